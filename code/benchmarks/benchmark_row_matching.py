@@ -0,0 +1,66 @@
+"""Compare rows/sec of matching table rows to DataFrame values with a df.loc lookup per column per row (the loop
+that parameterize_hillslopes and parameterize_channels ran inside their UpdateCursor) and with the single dict
+lookup per row of agwa_table_io.update_rows.
+
+Only the Python side of the update is timed: the rows stand in for what the UpdateCursor yields, so this runs
+without arcpy. benchmark_table_io.py times the cursors themselves.
+    python benchmark_row_matching.py 10000 100000
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+
+PARAMETERS = ["Ksat", "G", "Porosity", "Rock", "Distribution", "Cv", "Interception", "Canopy", "Manning",
+              "Imperviousness"]
+
+
+def timed(label, n_rows, function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<40} {elapsed:8.2f} s  {n_rows / elapsed:12.0f} rows/s")
+
+
+def records(df, fields):
+    df_fields = df[fields].astype(object)
+    return df_fields.where(df_fields.notna(), None).values.tolist()
+
+
+def benchmark(n_rows):
+    print(f"{n_rows} rows")
+    hillslope_ids = np.arange(n_rows) * 10 + 1
+    df = pd.DataFrame(np.random.rand(n_rows, len(PARAMETERS)), columns=PARAMETERS)
+    df.insert(0, "HillslopeID", hillslope_ids)
+    fields = ["HillslopeID"] + PARAMETERS
+    rows = [[int(hillslope_id)] + [None] * len(PARAMETERS) for hillslope_id in np.random.permutation(hillslope_ids)]
+
+    def match_with_loc(rows):
+        for row in rows:
+            hillslope_id = row[0]
+            for column in PARAMETERS:
+                values = df.loc[df["HillslopeID"] == hillslope_id, column].values
+                if values.size > 0:
+                    row[fields.index(column)] = values[0]
+
+    def match_with_dict():
+        lookup = {str(record[0]): record[1:] for record in records(df, fields)}
+        for row in rows:
+            values = lookup.get(str(row[0]))
+            if values is not None:
+                row[1:] = values
+
+    # df.loc is O(rows) per lookup, so it is only timed on a sample of the rows and scaled
+    sample = rows[:min(n_rows, 2000)]
+    start = time.perf_counter()
+    match_with_loc(sample)
+    elapsed = (time.perf_counter() - start) * n_rows / len(sample)
+    print(f"    {'df.loc per column per row (scaled)':<40} {elapsed:8.2f} s  {n_rows / elapsed:12.0f} rows/s")
+    timed("dict lookup per row (update_rows)", n_rows, match_with_dict)
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 100000]
+    for size in sizes:
+        benchmark(size)
@@ -0,0 +1,80 @@
+"""Compare rows/sec of per-row cursors and AddJoin/CalculateField with the bulk operations of agwa_table_io.
+
+Run with the ArcGIS Pro Python environment:
+    python benchmark_table_io.py 10000 100000
+"""
+import os
+import sys
+import time
+import arcpy
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+import agwa_table_io
+
+
+def create_table(gdb, name):
+    table = os.path.join(gdb, name)
+    arcpy.management.CreateTable(gdb, name)
+    arcpy.management.AddFields(table, [["DelineationName", "TEXT"], ["DiscretizationName", "TEXT"],
+                                       ["ParameterizationName", "TEXT"], ["HillslopeID", "LONG"],
+                                       ["Area", "DOUBLE"], ["MeanSlope", "DOUBLE"]])
+    return table
+
+
+def timed(label, n_rows, function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<40} {elapsed:8.2f} s  {n_rows / elapsed:12.0f} rows/s")
+
+
+def benchmark(gdb, n_rows):
+    print(f"{n_rows} rows")
+    fields = ["DelineationName", "DiscretizationName", "ParameterizationName", "HillslopeID"]
+    rows = [("d", "d_1", "p", i * 10 + 1) for i in range(n_rows)]
+    df_values = pd.DataFrame({"HillslopeID": [row[3] for row in rows],
+                              "Area": np.random.rand(n_rows), "MeanSlope": np.random.rand(n_rows)})
+
+    # Insert: one InsertCursor per row vs one InsertCursor
+    per_row_table = create_table(gdb, f"per_row_{n_rows}")
+    def insert_per_row():
+        for row in rows:
+            with arcpy.da.InsertCursor(per_row_table, fields) as cursor:
+                cursor.insertRow(row)
+    timed("insert, cursor per row", n_rows, insert_per_row)
+
+    bulk_table = create_table(gdb, f"bulk_{n_rows}")
+    timed("insert, agwa_table_io.append_rows", n_rows, lambda: agwa_table_io.append_rows(bulk_table, rows, fields))
+
+    # Update: AddJoin + CalculateField vs one keyed UpdateCursor
+    values_table = os.path.join(gdb, f"values_{n_rows}")
+    arcpy.management.CreateTable(gdb, f"values_{n_rows}")
+    arcpy.management.AddFields(values_table, [["HillslopeID", "LONG"], ["Area", "DOUBLE"], ["MeanSlope", "DOUBLE"]])
+    agwa_table_io.append_rows(values_table, df_values)
+    def update_with_join():
+        view = f"per_row_{n_rows}_view"
+        arcpy.management.MakeTableView(per_row_table, view)
+        arcpy.management.AddJoin(view, "HillslopeID", values_table, "HillslopeID")
+        arcpy.management.CalculateField(view, f"per_row_{n_rows}.Area", f"!values_{n_rows}.Area!", "PYTHON3")
+        arcpy.management.CalculateField(view, f"per_row_{n_rows}.MeanSlope", f"!values_{n_rows}.MeanSlope!",
+                                        "PYTHON3")
+        arcpy.management.RemoveJoin(view, f"values_{n_rows}")
+        arcpy.management.Delete(view)
+    timed("update, AddJoin + CalculateField", n_rows, update_with_join)
+    timed("update, agwa_table_io.update_rows", n_rows,
+          lambda: agwa_table_io.update_rows(bulk_table, df_values, "HillslopeID"))
+
+    # Delete by key
+    timed("delete, agwa_table_io.delete_rows", n_rows,
+          lambda: agwa_table_io.delete_rows(bulk_table, {"ParameterizationName": "p"}))
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 100000]
+    folder = tempfile.mkdtemp()
+    gdb = arcpy.management.CreateFileGDB(folder, "benchmark.gdb").getOutput(0)
+    for size in sizes:
+        benchmark(gdb, size)
+    arcpy.management.Delete(gdb)
@@ -8,6 +8,8 @@ from arcpy import da
 import sys
 import subprocess
 from datetime import datetime
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
 
 # Global Variables
 # Extension of the raster outputs
@@ -289,33 +291,32 @@ def create_burn_severity_lc(burn_severity_map, burn_severity_field, lc, change_t
     expression_start = ""
     expression_end = ""
 
-    # Open the Change Table using a Search Cursor
+    # Read the Change Table
     tweet("Creating con expression for RasterCalculator tool ... ")
     try:
-        with da.SearchCursor(change_table, burn_severity_fields) as s_cursor:
-            # Loop through each record returned by the cursor
-            for s_row in s_cursor:
-                # Access the values from the given columns
-                pre_burn_value = s_row[0]
-                severity_string = s_row[1]
-                post_burn_value = s_row[2]
-
-                # Convert severity from string to integer
-                if severity_string == "low":
-                    severity = 2
-                elif severity_string == "moderate":
-                    severity = 3
-                elif severity_string == "high":
-                    severity = 4
-                else:
-                    severity = -99
-
-                # Create expression based on the current row in the change table
-                # Example: Con((lc == 41.0) & (bslc == 2), 410.0
-                # lc is a variable that is replaced by the land cover raster, lc, when RasterCalculator is executed
-                # bslc is a variable that is replaced by the burn_severity_with_lc_extent raster
-                expression_start += f'Con((lc == {pre_burn_value}) & (bslc == {severity}), {post_burn_value}, '
-                expression_end += ")"  # Keeps track of closing brackets based on the number of loops
+        # Loop through each record of the change table, read once per session
+        for s_row in agwa_lookup_tables.burn_severity_changes(change_table).itertuples(index=False):
+            # Access the values from the given columns
+            pre_burn_value = s_row[0]
+            severity_string = s_row[1]
+            post_burn_value = s_row[2]
+
+            # Convert severity from string to integer
+            if severity_string == "low":
+                severity = 2
+            elif severity_string == "moderate":
+                severity = 3
+            elif severity_string == "high":
+                severity = 4
+            else:
+                severity = -99
+
+            # Create expression based on the current row in the change table
+            # Example: Con((lc == 41.0) & (bslc == 2), 410.0
+            # lc is a variable that is replaced by the land cover raster, lc, when RasterCalculator is executed
+            # bslc is a variable that is replaced by the burn_severity_with_lc_extent raster
+            expression_start += f'Con((lc == {pre_burn_value}) & (bslc == {severity}), {post_burn_value}, '
+            expression_end += ")"  # Keeps track of closing brackets based on the number of loops
     except Exception as e:
         tweet("Error: Setting up search cursor on the look-up table.", True)
         tweet(f"Exception message: {e}", True)
@@ -424,17 +425,13 @@ def change_entire_polygon(lc_raster, polygon, output_folder, new_name, lc_lut, l
     # Following variable will be used later in the code
     lc_to_class = -99
 
-    # Set up where clause to find the "from" land cover type
-    to_wc = f"{arcpy.AddFieldDelimiters(lc_lut, 'NAME')} = '{lc_to}'"
-
-    # Open the land cover look up table using a Search Cursor
+    # Read the land cover look up table (once per session, see agwa_lookup_tables)
     tweet("Retrieving class code from the land cover look up table ... ")
     try:
         # Retrieve the "CLASS" for the "to" land cover type
-        with da.SearchCursor(lc_lut, ["CLASS"], to_wc) as s_cursor:
-            # Loop through each record returned by the cursor
-            for s_row in s_cursor:
-                lc_to_class = int(s_row[0])
+        class_value = agwa_lookup_tables.land_cover_class(lc_lut, lc_to)
+        if class_value is not None:
+            lc_to_class = class_value
     except Exception as e:
         tweet("Error: Setting up search cursor on the land cover look-up table.", True)
         tweet(f"Exception message: {e}", True)
@@ -544,26 +541,18 @@ def change_selected_type(lc_raster, polygon, output_folder, lc_from, lc_to, lc_l
     lc_from_class = -99
     lc_to_class = -99
 
-    # Set up where clause to find the "from" land cover type
-    from_wc = f"{arcpy.AddFieldDelimiters(lc_lut, 'NAME')} = '{lc_from}'"
-
-    # Set up where clause to find the "from" land cover type
-    to_wc = f"{arcpy.AddFieldDelimiters(lc_lut, 'NAME')} = '{lc_to}'"
-
-    # Open the land cover look up table using a Search Cursor
+    # Read the land cover look up table (once per session, see agwa_lookup_tables)
     tweet("Retrieving class codes from the land cover look up table ... ")
     try:
         # Retrieve the "CLASS" for the "from" land cover type
-        with da.SearchCursor(lc_lut, ["CLASS"], from_wc) as s_cursor:
-            # Loop through each record returned by the cursor
-            for s_row in s_cursor:
-                lc_from_class = int(s_row[0])
+        class_value = agwa_lookup_tables.land_cover_class(lc_lut, lc_from)
+        if class_value is not None:
+            lc_from_class = class_value
 
         # Retrieve the "CLASS" for the "to" land cover type
-        with da.SearchCursor(lc_lut, ["CLASS"], to_wc) as s_cursor:
-            # Loop through each record returned by the cursor
-            for s_row in s_cursor:
-                lc_to_class = int(s_row[0])
+        class_value = agwa_lookup_tables.land_cover_class(lc_lut, lc_to)
+        if class_value is not None:
+            lc_to_class = class_value
 
     except Exception as e:
         tweet("Error: Setting up search cursor on the land cover look-up table.", True)
@@ -721,21 +710,17 @@ def create_spatially_random_surface(lc_raster, polygon, output_folder, random_di
     # Dictionary will store land cover type as key and class code as value
     class_dict = {}
 
-    # Open the land cover look up table using a Search Cursor
+    # Read the land cover look up table (once per session, see agwa_lookup_tables)
     tweet("Retrieving class codes from the land cover look up table ... ")
 
     # Loop through the dictionary keys
     for each_type in random_dict.keys():
-        # Set up where clause to find the "to" land cover type
-        to_wc = f"{arcpy.AddFieldDelimiters(lc_lut, 'NAME')} = '{each_type}'"
-
         try:
             # Retrieve the "CLASS" for the "to" land cover type
-            with da.SearchCursor(lc_lut, ["CLASS"], to_wc) as s_cursor:
-                # Loop through each record returned by the cursor
-                for s_row in s_cursor:
-                    # Add class code to dictionary with the land cover type as key
-                    class_dict[each_type] = int(s_row[0])
+            class_value = agwa_lookup_tables.land_cover_class(lc_lut, each_type)
+            if class_value is not None:
+                # Add class code to dictionary with the land cover type as key
+                class_dict[each_type] = class_value
         except Exception as e:
             tweet("Error: Setting up search cursor on the land cover look-up table.", True)
             tweet(f"Exception message: {e}", True)
@@ -953,21 +938,17 @@ def create_patchy_fractal_surface(lc_raster, polygon, output_folder, new_name, l
     # Dictionary will store land cover type as key and class code as value
     class_dict = {}
 
-    # Open the land cover look up table using a Search Cursor
+    # Read the land cover look up table (once per session, see agwa_lookup_tables)
     tweet("Retrieving class codes from the land cover look up table ... ")
 
     # Loop through the dictionary keys
     for each_type in random_dict.keys():
-        # Set up where clause to find the "to" land cover type
-        to_wc = f"{arcpy.AddFieldDelimiters(lc_lut, 'NAME')} = '{each_type}'"
-
         try:
             # Retrieve the "CLASS" for the "to" land cover type
-            with da.SearchCursor(lc_lut, ["CLASS"], to_wc) as s_cursor:
-                # Loop through each record returned by the cursor
-                for s_row in s_cursor:
-                    # Add class code to dictionary with the land cover type as key
-                    class_dict[each_type] = int(s_row[0])
+            class_value = agwa_lookup_tables.land_cover_class(lc_lut, each_type)
+            if class_value is not None:
+                # Add class code to dictionary with the land cover type as key
+                class_dict[each_type] = class_value
         except Exception as e:
             tweet("Error: Setting up search cursor on the land cover look-up table.", True)
             tweet(f"Exception message: {e}", True)
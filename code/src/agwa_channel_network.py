@@ -0,0 +1,253 @@
+import os
+import arcpy
+import numpy as np
+import pandas as pd
+import agwa_table_io
+
+
+# Channels of each discretization with the node fields of the channels feature class and the channel they flow
+# into (-1 for the outlet), written by Step 3 Discretize Watershed
+CHANNEL_NETWORK_TABLE = "channel_network"
+CHANNEL_NETWORK_FIELDS = [("DelineationName", "TEXT"), ("DiscretizationName", "TEXT"), ("ChannelID", "LONG"),
+                          ("arcid", "LONG"), ("grid_code", "LONG"), ("from_node", "LONG"), ("to_node", "LONG"),
+                          ("DownstreamChannel", "LONG"), ("CreationDate", "TEXT"), ("AGWAVersionAtCreation", "TEXT"),
+                          ("AGWAGDBVersionAtCreation", "TEXT"), ("Status", "TEXT")]
+
+
+class ChannelNetwork(object):
+    """In-memory topology of the channels of one discretization.
+
+    The network is built from a single read of the channel_network table, or for discretizations
+    created before it, of the contributing_channels table and the {discretization}_channels feature
+    class, so stages that need the channel topology (stream sequence, contributing areas, parameter
+    file) can walk it without issuing one cursor per channel."""
+
+    def __init__(self, channel_ids, contributing, outlet_channel_id):
+        """channel_ids: iterable of ChannelIDs in the discretization.
+        contributing: dict of ChannelID -> list of ChannelIDs flowing directly into it.
+        outlet_channel_id: ChannelID of the watershed outlet channel."""
+
+        self.channel_ids = [int(channel_id) for channel_id in channel_ids]
+        self.contributing = {channel_id: [] for channel_id in self.channel_ids}
+        for channel_id, contributing_ids in contributing.items():
+            self.contributing.setdefault(int(channel_id), []).extend(int(c) for c in contributing_ids)
+
+        self.downstream = {}
+        for channel_id, contributing_ids in self.contributing.items():
+            for contributing_id in contributing_ids:
+                self.downstream[contributing_id] = channel_id
+
+        self.outlet_channel_id = int(outlet_channel_id) if outlet_channel_id is not None else None
+        self._sequence = None
+
+    @classmethod
+    def from_workspace(cls, workspace, delineation_name, discretization_name):
+        """Build the network of a discretization from the workspace geodatabase."""
+
+        channel_network_table = os.path.join(workspace, CHANNEL_NETWORK_TABLE)
+        if arcpy.Exists(channel_network_table):
+            df_network = agwa_table_io.read_table(channel_network_table,
+                                                  ["ChannelID", "arcid", "grid_code", "from_node", "to_node",
+                                                   "DownstreamChannel"],
+                                                  {"DelineationName": delineation_name,
+                                                   "DiscretizationName": discretization_name})
+            if not df_network.empty:
+                return cls.from_dataframe(workspace, discretization_name, df_network)
+
+        channels_feature_class = os.path.join(workspace, f"{discretization_name}_channels")
+        channel_fields = ["ChannelID", "arcid", "grid_code", "from_node", "to_node"]
+        df_channels = agwa_table_io.read_table(channels_feature_class, channel_fields)
+
+        contributing_channels_table = os.path.join(workspace, "contributing_channels")
+        df_contrib = agwa_table_io.read_table(contributing_channels_table, ["ChannelID", "ContributingChannel"],
+                                              {"DelineationName": delineation_name,
+                                               "DiscretizationName": discretization_name}, skip_nulls=True)
+
+        # ChannelID and ContributingChannel are stored as text in contributing_channels
+        contributing = {}
+        for channel_id, contributing_id in zip(df_contrib.ChannelID, df_contrib.ContributingChannel):
+            contributing.setdefault(int(float(channel_id)), []).append(int(float(contributing_id)))
+
+        outlet_channel_id = cls._find_outlet_channel(workspace, discretization_name, df_channels, contributing)
+
+        return cls(df_channels.ChannelID.values, contributing, outlet_channel_id)
+
+    @classmethod
+    def from_dataframe(cls, workspace, discretization_name, df_network):
+        """Build the network of a discretization from the rows of the channel_network table (df_network)."""
+
+        contributing = {}
+        for channel_id, downstream_id in zip(df_network.ChannelID, df_network.DownstreamChannel):
+            if downstream_id != -1:
+                contributing.setdefault(int(downstream_id), []).append(int(channel_id))
+
+        outlet_channel_id = cls._find_outlet_channel(workspace, discretization_name, df_network, contributing)
+
+        return cls(df_network.ChannelID.values, contributing, outlet_channel_id)
+
+    @staticmethod
+    def _find_outlet_channel(workspace, discretization_name, df_channels, contributing):
+        """Identify the outlet channel from the outlet node of the discretization nodes feature class.
+        Falls back to the channel that does not contribute to any other channel."""
+
+        nodes_feature_class = os.path.join(workspace, f"{discretization_name}_nodes")
+        if arcpy.Exists(nodes_feature_class):
+            node_type_field = arcpy.AddFieldDelimiters(workspace, "node_type")
+            expression = f"{node_type_field} = 'outlet'"
+            fields = ["arcid", "grid_code", "from_node", "to_node"]
+            with arcpy.da.SearchCursor(nodes_feature_class, fields, expression) as nodes_cursor:
+                for nodes_row in nodes_cursor:
+                    df_outlet = df_channels[(df_channels.arcid == nodes_row[0]) &
+                                            (df_channels.grid_code == nodes_row[1]) &
+                                            (df_channels.from_node == nodes_row[2]) &
+                                            (df_channels.to_node == nodes_row[3])]
+                    if not df_outlet.empty:
+                        return int(df_outlet.ChannelID.values[0])
+
+        contributing_ids = {c for contributing_ids in contributing.values() for c in contributing_ids}
+        outlet_candidates = [int(c) for c in df_channels.ChannelID.values if int(c) not in contributing_ids]
+        if len(outlet_candidates) == 0:
+            raise Exception(f"Cannot identify the outlet channel of the discretization '{discretization_name}'.")
+        return outlet_candidates[0]
+
+    def __len__(self):
+        return len(self.channel_ids)
+
+    def upstream_channels(self, channel_id):
+        """Return the channels flowing directly into channel_id."""
+        return self.contributing.get(int(channel_id), [])
+
+    def downstream_channel(self, channel_id):
+        """Return the channel that channel_id flows into, or None for the outlet channel."""
+        return self.downstream.get(int(channel_id))
+
+    def headwater_channels(self):
+        """Return the channels without contributing channels."""
+        return [channel_id for channel_id in self.channel_ids if not self.contributing[channel_id]]
+
+    def sequence(self):
+        """Return a dict of ChannelID -> Sequence.
+
+        The sequence is the post-order of the network starting at the outlet, so every channel is
+        sequenced after all of its contributing channels and the outlet channel has the highest sequence."""
+
+        if self._sequence is not None:
+            return self._sequence
+
+        unprocessed_stack = [self.outlet_channel_id]
+        visited = set()
+        processed = []
+        while unprocessed_stack:
+            channel_id = unprocessed_stack[-1]
+            if channel_id in visited:
+                processed.append(unprocessed_stack.pop())
+                continue
+
+            visited.add(channel_id)
+            contributing_ids = self.contributing.get(channel_id, [])
+            if contributing_ids:
+                unprocessed_stack.extend(contributing_ids)
+            else:
+                # No contributing channels so add to the processed list
+                processed.append(unprocessed_stack.pop())
+
+        self._sequence = {channel_id: sequence for sequence, channel_id in enumerate(processed, start=1)}
+        return self._sequence
+
+    def topological_order(self):
+        """Return the ChannelIDs ordered by sequence, from the headwaters to the outlet."""
+        sequence = self.sequence()
+        return sorted(sequence, key=sequence.get)
+
+    def unsequenced_channels(self):
+        """Return the channels that are not connected to the outlet channel."""
+        sequence = self.sequence()
+        return [channel_id for channel_id in self.channel_ids if channel_id not in sequence]
+
+    def levels(self):
+        """Return a dict of ChannelID -> number of channels between it and the channel it ultimately drains to
+        (0 for the outlet channel)."""
+
+        levels = {}
+        for channel_id in self.channel_ids:
+            path = []
+            current = channel_id
+            while current not in levels and current in self.downstream:
+                path.append(current)
+                current = self.downstream[current]
+            level = levels.setdefault(current, 0)
+            for upstream_id in reversed(path):
+                level += 1
+                levels[upstream_id] = level
+        return levels
+
+    def accumulate(self, lateral_values, headwater_values):
+        """Accumulate element values downstream through the network.
+
+        lateral_values: array (n_channels, k) of values contributed along each channel (lateral hillslopes).
+        headwater_values: array (n_channels, k) of values of the headwater hillslope of each channel,
+            NaN where the channel has no headwater hillslope.
+        Rows are in the order of self.channel_ids. Returns an array (n_channels, k) of upstream values:
+        the headwater value when the channel has a headwater hillslope, otherwise the sum of the lateral and
+        upstream values of its contributing channels. Channels are processed level by level from the
+        headwaters, so each level is one vectorized NumPy update."""
+
+        lateral_values = np.asarray(lateral_values, dtype=float).reshape(len(self.channel_ids), -1)
+        headwater_values = np.asarray(headwater_values, dtype=float).reshape(len(self.channel_ids), -1)
+        has_headwater = ~np.isnan(headwater_values[:, 0])
+
+        index = {channel_id: i for i, channel_id in enumerate(self.channel_ids)}
+        downstream_index = np.array([index.get(self.downstream.get(c), -1) for c in self.channel_ids], dtype=np.int64)
+        levels = self.levels()
+        channel_levels = np.array([levels[c] for c in self.channel_ids], dtype=np.int64)
+
+        accumulated = np.zeros_like(lateral_values)
+        upstream_values = np.zeros_like(lateral_values)
+        for level in range(channel_levels.max(initial=0), -1, -1):
+            idx = np.flatnonzero(channel_levels == level)
+            upstream_values[idx] = np.where(has_headwater[idx, None], headwater_values[idx], accumulated[idx])
+            idx = idx[downstream_index[idx] >= 0]
+            np.add.at(accumulated, downstream_index[idx], lateral_values[idx] + upstream_values[idx])
+
+        return upstream_values
+
+    def accumulate_hillslopes(self, df_hillslopes, quantities=None, weight_field="Area"):
+        """Calculate LateralArea and UpstreamArea of every channel from the hillslope areas.
+
+        df_hillslopes must contain HillslopeID and weight_field. Hillslopes ChannelID - 1 and ChannelID - 2 are
+        the laterals of a channel and ChannelID - 3 is its headwater hillslope. For each column q in quantities,
+        an Upstream<q> column is added with the area-weighted mean of q over all hillslopes draining to the
+        channel outlet (UpstreamArea + LateralArea), e.g. upstream mean slope or imperviousness. Extra quantities
+        are accumulated in the same pass as the areas."""
+
+        quantities = list(quantities or [])
+        df = df_hillslopes.drop_duplicates("HillslopeID").set_index("HillslopeID")
+        weights = df[weight_field].astype(float)
+        columns = [weights] + [df[q].astype(float) * weights for q in quantities]
+        values = pd.concat(columns, axis=1).fillna(0.0)
+        values.columns = range(len(columns))
+
+        channel_ids = np.array(self.channel_ids, dtype=np.int64)
+        lateral_values = (values.reindex(channel_ids - 1).fillna(0.0).values +
+                          values.reindex(channel_ids - 2).fillna(0.0).values)
+        headwater_values = values.reindex(channel_ids - 3).values
+
+        upstream_values = self.accumulate(lateral_values, headwater_values)
+
+        df_result = pd.DataFrame({"ChannelID": channel_ids,
+                                  "LateralArea": lateral_values[:, 0],
+                                  "UpstreamArea": upstream_values[:, 0]})
+        total_area = lateral_values[:, 0] + upstream_values[:, 0]
+        for i, quantity in enumerate(quantities, start=1):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                df_result[f"Upstream{quantity}"] = (lateral_values[:, i] + upstream_values[:, i]) / total_area
+        return df_result
+
+    def to_dataframe(self):
+        """Return the network as a DataFrame with ChannelID, DownstreamChannel and Sequence columns.
+        DownstreamChannel is -1 for the outlet channel and Sequence is NaN for unsequenced channels."""
+        sequence = self.sequence()
+        return pd.DataFrame({
+            "ChannelID": np.array(self.channel_ids, dtype=np.int64),
+            "DownstreamChannel": np.array([self.downstream.get(c, -1) for c in self.channel_ids], dtype=np.int64),
+            "Sequence": np.array([sequence.get(c, np.nan) for c in self.channel_ids], dtype=float)})
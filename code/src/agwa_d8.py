@@ -0,0 +1,512 @@
+import os
+import tempfile
+import numpy as np
+
+# Pure NumPy implementation of the D8 steps of Step 3 Discretize Watershed (StreamLink, StreamOrder SHREVE,
+# unique pour points and Watershed). It does not import arcpy, so it runs without ArcGIS.
+#
+# Grids are 2D arrays in row-major order (row 0 is the north edge). Flow directions use the ArcGIS D8 encoding
+# and 0 for cells that are NoData or outside the mask. Cell arrays are indexed by the flat index row * n_cols + col.
+
+# D8 code -> (row offset, column offset) of the cell it flows into
+D8_OFFSETS = {1: (0, 1), 2: (1, 1), 4: (1, 0), 8: (1, -1), 16: (0, -1), 32: (-1, -1), 64: (-1, 0), 128: (-1, 1)}
+
+# Grids with more cells than this use memory-mapped arrays in the work folder instead of memory
+IN_MEMORY_CELLS = 100_000_000
+
+# Number of rows processed at a time by the neighborhood passes, and of cells by the flat passes
+ROW_BLOCK_SIZE = 1024
+CHUNK_SIZE = 1 << 22
+
+
+def empty_array(shape, dtype, directory=None, name=None):
+    """Uninitialized array, memory-mapped in directory when it has more than IN_MEMORY_CELLS cells."""
+
+    if directory is None or int(np.prod(shape)) <= IN_MEMORY_CELLS:
+        return np.empty(shape, dtype)
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, path = tempfile.mkstemp(prefix=f"{name or 'array'}_", suffix=".npy", dir=directory)
+    os.close(file_descriptor)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+
+def grid_array(values, shape, dtype, directory=None, name=None):
+    """Copy of the flat cell values as a grid of shape and dtype (see empty_array), filled chunk by chunk so that
+    no full-size temporary copy of values is made."""
+
+    out = empty_array(shape, dtype, directory, name)
+    flat = out.reshape(-1)
+    for start, stop in _chunks(flat.size):
+        flat[start:stop] = values[start:stop]
+    return out
+
+
+def downstream_cells(flow_direction, directory=None):
+    """Flat index of the cell each cell flows into, -1 when the cell has no flow direction or flows out of the
+    grid or into a cell without flow direction."""
+
+    n_rows, n_cols = flow_direction.shape
+    downstream = empty_array((n_rows * n_cols,), np.int64, directory, "downstream")
+    for row, block_rows in _row_blocks(n_rows):
+        block = np.asarray(flow_direction[row:row + block_rows])
+        rows, cols = np.indices(block.shape)
+        rows += row
+        block_downstream = np.full(block.shape, -1, np.int64)
+        for code, (d_row, d_col) in D8_OFFSETS.items():
+            is_code = block == code
+            to_rows, to_cols = rows[is_code] + d_row, cols[is_code] + d_col
+            inside = (to_rows >= 0) & (to_rows < n_rows) & (to_cols >= 0) & (to_cols < n_cols)
+            targets = np.full(to_rows.shape, -1, np.int64)
+            targets[inside] = to_rows[inside] * n_cols + to_cols[inside]
+            has_direction = np.zeros(targets.shape, bool)
+            has_direction[inside] = flow_direction.reshape(-1)[targets[inside]] != 0
+            block_downstream[is_code] = np.where(has_direction, targets, -1)
+        downstream[row * n_cols:(row + block_rows) * n_cols] = block_downstream.reshape(-1)
+    return downstream
+
+
+def stream_links(flow_direction, stream, directory=None):
+    """Stream link raster, like arcpy.sa.StreamLink: each section of the stream network between junctions gets a
+    unique value. A link starts at a stream cell that has no upstream stream cell (source) or more than one
+    (junction), and continues downstream through the cells that have exactly one. Links are numbered from 1 in
+    the row-major order of their first cell, which is not the numbering of StreamLink: the links are the same but
+    their values differ (see config.DISCRETIZATION_BACKEND). Returns a flat int64 array, 0 off the stream network."""
+
+    n_cells = stream.size
+    stream = stream.reshape(-1)
+    n_upstream, upstream = _upstream_stream_cells(flow_direction, stream, directory)
+
+    # Each link cell points to its upstream cell, and the first cell of the link to itself
+    first_cell = empty_array((n_cells,), np.int64, directory, "first_cell")
+    for start, stop in _chunks(n_cells):
+        cells = np.arange(start, stop, dtype=np.int64)
+        first_cell[start:stop] = np.where(stream[start:stop] & (n_upstream[start:stop] == 1), upstream[start:stop],
+                                          cells)
+    _find_roots(first_cell)
+
+    # Link number of the first cells, in row-major order
+    link_number = upstream
+    count = 0
+    for start, stop in _chunks(n_cells):
+        is_first = stream[start:stop] & (n_upstream[start:stop] != 1)
+        numbers = count + np.cumsum(is_first)
+        link_number[start:stop] = numbers
+        count = int(numbers[-1]) if len(numbers) else count
+
+    links = empty_array((n_cells,), np.int64, directory, "links")
+    for start, stop in _chunks(n_cells):
+        links[start:stop] = np.where(stream[start:stop], link_number[first_cell[start:stop]], 0)
+    return links
+
+
+def shreve_order(flow_direction, stream, links, directory=None, downstream=None):
+    """Shreve stream order, like arcpy.sa.StreamOrder with SHREVE: links without upstream links have order 1 and
+    the order of a link is the sum of the orders of the links flowing into it. links is the stream link array of
+    stream (see stream_links), downstream the downstream cells if already computed (see downstream_cells).
+    Returns a flat int64 array, 0 off the stream network."""
+
+    n_links = int(_maximum(links))
+    if downstream is None:
+        downstream = downstream_cells(flow_direction, directory)
+    stream = stream.reshape(-1)
+
+    # Link each link flows into (0 at the outlets)
+    downstream_link = np.zeros(n_links + 1, np.int64)
+    for start, stop in _chunks(stream.size):
+        cell_links = links[start:stop]
+        targets = downstream[start:stop]
+        target_links = np.zeros(len(targets), np.int64)
+        flows = targets >= 0
+        target_links[flows] = links[targets[flows]]
+        leaves = (cell_links > 0) & (target_links > 0) & (target_links != cell_links)
+        downstream_link[cell_links[leaves]] = target_links[leaves]
+
+    order = _link_orders(downstream_link)
+    cell_order = empty_array((stream.size,), np.int64, directory, "shreve_order")
+    for start, stop in _chunks(stream.size):
+        cell_order[start:stop] = order[links[start:stop]]
+    return cell_order
+
+
+def link_heads(flow_direction, links, directory=None):
+    """First cell of each link: the cells of links that have no upstream cell in the same link. These are the
+    cells of minimum flow accumulation of each link, where ZonalFill of the flow accumulation by stream link
+    equals the flow accumulation. Returns a flat boolean array."""
+
+    n_rows, n_cols = flow_direction.shape
+    links_2d = links.reshape(n_rows, n_cols)
+    heads = empty_array((n_rows * n_cols,), bool, directory, "heads")
+    for row, block_rows, neighbors in _neighbor_blocks(flow_direction, links_2d):
+        block_links = np.asarray(links_2d[row:row + block_rows])
+        has_upstream = np.zeros(block_links.shape, bool)
+        for flows_in, neighbor_links in neighbors:
+            has_upstream |= flows_in & (neighbor_links == block_links)
+        heads[row * n_cols:(row + block_rows) * n_cols] = ((block_links > 0) & ~has_upstream).reshape(-1)
+    return heads
+
+
+def unique_pour_points(flow_direction, links, first_order, directory=None):
+    """Pour point values of the stream cells: link * 10, plus 1 at the first cell of the first order links
+    (stream link * 10 + zero order points). Returns a flat int64 array, 0 off the stream network."""
+
+    heads = link_heads(flow_direction, links, directory)
+    pour_points = empty_array((links.size,), np.int64, directory, "pour_points")
+    for start, stop in _chunks(links.size):
+        pour_points[start:stop] = links[start:stop] * 10 + (heads[start:stop] & first_order[start:stop])
+    return pour_points
+
+
+def label_watersheds(flow_direction, pour_points, directory=None):
+    """Hillslope labels, like arcpy.sa.Watershed: each cell gets the value of the first pour point (non-zero
+    value of pour_points) on its flow path, including itself. Returns a flat int64 array, 0 for cells that do
+    not drain to a pour point."""
+
+    downstream = downstream_cells(flow_direction, directory)
+    root = downstream
+    for start, stop in _chunks(root.size):
+        cells = np.arange(start, stop, dtype=np.int64)
+        targets = root[start:stop]
+        root[start:stop] = np.where((pour_points[start:stop] != 0) | (targets < 0), cells, targets)
+    _find_roots(root)
+
+    labels = empty_array((root.size,), np.int64, directory, "labels")
+    for start, stop in _chunks(root.size):
+        labels[start:stop] = pour_points[root[start:stop]]
+    return labels
+
+
+def discretize(flow_direction, stream, directory=None):
+    """Stream links, Shreve order, unique pour points and hillslope labels of a stream network on a D8 flow
+    direction grid. Returns a dict of 2D arrays with the shape of flow_direction."""
+
+    shape = flow_direction.shape
+    links = stream_links(flow_direction, stream, directory)
+    order = shreve_order(flow_direction, stream, links, directory)
+    pour_points = unique_pour_points(flow_direction, links, order == 1, directory)
+    labels = label_watersheds(flow_direction, pour_points, directory)
+    return {"stream_links": links.reshape(shape), "shreve_order": order.reshape(shape),
+            "pour_points": pour_points.reshape(shape), "labels": labels.reshape(shape)}
+
+
+def link_count_curve(flow_direction, metric, thresholds):
+    """Number of channel heads and of confluences of the stream networks metric > threshold, for each of
+    thresholds, in one pass over the grid. metric is a 2D array that increases downstream (flow accumulation or
+    flow length upstream). A cell is a head for thresholds between the largest metric of the cells flowing into it
+    and its own metric, and a confluence for thresholds below the second largest (and its own), so the counts of
+    all the thresholds are histograms of these bounds. The number of links (channels) is heads + confluences.
+    Returns two int64 arrays in the order of thresholds."""
+
+    thresholds = np.asarray(thresholds, dtype=float)
+    order = np.argsort(thresholds)
+    sorted_thresholds = thresholds[order]
+    counts = {"own": np.zeros(len(thresholds) + 1, np.int64), "head_end": np.zeros(len(thresholds) + 1, np.int64),
+              "confluence": np.zeros(len(thresholds) + 1, np.int64)}
+
+    for row, block_rows, neighbors in _neighbor_blocks(flow_direction, metric):
+        block_metric = np.asarray(metric[row:row + block_rows], dtype=float)
+        inside = np.asarray(flow_direction[row:row + block_rows]) != 0
+        largest = np.full(block_metric.shape, -np.inf)
+        second = np.full(block_metric.shape, -np.inf)
+        for flows_in, neighbor_metric in neighbors:
+            values = np.where(flows_in, neighbor_metric, -np.inf)
+            second = np.maximum(second, np.minimum(largest, values))
+            largest = np.maximum(largest, values)
+        bounds = {"own": block_metric, "head_end": np.minimum(largest, block_metric),
+                  "confluence": np.minimum(second, block_metric)}
+        for name, values in bounds.items():
+            # Number of sorted thresholds below each value: the value is above thresholds[:n]
+            n_below = np.searchsorted(sorted_thresholds, values[inside], side="left")
+            counts[name] += np.bincount(n_below, minlength=len(thresholds) + 1)
+
+    # Number of cells whose value is above each threshold
+    above = {name: np.cumsum(count[::-1])[::-1][1:] for name, count in counts.items()}
+    heads, confluences = np.empty(len(thresholds), np.int64), np.empty(len(thresholds), np.int64)
+    heads[order] = above["own"] - above["head_end"]
+    confluences[order] = above["confluence"]
+    return heads, confluences
+
+
+class FlowGraph(object):
+    """D8 flow graph of a grid, built once and shared by several discretizations of the grid (e.g. a sweep of
+    channel initiation thresholds): the downstream cell of each cell, and the cells in topological order grouped
+    by the number of cells between them and the end of their flow path (their level). Hillslope labels are then
+    one pass over the levels instead of the pointer jumping of label_watersheds."""
+
+    def __init__(self, flow_direction, directory=None):
+        self.flow_direction = flow_direction
+        self.directory = directory
+        self.downstream = downstream_cells(flow_direction, directory)
+        levels = _path_lengths(self.downstream, directory)
+        self.order = np.argsort(levels, kind="stable")
+        self.level_starts = np.searchsorted(levels[self.order], np.arange(_maximum(levels) + 2))
+
+    def levels(self):
+        """Yield the cells of each level, from the ends of the flow paths (level 0) upstream."""
+        for start, stop in zip(self.level_starts[:-1], self.level_starts[1:]):
+            yield self.order[start:stop]
+
+    def label_watersheds(self, pour_points):
+        """Hillslope labels, see label_watersheds. Each level takes the labels of the level below it."""
+
+        labels = empty_array((self.downstream.size,), np.int64, self.directory, "labels")
+        for level, cells in enumerate(self.levels()):
+            own = pour_points[cells]
+            if level == 0:
+                labels[cells] = own
+            else:
+                labels[cells] = np.where(own != 0, own, labels[self.downstream[cells]])
+        return labels
+
+    def discretize(self, stream):
+        """Stream links, Shreve order, unique pour points and hillslope labels of the stream cells stream, see
+        discretize. Returns a dict of 2D arrays with the shape of the grid."""
+
+        shape = self.flow_direction.shape
+        links = stream_links(self.flow_direction, stream, self.directory)
+        order = shreve_order(self.flow_direction, stream, links, self.directory, self.downstream)
+        pour_points = unique_pour_points(self.flow_direction, links, order == 1, self.directory)
+        labels = self.label_watersheds(pour_points)
+        return {"stream_links": links.reshape(shape), "shreve_order": order.reshape(shape),
+                "pour_points": pour_points.reshape(shape), "labels": labels.reshape(shape)}
+
+
+class ThresholdSweep(object):
+    """Stream networks metric > threshold of a FlowGraph for increasing thresholds, derived incrementally. The stream
+    cells of a threshold are a subset of the stream cells of the threshold below it, so only the first threshold
+    takes passes over the grid (the stream cells and a pass over the levels of the flow graph, which finds the stream
+    cell where the flow path of each cell enters the network). Each next threshold only revisits the stream cells of
+    the previous one: the cells that leave the network pass their flow paths on to the next remaining stream cell
+    downstream, and links, Shreve order and pour points are computed on the remaining cells. Hillslope labels are
+    the pour point where the flow path of each cell enters the network and are only expanded to the grid by
+    labels_grid."""
+
+    def __init__(self, flow_graph, metric):
+        self.flow_graph = flow_graph
+        self.metric = metric.reshape(-1)
+        self.threshold = None
+        # Stream cells in row-major order, and their link, Shreve order and pour point values
+        self.cells = None
+        self.links = None
+        self.order = None
+        self.pour_points = None
+        # For each cell, the position in the stream cells of the first threshold of the stream cell where its flow
+        # path enters the network (-1 if none), and for each of these, the position in cells of the stream cell
+        # its flow path now enters the network at
+        self._entry = None
+        self._entry_cells = None
+
+    def advance(self, threshold):
+        """Move to the stream network metric > threshold, which must not be lower than the previous threshold."""
+
+        if self.threshold is not None and threshold < self.threshold:
+            raise Exception("The thresholds of a sweep must be in increasing order.")
+        if self.cells is None:
+            self._first_network(threshold)
+        else:
+            self._next_network(threshold)
+        self.threshold = threshold
+        self._link_network()
+
+    def channel_grid(self, out, nodata_value=255):
+        """Fill out, an array of the shape of the grid that can be memory-mapped, with 1 on the stream cells, 0 off
+        them and nodata_value where there is no flow direction. Returns out."""
+
+        flat = out.reshape(-1)
+        flow_direction = self.flow_graph.flow_direction.reshape(-1)
+        for start, stop in _chunks(flat.size):
+            flat[start:stop] = np.where(flow_direction[start:stop] != 0, 0, nodata_value)
+        flat[self.cells] = 1
+        return out
+
+    def links_grid(self, out):
+        """Fill out with the stream links, 0 off the stream network (see stream_links). Returns out."""
+
+        flat = out.reshape(-1)
+        for start, stop in _chunks(flat.size):
+            flat[start:stop] = 0
+        flat[self.cells] = self.links
+        return out
+
+    def labels_grid(self, out):
+        """Fill out with the hillslope labels, 0 for cells that do not drain to the stream network (see
+        label_watersheds). Returns out."""
+
+        # Pour point of each entry of the first threshold, and 0 at the end for the cells without entry (-1)
+        entry_pour_points = np.zeros(len(self._entry_cells) + 1, np.int64)
+        drains = self._entry_cells >= 0
+        entry_pour_points[:-1][drains] = self.pour_points[self._entry_cells[drains]]
+        flat = out.reshape(-1)
+        for start, stop in _chunks(flat.size):
+            flat[start:stop] = entry_pour_points[self._entry[start:stop]]
+        return out
+
+    def _first_network(self, threshold):
+        flow_direction = self.flow_graph.flow_direction.reshape(-1)
+        self.cells = np.concatenate([np.zeros(0, np.int64)] + [
+            start + np.flatnonzero((self.metric[start:stop] > threshold) & (flow_direction[start:stop] != 0))
+            for start, stop in _chunks(flow_direction.size)])
+
+        # Label the cells with 1 + the position of their entry in the stream cells
+        positions = empty_array((flow_direction.size,), np.int64, self.flow_graph.directory, "positions")
+        for start, stop in _chunks(positions.size):
+            positions[start:stop] = 0
+        positions[self.cells] = np.arange(1, len(self.cells) + 1)
+        self._entry = self.flow_graph.label_watersheds(positions)
+        for start, stop in _chunks(self._entry.size):
+            self._entry[start:stop] -= 1
+        self._entry_cells = np.arange(len(self.cells))
+
+    def _next_network(self, threshold):
+        n_cells = len(self.cells)
+        remains = self.metric[self.cells] > threshold
+        leaves = np.flatnonzero(~remains)
+
+        # Each cell that leaves points to the entry of its downstream cell, position n_cells when it has none
+        parent = np.arange(n_cells + 1)
+        downstream = self.flow_graph.downstream[self.cells[leaves]]
+        entry = np.full(len(leaves), -1, np.int64)
+        entry[downstream >= 0] = self._entry[downstream[downstream >= 0]]
+        entry_cells = np.full(len(leaves), -1, np.int64)
+        entry_cells[entry >= 0] = self._entry_cells[entry[entry >= 0]]
+        parent[leaves] = np.where(entry_cells >= 0, entry_cells, n_cells)
+        _find_roots(parent)
+
+        # The roots are the remaining cells and n_cells, whose new position is -1
+        new_positions = np.append(np.cumsum(remains) - 1, -1)
+        moved = new_positions[parent]
+        self._entry_cells = np.where(self._entry_cells >= 0, moved[self._entry_cells], -1)
+        self.cells = self.cells[remains]
+
+    def _link_network(self):
+        # Links, Shreve order and pour points of the stream cells, as stream_links, shreve_order and
+        # unique_pour_points: the first cell of a link (its head) has no upstream stream cell or more than one
+        n_cells = len(self.cells)
+        positions = np.arange(n_cells)
+        downstream = self.flow_graph.downstream[self.cells]
+        targets = np.minimum(np.searchsorted(self.cells, downstream), max(n_cells - 1, 0))
+        flows = (downstream >= 0) & (self.cells[targets] == downstream)
+        n_upstream = np.bincount(targets[flows], minlength=n_cells)
+        upstream = positions.copy()
+        upstream[targets[flows]] = positions[flows]
+        is_first = n_upstream != 1
+
+        first = np.where(is_first, positions, upstream)
+        _find_roots(first)
+        self.links = np.cumsum(is_first)[first]
+
+        downstream_link = np.zeros(np.count_nonzero(is_first) + 1, np.int64)
+        leaves = flows & (self.links[targets] != self.links)
+        downstream_link[self.links[leaves]] = self.links[targets[leaves]]
+        self.order = _link_orders(downstream_link)[self.links]
+        self.pour_points = self.links * 10 + (is_first & (self.order == 1))
+
+
+def _link_orders(downstream_link):
+    # Shreve order of each link from the link each link flows into (0 at the outlets, and for the unused link 0),
+    # accumulated from the sources to the outlets one level of links at a time
+    n_links = len(downstream_link) - 1
+    n_upstream_links = np.bincount(downstream_link[1:], minlength=n_links + 1)
+    n_upstream_links[0] = 0
+    order = np.zeros(n_links + 1, np.int64)
+    level = np.flatnonzero(n_upstream_links[1:] == 0) + 1
+    order[level] = 1
+    remaining = n_upstream_links.copy()
+    while len(level):
+        targets = downstream_link[level]
+        flows = targets > 0
+        np.add.at(order, targets[flows], order[level[flows]])
+        np.subtract.at(remaining, targets[flows], 1)
+        candidates = np.unique(targets[flows])
+        level = candidates[remaining[candidates] == 0]
+    return order
+
+
+def _path_lengths(downstream, directory):
+    # Number of cells downstream of each cell on its flow path, by pointer jumping with path lengths
+    parent = empty_array(downstream.shape, np.int64, directory, "parent")
+    lengths = empty_array(downstream.shape, np.int64, directory, "path_lengths")
+    for start, stop in _chunks(downstream.size):
+        targets = downstream[start:stop]
+        parent[start:stop] = np.where(targets < 0, np.arange(start, stop, dtype=np.int64), targets)
+        lengths[start:stop] = targets >= 0
+    next_parent = empty_array(downstream.shape, np.int64, directory, "next_parent")
+    next_lengths = empty_array(downstream.shape, np.int64, directory, "next_path_lengths")
+    for _ in range(64):
+        changed = False
+        for start, stop in _chunks(downstream.size):
+            block = parent[start:stop]
+            next_lengths[start:stop] = lengths[start:stop] + lengths[block]
+            next_parent[start:stop] = parent[block]
+            changed = changed or bool(np.any(next_parent[start:stop] != block))
+        parent, next_parent = next_parent, parent
+        lengths, next_lengths = next_lengths, lengths
+        if not changed:
+            break
+    return lengths
+
+
+def _upstream_stream_cells(flow_direction, stream, directory):
+    # Number of stream cells flowing into each stream cell, and one of them
+    n_rows, n_cols = flow_direction.shape
+    stream_2d = stream.reshape(n_rows, n_cols)
+    cell_index = np.arange(n_rows * n_cols, dtype=np.int64).reshape(n_rows, n_cols)
+    n_upstream = empty_array((n_rows * n_cols,), np.uint8, directory, "n_upstream")
+    upstream = empty_array((n_rows * n_cols,), np.int64, directory, "upstream")
+    for row, block_rows, neighbors in _neighbor_blocks(flow_direction, stream_2d, cell_index):
+        block_stream = np.asarray(stream_2d[row:row + block_rows])
+        block_count = np.zeros(block_stream.shape, np.uint8)
+        block_upstream = np.full(block_stream.shape, -1, np.int64)
+        for flows_in, neighbor_stream, neighbor_index in neighbors:
+            from_stream = flows_in & neighbor_stream & block_stream
+            block_count += from_stream
+            block_upstream[from_stream] = neighbor_index[from_stream]
+        n_upstream[row * n_cols:(row + block_rows) * n_cols] = block_count.reshape(-1)
+        upstream[row * n_cols:(row + block_rows) * n_cols] = block_upstream.reshape(-1)
+    return n_upstream, upstream
+
+
+def _neighbor_blocks(flow_direction, *grids):
+    # For each block of rows, yield the 8 neighbors of its cells as (flows into the cell, values of grids at the
+    # neighbor). Neighbors outside the grid do not flow into the cell.
+    n_rows, n_cols = flow_direction.shape
+    for row, block_rows in _row_blocks(n_rows):
+        top, bottom = max(row - 1, 0), min(row + block_rows + 1, n_rows)
+        padded = [np.pad(np.asarray(grid[top:bottom]), ((row - top == 0, row + block_rows == n_rows), (1, 1)))
+                  for grid in (flow_direction,) + grids]
+        neighbors = []
+        for code, (d_row, d_col) in D8_OFFSETS.items():
+            # The neighbor in the opposite direction flows into the cell when its code is this one
+            window = (slice(1 - d_row, 1 - d_row + block_rows), slice(1 - d_col, 1 - d_col + n_cols))
+            flows_in = padded[0][window] == code
+            neighbors.append((flows_in,) + tuple(grid[window] for grid in padded[1:]))
+        yield row, block_rows, neighbors
+
+
+def _find_roots(parent):
+    # Pointer jumping: replace each cell's parent by its parent's parent until every cell points to a root (a cell
+    # that is its own parent). Paths halve at each pass, so this takes about log2(longest path) passes. Cells on
+    # a cycle of flow directions never reach a root and are left pointing into the cycle.
+    for _ in range(64):
+        changed = False
+        for start, stop in _chunks(parent.size):
+            block = parent[start:stop]
+            jumped = parent[block]
+            if not changed and np.any(jumped != block):
+                changed = True
+            parent[start:stop] = jumped
+        if not changed:
+            return
+
+
+def _maximum(array):
+    return max((int(array[start:stop].max()) for start, stop in _chunks(array.size)), default=0)
+
+
+def _row_blocks(n_rows):
+    for row in range(0, n_rows, ROW_BLOCK_SIZE):
+        yield row, min(ROW_BLOCK_SIZE, n_rows - row)
+
+
+def _chunks(n_cells):
+    for start in range(0, n_cells, CHUNK_SIZE):
+        yield start, min(start + CHUNK_SIZE, n_cells)
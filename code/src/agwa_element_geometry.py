@@ -0,0 +1,116 @@
+import arcpy
+import numpy as np
+import pandas as pd
+import agwa_lookup_tables
+
+
+CHANNEL_GEOMETRY_FIELDS = ["SideSlope1", "SideSlope2", "UpstreamBankfullDepth", "DownstreamBankfullDepth",
+                           "UpstreamBankfullWidth", "DownstreamBankfullWidth", "UpstreamBottomWidth",
+                           "DownstreamBottomWidth"]
+FLOW_LENGTH_METHODS = ["Geometric Abstraction", "Plane Average"]
+
+
+def read_hydraulic_geometry_relationships(hgr_table, names=None):
+    """Read the coefficients and exponents of the hydraulic geometry relationships in the HGR lookup table.
+    Returns a DataFrame indexed by HGRNAME with columns wCoef, wExp, dCoef and dExp.
+    names: optional list of relationships to read, all relationships by default."""
+
+    df_hgr = agwa_lookup_tables.hydraulic_geometry_relationships(hgr_table).dropna()
+    if names is not None:
+        names = [names] if isinstance(names, str) else list(names)
+        missing = [name for name in names if name not in df_hgr.HGRNAME.values]
+        if missing:
+            raise Exception(f"Hydraulic geometry relationships {missing} not found in the table '{hgr_table}'.")
+        df_hgr = df_hgr[df_hgr.HGRNAME.isin(names)]
+    return df_hgr.drop_duplicates("HGRNAME", keep="last").set_index("HGRNAME")
+
+
+def hydraulic_geometry(upstream_area, lateral_area, width_coefficient, width_exponent, depth_coefficient,
+                       depth_exponent, side_slope1=1., side_slope2=1.):
+    """Evaluate the bankfull depth and width power laws and the trapezoidal bottom width of channels.
+
+    upstream_area, lateral_area: arrays of the channel contributing areas. The upstream end drains
+        UpstreamArea and the downstream end UpstreamArea + LateralArea.
+    The coefficients and exponents are scalars, or arrays of shape (n_relationships, 1) to evaluate several
+    relationships at once, in which case every returned array has shape (n_relationships, n_channels).
+    Returns a dict with the CHANNEL_GEOMETRY_FIELDS."""
+
+    upstream_area = np.asarray(upstream_area, dtype=float)
+    downstream_area = upstream_area + np.asarray(lateral_area, dtype=float)
+
+    upstream_depth = depth_coefficient * upstream_area ** depth_exponent
+    downstream_depth = depth_coefficient * downstream_area ** depth_exponent
+    upstream_width = width_coefficient * upstream_area ** width_exponent
+    downstream_width = width_coefficient * downstream_area ** width_exponent
+
+    # Bottom width of a trapezoid with the bankfull width at the top and the given side slopes (run/rise)
+    side_slope_factor = 1. / side_slope1 + 1. / side_slope2
+    upstream_bottom_width = upstream_width - upstream_depth * side_slope_factor
+    downstream_bottom_width = downstream_width - downstream_depth * side_slope_factor
+
+    shape = np.broadcast(upstream_depth, upstream_width).shape
+    return {"SideSlope1": np.full(shape, float(side_slope1)),
+            "SideSlope2": np.full(shape, float(side_slope2)),
+            "UpstreamBankfullDepth": np.broadcast_to(upstream_depth, shape),
+            "DownstreamBankfullDepth": np.broadcast_to(downstream_depth, shape),
+            "UpstreamBankfullWidth": np.broadcast_to(upstream_width, shape),
+            "DownstreamBankfullWidth": np.broadcast_to(downstream_width, shape),
+            "UpstreamBottomWidth": np.broadcast_to(upstream_bottom_width, shape),
+            "DownstreamBottomWidth": np.broadcast_to(downstream_bottom_width, shape)}
+
+
+def channel_geometries(df_channels, df_hgr, side_slope1=1., side_slope2=1.):
+    """Evaluate every relationship of df_hgr (see read_hydraulic_geometry_relationships) for every channel of
+    df_channels (ChannelID, UpstreamArea, LateralArea) in one broadcast.
+    Returns a long DataFrame with HydraulicGeometryRelationship, ChannelID and the CHANNEL_GEOMETRY_FIELDS."""
+
+    geometry = hydraulic_geometry(df_channels.UpstreamArea.values, df_channels.LateralArea.values,
+                                  df_hgr.wCoef.values[:, None], df_hgr.wExp.values[:, None],
+                                  df_hgr.dCoef.values[:, None], df_hgr.dExp.values[:, None],
+                                  side_slope1, side_slope2)
+    n_relationships, n_channels = len(df_hgr), len(df_channels)
+    df_geometries = pd.DataFrame({
+        "HydraulicGeometryRelationship": np.repeat(df_hgr.index.values, n_channels),
+        "ChannelID": np.tile(df_channels.ChannelID.values, n_relationships)})
+    for field in CHANNEL_GEOMETRY_FIELDS:
+        df_geometries[field] = geometry[field].reshape(-1)
+    return df_geometries
+
+
+def hillslope_geometries(hillslope_ids, areas, mean_flow_lengths, channel_ids=(), channel_lengths=(),
+                         flow_length_method="Plane Average"):
+    """Calculate the width and length of the rectangular planes representing hillslopes in one pass over arrays.
+
+    Plane Average: the length is the mean flow length and the width is area / length.
+    Geometric Abstraction: lateral hillslopes (IDs ending in 2 or 3) have the width of their channel
+        (channel ID = hillslope ID // 10 * 10 + 4) and length area / width. Headwater hillslopes (IDs ending
+        in 1) are abstracted as a triangle draining to the channel head, whose centroid lies at 2/3 of its
+        height: the length is 1.5 times the mean flow length and the width is area / length.
+    Hillslopes without a channel length or a mean flow length fall back to a square plane.
+    Returns a DataFrame with HillslopeID, Width and Length."""
+
+    if flow_length_method not in FLOW_LENGTH_METHODS:
+        raise Exception(f"Unknown flow length method '{flow_length_method}'. "
+                        f"Expected one of {FLOW_LENGTH_METHODS}.")
+
+    hillslope_ids = np.asarray(hillslope_ids, dtype=np.int64)
+    areas = np.asarray(areas, dtype=float)
+    mean_flow_lengths = np.asarray(mean_flow_lengths, dtype=float)
+    has_flow_length = np.isfinite(mean_flow_lengths) & (mean_flow_lengths > 0)
+
+    if flow_length_method == "Plane Average":
+        lengths = np.where(has_flow_length, mean_flow_lengths, np.sqrt(areas))
+    else:
+        channel_lengths = pd.Series(np.asarray(channel_lengths, dtype=float),
+                                    index=np.asarray(channel_ids, dtype=np.int64))
+        channel_lengths = channel_lengths[~channel_lengths.index.duplicated(keep="last")]
+        widths = channel_lengths.reindex(hillslope_ids // 10 * 10 + 4).values
+        is_lateral = np.isin(hillslope_ids % 10, (2, 3)) & np.isfinite(widths) & (widths > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lateral_lengths = areas / widths
+        headwater_lengths = np.where(has_flow_length, 1.5 * mean_flow_lengths, np.sqrt(areas))
+        lengths = np.where(is_lateral, lateral_lengths, headwater_lengths)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        widths = np.where(lengths > 0, areas / lengths, 0.)
+    return pd.DataFrame({"HillslopeID": hillslope_ids, "Width": widths, "Length": lengths})
@@ -0,0 +1,147 @@
+import os
+import struct
+
+# A file geodatabase is a folder with the files of each table, named after the number of the table in the system
+# catalog: table n is stored in a{n:08x}.gdbtable (rows) and a{n:08x}.gdbtablx (row offsets), along with its index
+# files and the .lock files ArcGIS creates while the table is open. The system catalog is table 1. This module reads
+# the names of the tables from the catalog without arcpy, so that the modification time of a few tables can be
+# read from their files.
+
+CATALOG_TABLE = "a00000001"
+TABLE_EXTENSIONS = (".gdbtable", ".gdbtablx")
+
+# Tables of a raster dataset: its raster and band properties, blocks of cell values and auxiliary information
+# (statistics, color map)
+RASTER_TABLE_PREFIXES = ("fras_ras_", "fras_bnd_", "fras_blk_", "fras_aux_")
+
+# Field types of the .gdbtable format
+OBJECT_ID, STRING = 6, 4
+FIXED_SIZE_TYPES = {0: "<h", 1: "<i", 2: "<f", 3: "<d", 5: "<d"}
+
+
+def is_file_gdb(path):
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, f"{CATALOG_TABLE}.gdbtable"))
+
+
+def table_numbers(gdb):
+    """Number of each table of the file geodatabase gdb, by lower case table name."""
+
+    with open(os.path.join(gdb, f"{CATALOG_TABLE}.gdbtable"), "rb") as f:
+        data = f.read()
+    with open(os.path.join(gdb, f"{CATALOG_TABLE}.gdbtablx"), "rb") as f:
+        offsets = f.read()
+
+    fields = _read_fields(data)
+    _, n_blocks, n_rows, offset_size = struct.unpack_from("<4I", offsets, 0)
+    numbers = {}
+    for index in range(min(n_rows, n_blocks * 1024)):
+        start = 16 + index * offset_size
+        offset = int.from_bytes(offsets[start:start + offset_size], "little")
+        if offset:
+            row = _read_row(data, offset, fields)
+            numbers[str(row["Name"]).lower()] = index + 1
+    return numbers
+
+
+def table_files(gdb, table_names):
+    """The .gdbtable and .gdbtablx files of the tables table_names of the file geodatabase gdb. Raises an
+    exception if a table is not in the geodatabase."""
+
+    numbers = table_numbers(gdb)
+    files = []
+    for table_name in table_names:
+        if table_name.lower() not in numbers:
+            raise Exception(f"The table '{table_name}' does not exist in {gdb}.")
+        files += [os.path.join(gdb, f"a{numbers[table_name.lower()]:08x}{extension}")
+                  for extension in TABLE_EXTENSIONS]
+    return files
+
+
+def modification_time(gdb, table_names):
+    """Last modification time of the tables table_names of the file geodatabase gdb. Opening the geodatabase only
+    creates and deletes .lock files, so it does not change."""
+    return max(os.path.getmtime(path) for path in table_files(gdb, table_names) if os.path.exists(path))
+
+
+def raster_modification_time(gdb, raster_name):
+    """Last modification time of the tables of the raster dataset raster_name of the file geodatabase gdb, None if
+    it has none."""
+
+    numbers = table_numbers(gdb)
+    table_names = [prefix + raster_name for prefix in RASTER_TABLE_PREFIXES
+                   if (prefix + raster_name).lower() in numbers]
+    return modification_time(gdb, table_names) if table_names else None
+
+
+def _read_fields(data):
+    # Name, type and nullability of the fields, from the field description section
+    position = struct.unpack_from("<Q", data, 32)[0]
+    n_fields = struct.unpack_from("<H", data, position + 12)[0]
+    position += 14
+    fields = []
+    for _ in range(n_fields):
+        name, position = _read_utf16(data, position)
+        _, position = _read_utf16(data, position)
+        field_type = data[position]
+        position += 1
+        nullable = False
+        if field_type == OBJECT_ID:
+            position += 2
+        elif field_type == STRING:
+            flags = data[position + 4]
+            position += 5
+            if flags & 4:
+                length, position = _read_varuint(data, position)
+                position += length
+            nullable = bool(flags & 1)
+        elif field_type in FIXED_SIZE_TYPES:
+            flags, default_length = data[position + 1], data[position + 2]
+            position += 3 + (default_length if flags & 4 else 0)
+            nullable = bool(flags & 1)
+        else:
+            raise Exception(f"Unsupported field type {field_type} in the catalog of a file geodatabase.")
+        fields.append((name, field_type, nullable))
+    return fields
+
+
+def _read_row(data, offset, fields):
+    # Values of a row: its size, a bit per nullable field set when the value is null, then the values
+    position = offset + 4
+    n_nullable = sum(nullable for _, _, nullable in fields)
+    null_flags = data[position:position + (n_nullable + 7) // 8]
+    position += (n_nullable + 7) // 8
+    row, nullable_index = {}, 0
+    for name, field_type, nullable in fields:
+        if field_type == OBJECT_ID:
+            continue
+        if nullable:
+            is_null = null_flags[nullable_index // 8] >> (nullable_index % 8) & 1
+            nullable_index += 1
+            if is_null:
+                row[name] = None
+                continue
+        if field_type == STRING:
+            length, position = _read_varuint(data, position)
+            row[name] = data[position:position + length].decode("utf-8")
+            position += length
+        else:
+            row[name] = struct.unpack_from(FIXED_SIZE_TYPES[field_type], data, position)[0]
+            position += struct.calcsize(FIXED_SIZE_TYPES[field_type])
+    return row
+
+
+def _read_utf16(data, position):
+    n_characters = data[position]
+    start = position + 1
+    return data[start:start + 2 * n_characters].decode("utf-16-le"), start + 2 * n_characters
+
+
+def _read_varuint(data, position):
+    value, shift = 0, 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
@@ -0,0 +1,213 @@
+import os
+import json
+import arcpy
+import config
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import agwa_file_gdb
+import agwa_step_cache
+import agwa_lookup_tables
+
+
+# gSSURGO tables read for the soil parameters: (table, key field, fields). Each table is stored in the cache sorted
+# by its key field and is filtered by the keys of the rows selected in the previous table (mukey -> cokey -> chkey
+# -> chtgkey), so only the rows of the map units of the watershed are loaded.
+GSSURGO_TABLES = [("component", "mukey", ["cokey", "comppct_r", "mukey"]),
+                  ("chorizon", "cokey", ["cokey", "chkey", "hzdept_r", "hzdepb_r", "ksat_r", "sandtotal_r",
+                                         "silttotal_r", "claytotal_r", "dbthirdbar_r", "partdensity", "sieveno10_r",
+                                         "kwfact"]),
+                  ("chtexturegrp", "chkey", ["chkey", "chtgkey", "texture"]),
+                  ("chtexture", "chtgkey", ["chtgkey", "texcl", "lieutex"])]
+
+# Tables of the soil parameter index, keyed by map unit, and the folder of the indexes in the cache folder
+SOIL_INDEX_TABLES = ["weighted_by_horizon", "weighted_by_component"]
+SOIL_INDEX_DIRECTORY = "soil_index"
+SOIL_INDEX_KEY = "MapUnitKey"
+
+# Original row number of each cached row, used to return the selected rows in the order of the gSSURGO table
+ROW_FIELD = "_row"
+METADATA_FILE = "metadata.json"
+
+
+def database_key(soil_gdb):
+    """Key of the gSSURGO tables of soil_gdb: a hash of the path of the geodatabase, the last modification time of
+    the tables read and their fields. It changes when the tables are edited or the geodatabase is replaced, not
+    when it is opened."""
+
+    digest = hashlib.sha1(os.path.normcase(os.path.abspath(soil_gdb)).encode())
+    digest.update(repr(_modification_time(soil_gdb)).encode())
+    digest.update(repr(GSSURGO_TABLES).encode())
+    return digest.hexdigest()
+
+
+def cache_directory(soil_gdb, key=None):
+    """Folder of the cache of soil_gdb, named after its database_key (key if given), so editing or replacing the
+    tables creates a new cache."""
+    return os.path.join(_cache_root(), _folder_name(soil_gdb, key or database_key(soil_gdb)))
+
+
+def build_cache(soil_gdb):
+    """Extract the fields of GSSURGO_TABLES from soil_gdb into a folder of .npy files, one per field, sorted by the
+    key field of each table. Does nothing if the cache is up to date. Caches of previous versions of the same
+    geodatabase are deleted. Returns the cache folder."""
+
+    key = database_key(soil_gdb)
+    directory = cache_directory(soil_gdb, key)
+    if os.path.exists(os.path.join(directory, METADATA_FILE)):
+        return directory
+
+    arcpy.AddMessage(f"Caching the gSSURGO tables of {soil_gdb} in {directory}. This is done once per database.")
+    _delete_stale_caches(soil_gdb, os.path.dirname(directory), key)
+    building_directory = f"{directory}_building"
+    shutil.rmtree(building_directory, ignore_errors=True)
+    for table_name, key_field, fields in GSSURGO_TABLES:
+        array = arcpy.da.TableToNumPyArray(os.path.join(soil_gdb, table_name), fields, skip_nulls=False)
+        _save_columns(os.path.join(building_directory, table_name), array, key_field, fields)
+
+    # The metadata file is written last and marks the cache as complete
+    with open(os.path.join(building_directory, METADATA_FILE), "w") as f:
+        json.dump({"soil_gdb": os.path.abspath(soil_gdb), "database_key": key}, f)
+    os.replace(building_directory, directory)
+    return directory
+
+
+def read_soil_tables(soil_gdb, mukeys):
+    """Read the rows of the gSSURGO component, chorizon, chtexturegrp and chtexture tables that belong to the map
+    units mukeys, from the cache of soil_gdb (built if needed). Only the row ranges of the selected keys are
+    loaded from the memory-mapped files. Rows are in the order of the gSSURGO tables.
+    Returns a dict of table name -> DataFrame with the fields of GSSURGO_TABLES."""
+
+    directory = build_cache(soil_gdb)
+    keys = mukeys
+    tables = {}
+    for index, (table_name, key_field, fields) in enumerate(GSSURGO_TABLES):
+        tables[table_name] = _read_columns(os.path.join(directory, table_name), key_field, keys, fields)
+        if index + 1 < len(GSSURGO_TABLES):
+            keys = tables[table_name][GSSURGO_TABLES[index + 1][1]].values
+    return tables
+
+
+def soil_index_directory(soil_gdb, kin_lut_table, max_horizons, max_thickness, key=None):
+    """Folder of the soil parameter index of soil_gdb for the kin_lut table and the horizon options, named after
+    the database_key of soil_gdb (key if given). Indexes are kept apart from the caches of the tables, which are
+    rebuilt independently."""
+
+    digest = hashlib.sha1(agwa_step_cache.fingerprint(kin_lut_table, agwa_lookup_tables.KIN_LUT_FIELDS).encode())
+    digest.update(repr((int(max_horizons), float(max_thickness))).encode())
+    return os.path.join(_cache_root(), SOIL_INDEX_DIRECTORY,
+                        f"{_folder_name(soil_gdb, key or database_key(soil_gdb))}_{digest.hexdigest()[:16]}")
+
+
+def save_soil_index(soil_gdb, key, kin_lut_table, max_horizons, max_thickness, df_weighted_by_horizon,
+                    df_weighted_by_component):
+    """Save the soil parameters weighted by horizon and by component of every map unit of soil_gdb as the soil
+    parameter index for kin_lut_table, max_horizons and max_thickness. key is the database_key of soil_gdb taken
+    before the tables were read, so that an index calculated from tables edited in the meantime is never read.
+    Indexes of previous versions of the tables are deleted. Returns the index folder."""
+
+    directory = soil_index_directory(soil_gdb, kin_lut_table, max_horizons, max_thickness, key)
+    building_directory = f"{directory}_building"
+    shutil.rmtree(building_directory, ignore_errors=True)
+    for table_name, df in zip(SOIL_INDEX_TABLES, [df_weighted_by_horizon, df_weighted_by_component]):
+        df = df.assign(**{SOIL_INDEX_KEY: df[SOIL_INDEX_KEY].astype(str)})
+        _save_columns(os.path.join(building_directory, table_name), df, SOIL_INDEX_KEY, list(df.columns))
+        with open(os.path.join(building_directory, table_name, "fields.json"), "w") as f:
+            json.dump(list(df.columns), f)
+
+    # The metadata file marks the index as complete
+    with open(os.path.join(building_directory, METADATA_FILE), "w") as f:
+        json.dump({"soil_gdb": os.path.abspath(soil_gdb), "database_key": key}, f)
+    _delete_stale_caches(soil_gdb, os.path.dirname(directory), key)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(building_directory, directory)
+    return directory
+
+
+def read_soil_index(soil_gdb, kin_lut_table, max_horizons, max_thickness, mukeys):
+    """Read the rows of the map units mukeys from the soil parameter index of soil_gdb for kin_lut_table,
+    max_horizons and max_thickness. Returns the parameters weighted by horizon and by component, or None if the
+    index was not built for the current tables of soil_gdb."""
+
+    directory = soil_index_directory(soil_gdb, kin_lut_table, max_horizons, max_thickness)
+    if not os.path.exists(os.path.join(directory, METADATA_FILE)):
+        return None
+    tables = []
+    for table_name in SOIL_INDEX_TABLES:
+        with open(os.path.join(directory, table_name, "fields.json")) as f:
+            fields = json.load(f)
+        tables.append(_read_columns(os.path.join(directory, table_name), SOIL_INDEX_KEY,
+                                    np.asarray(mukeys).astype(str), fields))
+    return tuple(tables)
+
+
+def _folder_name(soil_gdb, key):
+    return f"{os.path.splitext(os.path.basename(os.path.normpath(soil_gdb)))[0]}_{key[:16]}"
+
+
+def _cache_root():
+    return config.GSSURGO_CACHE_DIRECTORY or os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")),
+                                                          "AGWA", "gssurgo_cache")
+
+
+def _save_columns(table_directory, table, key_field, fields):
+    # One .npy file per field, sorted by key_field, and the original row number of each row
+    os.makedirs(table_directory)
+    key_values = np.asarray(table[key_field])
+    order = np.argsort(key_values.astype(str) if key_values.dtype == object else key_values, kind="stable")
+    np.save(os.path.join(table_directory, f"{ROW_FIELD}.npy"), order.astype(np.int64))
+    for field in fields:
+        # Object columns cannot be memory-mapped, they are stored as fixed-width text
+        values = np.asarray(table[field])[order]
+        np.save(os.path.join(table_directory, f"{field}.npy"),
+                values.astype(str) if values.dtype == object else values)
+
+
+def _read_columns(table_directory, key_field, keys, fields):
+    rows = _select_rows(table_directory, key_field, keys)
+    return pd.DataFrame({field: np.load(os.path.join(table_directory, f"{field}.npy"), mmap_mode="r")[rows]
+                         for field in fields})
+
+
+def _select_rows(table_directory, key_field, keys):
+    key_column = np.load(os.path.join(table_directory, f"{key_field}.npy"), mmap_mode="r")
+    keys = np.unique(np.asarray(keys).astype(key_column.dtype))
+    starts = np.searchsorted(key_column, keys, "left")
+    lengths = np.searchsorted(key_column, keys, "right") - starts
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    rows = np.repeat(starts, lengths) + offsets
+
+    original_rows = np.load(os.path.join(table_directory, f"{ROW_FIELD}.npy"), mmap_mode="r")[rows]
+    return rows[np.argsort(original_rows, kind="stable")]
+
+
+def _modification_time(soil_gdb):
+    # Last modification time of the files of the tables read. ArcGIS creates and deletes .lock files in a file
+    # geodatabase, which changes the time of the folder, whenever the database is opened, and the rasters stored
+    # with the tables get statistics and pyramids, so neither is part of the key. When the system catalog cannot
+    # be read, all the table files are used.
+    if agwa_file_gdb.is_file_gdb(soil_gdb):
+        try:
+            return agwa_file_gdb.modification_time(soil_gdb, [table_name for table_name, _, _ in GSSURGO_TABLES])
+        except Exception:
+            pass
+    if os.path.isdir(soil_gdb):
+        return max((entry.stat().st_mtime for entry in os.scandir(soil_gdb)
+                    if entry.name.lower().endswith(agwa_file_gdb.TABLE_EXTENSIONS)), default=None)
+    return os.path.getmtime(soil_gdb) if os.path.exists(soil_gdb) else None
+
+
+def _delete_stale_caches(soil_gdb, root, key):
+    # Caches or indexes in root of soil_gdb with another database key
+    if not os.path.isdir(root):
+        return
+    for entry in os.scandir(root):
+        metadata_file = os.path.join(entry.path, METADATA_FILE)
+        if not os.path.exists(metadata_file):
+            continue
+        with open(metadata_file) as f:
+            metadata = json.load(f)
+        if (os.path.normcase(metadata.get("soil_gdb", "")) == os.path.normcase(os.path.abspath(soil_gdb)) and
+                metadata.get("database_key") != key):
+            shutil.rmtree(entry.path, ignore_errors=True)
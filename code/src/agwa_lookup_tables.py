@@ -0,0 +1,97 @@
+import os
+import arcpy
+import pandas as pd
+
+
+# Tables of lookup_tables.gdb read by the tools, with the fields used
+KIN_LUT_FIELDS = ["TextureName", "KS", "G", "POR", "SMAX", "CV", "SAND", "SILT", "CLAY", "DIST", "KFF", "BPressure"]
+LAND_COVER_LUT_FIELDS = ["CLASS", "NAME", "COVER", "INT", "N", "IMPERV"]
+CHANNEL_TYPE_FIELDS = ["Channel_Type", "Ksat", "Manning", "Pave"]
+HGR_FIELDS = ["HGRNAME", "wCoef", "wExp", "dCoef", "dExp"]
+BURN_SEVERITY_FIELDS = ["PREBURN", "SEVERITY", "POSTBURN"]
+
+# Tables read in this session: (table path, fields) -> (modification time of the geodatabase, DataFrame).
+# This module must not be reloaded with importlib.reload, which would empty the cache.
+_tables = {}
+
+
+def lookup_table_path(agwa_directory, table_name):
+    """Path of a table of the lookup_tables.gdb of the AGWA directory."""
+    return os.path.join(agwa_directory, "lookup_tables.gdb", table_name)
+
+
+def read_lookup_table(table, fields=None):
+    """Read fields (all attribute fields by default) of a lookup table into a DataFrame. The table is read from
+    the geodatabase once per session and then served from memory, until a file of its geodatabase is modified.
+    Null values are returned as None or NaN. Returns a copy that the caller can modify."""
+
+    key = (os.path.normcase(os.path.abspath(table)), tuple(fields) if fields is not None else None)
+    modification_time = _modification_time(table)
+    cached = _tables.get(key)
+    if cached is None or cached[0] != modification_time:
+        if not arcpy.Exists(table):
+            raise Exception(f"The lookup table '{table}' does not exist.")
+        if fields is None:
+            fields = [field.name for field in arcpy.ListFields(table)
+                      if field.type not in ("OID", "Geometry", "Raster", "Blob")]
+        with arcpy.da.SearchCursor(table, list(fields)) as cursor:
+            df = pd.DataFrame(cursor, columns=list(fields))
+        cached = (modification_time, df)
+        _tables[key] = cached
+    return cached[1].copy()
+
+
+def clear():
+    """Empty the cache, so every table is read again from its geodatabase."""
+    _tables.clear()
+
+
+def kin_lut(agwa_directory):
+    """Soil texture parameters of the kin_lut table, with the KIN_LUT_FIELDS."""
+    return read_lookup_table(lookup_table_path(agwa_directory, "kin_lut"), KIN_LUT_FIELDS)
+
+
+def land_cover_lut(land_cover_lut_table):
+    """Land cover parameters of a land cover lookup table (e.g. mrlc2001_lut), with the LAND_COVER_LUT_FIELDS."""
+    return read_lookup_table(land_cover_lut_table, LAND_COVER_LUT_FIELDS)
+
+
+def land_cover_class(land_cover_lut_table, name):
+    """CLASS of the land cover type name in a land cover lookup table, or None if the table has no such type.
+    When several rows have the name, the last one is used."""
+
+    df_lut = read_lookup_table(land_cover_lut_table, ["CLASS", "NAME"])
+    classes = df_lut[df_lut.NAME == name].CLASS
+    return int(classes.iloc[-1]) if len(classes) else None
+
+
+def channel_types(agwa_directory):
+    """Channel types of the channel_types table, with the CHANNEL_TYPE_FIELDS."""
+    return read_lookup_table(lookup_table_path(agwa_directory, "channel_types"), CHANNEL_TYPE_FIELDS)
+
+
+def hydraulic_geometry_relationships(hgr_table):
+    """Hydraulic geometry relationships of an HGR table, with the HGR_FIELDS."""
+    return read_lookup_table(hgr_table, HGR_FIELDS)
+
+
+def burn_severity_changes(change_table):
+    """Rows of a burn severity land cover change table (e.g. mrlc2001_severity), with the BURN_SEVERITY_FIELDS."""
+    return read_lookup_table(change_table, BURN_SEVERITY_FIELDS)
+
+
+def precipitation_distribution(distribution_table, hyetograph_shape):
+    """Cumulative fraction of the precipitation depth of the hyetograph_shape column of an NRCS precipitation
+    distribution table (nrcs_precipitation_distributions_LUT) as a Series indexed by Time in hours, in the order
+    of the table."""
+
+    df_distribution = read_lookup_table(distribution_table, ["Time", hyetograph_shape])
+    return df_distribution.set_index("Time")[hyetograph_shape]
+
+
+def _modification_time(table):
+    # Tables are in file geodatabases, which are folders whose files change when a table is edited
+    workspace = os.path.dirname(table)
+    if os.path.isdir(workspace):
+        return max([os.path.getmtime(workspace)] + [entry.stat().st_mtime for entry in os.scandir(workspace)])
+    return os.path.getmtime(table) if os.path.exists(table) else None
@@ -0,0 +1,214 @@
+import os
+import sys
+import math
+import arcpy
+import config
+import shutil
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+import multiprocessing
+import multiprocessing.spawn
+import concurrent.futures
+import agwa_channel_network
+import agwa_raster_io
+import agwa_table_io
+import agwa_zonal
+
+
+def worker_count(factor=None):
+    """Number of worker processes from config.PARALLEL_PROCESSING_FACTOR (or factor), which follows the
+    convention of arcpy.env.parallelProcessingFactor: a number of processes ("4" or 4) or a percentage of the
+    cores ("50%"). 0 means sequential processing and returns 1."""
+
+    factor = config.PARALLEL_PROCESSING_FACTOR if factor is None else factor
+    cpu_count = os.cpu_count() or 1
+    if isinstance(factor, str):
+        factor = factor.strip()
+        if factor.endswith("%"):
+            n_workers = math.floor(cpu_count * float(factor[:-1]) / 100)
+        else:
+            n_workers = int(float(factor or 0))
+    else:
+        n_workers = int(factor or 0)
+    return max(1, min(n_workers, cpu_count))
+
+
+def partition_hillslopes(channel_network, hillslope_ids, n_groups):
+    """Split hillslopes into groups of whole sub-basins with about the same number of hillslopes.
+
+    Channels are visited from the headwaters to the outlet, accumulating the hillslopes of the channels upstream
+    that are not assigned yet. When a channel has accumulated len(hillslope_ids) / n_groups hillslopes, it and its
+    unassigned upstream channels become a group. The channels left at the end, including channels not connected
+    to the outlet, form the last group. Hillslopes drain to channel hillslope_id // 10 * 10 + 4.
+    Returns a list of arrays of hillslope ids."""
+
+    hillslope_ids = np.asarray(hillslope_ids, dtype=np.int64)
+    hillslope_channels = hillslope_ids // 10 * 10 + 4
+    weights = pd.Series(1, index=hillslope_channels).groupby(level=0).sum().to_dict()
+    target = len(hillslope_ids) / max(n_groups, 1)
+
+    channel_groups = []
+    pending, pending_weights = {}, {}
+    for channel_id in channel_network.topological_order():
+        members, weight = [channel_id], weights.get(channel_id, 0)
+        for upstream_id in channel_network.upstream_channels(channel_id):
+            members += pending.pop(upstream_id, [])
+            weight += pending_weights.pop(upstream_id, 0)
+        if weight >= target:
+            channel_groups.append(members)
+        else:
+            pending[channel_id], pending_weights[channel_id] = members, weight
+    remaining = [channel_id for members in pending.values() for channel_id in members]
+    remaining += channel_network.unsequenced_channels()
+    channel_groups.append(remaining)
+
+    group_of_channel = {channel_id: index for index, members in enumerate(channel_groups) for channel_id in members}
+    last_group = len(channel_groups) - 1
+    hillslope_groups = np.array([group_of_channel.get(channel_id, last_group) for channel_id in hillslope_channels],
+                                dtype=np.int64)
+    groups = [hillslope_ids[hillslope_groups == index] for index in range(len(channel_groups))]
+    return [group for group in groups if len(group)]
+
+
+def partition_discretization(workspace, delineation_name, discretization_name, n_groups):
+    """Partition the hillslopes of a discretization into groups of sub-basins, see partition_hillslopes."""
+
+    channel_network = agwa_channel_network.ChannelNetwork.from_workspace(workspace, delineation_name,
+                                                                        discretization_name)
+    hillslopes_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
+    return partition_hillslopes(channel_network, read_hillslope_ids(hillslopes_feature_class), n_groups)
+
+
+def read_hillslope_ids(hillslopes_feature_class):
+    """HillslopeID of each hillslope of hillslopes_feature_class, skipping hillslopes without one."""
+
+    with arcpy.da.SearchCursor(hillslopes_feature_class, ["HillslopeID"]) as cursor:
+        return [int(row[0]) for row in cursor if row[0] is not None]
+
+
+def run_partitioned(task, groups, *args, n_workers=None, merge=None):
+    """Run task(scratch_gdb, group, *args) for each group of hillslope ids in a pool of worker processes.
+
+    Each task gets its own scratch file geodatabase in a temporary folder, so workers never write to the same
+    geodatabase. task must be a module-level function so it can be sent to the workers. merge, when given, is
+    called with the list of results (in the order of groups) before the scratch folder is deleted, so it can copy
+    datasets out of the scratch geodatabases. Returns merge(results), or the list of results."""
+
+    n_workers = min(n_workers or worker_count(), len(groups))
+    scratch_folder = tempfile.mkdtemp(prefix="agwa_parallel_")
+    try:
+        with _worker_environment(), \
+                concurrent.futures.ProcessPoolExecutor(max_workers=max(n_workers, 1)) as executor:
+            futures = [executor.submit(_run_task, task, scratch_folder, index, group, args)
+                       for index, group in enumerate(groups)]
+            results = [future.result() for future in futures]
+        return merge(results) if merge is not None else results
+    finally:
+        shutil.rmtree(scratch_folder, ignore_errors=True)
+
+
+def zonal_statistics_by_sub_basin(workspace, delineation_name, discretization_name, snap_raster, value_rasters,
+                                  circular=(), n_workers=None):
+    """Calculate the zonal statistics of the hillslopes (see agwa_zonal.zonal_statistics) with one worker process
+    per group of sub-basins. Each worker rasterizes only the hillslopes of its group onto the grid of snap_raster,
+    so value_rasters must be aligned with snap_raster. Returns a DataFrame indexed by HillslopeID."""
+
+    n_workers = n_workers or worker_count()
+    groups = partition_discretization(workspace, delineation_name, discretization_name, n_workers)
+    hillslopes_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
+    return run_partitioned(_zonal_statistics_task, groups, hillslopes_feature_class, snap_raster, value_rasters,
+                           list(circular), n_workers=n_workers,
+                           merge=lambda results: pd.concat(results).sort_index())
+
+
+def intersect_hillslopes(workspace, delineation_name, discretization_name, overlay_feature_class,
+                         out_feature_class, n_workers=None):
+    """PairwiseIntersect overlay_feature_class with the hillslopes of the discretization into out_feature_class.
+    With more than one worker (see worker_count), the hillslopes are split into groups of sub-basins that are
+    intersected in parallel and the results are merged."""
+
+    n_workers = n_workers or worker_count()
+    hillslopes_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
+    if arcpy.Exists(out_feature_class):
+        arcpy.management.Delete(out_feature_class)
+    if n_workers <= 1:
+        arcpy.analysis.PairwiseIntersect(f"'{overlay_feature_class}'; '{hillslopes_feature_class}'",
+                                         out_feature_class, "ALL", None, "INPUT")
+        return out_feature_class
+
+    groups = partition_discretization(workspace, delineation_name, discretization_name, n_workers)
+    return run_partitioned(_intersect_task, groups, hillslopes_feature_class, overlay_feature_class,
+                           n_workers=n_workers,
+                           merge=lambda results: arcpy.management.Merge(results, out_feature_class).getOutput(0))
+
+
+def crosstab_rasters(zone_raster, class_rasters, zone_ids, n_workers=None):
+    """Cross-tabulate each of class_rasters with zone_raster (see agwa_zonal.zonal_crosstab) with one worker
+    process per class raster. Each class raster is resampled to the grid of zone_raster in the scratch geodatabase
+    of its worker. Returns a list of DataFrames in the order of class_rasters."""
+
+    return run_partitioned(_crosstab_task, list(class_rasters), zone_raster, list(zone_ids), n_workers=n_workers)
+
+
+@contextlib.contextmanager
+def _worker_environment():
+    # Set the PYTHONPATH and Python executable of the worker processes while the pool runs, then restore them so
+    # other tools of the ArcGIS Pro session are not affected
+    python_path = os.environ.get("PYTHONPATH")
+    executable = multiprocessing.spawn.get_executable()
+
+    # Workers import the task modules by name, so they need this folder on their path
+    src_directory = os.path.dirname(os.path.abspath(__file__))
+    if src_directory not in (python_path or "").split(os.pathsep):
+        os.environ["PYTHONPATH"] = os.pathsep.join(path for path in [src_directory, python_path] if path)
+
+    # Inside ArcGIS Pro sys.executable is ArcGISPro.exe, which cannot start worker processes
+    if os.path.basename(sys.executable).lower() not in ("python.exe", "pythonw.exe", "python", "python3"):
+        python = "pythonw.exe" if sys.platform == "win32" else os.path.join("bin", "python")
+        multiprocessing.set_executable(os.path.join(sys.exec_prefix, python))
+    try:
+        yield
+    finally:
+        if python_path is None:
+            os.environ.pop("PYTHONPATH", None)
+        else:
+            os.environ["PYTHONPATH"] = python_path
+        multiprocessing.set_executable(executable)
+
+
+def _run_task(task, scratch_folder, index, group, args):
+    arcpy.env.overwriteOutput = True
+    scratch_gdb = arcpy.management.CreateFileGDB(scratch_folder, f"worker_{index}.gdb").getOutput(0)
+    return task(scratch_gdb, group, *args)
+
+
+def _select_hillslopes(hillslopes_feature_class, hillslope_ids, scratch_gdb):
+    # Keep the name of the feature class so the fields created by the overlay tools are the same as without groups
+    out_feature_class = os.path.join(scratch_gdb, os.path.basename(hillslopes_feature_class))
+    where = agwa_table_io.where_clause(hillslopes_feature_class, {"HillslopeID": [int(i) for i in hillslope_ids]})
+    arcpy.analysis.Select(hillslopes_feature_class, out_feature_class, where)
+    return out_feature_class
+
+
+def _zonal_statistics_task(scratch_gdb, hillslope_ids, hillslopes_feature_class, snap_raster, value_rasters,
+                           circular):
+    hillslopes = _select_hillslopes(hillslopes_feature_class, hillslope_ids, scratch_gdb)
+    zone_raster = os.path.join(scratch_gdb, "hillslopes_zones")
+    agwa_raster_io.rasterize_zones(hillslopes, "HillslopeID", snap_raster, zone_raster)
+    return agwa_zonal.zonal_statistics(zone_raster, value_rasters, hillslope_ids, circular)
+
+
+def _intersect_task(scratch_gdb, hillslope_ids, hillslopes_feature_class, overlay_feature_class):
+    hillslopes = _select_hillslopes(hillslopes_feature_class, hillslope_ids, scratch_gdb)
+    out_feature_class = os.path.join(scratch_gdb, "intersection")
+    arcpy.analysis.PairwiseIntersect(f"'{overlay_feature_class}'; '{hillslopes}'", out_feature_class,
+                                     "ALL", None, "INPUT")
+    return out_feature_class
+
+
+def _crosstab_task(scratch_gdb, class_raster, zone_raster, zone_ids):
+    aligned_raster = agwa_raster_io.align_raster(class_raster, zone_raster, os.path.join(scratch_gdb, "aligned"),
+                                                 "NEAREST")
+    return agwa_zonal.zonal_crosstab(zone_raster, aligned_raster, zone_ids)
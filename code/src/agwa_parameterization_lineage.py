@@ -0,0 +1,183 @@
+import os
+import arcpy
+import datetime
+import pandas as pd
+import agwa_table_io
+
+
+LINEAGE_TABLE_NAME = "parameterization_lineage"
+LINEAGE_FIELDS = ["DelineationName", "DiscretizationName", "ParameterizationName", "ParentParameterizationName",
+                  "TableName", "InheritedFields", "CreationDate"]
+
+# Key field of each parameter table
+TABLE_KEYS = {"parameters_hillslopes": "HillslopeID",
+              "parameters_channels": "ChannelID"}
+NAME_FIELDS = ["DelineationName", "DiscretizationName", "ParameterizationName"]
+
+
+def add_parent(workspace, delineation_name, discretization_name, parameterization_name, parent_parameterization_name,
+               table_name, inherited_fields):
+    """Record that parameterization_name inherits inherited_fields of table_name from parent_parameterization_name.
+
+    No rows are copied: the child stores only the rows and columns it overrides, and read_parameters resolves the
+    inherited columns through the parent (and its own parents) when the parameters are read."""
+
+    lineage_table = os.path.join(workspace, LINEAGE_TABLE_NAME)
+    if not arcpy.Exists(lineage_table):
+        arcpy.CreateTable_management(workspace, LINEAGE_TABLE_NAME)
+        for field in LINEAGE_FIELDS:
+            arcpy.AddField_management(lineage_table, field, "TEXT")
+
+    if parent_parameterization_name == parameterization_name:
+        raise Exception(f"Parameterization '{parameterization_name}' cannot inherit from itself.")
+
+    agwa_table_io.delete_rows(lineage_table, {"DelineationName": delineation_name,
+                                              "DiscretizationName": discretization_name,
+                                              "ParameterizationName": parameterization_name,
+                                              "ParentParameterizationName": parent_parameterization_name,
+                                              "TableName": table_name})
+    agwa_table_io.append_rows(lineage_table, [(delineation_name, discretization_name, parameterization_name,
+                                               parent_parameterization_name, table_name, ",".join(inherited_fields),
+                                               datetime.datetime.now().isoformat())], LINEAGE_FIELDS)
+
+
+def get_parents(workspace, delineation_name, discretization_name, parameterization_name, table_name):
+    """Return a list of (parent parameterization name, list of inherited fields) of a parameterization."""
+
+    lineage_table = os.path.join(workspace, LINEAGE_TABLE_NAME)
+    if not arcpy.Exists(lineage_table):
+        return []
+    df_lineage = agwa_table_io.read_table(lineage_table, ["ParentParameterizationName", "InheritedFields"],
+                                          {"DelineationName": delineation_name,
+                                           "DiscretizationName": discretization_name,
+                                           "ParameterizationName": parameterization_name,
+                                           "TableName": table_name})
+    return [(parent, inherited.split(",")) for parent, inherited in
+            zip(df_lineage.ParentParameterizationName, df_lineage.InheritedFields)]
+
+
+def get_children(workspace, delineation_name, discretization_name, parameterization_name, table_name):
+    """Return a list of (child parameterization name, list of inherited fields) of the parameterizations that inherit
+    fields of table_name from parameterization_name."""
+
+    lineage_table = os.path.join(workspace, LINEAGE_TABLE_NAME)
+    if not arcpy.Exists(lineage_table):
+        return []
+    df_lineage = agwa_table_io.read_table(lineage_table, ["ParameterizationName", "InheritedFields"],
+                                          {"DelineationName": delineation_name,
+                                           "DiscretizationName": discretization_name,
+                                           "ParentParameterizationName": parameterization_name,
+                                           "TableName": table_name})
+    return [(child, inherited.split(",")) for child, inherited in
+            zip(df_lineage.ParameterizationName, df_lineage.InheritedFields)]
+
+
+def detach_children(workspace, delineation_name, discretization_name, parameterization_name, table_name,
+                    fields=None):
+    """Copy the values of fields (all inherited fields by default) of table_name that the children of
+    parameterization_name inherit from it into the rows of the children, and remove these fields from their
+    lineage. The children then keep their current values when parameterization_name is parameterized again or
+    deleted. Returns the names of the children that were detached."""
+
+    key_field = TABLE_KEYS[table_name]
+    table = os.path.join(workspace, table_name)
+    lineage_table = os.path.join(workspace, LINEAGE_TABLE_NAME)
+    detached = []
+    for child, inherited_fields in get_children(workspace, delineation_name, discretization_name,
+                                                parameterization_name, table_name):
+        detached_fields = [field for field in inherited_fields if fields is None or field in fields]
+        if not detached_fields:
+            continue
+        df_child = read_parameters(workspace, table_name, [key_field] + detached_fields, delineation_name,
+                                   discretization_name, child)
+        agwa_table_io.upsert_rows(table, df_child, key_field, detached_fields,
+                                  {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+                                   "ParameterizationName": child})
+
+        agwa_table_io.delete_rows(lineage_table, {"DelineationName": delineation_name,
+                                                  "DiscretizationName": discretization_name,
+                                                  "ParameterizationName": child,
+                                                  "ParentParameterizationName": parameterization_name,
+                                                  "TableName": table_name})
+        remaining_fields = [field for field in inherited_fields if field not in detached_fields]
+        if remaining_fields:
+            add_parent(workspace, delineation_name, discretization_name, child, parameterization_name, table_name,
+                       remaining_fields)
+        detached.append(child)
+    return detached
+
+
+def delete_parameterization(workspace, delineation_name, discretization_name, parameterization_name,
+                            detach=False):
+    """Delete the rows of a parameterization from the parameter tables and its lineage.
+    A parameterization that other parameterizations inherit from is not deleted, unless detach is True, in which
+    case the values they inherit are first copied into them (see detach_children)."""
+
+    for table_name in TABLE_KEYS:
+        children = get_children(workspace, delineation_name, discretization_name, parameterization_name,
+                                table_name)
+        if children and not detach:
+            raise Exception(f"Parameterization '{parameterization_name}' cannot be deleted: the parameterizations "
+                            f"{', '.join(child for child, _ in children)} inherit their {table_name} values "
+                            "from it.")
+
+    filters = {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+               "ParameterizationName": parameterization_name}
+    for table_name in TABLE_KEYS:
+        detach_children(workspace, delineation_name, discretization_name, parameterization_name, table_name)
+        table = os.path.join(workspace, table_name)
+        if arcpy.Exists(table):
+            agwa_table_io.delete_rows(table, filters)
+    lineage_table = os.path.join(workspace, LINEAGE_TABLE_NAME)
+    if arcpy.Exists(lineage_table):
+        agwa_table_io.delete_rows(lineage_table, filters)
+
+
+def read_parameters(workspace, table_name, fields, delineation_name, discretization_name, parameterization_name,
+                    null_value=None, _visited=None):
+    """Read fields of the parameter table table_name for a parameterization, resolving inherited columns through
+    its parents. Values stored by the parameterization itself take precedence over inherited values.
+
+    Returns a DataFrame with the key field of the table (HillslopeID or ChannelID) and fields, with one row per
+    element of the parameterization or of any parent it inherits from. Name fields (DelineationName,
+    DiscretizationName, ParameterizationName) are filled with the names of the requested parameterization."""
+
+    key_field = TABLE_KEYS[table_name]
+    fields = [field for field in fields if field != key_field]
+    value_fields = [field for field in fields if field not in NAME_FIELDS]
+    visited = (_visited or set()) | {parameterization_name}
+
+    # Read with a cursor rather than TableToNumPyArray: fields a child does not override are stored as nulls
+    table = os.path.join(workspace, table_name)
+    where = agwa_table_io.where_clause(table, {"DelineationName": delineation_name,
+                                               "DiscretizationName": discretization_name,
+                                               "ParameterizationName": parameterization_name})
+    with arcpy.da.SearchCursor(table, [key_field] + value_fields, where) as cursor:
+        df = pd.DataFrame(cursor, columns=[key_field] + value_fields)
+
+    for parent, inherited_fields in get_parents(workspace, delineation_name, discretization_name,
+                                                parameterization_name, table_name):
+        if parent in visited:
+            raise Exception(f"Parameterization '{parameterization_name}' has a circular lineage through '{parent}'.")
+        parent_fields = [field for field in value_fields if field in inherited_fields]
+        if not parent_fields:
+            continue
+        df_parent = read_parameters(workspace, table_name, parent_fields, delineation_name, discretization_name,
+                                    parent, _visited=visited)
+        if df_parent.empty:
+            raise Exception(f"Parameterization '{parameterization_name}' inherits {table_name} values from "
+                            f"'{parent}', which has no rows in {table_name}. It may have been deleted.")
+        df = df.merge(df_parent, on=key_field, how="outer", suffixes=("", "_parent"))
+        for field in parent_fields:
+            df[field] = df[field].where(df[field].notna(), df[f"{field}_parent"])
+        df = df.drop(columns=[f"{field}_parent" for field in parent_fields])
+
+    names = {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+             "ParameterizationName": parameterization_name}
+    for field in fields:
+        if field in names:
+            df[field] = names[field]
+    df = df[[key_field] + fields].sort_values(key_field).reset_index(drop=True)
+    if null_value is not None:
+        df = df.fillna(null_value)
+    return df
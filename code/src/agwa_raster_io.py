@@ -0,0 +1,137 @@
+import arcpy
+import numpy as np
+
+# Number of rows and columns read from a raster at a time. 2048 x 2048 float64 blocks use 32 MB per raster.
+BLOCK_SIZE = 2048
+
+
+class RasterGrid(object):
+    """Extent, cell size and dimensions of a raster, used to read aligned blocks from several rasters."""
+
+    def __init__(self, raster):
+        r = arcpy.Raster(raster)
+        self.x_min = r.extent.XMin
+        self.y_max = r.extent.YMax
+        self.cell_width = r.meanCellWidth
+        self.cell_height = r.meanCellHeight
+        self.n_cols = r.width
+        self.n_rows = r.height
+        self.spatial_reference = r.spatialReference
+
+    @property
+    def cell_area(self):
+        return self.cell_width * self.cell_height
+
+    def is_aligned(self, raster, tolerance=1e-6):
+        """Check whether raster has the same cell size as this grid and its cells line up with it."""
+        other = arcpy.Raster(raster)
+        if (abs(other.meanCellWidth - self.cell_width) > tolerance * self.cell_width or
+                abs(other.meanCellHeight - self.cell_height) > tolerance * self.cell_height):
+            return False
+        col_offset = (other.extent.XMin - self.x_min) / self.cell_width
+        row_offset = (self.y_max - other.extent.YMax) / self.cell_height
+        return abs(col_offset - round(col_offset)) < 1e-3 and abs(row_offset - round(row_offset)) < 1e-3
+
+    def blocks(self, block_size=BLOCK_SIZE):
+        """Yield (row, col, n_rows, n_cols) windows covering the grid."""
+        for row in range(0, self.n_rows, block_size):
+            for col in range(0, self.n_cols, block_size):
+                yield row, col, min(block_size, self.n_rows - row), min(block_size, self.n_cols - col)
+
+    def lower_left(self, row, col, n_rows):
+        """Lower left corner of a window, as expected by arcpy.RasterToNumPyArray."""
+        return arcpy.Point(self.x_min + col * self.cell_width, self.y_max - (row + n_rows) * self.cell_height)
+
+    def cell_indices(self, xs, ys):
+        """Return the (row, col) of the cells containing the points xs, ys."""
+        cols = np.floor((np.asarray(xs, dtype=float) - self.x_min) / self.cell_width).astype(np.int64)
+        rows = np.floor((self.y_max - np.asarray(ys, dtype=float)) / self.cell_height).astype(np.int64)
+        return rows, cols
+
+
+def read_block(raster, grid, row, col, n_rows, n_cols):
+    """Read a window of raster aligned to grid as a float array with NaN for NoData."""
+
+    r = arcpy.Raster(raster) if not isinstance(raster, arcpy.Raster) else raster
+    array = arcpy.RasterToNumPyArray(r, grid.lower_left(row, col, n_rows), n_cols, n_rows).astype(float)
+    if r.noDataValue is not None:
+        array[array == r.noDataValue] = np.nan
+    return array
+
+
+def read_zone_block(raster, grid, row, col, n_rows, n_cols):
+    """Read a window of an integer zone raster with 0 for NoData."""
+    return arcpy.RasterToNumPyArray(raster, grid.lower_left(row, col, n_rows), n_cols, n_rows,
+                                    nodata_to_value=0).astype(np.int64)
+
+
+def read_raster(raster, grid, out, nodata_to_value=0, block_size=BLOCK_SIZE):
+    """Read raster block by block into out, an array of shape (grid.n_rows, grid.n_cols) that can be
+    memory-mapped, with nodata_to_value for NoData and cells outside the raster. Returns out."""
+
+    r = arcpy.Raster(raster) if not isinstance(raster, arcpy.Raster) else raster
+    for row, col, n_rows, n_cols in grid.blocks(block_size):
+        out[row:row + n_rows, col:col + n_cols] = arcpy.RasterToNumPyArray(
+            r, grid.lower_left(row, col, n_rows), n_cols, n_rows, nodata_to_value=nodata_to_value)
+    return out
+
+
+def write_raster(array, grid, out_raster, nodata_value=0):
+    """Save a 2D array aligned to grid as out_raster, with nodata_value as NoData. Returns out_raster."""
+
+    if arcpy.Exists(out_raster):
+        arcpy.management.Delete(out_raster)
+    raster = arcpy.NumPyArrayToRaster(np.asarray(array), grid.lower_left(0, 0, grid.n_rows), grid.cell_width,
+                                      grid.cell_height, nodata_value)
+    raster.save(out_raster)
+    arcpy.management.DefineProjection(out_raster, grid.spatial_reference)
+    return out_raster
+
+
+def sample_points(raster, xs, ys, block_size=BLOCK_SIZE):
+    """Return the values of raster at the points xs, ys (value of the cell containing each point, like
+    Sample with NEAREST), NaN for points outside the raster or on NoData.
+
+    Points are grouped by block and only the window spanning the points of each block is read, so sampling
+    a few thousand channel endpoints reads a small part of a large DEM."""
+
+    grid = RasterGrid(raster)
+    r = arcpy.Raster(raster)
+    rows, cols = grid.cell_indices(xs, ys)
+    values = np.full(len(rows), np.nan)
+
+    inside = np.flatnonzero((rows >= 0) & (rows < grid.n_rows) & (cols >= 0) & (cols < grid.n_cols))
+    block_ids = (rows[inside] // block_size) * (grid.n_cols // block_size + 1) + cols[inside] // block_size
+    for block_id in np.unique(block_ids):
+        points = inside[block_ids == block_id]
+        row, col = rows[points].min(), cols[points].min()
+        n_rows, n_cols = rows[points].max() - row + 1, cols[points].max() - col + 1
+        window = read_block(r, grid, row, col, n_rows, n_cols)
+        values[points] = window[rows[points] - row, cols[points] - col]
+    return values
+
+
+def rasterize_zones(feature_class, zone_field, snap_raster, out_raster):
+    """Rasterize the zone_field of polygons onto the grid of snap_raster. Cells are assigned by cell center,
+    which matches how ZonalStatisticsAsTable rasterizes feature zones."""
+
+    if arcpy.Exists(out_raster):
+        arcpy.management.Delete(out_raster)
+    extent = arcpy.Describe(feature_class).extent
+    with arcpy.EnvManager(snapRaster=snap_raster, cellSize=snap_raster, extent=extent):
+        arcpy.conversion.PolygonToRaster(feature_class, zone_field, out_raster, "CELL_CENTER", "", snap_raster)
+    return out_raster
+
+
+def align_raster(raster, grid_raster, out_raster, resampling_method="BILINEAR"):
+    """Return raster if it is aligned to grid_raster, otherwise resample it onto the grid of grid_raster.
+    Use resampling_method="NEAREST" for categorical rasters such as land cover or soil map units."""
+
+    if RasterGrid(grid_raster).is_aligned(raster):
+        return raster
+    if arcpy.Exists(out_raster):
+        arcpy.management.Delete(out_raster)
+    with arcpy.EnvManager(snapRaster=grid_raster, cellSize=grid_raster, extent=grid_raster,
+                          resamplingMethod=resampling_method):
+        arcpy.sa.ApplyEnvironment(raster).save(out_raster)
+    return out_raster
@@ -0,0 +1,168 @@
+import os
+import arcpy
+import hashlib
+import datetime
+import agwa_file_gdb
+import agwa_raster_io
+import agwa_table_io
+import agwa_parameterization_lineage
+
+
+CACHE_TABLE_NAME = "parameterization_cache"
+CACHE_FIELDS = ["DelineationName", "DiscretizationName", "ParameterizationName", "StepName", "StepHash",
+                "CreationDate"]
+
+# Key field of each parameter table, used to copy step outputs between parameterizations
+TABLE_KEYS = {"parameters_hillslopes": "HillslopeID",
+              "parameters_channels": "ChannelID"}
+
+
+def fingerprint(dataset, fields=None, filters=None):
+    """Return a hash identifying the content of an input of a step.
+
+    Feature classes and tables are hashed from their rows (fields, or OID and geometry by default, restricted to
+    filters), so re-creating an identical discretization does not invalidate the cache. Rasters are hashed from
+    their extent, cell size, NoData value, pixel type, spatial reference and the last modification time of their
+    files (see raster_modification_time), so a raster overwritten in place changes its fingerprint even though its
+    path does not, without reading its cells. Rasters without files (e.g. in an enterprise geodatabase) are hashed
+    from the values of every cell, read block by block. Options (strings, numbers, None) are hashed from their
+    value."""
+
+    digest = hashlib.sha1()
+    if dataset is None or not isinstance(dataset, str) or not arcpy.Exists(dataset):
+        digest.update(repr(dataset).encode())
+        return digest.hexdigest()
+
+    description = arcpy.Describe(dataset)
+    digest.update(str(dataset).encode())
+    if description.dataType in ("RasterDataset", "RasterLayer", "RasterBand"):
+        raster = arcpy.Raster(dataset)
+        grid = agwa_raster_io.RasterGrid(dataset)
+        modification_time = raster_modification_time(raster.catalogPath)
+        digest.update(f"{grid.x_min},{grid.y_max},{grid.cell_width},{grid.cell_height},{grid.n_rows},"
+                      f"{grid.n_cols},{raster.noDataValue},{raster.pixelType},"
+                      f"{grid.spatial_reference.exportToString()},{modification_time}".encode())
+        if modification_time is None:
+            for row, col, n_rows, n_cols in grid.blocks():
+                block = arcpy.RasterToNumPyArray(raster, grid.lower_left(row, col, n_rows), n_cols, n_rows)
+                digest.update(str(block.dtype).encode())
+                digest.update(block.tobytes())
+    else:
+        if fields is None:
+            fields = ["OID@", "SHAPE@WKB"] if hasattr(description, "shapeType") else ["OID@"]
+        where = agwa_table_io.where_clause(dataset, filters)
+        with arcpy.da.SearchCursor(dataset, fields, where) as cursor:
+            for row in cursor:
+                digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def raster_modification_time(path):
+    """Last modification time of the files of the raster at path: the tables of a raster dataset of a file
+    geodatabase (not the .lock files created when it is opened), the files of an Esri grid folder or the raster
+    file. None if the raster has no files or they cannot be found."""
+
+    gdb, raster_name = os.path.split(path)
+    if agwa_file_gdb.is_file_gdb(gdb):
+        try:
+            return agwa_file_gdb.raster_modification_time(gdb, raster_name)
+        except Exception:
+            return None
+    if os.path.isdir(path):
+        return max((entry.stat().st_mtime for entry in os.scandir(path) if not entry.name.endswith(".lock")),
+                   default=None)
+    return os.path.getmtime(path) if os.path.isfile(path) else None
+
+
+class StepCache(object):
+    """Record of the steps of a parameterization and the hash of their inputs, stored in the
+    parameterization_cache table of the workspace.
+
+    A step hash combines the fingerprints of the step inputs, its options and the hashes of the steps it
+    depends on. When another parameterization of the same discretization has a step with the same hash, the
+    outputs of that step are copied from it instead of being recalculated."""
+
+    def __init__(self, workspace, delineation_name, discretization_name, parameterization_name, enabled=True):
+        self.workspace = workspace
+        self.delineation_name = delineation_name
+        self.discretization_name = discretization_name
+        self.parameterization_name = parameterization_name
+        self.enabled = enabled
+        self.table = os.path.join(workspace, CACHE_TABLE_NAME)
+        self.hashes = {}
+
+        if not arcpy.Exists(self.table):
+            arcpy.CreateTable_management(workspace, CACHE_TABLE_NAME)
+            for field in CACHE_FIELDS:
+                arcpy.AddField_management(self.table, field, "TEXT")
+
+    def step_hash(self, step_name, inputs=(), options=(), depends_on=()):
+        """Hash of a step from the fingerprints of its inputs, its options and the hashes of the steps it depends
+        on, which must have been run or restored before."""
+        digest = hashlib.sha1(step_name.encode())
+        for value in list(inputs) + list(options):
+            digest.update(repr(value).encode())
+        for dependency in depends_on:
+            digest.update(self.hashes[dependency].encode())
+        return digest.hexdigest()
+
+    def find_donor(self, step_name, step_hash):
+        """Return the name of another parameterization of the discretization with the same step hash, or None."""
+        if not self.enabled:
+            return None
+        df_cache = agwa_table_io.read_table(self.table, ["ParameterizationName"],
+                                            {"DelineationName": self.delineation_name,
+                                             "DiscretizationName": self.discretization_name,
+                                             "StepName": step_name, "StepHash": step_hash})
+        donors = [name for name in df_cache.ParameterizationName.values if name != self.parameterization_name]
+        return donors[-1] if donors else None
+
+    def restore(self, step_name, step_hash, outputs):
+        """Copy the outputs (dict of table name -> fields) of a step from a donor parameterization.
+        Returns the name of the donor, or None when the step has to be calculated."""
+
+        donor = self.find_donor(step_name, step_hash)
+        if donor is None:
+            return None
+
+        # Every output table of the donor is read before any is written, so a step is either restored completely
+        # or calculated
+        donor_tables = {}
+        for table_name, fields in outputs.items():
+            key_field = TABLE_KEYS[table_name]
+            df_donor = agwa_parameterization_lineage.read_parameters(self.workspace, table_name,
+                                                                     [key_field] + list(fields),
+                                                                     self.delineation_name,
+                                                                     self.discretization_name, donor)
+            if df_donor.empty:
+                return None
+            donor_tables[table_name] = df_donor
+
+        for table_name, df_donor in donor_tables.items():
+            table = os.path.join(self.workspace, table_name)
+            where = agwa_table_io.where_clause(table, {"DelineationName": self.delineation_name,
+                                                       "DiscretizationName": self.discretization_name,
+                                                       "ParameterizationName": self.parameterization_name})
+            agwa_table_io.update_rows(table, df_donor, TABLE_KEYS[table_name], outputs[table_name], where=where)
+        return donor
+
+    def record(self, step_name, step_hash):
+        """Record the hash of a step that was calculated or restored for this parameterization."""
+        self.hashes[step_name] = step_hash
+        filters = {"DelineationName": self.delineation_name, "DiscretizationName": self.discretization_name,
+                   "ParameterizationName": self.parameterization_name, "StepName": step_name}
+        agwa_table_io.delete_rows(self.table, filters)
+        agwa_table_io.append_rows(self.table, [(self.delineation_name, self.discretization_name,
+                                                self.parameterization_name, step_name, step_hash,
+                                                datetime.datetime.now().isoformat())], CACHE_FIELDS)
+
+    def run(self, step_name, outputs, function, *args, inputs=(), options=(), depends_on=()):
+        """Run function(*args) unless the step can be restored from another parameterization.
+        Returns the donor parameterization name when the step was restored, otherwise None."""
+
+        step_hash = self.step_hash(step_name, inputs, options, depends_on)
+        donor = self.restore(step_name, step_hash, outputs)
+        if donor is None:
+            function(*args)
+        self.record(step_name, step_hash)
+        return donor
@@ -0,0 +1,164 @@
+import arcpy
+import numpy as np
+import pandas as pd
+
+
+def where_clause(table, filters):
+    """Build a where clause from a dict of field -> value, e.g.
+    {"DelineationName": "d1", "DiscretizationName": "d1_1000"} ->
+    "DelineationName = 'd1' And DiscretizationName = 'd1_1000'".
+    List or tuple values are written as IN (...). Returns None when filters is empty."""
+
+    if not filters:
+        return None
+    clauses = []
+    for field, value in filters.items():
+        field_name = arcpy.AddFieldDelimiters(table, field)
+        if isinstance(value, (list, tuple, set, np.ndarray, pd.Series)):
+            values = ", ".join(_sql_literal(v) for v in value)
+            clauses.append(f"{field_name} IN ({values})")
+        else:
+            clauses.append(f"{field_name} = {_sql_literal(value)}")
+    return " And ".join(clauses)
+
+
+def read_table(table, fields, filters=None, where=None, null_value=None, skip_nulls=False, as_dataframe=True):
+    """Read only the given fields of the rows of table selected by filters (dict of field -> value, see
+    where_clause) and/or where. The selection is done by the geodatabase in the where clause instead of
+    loading every row and column and filtering in pandas.
+
+    Returns a DataFrame, or the structured NumPy array from arcpy.da.TableToNumPyArray if as_dataframe is False.
+    Works for tables and for the attribute fields of feature classes."""
+
+    fields = [fields] if isinstance(fields, str) else list(fields)
+    expression = _combine_where(where_clause(table, filters), where)
+    if null_value is None:
+        array = arcpy.da.TableToNumPyArray(table, fields, expression, skip_nulls)
+    else:
+        array = arcpy.da.TableToNumPyArray(table, fields, expression, skip_nulls, null_value)
+    return pd.DataFrame(array) if as_dataframe else array
+
+
+def _sql_literal(value):
+    if isinstance(value, (str, np.str_)):
+        value = str(value).replace("'", "''")
+        return f"'{value}'"
+    return str(value)
+
+
+def _combine_where(*clauses):
+    clauses = [clause for clause in clauses if clause]
+    if len(clauses) <= 1:
+        return clauses[0] if clauses else None
+    return " And ".join(f"({clause})" for clause in clauses)
+
+
+def _records(df, fields):
+    """Rows of df[fields] as lists of Python values with None for missing values, as expected by arcpy cursors."""
+    df_fields = df[fields].astype(object)
+    return df_fields.where(df_fields.notna(), None).values.tolist()
+
+
+def _key(values):
+    """Normalize key values so that 11, 11.0 and '11' match the same row."""
+    key = []
+    for value in values:
+        if isinstance(value, (float, np.floating)) and float(value).is_integer():
+            value = int(value)
+        key.append(str(value))
+    return tuple(key)
+
+
+def update_rows(table, df, key_fields, fields=None, where=None):
+    """Update the rows of table that match df on key_fields with the values of df.
+
+    df: DataFrame with the key_fields and the fields to update. fields defaults to all other columns of df.
+    where: optional where clause restricting the rows visited, e.g. the DelineationName/DiscretizationName/
+        ParameterizationName of the rows being updated.
+    The table is scanned once with a single UpdateCursor and each row is matched with a dict lookup,
+    which replaces AddJoin/CalculateField/RemoveJoin and per-row lookups in pandas. Returns the number of
+    rows updated."""
+
+    updated_keys, _ = _update_matching_rows(table, df, key_fields, fields, where)
+    return len(updated_keys)
+
+
+def upsert_rows(table, df, key_fields, fields=None, filters=None):
+    """Update the rows of table selected by filters (dict of field -> value) that match df on key_fields, and
+    insert the rows of df that were not found, with the filters values. Returns the number of rows inserted."""
+
+    where = where_clause(table, filters)
+    updated_keys, fields = _update_matching_rows(table, df, key_fields, fields, where)
+    key_fields = [key_fields] if isinstance(key_fields, str) else list(key_fields)
+    filters = filters or {}
+
+    n_keys = len(key_fields)
+    new_rows = [list(filters.values()) + list(record)
+                for record in _records(df, key_fields + fields) if _key(record[:n_keys]) not in updated_keys]
+    if not new_rows:
+        return 0
+    return append_rows(table, new_rows, list(filters) + key_fields + fields)
+
+
+def _update_matching_rows(table, df, key_fields, fields, where):
+    key_fields = [key_fields] if isinstance(key_fields, str) else list(key_fields)
+    if fields is None:
+        fields = [field for field in df.columns if field not in key_fields]
+    fields = list(fields)
+    n_keys = len(key_fields)
+
+    lookup = {_key(record[:n_keys]): record[n_keys:] for record in _records(df, key_fields + fields)}
+
+    updated_keys = set()
+    with arcpy.da.UpdateCursor(table, key_fields + fields, where) as cursor:
+        for row in cursor:
+            key = _key(row[:n_keys])
+            values = lookup.get(key)
+            if values is not None:
+                cursor.updateRow(list(row[:n_keys]) + values)
+                updated_keys.add(key)
+    return updated_keys, fields
+
+
+def append_rows(table, rows, fields=None):
+    """Insert rows into table with a single InsertCursor.
+
+    rows: DataFrame (fields defaults to its columns) or iterable of sequences ordered like fields.
+    Returns the number of rows inserted."""
+
+    if isinstance(rows, pd.DataFrame):
+        if fields is None:
+            fields = list(rows.columns)
+        rows = _records(rows, list(fields))
+
+    n_inserted = 0
+    with arcpy.da.InsertCursor(table, list(fields)) as cursor:
+        for row in rows:
+            cursor.insertRow(row)
+            n_inserted += 1
+    return n_inserted
+
+
+def delete_rows(table, filters=None, where=None, key_fields=None, keys=None):
+    """Delete the rows of table selected by filters (dict of field -> value, see where_clause) and/or where.
+    When key_fields and keys are given, only rows whose key_fields values are in keys (DataFrame or iterable of
+    tuples) are deleted. Returns the number of rows deleted."""
+
+    expression = _combine_where(where_clause(table, filters), where)
+
+    fields = ["OID@"]
+    key_set = None
+    if key_fields is not None:
+        key_fields = [key_fields] if isinstance(key_fields, str) else list(key_fields)
+        fields += key_fields
+        if isinstance(keys, pd.DataFrame):
+            keys = _records(keys, key_fields)
+        key_set = {_key(key if isinstance(key, (list, tuple)) else [key]) for key in keys}
+
+    n_deleted = 0
+    with arcpy.da.UpdateCursor(table, fields, expression) as cursor:
+        for row in cursor:
+            if key_set is None or _key(row[1:]) in key_set:
+                cursor.deleteRow()
+                n_deleted += 1
+    return n_deleted
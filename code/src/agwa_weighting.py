@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+
+TEXTURE_FIELDS = ["Sand", "Silt", "Clay"]
+
+
+def weighted_mean(df, group_fields, value_fields, weight_field, exclude=None, renormalize=None):
+    """Weighted mean of value_fields for each group of rows of df with the same group_fields.
+
+    The mean of a value is sum(value * weight) / sum(weight): missing values add nothing to the numerator but
+    their weight still counts in the denominator.
+    exclude: optional boolean mask of rows left out of the means, e.g. df.Pave == 1. Excluded rows are only left
+        out of groups that also have rows that are not excluded.
+    renormalize: optional list of fields (e.g. TEXTURE_FIELDS) rescaled to sum to 1 in each group, unless their
+        sum is 0.
+    One groupby over value * weight replaces a loop over the groups. Groups are in order of first appearance in
+    df. Returns a DataFrame with the group_fields and value_fields."""
+
+    group_fields = [group_fields] if isinstance(group_fields, str) else list(group_fields)
+    value_fields = list(value_fields)
+    group_order = df.groupby(group_fields, sort=False).size().index
+
+    if exclude is not None:
+        exclude = pd.Series(np.asarray(exclude, dtype=bool), index=df.index)
+        all_excluded = exclude.groupby([df[field] for field in group_fields], sort=False).transform("all")
+        df = df[~exclude | all_excluded]
+
+    keys = [df[field] for field in group_fields]
+    weights = df[weight_field].astype(float)
+    weighted_sums = df[value_fields].astype(float).mul(weights, axis=0).groupby(keys, sort=False).sum()
+    total_weights = weights.groupby(keys, sort=False).sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        df_means = weighted_sums.div(total_weights, axis=0).reindex(group_order)
+
+    if renormalize:
+        total = df_means[renormalize].sum(axis=1, skipna=False)
+        scale = total.where(total != 0, 1.)
+        df_means[renormalize] = df_means[renormalize].div(scale, axis=0)
+
+    return df_means.reset_index()
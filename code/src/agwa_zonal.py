@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+import agwa_raster_io
+
+
+class ZonalAccumulator(object):
+    """Running per-zone statistics of one value raster, updated block by block with np.bincount.
+
+    Supported statistics are COUNT, SUM, MEAN, MIN, MAX and STD. With circular=True, values are treated as
+    angles in degrees (e.g. aspect): negative values (flat cells) are ignored and MEAN is the circular mean."""
+
+    def __init__(self, zone_ids, circular=False):
+        self.zone_ids = np.asarray(sorted(zone_ids), dtype=np.int64)
+        self.lookup = np.full(int(self.zone_ids.max(initial=0)) + 1, -1, dtype=np.int64)
+        self.lookup[self.zone_ids] = np.arange(len(self.zone_ids))
+        self.circular = circular
+
+        n = len(self.zone_ids)
+        self.count = np.zeros(n)
+        self.sum = np.zeros(n)
+        self.sum_squares = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        if circular:
+            self.sum_sin = np.zeros(n)
+            self.sum_cos = np.zeros(n)
+
+    def zone_index(self, zones):
+        """Map zone values to positions in self.zone_ids, -1 for cells outside the zones."""
+        zones = np.asarray(zones, dtype=np.int64)
+        inside = (zones > 0) & (zones < len(self.lookup))
+        index = np.full(zones.shape, -1, dtype=np.int64)
+        index[inside] = self.lookup[zones[inside]]
+        return index
+
+    def add(self, zone_index, values):
+        """Add one block of values. zone_index is the output of zone_index() for the same block."""
+
+        valid = (zone_index >= 0) & ~np.isnan(values)
+        if self.circular:
+            valid &= values >= 0
+        idx = zone_index[valid]
+        v = values[valid]
+        if idx.size == 0:
+            return
+
+        n = len(self.zone_ids)
+        self.count += np.bincount(idx, minlength=n)
+        self.sum += np.bincount(idx, weights=v, minlength=n)
+        self.sum_squares += np.bincount(idx, weights=v * v, minlength=n)
+        np.minimum.at(self.min, idx, v)
+        np.maximum.at(self.max, idx, v)
+        if self.circular:
+            radians = np.deg2rad(v)
+            self.sum_sin += np.bincount(idx, weights=np.sin(radians), minlength=n)
+            self.sum_cos += np.bincount(idx, weights=np.cos(radians), minlength=n)
+
+    def statistics(self):
+        """Return a DataFrame of the statistics indexed by zone id. Zones without data get NaN
+        (MEAN is -1 for circular zones that only contain flat cells, like ArcGIS aspect)."""
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum / self.count
+            std = np.sqrt(np.maximum(self.sum_squares / self.count - mean ** 2, 0))
+        if self.circular:
+            mean = np.mod(np.rad2deg(np.arctan2(self.sum_sin, self.sum_cos)), 360)
+            mean[mean >= 360] = 0
+            mean[self.count == 0] = -1
+        no_data = self.count == 0
+        minimum = np.where(no_data, np.nan, self.min)
+        maximum = np.where(no_data, np.nan, self.max)
+        if not self.circular:
+            mean[no_data] = np.nan
+        return pd.DataFrame({"COUNT": self.count, "SUM": self.sum, "MEAN": mean, "MIN": minimum,
+                             "MAX": maximum, "STD": std}, index=pd.Index(self.zone_ids, name="ZoneID"))
+
+
+def zonal_statistics(zone_raster, value_rasters, zone_ids, circular=(), block_size=agwa_raster_io.BLOCK_SIZE):
+    """Calculate statistics of several value rasters for the zones of zone_raster in one pass.
+
+    zone_raster: integer raster of zone ids (0 or NoData outside the zones).
+    value_rasters: dict of name -> raster aligned with zone_raster.
+    zone_ids: ids of the zones to report.
+    circular: names of value_rasters holding angles in degrees.
+    Each block of the zone raster is read once and reused for all value rasters.
+    Returns a DataFrame indexed by zone id with columns '<name>_<STATISTIC>'."""
+
+    grid = agwa_raster_io.RasterGrid(zone_raster)
+    accumulators = {name: ZonalAccumulator(zone_ids, name in circular) for name in value_rasters}
+    template = next(iter(accumulators.values())) if accumulators else ZonalAccumulator(zone_ids)
+    for row, col, n_rows, n_cols in grid.blocks(block_size):
+        zones = agwa_raster_io.read_zone_block(zone_raster, grid, row, col, n_rows, n_cols)
+        zone_index = template.zone_index(zones)
+        if not (zone_index >= 0).any():
+            continue
+        for name, raster in value_rasters.items():
+            values = agwa_raster_io.read_block(raster, grid, row, col, n_rows, n_cols)
+            accumulators[name].add(zone_index, values)
+
+    frames = []
+    for name, accumulator in accumulators.items():
+        df = accumulator.statistics()
+        df.columns = [f"{name}_{statistic}" for statistic in df.columns]
+        frames.append(df)
+    return pd.concat(frames, axis=1) if frames else pd.DataFrame(index=template.zone_ids)
+
+
+def zonal_profiles(zone_raster, distance_raster, value_raster, zone_ids, n_segments, max_distances=None,
+                   block_size=agwa_raster_io.BLOCK_SIZE):
+    """Calculate the mean of value_raster in n_segments equal-length distance bands of each zone, e.g. the slope
+    profile of hillslopes binned by flow length downstream.
+
+    distance_raster: distance of each cell to the outlet of its zone, aligned with zone_raster.
+    max_distances: Series of the longest distance of each zone, indexed by zone id. When None, it is calculated
+        in a first pass over the zone and distance rasters.
+    Cells are binned with one np.bincount per block on zone * n_segments + segment keys, so memory depends on the
+    block size and the number of zones only. Segment 1 is the most upslope band.
+    Returns a DataFrame with ZoneID, Segment, UpstreamDistance, DownstreamDistance, COUNT and MEAN. MEAN is NaN
+    for segments without cells."""
+
+    grid = agwa_raster_io.RasterGrid(zone_raster)
+    template = ZonalAccumulator(zone_ids)
+    n_zones = len(template.zone_ids)
+
+    if max_distances is None:
+        distance_accumulator = ZonalAccumulator(zone_ids)
+        for row, col, n_rows, n_cols in grid.blocks(block_size):
+            zone_index = template.zone_index(agwa_raster_io.read_zone_block(zone_raster, grid, row, col, n_rows,
+                                                                            n_cols))
+            if (zone_index >= 0).any():
+                distances = agwa_raster_io.read_block(distance_raster, grid, row, col, n_rows, n_cols)
+                distance_accumulator.add(zone_index, distances)
+        max_distances = np.where(distance_accumulator.count > 0, distance_accumulator.max, 0.)
+    else:
+        max_distances = pd.Series(max_distances).reindex(template.zone_ids).fillna(0).values
+
+    count = np.zeros(n_zones * n_segments)
+    total = np.zeros(n_zones * n_segments)
+    for row, col, n_rows, n_cols in grid.blocks(block_size):
+        zone_index = template.zone_index(agwa_raster_io.read_zone_block(zone_raster, grid, row, col, n_rows, n_cols))
+        if not (zone_index >= 0).any():
+            continue
+        distances = agwa_raster_io.read_block(distance_raster, grid, row, col, n_rows, n_cols)
+        values = agwa_raster_io.read_block(value_raster, grid, row, col, n_rows, n_cols)
+        valid = (zone_index >= 0) & ~np.isnan(distances) & ~np.isnan(values)
+        idx = zone_index[valid]
+        max_distance = max_distances[idx]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            relative_distance = np.where(max_distance > 0, distances[valid] / max_distance, 1.)
+        segment = np.clip(np.floor((1. - relative_distance) * n_segments), 0, n_segments - 1).astype(np.int64)
+        keys = idx * n_segments + segment
+        count += np.bincount(keys, minlength=n_zones * n_segments)
+        total += np.bincount(keys, weights=values[valid], minlength=n_zones * n_segments)
+
+    segments = np.tile(np.arange(n_segments), n_zones)
+    zone_max_distances = np.repeat(max_distances, n_segments)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+    return pd.DataFrame({"ZoneID": np.repeat(template.zone_ids, n_segments),
+                         "Segment": segments + 1,
+                         "UpstreamDistance": zone_max_distances * (1. - segments / n_segments),
+                         "DownstreamDistance": zone_max_distances * (1. - (segments + 1) / n_segments),
+                         "COUNT": count,
+                         "MEAN": mean})
+
+
+def zonal_crosstab(zone_raster, class_raster, zone_ids, block_size=agwa_raster_io.BLOCK_SIZE):
+    """Count the cells of each class of an integer class raster (e.g. land cover or soil map units) in each zone
+    of zone_raster.
+
+    class_raster must be aligned with zone_raster. Class values are truncated to integers and negative values
+    and NoData are ignored. Cells are counted with one np.bincount per block on zone * n_classes + class keys,
+    where classes are numbered in the sorted list of values found so far, so large values such as map unit keys
+    do not need a dense table.
+    Returns a DataFrame with ZoneID, Class, COUNT and AREA for the classes present in each zone, sorted by zone
+    and class."""
+
+    grid = agwa_raster_io.RasterGrid(zone_raster)
+    template = ZonalAccumulator(zone_ids)
+    n_zones = len(template.zone_ids)
+    class_values = np.zeros(0, dtype=np.int64)
+    counts = np.zeros((n_zones, 0))
+    for row, col, n_rows, n_cols in grid.blocks(block_size):
+        zone_index = template.zone_index(agwa_raster_io.read_zone_block(zone_raster, grid, row, col, n_rows, n_cols))
+        if not (zone_index >= 0).any():
+            continue
+        values = agwa_raster_io.read_block(class_raster, grid, row, col, n_rows, n_cols)
+        valid = (zone_index >= 0) & ~np.isnan(values) & (values >= 0)
+        if not valid.any():
+            continue
+        idx = zone_index[valid]
+        classes = values[valid].astype(np.int64)
+
+        block_class_values = np.unique(classes)
+        if not np.isin(block_class_values, class_values).all():
+            new_class_values = np.union1d(class_values, block_class_values)
+            new_counts = np.zeros((n_zones, len(new_class_values)))
+            new_counts[:, np.searchsorted(new_class_values, class_values)] = counts
+            class_values, counts = new_class_values, new_counts
+        n_classes = len(class_values)
+        class_index = np.searchsorted(class_values, classes)
+        counts += np.bincount(idx * n_classes + class_index,
+                              minlength=n_zones * n_classes).reshape(n_zones, n_classes)
+
+    zone_positions, class_positions = np.nonzero(counts)
+    cell_counts = counts[zone_positions, class_positions]
+    return pd.DataFrame({"ZoneID": template.zone_ids[zone_positions],
+                         "Class": class_values[class_positions],
+                         "COUNT": cell_counts,
+                         "AREA": cell_counts * grid.cell_area})
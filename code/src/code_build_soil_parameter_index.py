@@ -0,0 +1,48 @@
+import os
+import sys
+import arcpy
+import importlib
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+import agwa_gssurgo_cache
+importlib.reload(agwa_gssurgo_cache)
+import code_parameterize_land_cover_and_soils
+importlib.reload(code_parameterize_land_cover_and_soils)
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
+
+
+def tweet(msg):
+    """Produce a message for both arcpy and python"""
+    m = "\n{}\n".format(msg)
+    arcpy.AddMessage(m)
+    print(m, arcpy.GetMessages())
+
+
+def execute(agwa_directory, soils_database_path, max_horizons, max_thickness):
+    """Calculate the soil parameters weighted by horizon and by component of every map unit of a gSSURGO
+    database for max_horizons and max_thickness, and save them as the soil parameter index of the database.
+    Step 5 - Parameterize Land Cover and Soils then reads the parameters of the map units of a watershed from
+    the index instead of calculating them. Called from the Build Soil Parameter Index tool."""
+
+    kin_lut_table = agwa_lookup_tables.lookup_table_path(agwa_directory, "kin_lut")
+    if not arcpy.Exists(kin_lut_table):
+        raise Exception(f"The table 'kin_lut' does not exist in {os.path.join(agwa_directory, 'lookup_tables.gdb')}.")
+
+    # The key of the tables is taken before they are read, see agwa_gssurgo_cache.save_soil_index
+    database_key = agwa_gssurgo_cache.database_key(soils_database_path)
+    tweet(f"Reading the map units of {soils_database_path}")
+    component_table = os.path.join(soils_database_path, "component")
+    mukeys = pd.unique(arcpy.da.TableToNumPyArray(component_table, ["mukey"])["mukey"].astype(str))
+
+    tweet(f"Calculating the soil parameters of {len(mukeys)} map units")
+    (_, _, df_weighted_by_horizon, df_weighted_by_component, textures_not_usda_type) = (
+        code_parameterize_land_cover_and_soils.calculate_soil_parameters(soils_database_path, kin_lut_table, mukeys,
+                                                                         max_thickness, max_horizons))
+    tweet(f"Textures not matching the 12 standard USDA types: {', '.join(set(textures_not_usda_type))}. \n"
+          "    Soil parameters for these textures were estimated by AGWA.")
+
+    index_directory = agwa_gssurgo_cache.save_soil_index(soils_database_path, database_key, kin_lut_table,
+                                                         max_horizons, max_thickness, df_weighted_by_horizon,
+                                                         df_weighted_by_component)
+    tweet(f"Soil parameter index of {len(df_weighted_by_component)} map units saved in {index_directory}")
@@ -2,7 +2,10 @@ import re
 import os
 import arcpy
 import tempfile
+import importlib
 import pandas as pd
+import agwa_table_io
+importlib.reload(agwa_table_io)
 
 
 def process_compare(workspace, delineation, discretization, compare_method, base_simulation, target_simulation, compare_name):
@@ -26,14 +29,12 @@ def process_compare(workspace, delineation, discretization, compare_method, base
                 
         # Load data into DataFrames
         k2_results_table = os.path.join(workspace, "k2_results")
-        df_results = pd.DataFrame(arcpy.da.FeatureClassToNumPyArray(k2_results_table, "*"))
-        df_base = df_results[(df_results["DelineationName"] == delineation) &
-                            (df_results["DiscretizationName"] == discretization) &
-                            (df_results["SimulationName"] == base_simulation)][fields_to_compare + index_fields]
-
-        df_target = df_results[(df_results["DelineationName"] == delineation) &
-                            (df_results["DiscretizationName"] == discretization) &
-                            (df_results["SimulationName"] == target_simulation)][fields_to_compare + index_fields]
+        df_results = agwa_table_io.read_table(k2_results_table, ["SimulationName"] + fields_to_compare + index_fields,
+                                              {"DelineationName": delineation,
+                                               "DiscretizationName": discretization,
+                                               "SimulationName": [base_simulation, target_simulation]})
+        df_base = df_results[df_results["SimulationName"] == base_simulation][fields_to_compare + index_fields]
+        df_target = df_results[df_results["SimulationName"] == target_simulation][fields_to_compare + index_fields]
 
         # Set indices for comparison
         df_base.set_index(index_fields, inplace=True)
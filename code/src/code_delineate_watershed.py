@@ -4,7 +4,10 @@ import pandas as pd
 import arcpy.management  # Import statement added to provide intellisense in PyCharm
 from arcpy._mp import Table
 from datetime import datetime
+import importlib
 import config
+import agwa_table_io
+importlib.reload(agwa_table_io)
 
 # Check out any necessary licenses
 arcpy.CheckOutExtension("spatial")
@@ -155,13 +158,8 @@ def extract_inputs(prjgdb, delineation_name):
 
     tweet("Extracting input parameters from meta tables")
     # Extract the inputs from the metaWorkspace table
-    df_meta_workspace = pd.DataFrame(arcpy.da.TableToNumPyArray(os.path.join(prjgdb, "metaWorkspace"), "*"))
-    if df_meta_workspace.empty:
-        msg = "Cannot proceed. \nThe table 'metaWorkspace' returned 0 records."
-        tweet(msg)
-        raise Exception(msg)
-
-    df_workspace = df_meta_workspace.loc[df_meta_workspace['ProjectGeoDataBase'] == prjgdb].squeeze()
+    df_workspace = agwa_table_io.read_table(os.path.join(prjgdb, "metaWorkspace"), ["FDPath", "FAPath"],
+                                            {"ProjectGeoDataBase": prjgdb}).squeeze(axis=0)
     if df_workspace.empty:
         msg = f"Cannot proceed. \nThe table 'metaWorkspace' returned 0 records with field 'ProjectGeoDataBase' equal to '{prjgdb}'."
         tweet(msg)
@@ -171,12 +169,9 @@ def extract_inputs(prjgdb, delineation_name):
     fa_raster = df_workspace["FAPath"]        
 
     # Extract the inputs from the metaDelineation table
-    df_meta_delineation = pd.DataFrame(arcpy.da.TableToNumPyArray(os.path.join(prjgdb, "metaDelineation"), "*"))
-    if df_meta_delineation.empty:
-        msg = "Cannot proceed. \nThe table 'metaDelineation' returned 0 records."
-        tweet(msg)
-        raise Exception(msg)
-    df_delineation = df_meta_delineation.loc[df_meta_delineation['DelineationName'] == delineation_name].squeeze()
+    df_delineation = agwa_table_io.read_table(os.path.join(prjgdb, "metaDelineation"),
+                                              ["OutletX", "OutletY", "OutletSnappingRadius"],
+                                              {"DelineationName": delineation_name}).squeeze(axis=0)
     if df_delineation.empty:
         msg = f"Cannot proceed. \nThe table 'metaDelineation' returned 0 records with field 'DelineationName' equal to '{delineation_name}'."
         tweet(msg)
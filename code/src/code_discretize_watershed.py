@@ -1,9 +1,22 @@
 import os
 import arcpy
+import time
+import shutil
 import datetime
+import tempfile
+import importlib
+import numpy as np
 import pandas as pd
 from arcpy._mp import Table
 import config
+import agwa_table_io
+importlib.reload(agwa_table_io)
+import agwa_channel_network
+importlib.reload(agwa_channel_network)
+import agwa_raster_io
+importlib.reload(agwa_raster_io)
+import agwa_d8
+importlib.reload(agwa_d8)
 arcpy.env.parallelProcessingFactor = config.PARALLEL_PROCESSING_FACTOR
 
 arcpy.CheckOutExtension("spatial")
@@ -144,22 +157,263 @@ def discretize(prjgdb, workspace, delineation_name, discretization_name, save_in
 
 
     # Create Flow Length Downstream. It is used in hillslope parameterization for hillslope-based flow length calculations
-    tweet("Creating flow length (downstream) raster")
-    flow_direction_nostream_raster = arcpy.sa.Con(channel_raster_output, flow_direction_raster, None, "Value = 0")
-    save_intermediate_raster(flow_direction_nostream_raster, discretization_name, "flowDirectionNoStream", workspace, save_intermediate_outputs)
-    flow_length_down_raster = arcpy.sa.FlowLength(flow_direction_nostream_raster, direction_measurement="DOWNSTREAM")
-    flow_length_down_raster.save(f"{discretization_name}_flow_length_downstream")
+    create_flow_length_downstream(workspace, discretization_name, channel_raster_output, flow_direction_raster,
+                                  save_intermediate_outputs)
 
     # Create Stream Link
     tweet("Creating stream links raster")
-    stream_link_raster = arcpy.sa.StreamLink(channel_raster, flow_direction_raster)
-    save_intermediate_raster(stream_link_raster, discretization_name, "streamLinkRaster", workspace, save_intermediate_outputs)
+    if config.DISCRETIZATION_BACKEND == "NumPy":
+        d8_directory = tempfile.mkdtemp(prefix="agwa_d8_")
+        d8_grid, flow_direction, stream = read_d8_inputs(flow_direction_raster, channel_raster, arcpy.env.mask,
+                                                         d8_directory)
+        stream_links = agwa_d8.stream_links(flow_direction, stream, d8_directory)
+        first_order_channels = agwa_d8.shreve_order(flow_direction, stream, stream_links, d8_directory) == 1
+        stream_link_array = agwa_d8.grid_array(stream_links, flow_direction.shape, np.int32, d8_directory,
+                                               "stream_link_raster")
+        stream_link_raster = agwa_raster_io.write_raster(
+            stream_link_array, d8_grid, os.path.join(workspace, f"intermediate_{discretization_name}_streamLinkRaster"))
+        del stream_link_array
+    elif config.DISCRETIZATION_BACKEND == "ArcGIS":
+        stream_link_raster = arcpy.sa.StreamLink(channel_raster, flow_direction_raster)
+        save_intermediate_raster(stream_link_raster, discretization_name, "streamLinkRaster", workspace, save_intermediate_outputs)
+    else:
+        raise Exception(f"Unknown discretization backend '{config.DISCRETIZATION_BACKEND}'. "
+                        "Set config.DISCRETIZATION_BACKEND to 'ArcGIS' or 'NumPy'.")
 
     # Add internal pour points
     if internal_pour_points_method!="None":
         stream_link_raster = add_internal_pour_points(workspace, delineation_name, discretization_name, internal_pour_points_feature,
                                                       internal_pour_points_snap_distance, flow_accumulation_raster,
                                                       channel_raster, stream_link_raster, save_intermediate_outputs)
+    # Process: Stream to Feature, and nodes
+    channel_feature_class = create_channels_and_nodes(workspace, discretization_name, stream_link_raster,
+                                                      flow_direction_raster)
+
+    if config.DISCRETIZATION_BACKEND == "NumPy":
+        # Internal pour points split links of the stream link raster, which is read back
+        if internal_pour_points_method != "None":
+            stream_links = agwa_raster_io.read_raster(stream_link_raster, d8_grid, agwa_d8.empty_array(
+                flow_direction.shape, np.int64, d8_directory, "stream_links")).reshape(-1)
+        tweet("Creating unique pour points and discretization raster")
+        unique_pour_points = agwa_d8.unique_pour_points(flow_direction, stream_links, first_order_channels,
+                                                        d8_directory)
+        hillslope_labels = agwa_d8.label_watersheds(flow_direction, unique_pour_points, d8_directory)
+        discretization_array = agwa_d8.grid_array(hillslope_labels, flow_direction.shape, np.int32, d8_directory,
+                                                  "discretization_raster")
+        discretization_raster = agwa_raster_io.write_raster(
+            discretization_array, d8_grid,
+            os.path.join(workspace, f"intermediate_{discretization_name}_discretization_raster"))
+        del flow_direction, stream, stream_links, first_order_channels, unique_pour_points, hillslope_labels
+        del discretization_array
+        shutil.rmtree(d8_directory, ignore_errors=True)
+    else:
+        # Process: Stream Order
+        tweet("Creating stream orders raster")
+        stream_order_raster = arcpy.sa.StreamOrder(channel_raster, flow_direction_raster, "SHREVE")
+        save_intermediate_raster(stream_order_raster, discretization_name, "StreamOrder", workspace, save_intermediate_outputs)
+
+
+        # Process: Raster Calculator (2)
+        tweet("Creating first order channels raster")
+        first_order_channel_raster = stream_order_raster == 1    
+        save_intermediate_raster(first_order_channel_raster, discretization_name, "firstOrderChannels", workspace, save_intermediate_outputs)
+
+
+        # Process: Zonal Fill
+        tweet("Creating minimum flow accumulation zones raster of stream links")
+        minimum_fa_zones_raster = arcpy.sa.ZonalFill(stream_link_raster, flow_accumulation_raster)
+        save_intermediate_raster(minimum_fa_zones_raster, discretization_name, "faZones", workspace, save_intermediate_outputs)
+
+
+        # Process: Raster Calculator (3)
+        tweet("Creating first order points raster")
+        stream_link_points_raster = minimum_fa_zones_raster == flow_accumulation_raster
+        save_intermediate_raster(stream_link_points_raster, discretization_name, "StreamLinkPoints", workspace, save_intermediate_outputs)
+
+
+        # Process: Raster Calculator (4)
+        tweet("Creating zero order points raster")
+        zero_order_points_raster = arcpy.sa.Con(first_order_channel_raster, stream_link_points_raster, 0)
+        save_intermediate_raster(zero_order_points_raster, discretization_name, "ZeroOrderPoints", workspace, save_intermediate_outputs)
+
+
+        # Process: Times
+        tweet("Creating stream links * 10 raster")
+        stream_link_10_raster = stream_link_raster * 10
+        save_intermediate_raster(stream_link_10_raster, discretization_name, "StreamLink10", workspace, save_intermediate_outputs)
+
+
+        # Process: Plus
+        tweet("Creating unique pour points raster")
+        unique_pour_points_raster = zero_order_points_raster + stream_link_10_raster
+        save_intermediate_raster(unique_pour_points_raster, discretization_name, "UniquePourPoints", workspace, save_intermediate_outputs)
+
+
+        # Process: Watershed
+        tweet("Creating discretization raster")
+        discretization_raster = arcpy.sa.Watershed(flow_direction_raster, unique_pour_points_raster, "VALUE")
+        save_intermediate_raster(discretization_raster, discretization_name, "discretization_raster", workspace, save_intermediate_outputs)
+
+
+
+    intermediate_rasters = []
+    if config.DISCRETIZATION_BACKEND == "NumPy":
+        intermediate_rasters = [os.path.join(workspace, f"intermediate_{discretization_name}_{raster_name}")
+                                for raster_name in ["streamLinkRaster", "discretization_raster"]]
+    create_hillslopes(workspace, delineation_name, discretization_name, discretization_raster, channel_feature_class,
+                      save_intermediate_outputs, intermediate_rasters)
+
+
+def sweep_thresholds(prjgdb, workspace, delineation_name, model, threshold_method, threshold_values,
+                     discretization_names, environment, save_intermediate_outputs):
+    """Discretize the watershed for several threshold-based channel initiation thresholds at once, with the NumPy
+    backend (agwa_d8). The flow direction and threshold rasters are read and the flow graph is built once, then
+    the thresholds are swept from the lowest (the most channels) up, each one derived from the stream cells of the
+    previous one (see agwa_d8.ThresholdSweep). Element counts and timing are reported for every threshold.
+    The usual {discretization}_hillslopes, _channels and _nodes datasets (and metaDiscretization rows) are created
+    for the thresholds that have a name in discretization_names (one per threshold, None or "" to only report the
+    threshold).
+    Returns the report as a DataFrame."""
+
+    if len(discretization_names) != len(threshold_values):
+        raise Exception("One discretization name (or None) is needed for each threshold.")
+
+    arcpy.env.workspace = workspace
+    arcpy.env.mask = delineation_name + "_raster"
+    arcpy.env.overwriteOutput = True
+
+    tweet("Reading the flow direction and threshold rasters and building the flow graph")
+    start_time = time.perf_counter()
+    d8_directory = tempfile.mkdtemp(prefix="agwa_d8_")
+    flow_direction_raster, grid, flow_direction, metric, thresholds = read_threshold_inputs(
+        prjgdb, arcpy.env.mask, threshold_method, threshold_values, d8_directory)
+    flow_graph = agwa_d8.FlowGraph(flow_direction, d8_directory)
+    tweet(f"Flow graph of {flow_direction.size} cells built in {time.perf_counter() - start_time:.1f} s")
+
+    # The rasters of the named thresholds are filled chunk by chunk into these arrays, memory-mapped for large grids
+    report = []
+    sweep = agwa_d8.ThresholdSweep(flow_graph, metric)
+    channel_array = agwa_d8.empty_array(flow_direction.shape, np.uint8, d8_directory, "channel_raster")
+    zone_array = agwa_d8.empty_array(flow_direction.shape, np.int32, d8_directory, "zone_raster")
+    for index in sorted(range(len(thresholds)), key=lambda i: thresholds[i]):
+        start_time = time.perf_counter()
+        sweep.advance(thresholds[index])
+        discretization_name = (discretization_names[index] or "").strip()
+        # Every stream cell labels itself, so the hillslope zones are the distinct pour point values
+        threshold_report = {"ThresholdValue": threshold_values[index], "DiscretizationName": discretization_name,
+                            "Channels": int(sweep.links.max(initial=0)),
+                            "FirstOrderChannels": int(np.count_nonzero(sweep.pour_points % 10 == 1)),
+                            "HillslopeZones": int(len(np.unique(sweep.pour_points))),
+                            "Seconds": time.perf_counter() - start_time, "Hillslopes": None, "OutputSeconds": None}
+
+        if discretization_name:
+            start_time = time.perf_counter()
+            initialize_workspace(delineation_name, model, "Threshold-based", threshold_method,
+                                 threshold_values[index], None, None, None, None, "None", None, None,
+                                 discretization_name, environment, prjgdb)
+            channel_raster = agwa_raster_io.write_raster(sweep.channel_grid(channel_array, 255), grid,
+                                                         f"{discretization_name}_channel_raster", nodata_value=255)
+            create_flow_length_downstream(workspace, discretization_name, channel_raster, flow_direction_raster,
+                                          save_intermediate_outputs)
+            intermediate_rasters = [os.path.join(workspace, f"intermediate_{discretization_name}_{raster_name}")
+                                    for raster_name in ["streamLinkRaster", "discretization_raster"]]
+            stream_link_raster = agwa_raster_io.write_raster(sweep.links_grid(zone_array), grid,
+                                                             intermediate_rasters[0])
+            channel_feature_class = create_channels_and_nodes(workspace, discretization_name, stream_link_raster,
+                                                              flow_direction_raster)
+            discretization_raster = agwa_raster_io.write_raster(sweep.labels_grid(zone_array), grid,
+                                                                intermediate_rasters[1])
+            create_hillslopes(workspace, delineation_name, discretization_name, discretization_raster,
+                              channel_feature_class, save_intermediate_outputs, intermediate_rasters)
+            threshold_report["Hillslopes"] = int(
+                arcpy.management.GetCount(f"{discretization_name}_hillslopes").getOutput(0))
+            threshold_report["OutputSeconds"] = time.perf_counter() - start_time
+        report.append(threshold_report)
+        message = (f"Threshold {threshold_values[index]}: {threshold_report['Channels']} channels, "
+                   f"{threshold_report['HillslopeZones']} hillslope zones, {threshold_report['Seconds']:.1f} s")
+        if discretization_name:
+            message += (f"; {discretization_name}: {threshold_report['Hillslopes']} hillslopes, "
+                        f"{threshold_report['OutputSeconds']:.1f} s")
+        tweet(message)
+
+    del flow_graph, sweep, flow_direction, metric, channel_array, zone_array
+    shutil.rmtree(d8_directory, ignore_errors=True)
+    return pd.DataFrame(report)
+
+
+def preview_element_counts(prjgdb, workspace, delineation_name, threshold_method, threshold_values):
+    """Estimate the number of channels and hillslopes, and so the number of K2 elements (NELE), that
+    threshold-based discretizations of the watershed would have for each of threshold_values, without
+    discretizing it. Channel heads and confluences are counted for all the thresholds in one pass over the D8 flow
+    direction and threshold rasters inside the delineation mask (see agwa_d8.link_count_curve). Each channel has
+    a right and a left lateral hillslope and first order channels an upland one, so the hillslopes are an upper
+    bound. Returns a DataFrame with ThresholdValue, Channels, Hillslopes and NELE, in the order of
+    threshold_values."""
+
+    start_time = time.perf_counter()
+    d8_directory = tempfile.mkdtemp(prefix="agwa_d8_")
+    _, _, flow_direction, metric, thresholds = read_threshold_inputs(
+        prjgdb, os.path.join(workspace, f"{delineation_name}_raster"), threshold_method, threshold_values,
+        d8_directory)
+    heads, confluences = agwa_d8.link_count_curve(flow_direction, metric, thresholds)
+    del flow_direction, metric
+    shutil.rmtree(d8_directory, ignore_errors=True)
+
+    channels = heads + confluences
+    hillslopes = 2 * channels + heads
+    df_preview = pd.DataFrame({"ThresholdValue": list(threshold_values), "Channels": channels,
+                               "Hillslopes": hillslopes, "NELE": channels + hillslopes})
+    tweet(f"Element counts of {len(df_preview)} thresholds estimated in {time.perf_counter() - start_time:.1f} s\n"
+          f"{df_preview.to_string(index=False)}")
+    return df_preview
+
+
+def read_threshold_inputs(prjgdb, mask_raster, threshold_method, threshold_values, directory):
+    """Read the flow direction raster of the workspace and the raster compared to the channel initiation
+    thresholds (flow length upstream, or flow accumulation) on its grid, with flow direction 0 outside mask_raster,
+    and convert threshold_values to the units of that raster. Large grids are memory-mapped in directory.
+    Returns the flow direction raster, the grid, the flow direction and threshold raster arrays and the
+    thresholds. Called in sweep_thresholds and preview_element_counts functions."""
+
+    if threshold_method not in ["Flow length (unit: m)", "Flow accumulation (unit: %)"]:
+        raise Exception(f"Unknown threshold method '{threshold_method}'.")
+    df_workspace = agwa_table_io.read_table(os.path.join(prjgdb, "metaWorkspace"), ["FDPath", "FAPath", "FlUpPath"],
+                                            {"ProjectGeoDataBase": prjgdb}).squeeze(axis=0)
+    flow_direction_raster = df_workspace["FDPath"]
+    grid, flow_direction = read_d8_flow_direction(flow_direction_raster, mask_raster, directory)
+    metric_raster = df_workspace["FlUpPath"] if threshold_method == "Flow length (unit: m)" else df_workspace["FAPath"]
+    metric = agwa_raster_io.read_raster(metric_raster, grid, agwa_d8.empty_array(flow_direction.shape, np.float64,
+                                                                                  directory, "metric"),
+                                        nodata_to_value=-1)
+    if threshold_method == "Flow accumulation (unit: %)":
+        # Percent of the largest flow accumulation in the watershed, like ExtractByMask and MAXIMUM in discretize
+        cell_count = max((metric[row:row + n_rows, col:col + n_cols][
+            flow_direction[row:row + n_rows, col:col + n_cols] != 0].max(initial=0)
+            for row, col, n_rows, n_cols in grid.blocks()), default=0)
+        thresholds = [float(value) * int(cell_count) / 100 for value in threshold_values]
+    else:
+        thresholds = [float(value) for value in threshold_values]
+    return flow_direction_raster, grid, flow_direction, metric, thresholds
+
+
+def create_flow_length_downstream(workspace, discretization_name, channel_raster, flow_direction_raster,
+                                  save_intermediate_outputs):
+    """Create the {discretization}_flow_length_downstream raster, the flow length from each cell to the channels.
+    It is used in hillslope parameterization for hillslope-based flow length calculations.
+    Called in discretize and sweep_thresholds functions."""
+
+    tweet("Creating flow length (downstream) raster")
+    flow_direction_nostream_raster = arcpy.sa.Con(channel_raster, flow_direction_raster, None, "Value = 0")
+    save_intermediate_raster(flow_direction_nostream_raster, discretization_name, "flowDirectionNoStream", workspace, save_intermediate_outputs)
+    flow_length_down_raster = arcpy.sa.FlowLength(flow_direction_nostream_raster, direction_measurement="DOWNSTREAM")
+    flow_length_down_raster.save(f"{discretization_name}_flow_length_downstream")
+
+
+def create_channels_and_nodes(workspace, discretization_name, stream_link_raster, flow_direction_raster):
+    """Convert the stream links to the {discretization}_channels feature class and create the
+    {discretization}_nodes feature class with the outlet node. Returns the name of the channels feature class.
+    Called in discretize and sweep_thresholds functions."""
+
     # Process: Stream to Feature
     tweet("Converting channels raster to feature class")
     channel_feature_class = f"{discretization_name}_channels"
@@ -195,54 +449,14 @@ def discretize(prjgdb, workspace, delineation_name, discretization_name, save_in
                 cursor.insertRow((channel_row[0].lastPoint, channel_row[1], channel_row[2], channel_row[3], channel_row[4],
                                   "outlet"))
 
-
-    # Process: Stream Order
-    tweet("Creating stream orders raster")
-    stream_order_raster = arcpy.sa.StreamOrder(channel_raster, flow_direction_raster, "SHREVE")
-    save_intermediate_raster(stream_order_raster, discretization_name, "StreamOrder", workspace, save_intermediate_outputs)
-
-
-    # Process: Raster Calculator (2)
-    tweet("Creating first order channels raster")
-    first_order_channel_raster = stream_order_raster == 1    
-    save_intermediate_raster(first_order_channel_raster, discretization_name, "firstOrderChannels", workspace, save_intermediate_outputs)
+    return channel_feature_class
 
 
-    # Process: Zonal Fill
-    tweet("Creating minimum flow accumulation zones raster of stream links")
-    minimum_fa_zones_raster = arcpy.sa.ZonalFill(stream_link_raster, flow_accumulation_raster)
-    save_intermediate_raster(minimum_fa_zones_raster, discretization_name, "faZones", workspace, save_intermediate_outputs)
-
-
-    # Process: Raster Calculator (3)
-    tweet("Creating first order points raster")
-    stream_link_points_raster = minimum_fa_zones_raster == flow_accumulation_raster
-    save_intermediate_raster(stream_link_points_raster, discretization_name, "StreamLinkPoints", workspace, save_intermediate_outputs)
-
-
-    # Process: Raster Calculator (4)
-    tweet("Creating zero order points raster")
-    zero_order_points_raster = arcpy.sa.Con(first_order_channel_raster, stream_link_points_raster, 0)
-    save_intermediate_raster(zero_order_points_raster, discretization_name, "ZeroOrderPoints", workspace, save_intermediate_outputs)
-
-
-    # Process: Times
-    tweet("Creating stream links * 10 raster")
-    stream_link_10_raster = stream_link_raster * 10
-    save_intermediate_raster(stream_link_10_raster, discretization_name, "StreamLink10", workspace, save_intermediate_outputs)
-
-
-    # Process: Plus
-    tweet("Creating unique pour points raster")
-    unique_pour_points_raster = zero_order_points_raster + stream_link_10_raster
-    save_intermediate_raster(unique_pour_points_raster, discretization_name, "UniquePourPoints", workspace, save_intermediate_outputs)
-
-
-    # Process: Watershed
-    tweet("Creating discretization raster")
-    discretization_raster = arcpy.sa.Watershed(flow_direction_raster, unique_pour_points_raster, "VALUE")
-    save_intermediate_raster(discretization_raster, discretization_name, "discretization_raster", workspace, save_intermediate_outputs)
-
+def create_hillslopes(workspace, delineation_name, discretization_name, discretization_raster, channel_feature_class,
+                      save_intermediate_outputs, intermediate_rasters=()):
+    """Convert the discretization raster to the {discretization}_hillslopes feature class, split by the channels,
+    identify the contributing channels, check the discretization and add it to the map. intermediate_rasters are
+    deleted with the other intermediates. Called in discretize and sweep_thresholds functions."""
 
     # Raster to Polygon
     tweet("Converting discretization raster to feature class")
@@ -287,6 +501,7 @@ def discretize(prjgdb, workspace, delineation_name, discretization_name, save_in
     intermediates = [intermediate_discretization_1, intermediate_discretization_2, 
                      intermediate_discretization_3, intermediate_discretization_4, 
                         intermediate_discretization_5]
+    intermediates += list(intermediate_rasters)
     cleanup_intermediates(intermediates, save_intermediate_outputs)
 
     tweet("Checking discretization")
@@ -359,84 +574,38 @@ def assign_ids(discretization_feature_class, channel_feature_class):
     arcpy.management.AddField(discretization_feature_class, hillslope_id_field, "LONG", None, None, None, "", "NULLABLE",
                               "NON_REQUIRED", "")
 
-    fields = ["SHAPE@", "GRIDCODE", "HillslopeID"]
-    with arcpy.da.UpdateCursor(discretization_feature_class, fields) as hillslope_cursor:
+    # Lateral hillslopes (even gridcode) are on the right or the left of the channel with grid_code gridcode / 10.
+    # The side is the side of an interior point of the hillslope relative to the nearest segment of the channel.
+    channel_segments = read_channel_segments(channel_feature_class)
+    oids, gridcodes, points = [], [], []
+    with arcpy.da.SearchCursor(discretization_feature_class, ["OID@", "GRIDCODE", "SHAPE@"]) as hillslope_cursor:
+        for oid, gridcode, hillslope_poly in hillslope_cursor:
+            oids.append(oid)
+            gridcodes.append(gridcode)
+            label_point = hillslope_poly.labelPoint if hillslope_poly is not None else None
+            points.append((label_point.X, label_point.Y) if label_point is not None else (np.nan, np.nan))
+    gridcodes = np.array(gridcodes, dtype=np.int64)
+    points = np.array(points, dtype=float).reshape(-1, 2)
+
+    hillslope_ids = np.where(gridcodes % 2 == 1, gridcodes, -1)
+    laterals = np.flatnonzero(gridcodes % 2 == 0)
+    stream_gridcodes = gridcodes[laterals] // 10
+    for stream_gridcode in np.unique(stream_gridcodes):
+        segments = channel_segments.get(int(stream_gridcode))
+        if segments is None:
+            continue
+        idx = laterals[stream_gridcodes == stream_gridcode]
+        on_left = points_on_left(points[idx], *segments)
+        hillslope_ids[idx] = np.where(on_left, gridcodes[idx] + 3, gridcodes[idx] + 2)
+
+    # Hillslopes without a channel keep a null HillslopeID
+    hillslope_id_of_oid = {oid: int(hillslope_id) for oid, hillslope_id in zip(oids, hillslope_ids)
+                           if hillslope_id != -1}
+    with arcpy.da.UpdateCursor(discretization_feature_class, ["OID@", hillslope_id_field]) as hillslope_cursor:
         for hillslope_row in hillslope_cursor:
-            if hillslope_row[1] % 2 == 1:
-                hillslope_row[2] = hillslope_row[1]
-            else:
-                hillslope_poly = hillslope_row[0]
-                hillslope_gridcode = hillslope_row[1]
-                stream_gridcode = hillslope_gridcode / 10
-                expression = "{0} = {1}".format(arcpy.AddFieldDelimiters(arcpy.env.workspace, "grid_code"),
-                                                stream_gridcode)
-                with arcpy.da.SearchCursor(channel_feature_class, "SHAPE@", expression) as channel_cursor:
-                    for channel_row in channel_cursor:
-                        stream_line = channel_row[0]
-                        stream_part = stream_line.getPart(0)
-                        if stream_part.count > 3:
-                            start_point = stream_part[1]
-                            end_point = stream_part[2]
-                        else:
-                            start_point = stream_line.positionAlongLine(0.49, True).getPart(0)
-                            end_point = stream_line.positionAlongLine(0.51, True).getPart(0)
-
-                        start_tpl = (start_point.X, start_point.Y)
-                        end_tpl = (end_point.X, end_point.Y)
-                        midpoint = ((start_tpl[0] + end_tpl[0]) / 2, (start_tpl[1] + end_tpl[1]) / 2)
-
-                        if start_tpl[0] == end_tpl[0]:
-                            # vertical line
-                            int_tpl = tuple(item1 + item2 for item1, item2 in zip(midpoint, (1, 0)))
-                        elif start_tpl[1] == end_tpl[1]:
-                            # horizontal line
-                            int_tpl = tuple(item1 + item2 for item1, item2 in zip(midpoint, (0, 1)))
-                        else:
-                            # normal slope
-                            slope = (end_tpl[1] - start_tpl[1]) / (end_tpl[0] - start_tpl[0])
-                            slope_perp_bisector = -1 / slope
-                            intercept_bisector = slope_perp_bisector * (-1) * midpoint[0] + midpoint[1]
-                            int_x = midpoint[0] + 1
-                            int_y = slope_perp_bisector * int_x + intercept_bisector
-                            int_tpl = (int_x, int_y)
-
-                        # the intersection point is calculated from the stream of derived from the polygon
-                        # so using the cross product will always return the same result on the same side of the
-                        # line
-                        # a = np.array([start_tpl[0] - int_tpl[0], start_tpl[1] - int_tpl[1], 0])
-                        # b = np.array([end_tpl[0] - int_tpl[0], end_tpl[1] - int_tpl[1], 0])
-                        # c = np.cross(a, b)
-                        # if c[2] > 0:
-                        #     print("Side is left")
-                        #     hillslope_row[2] = hillslope_gridcode + 3
-                        # else:
-                        #     print("Side is right")
-                        #     hillslope_row[2] = hillslope_gridcode + 2
-                        # print(c)
-
-                        # The intersection point is calculated to always be on the right side of the stream
-                        # so if the hillslope polygon contains it, the polygon is on the right side of the stream too
-                        pg = arcpy.PointGeometry(arcpy.Point(int_tpl[0], int_tpl[1]), hillslope_poly.spatialReference)
-                        result = stream_line.queryPointAndDistance(pg)
-                        (point, dist_along_line, dist_to_point, on_right) = result
-                        if on_right:
-                            # intersection point is on right side of line
-                            # if hillslope_poly contains the point, it is also on the right side of the line
-                            # else it"s on the left side of the line
-                            if hillslope_poly.contains(pg):
-                                hillslope_row[2] = hillslope_gridcode + 2
-                            else:
-                                hillslope_row[2] = hillslope_gridcode + 3
-                        else:
-                            # intersection point is on left side of line
-                            # if hillslope_poly contains the point, it is also on the left side of the line
-                            # else it"s on the right side of the line
-                            if hillslope_poly.contains(pg):
-                                hillslope_row[2] = hillslope_gridcode + 3
-                            else:
-                                hillslope_row[2] = hillslope_gridcode + 2
-
-            hillslope_cursor.updateRow(hillslope_row)
+            if hillslope_row[0] in hillslope_id_of_oid:
+                hillslope_row[1] = hillslope_id_of_oid[hillslope_row[0]]
+                hillslope_cursor.updateRow(hillslope_row)
 
     # Assign the ChannelID to each stream in the channels feature class
     tweet("Assigning ChannelID to channels")
@@ -446,9 +615,55 @@ def assign_ids(discretization_feature_class, channel_feature_class):
     arcpy.management.CalculateField(channel_feature_class, channel_id_field, "(!grid_code! * 10) + 4", "PYTHON3")
 
 
+def read_channel_segments(channel_feature_class):
+    """Read the vertices of all the channels once. Returns a dict of grid_code -> (start points, end points) of
+    the segments of the channel, arrays of shape (n_segments, 2) in the direction of flow."""
+
+    channel_segments = {}
+    with arcpy.da.SearchCursor(channel_feature_class, ["grid_code", "SHAPE@"]) as channel_cursor:
+        for grid_code, stream_line in channel_cursor:
+            if stream_line is None:
+                continue
+            for part in stream_line:
+                vertices = np.array([(point.X, point.Y) for point in part if point is not None], dtype=float)
+                if len(vertices) < 2:
+                    continue
+                starts, ends = channel_segments.setdefault(int(grid_code), ([], []))
+                starts.append(vertices[:-1])
+                ends.append(vertices[1:])
+    return {grid_code: (np.concatenate(starts), np.concatenate(ends))
+            for grid_code, (starts, ends) in channel_segments.items()}
+
+
+def points_on_left(points, starts, ends):
+    """For each point (array of shape (n, 2)), whether it is on the left of the polyline made of the segments
+    starts -> ends, from the sign of the 2D cross product with the nearest segment. When several segments are
+    nearest (at a vertex), the one whose line is farthest from the point decides. Points on the line are on
+    the right."""
+
+    direction = ends - starts
+    length_squared = np.einsum("ij,ij->i", direction, direction)
+    relative = points[:, None, :] - starts[None, :, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.clip(np.einsum("nij,ij->ni", relative, direction) / length_squared, 0, 1)
+    t = np.nan_to_num(t)
+    offset = relative - t[:, :, None] * direction[None, :, :]
+    distance = np.hypot(offset[:, :, 0], offset[:, :, 1])
+    cross = direction[None, :, 0] * relative[:, :, 1] - direction[None, :, 1] * relative[:, :, 0]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        line_distance = np.nan_to_num(np.abs(cross) / np.sqrt(length_squared))
+    nearest = distance <= distance.min(axis=1, keepdims=True) * (1 + 1e-9)
+    segment = np.argmax(np.where(nearest, line_distance, -1), axis=1)
+    return cross[np.arange(len(points)), segment] > 0
+
+
 def identify_contributing_channels(workspace, delineation_name, discretization_name, channel_feature_class):
+    """Identify the contributing channels of each channel (the channels whose to_node is its from_node) with one
+    read of the channels feature class and a join on the nodes, and write them to the contributing_channels table.
+    The channels and their downstream channel are written to the channel_network table, see
+    agwa_channel_network.ChannelNetwork.from_workspace."""
 
-    # Identify the contributing channels for each channel    
     contributing_channels_table = os.path.join(workspace, "contributing_channels")
     contrib_fields = ["DelineationName", "DiscretizationName", "ChannelID", "ContributingChannel", "CreationDate",
               "AGWAVersionAtCreation", "AGWAGDBVersionAtCreation", "Status"]
@@ -457,21 +672,35 @@ def identify_contributing_channels(workspace, delineation_name, discretization_n
         for field in contrib_fields:
             arcpy.AddField_management(contributing_channels_table, field, "TEXT")
 
-    channel_fields = ["from_node", "ChannelID"]
-    # expression = "{0} = "{1}" AND {2} = "{3}"".format(arcpy.AddFieldDelimiters(workspace, "to_node"), missing_to_node)
-    with arcpy.da.SearchCursor(channel_feature_class, channel_fields) as channel_cursor:
-        for channel_row in channel_cursor:
-            from_node = channel_row[0]
-            channel_id = channel_row[1]
-
-            to_node_field = arcpy.AddFieldDelimiters(workspace, "to_node")
-            inner_expression = "{0} = {1}".format(to_node_field, from_node)
-            with arcpy.da.SearchCursor(channel_feature_class, channel_fields, inner_expression) as inner_channel_cursor:
-                for inner_channel_row in inner_channel_cursor:
-                    inner_channel_id = inner_channel_row[1]
-                    with arcpy.da.InsertCursor(contributing_channels_table, contrib_fields) as contrib_cursor:
-                        contrib_cursor.insertRow((delineation_name, discretization_name, channel_id, inner_channel_id,
-                                datetime.datetime.now().isoformat(), config.AGWA_VERSION, config.AGWAGDB_VERSION, "X"))
+    channel_fields = ["arcid", "grid_code", "from_node", "to_node", "ChannelID"]
+    df_channels = agwa_table_io.read_table(channel_feature_class, channel_fields)
+
+    # Pairs in the order of the channels, then of their contributing channels, as the previous nested cursors
+    df_contributing = pd.merge(df_channels[["from_node", "ChannelID"]], df_channels[["to_node", "ChannelID"]],
+                               left_on="from_node", right_on="to_node", suffixes=("", "_contributing"))
+    creation_date = datetime.datetime.now().isoformat()
+    contrib_rows = [(delineation_name, discretization_name, int(channel_id), int(contributing_id), creation_date,
+                     config.AGWA_VERSION, config.AGWAGDB_VERSION, "X")
+                    for channel_id, contributing_id in zip(df_contributing.ChannelID,
+                                                           df_contributing.ChannelID_contributing)]
+    agwa_table_io.append_rows(contributing_channels_table, contrib_rows, contrib_fields)
+
+    # Each channel flows into the channel that starts at its to_node, -1 for the outlet
+    downstream_channels = df_channels.drop_duplicates("from_node").set_index("from_node").ChannelID
+    df_network = df_channels.assign(
+        DownstreamChannel=df_channels.to_node.map(downstream_channels).fillna(-1).astype(int),
+        DelineationName=delineation_name, DiscretizationName=discretization_name, CreationDate=creation_date,
+        AGWAVersionAtCreation=config.AGWA_VERSION, AGWAGDBVersionAtCreation=config.AGWAGDB_VERSION, Status="X")
+
+    channel_network_table = os.path.join(workspace, agwa_channel_network.CHANNEL_NETWORK_TABLE)
+    if not arcpy.Exists(channel_network_table):
+        arcpy.CreateTable_management(workspace, agwa_channel_network.CHANNEL_NETWORK_TABLE)
+        for field, field_type in agwa_channel_network.CHANNEL_NETWORK_FIELDS:
+            arcpy.AddField_management(channel_network_table, field, field_type)
+    agwa_table_io.delete_rows(channel_network_table, {"DelineationName": delineation_name,
+                                                      "DiscretizationName": discretization_name})
+    agwa_table_io.append_rows(channel_network_table, df_network,
+                              [field for field, _ in agwa_channel_network.CHANNEL_NETWORK_FIELDS])
 
 
 def add_internal_pour_points(workspace, delineation_name, discretization_name, internal_pour_points_fc, 
@@ -565,17 +794,25 @@ def read_and_extract_parameters(prjgdb, delineation_name, discretization_name):
     """Reads parameters from metaWorkspace and metaDiscretization tables, and extracts variables."""
 
     # Read workspace-related data
-    df_meta_workspace = pd.DataFrame(arcpy.da.TableToNumPyArray(os.path.join(prjgdb, "metaWorkspace"), "*"))
-    df_workspace = df_meta_workspace[df_meta_workspace["ProjectGeoDataBase"] == prjgdb].squeeze()
+    df_workspace = agwa_table_io.read_table(os.path.join(prjgdb, "metaWorkspace"),
+                                            ["FDPath", "FAPath", "FlUpPath", "FilledDEMPath"],
+                                            {"ProjectGeoDataBase": prjgdb}).squeeze(axis=0)
     flow_direction_raster = df_workspace["FDPath"]
     flow_accumulation_raster = df_workspace["FAPath"]
     fl_up_raster = df_workspace["FlUpPath"]
     dem_raster_path = df_workspace["FilledDEMPath"]
         
     # Read discretization-related data, extract variables required for the discretization
-    df_meta_discretization = pd.DataFrame(arcpy.da.TableToNumPyArray(os.path.join(prjgdb, "metaDiscretization"), "*"))
-    df_discretization = df_meta_discretization[(df_meta_discretization["DelineationName"] == delineation_name) &
-        (df_meta_discretization["DiscretizationName"] == discretization_name)].squeeze()   
+    meta_discretization_table = os.path.join(prjgdb, "metaDiscretization")
+    discretization_fields = ["Methodology", "ThresholdMethod", "ThresholdValue", "ExistingChannelNetworkFeature",
+                             "ExistingChannelNetworkSnapDistance", "ChannelInitiationPointsFeature",
+                             "ChannelInitiationPointsSnapDistance", "InternalPourPointsMethod",
+                             "InternalPourPointsFeature", "InternalPourPointsSnappingDistance"]
+    existing_fields = [field.name for field in arcpy.ListFields(meta_discretization_table)]
+    df_discretization = agwa_table_io.read_table(meta_discretization_table,
+                                                 [field for field in discretization_fields if field in existing_fields],
+                                                 {"DelineationName": delineation_name,
+                                                  "DiscretizationName": discretization_name}).squeeze(axis=0)
     methodology = df_discretization.get("Methodology", None)
     threshold_method = df_discretization.get("ThresholdMethod", None)
     threshold_value = df_discretization.get("ThresholdValue", None)
@@ -607,3 +844,32 @@ def save_intermediate_raster(raster, discretization_name, raster_name, workspace
         output_path = os.path.join(workspace, f"intermediate_{discretization_name}_{raster_name}")
         raster.save(output_path)
         # tweet(f"Saved raster: {output_path}")
+
+
+def read_d8_inputs(flow_direction_raster, channel_raster, mask_raster, directory):
+    """Read the flow direction raster and the stream cells (values greater than 0) of channel_raster on the grid of
+    flow_direction_raster, for the NumPy discretization backend (agwa_d8). Cells outside mask_raster get flow
+    direction 0. Large grids are memory-mapped in directory. Called in discretize function."""
+
+    grid, flow_direction = read_d8_flow_direction(flow_direction_raster, mask_raster, directory)
+    stream = agwa_raster_io.read_raster(channel_raster, grid, agwa_d8.empty_array(flow_direction.shape, bool,
+                                                                                  directory, "stream"))
+    for row, col, n_rows, n_cols in grid.blocks():
+        stream[row:row + n_rows, col:col + n_cols] &= flow_direction[row:row + n_rows, col:col + n_cols] != 0
+    return grid, flow_direction, stream
+
+
+def read_d8_flow_direction(flow_direction_raster, mask_raster, directory):
+    """Read the flow direction raster for the NumPy discretization backend, with flow direction 0 outside
+    mask_raster. Large grids are memory-mapped in directory. Returns the grid and the flow direction array.
+    Called in read_d8_inputs and sweep_thresholds functions."""
+
+    grid = agwa_raster_io.RasterGrid(flow_direction_raster)
+    flow_direction = agwa_raster_io.read_raster(
+        flow_direction_raster, grid, agwa_d8.empty_array((grid.n_rows, grid.n_cols), np.uint8, directory,
+                                                         "flow_direction"))
+    if mask_raster:
+        for row, col, n_rows, n_cols in grid.blocks():
+            outside = agwa_raster_io.read_zone_block(mask_raster, grid, row, col, n_rows, n_cols) == 0
+            flow_direction[row:row + n_rows, col:col + n_cols][outside] = 0
+    return grid, flow_direction
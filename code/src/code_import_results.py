@@ -3,10 +3,13 @@ import io
 import sys
 import arcpy
 import datetime
+import importlib
 import pandas as pd
 import arcpy.management
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 from config import AGWA_VERSION, AGWAGDB_VERSION
+import agwa_table_io
+importlib.reload(agwa_table_io)
 
 def tweet(msg):
     """Produce a message for both arcpy and python    """
@@ -37,16 +40,13 @@ def import_k2_results(workspace, delineation_name, discretization_name, paramete
     add_field_alias(workspace, "k2_results")
 
     tweet("    Removing existing records for the simulation if they exist")
-    where_clause = (f"DelineationName = '{delineation_name}' AND DiscretizationName = '{discretization_name}' "
-                    f"AND ParameterizationName = '{parameterization_name}' AND SimulationName = '{simulation_name}'")
-    with arcpy.da.UpdateCursor(results_table, df_results.columns, where_clause) as cursor:
-        for row in cursor:
-            cursor.deleteRow()
+    agwa_table_io.delete_rows(results_table, {"DelineationName": delineation_name,
+                                              "DiscretizationName": discretization_name,
+                                              "ParameterizationName": parameterization_name,
+                                              "SimulationName": simulation_name})
     
     tweet(f"    Importing simulation {simulation_name} into table k2_results")    
-    with arcpy.da.InsertCursor(results_table, df_results.columns) as cursor:
-        for row in df_results.itertuples(index=False):
-            cursor.insertRow(row)
+    agwa_table_io.append_rows(results_table, df_results)
     
 def add_field_alias(results_gdb_abspath, table_name):
     """Add field aliases to the table k2_results, called by import_k2_results."""
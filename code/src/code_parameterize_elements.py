@@ -2,18 +2,70 @@ import os
 import sys
 import arcpy
 import datetime
+import importlib
 import pandas as pd
 from enum import Enum
 from arcpy._mp import Table
-from collections import deque
 import arcpy.management  # Import statement added to provide intellisense in PyCharm
 import config
+import agwa_channel_network
+importlib.reload(agwa_channel_network)
+import agwa_raster_io
+importlib.reload(agwa_raster_io)
+import agwa_zonal
+importlib.reload(agwa_zonal)
+import agwa_table_io
+importlib.reload(agwa_table_io)
+import agwa_element_geometry
+importlib.reload(agwa_element_geometry)
+import agwa_step_cache
+importlib.reload(agwa_step_cache)
+import agwa_parameterization_lineage
+importlib.reload(agwa_parameterization_lineage)
+import agwa_parallel
+importlib.reload(agwa_parallel)
+from agwa_channel_network import ChannelNetwork
 arcpy.env.parallelProcessingFactor = config.PARALLEL_PROCESSING_FACTOR
 
 
 arcpy.CheckOutExtension("spatial")
 
 
+# Steps of parameterize() with the parameter table columns they write and the steps whose outputs they read.
+# The inputs and options of each step are passed to agwa_step_cache when the step is run.
+PARAMETERIZATION_STEPS = {
+    "hillslope_areas": {"outputs": {"parameters_hillslopes": ["Area"]},
+                        "depends_on": []},
+    "zonal_statistics": {"outputs": {"parameters_hillslopes": ["MeanElevation", "MeanSlope", "MeanAspect",
+                                                               "MeanFlowLength"]},
+                         "depends_on": []},
+    "hillslope_centroids": {"outputs": {"parameters_hillslopes": ["CentroidX", "CentroidY"]},
+                            "depends_on": []},
+    "stream_lengths": {"outputs": {"parameters_channels": ["ChannelLength"]},
+                       "depends_on": []},
+    "hillslope_geometries": {"outputs": {"parameters_hillslopes": ["Width", "Length"]},
+                             "depends_on": ["hillslope_areas", "zonal_statistics", "stream_lengths"]},
+    "stream_sequence": {"outputs": {"parameters_channels": ["Sequence"]},
+                        "depends_on": []},
+    "contributing_areas": {"outputs": {"parameters_channels": ["LateralArea", "UpstreamArea"]},
+                           "depends_on": ["hillslope_areas"]},
+    "stream_slopes": {"outputs": {"parameters_channels": ["CentroidX", "CentroidY", "UpstreamElevation",
+                                                          "DownstreamElevation", "MeanSlope"]},
+                      "depends_on": []},
+    "stream_geometries": {"outputs": {"parameters_channels": agwa_element_geometry.CHANNEL_GEOMETRY_FIELDS},
+                          "depends_on": ["contributing_areas"]},
+}
+
+
+# Channel geometries of a parameterization under alternative hydraulic geometry relationships, one row per channel
+# and relationship, for sensitivity runs (see calculate_alternative_stream_geometries)
+CHANNEL_GEOMETRIES_TABLE = "parameters_channel_geometries"
+CHANNEL_GEOMETRIES_FIELDS = [("DelineationName", "TEXT"), ("DiscretizationName", "TEXT"),
+                             ("ParameterizationName", "TEXT"), ("HydraulicGeometryRelationship", "TEXT"),
+                             ("ChannelID", "LONG")] + \
+    [(field, "DOUBLE") for field in agwa_element_geometry.CHANNEL_GEOMETRY_FIELDS]
+
+
 def tweet(msg):
     """Produce a message for both arcpy and Python."""
     m = f"\n{msg}\n"
@@ -33,8 +85,8 @@ def initialize_workspace(delineation_name, prjgdb, discretization_name, paramete
         raise Exception(f"The table 'metaDiscretization' does not exist in the workspace {prjgdb}."
                         "Please run Step 3 first.")
     
-    df = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_discretization_table, ["DelineationName", "DiscretizationName"]))
-    df = df[(df['DelineationName']==delineation_name) & (df['DiscretizationName'] == discretization_name)]
+    df = agwa_table_io.read_table(meta_discretization_table, ["DiscretizationName"],
+                                  {"DelineationName": delineation_name, "DiscretizationName": discretization_name})
     if df.empty:
         msg = (f"Cannot proceed. \nThe table 'metaDiscretization' returned 0 records with field "
                f"'DiscretizationName' equal to '{discretization_name}'.")
@@ -65,10 +117,10 @@ def initialize_workspace(delineation_name, prjgdb, discretization_name, paramete
             arcpy.AddField_management(meta_parameterization_table, field, "TEXT")
     else:
         # check if the parameterization already exists in the table (this is checked in the GUI before this function is called)
-        df = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_parameterization_table, 
-                                                     ["DelineationName", "DiscretizationName", "ParameterizationName"]))
-        df = df[(df['DelineationName']==delineation_name) & (df['DiscretizationName'] == discretization_name) &
-                (df['ParameterizationName'] == parameterization_name)]
+        df = agwa_table_io.read_table(meta_parameterization_table, ["ParameterizationName"],
+                                      {"DelineationName": delineation_name,
+                                       "DiscretizationName": discretization_name,
+                                       "ParameterizationName": parameterization_name})
         if not df.empty:
             msg = (f"Cannot proceed. \nParameterization name '{parameterization_name}' "
                    f"already exists with the disretization '{discretization_name}'.")
@@ -108,59 +160,109 @@ def parameterize(prjgdb, workspace, delineation_name, discretization, parameteri
     arcpy.env.workspace = workspace
     arcpy.env.overwriteOutput = True
 
-    tweet("Calculating hillslope areas")
-    calculate_hillslope_areas(workspace, delineation_name, discretization, parameterization_name,
-                            save_intermediate_outputs)
-
-    tweet("Calculating mean elevation")
-    calculate_mean_elevation(workspace, delineation_name, discretization, parameterization_name,
-                            unfilled_dem_raster, save_intermediate_outputs)
-
-    tweet("Calculating mean slope")
-    calculate_mean_slope(workspace, delineation_name, discretization, parameterization_name, slope_raster,
-                        save_intermediate_outputs)
+    # Fingerprint the inputs so steps whose inputs and options did not change since another parameterization of
+    # the discretization are copied from it instead of being recalculated
+    tweet("Checking for unchanged parameterization steps")
+    cache = agwa_step_cache.StepCache(workspace, delineation_name, discretization, parameterization_name,
+                                      config.USE_PARAMETERIZATION_CACHE)
+    hillslopes_feature_class = os.path.join(workspace, f"{discretization}_hillslopes")
+    channels_feature_class = os.path.join(workspace, f"{discretization}_channels")
+    flow_length_down_raster = os.path.join(workspace, f"{discretization}_flow_length_downstream")
+    hillslopes_fingerprint = agwa_step_cache.fingerprint(hillslopes_feature_class, ["HillslopeID", "SHAPE@WKB"])
+    channels_fingerprint = agwa_step_cache.fingerprint(channels_feature_class, ["ChannelID", "SHAPE@WKB"])
+    network_fingerprint = agwa_step_cache.fingerprint(os.path.join(workspace, "contributing_channels"),
+                                                      ["ChannelID", "ContributingChannel"],
+                                                      {"DelineationName": delineation_name,
+                                                       "DiscretizationName": discretization})
+    dem_fingerprint = agwa_step_cache.fingerprint(unfilled_dem_raster)
+    raster_fingerprints = [dem_fingerprint] + [agwa_step_cache.fingerprint(raster) for raster in
+                                               (slope_raster, aspect_raster, flow_length_down_raster)]
+
+    def run_step(step_name, message, function, *args, inputs=(), options=()):
+        tweet(message)
+        step = PARAMETERIZATION_STEPS[step_name]
+        donor = cache.run(step_name, step["outputs"], function, *args, inputs=inputs, options=options,
+                          depends_on=step["depends_on"])
+        if donor is not None:
+            tweet(f"Inputs unchanged, copied from parameterization '{donor}'")
+
+    zone_raster = os.path.join(workspace, f"intermediate_{discretization}_hillslopes_zones")
+
+    zonal_statistics = {}
+
+    def rasterize_and_calculate_zonal_statistics():
+        if agwa_parallel.worker_count() > 1:
+            tweet(f"Calculating zonal statistics of sub-basins with {agwa_parallel.worker_count()} processes")
+            statistics_zone_raster = None
+        else:
+            tweet("Rasterizing hillslopes")
+            agwa_raster_io.rasterize_zones(hillslopes_feature_class, "HillslopeID", unfilled_dem_raster, zone_raster)
+            statistics_zone_raster = zone_raster
+        zonal_statistics["df_stats"] = calculate_zonal_statistics(
+            workspace, delineation_name, discretization, parameterization_name, statistics_zone_raster,
+            unfilled_dem_raster, slope_raster, aspect_raster, save_intermediate_outputs)
+
+    run_step("hillslope_areas", "Calculating hillslope areas",
+             calculate_hillslope_areas, workspace, delineation_name, discretization, parameterization_name,
+             save_intermediate_outputs,
+             inputs=[hillslopes_fingerprint])
+
+    run_step("zonal_statistics", "Calculating mean elevation, slope, aspect and flow length",
+             rasterize_and_calculate_zonal_statistics,
+             inputs=[hillslopes_fingerprint] + raster_fingerprints)
 
     if slope_method == "Complex":
         tweet("Calculating complex slope")
-        calculate_complex_slope(workspace, agwa_directory, delineation_name, discretization, parameterization_name, slope_raster,
-                                fa_raster, flow_length_raster, save_intermediate_outputs)
-
-
-    tweet("Calculating mean aspect")
-    calculate_mean_aspect(workspace, delineation_name, discretization, parameterization_name, aspect_raster,
-                        save_intermediate_outputs)
-
-
-    tweet("Calculating mean flow length")
-    calculate_mean_flow_length(workspace, delineation_name, discretization, parameterization_name,
-                            save_intermediate_outputs)
-
-    tweet("Calculating hillslope centroids")
-    calculate_centroids(workspace, delineation_name, discretization, parameterization_name, save_intermediate_outputs)
-
-    tweet("Calculating stream lengths")
-    calculate_stream_length(workspace, delineation_name, discretization, parameterization_name,
-                            save_intermediate_outputs)
-
-    tweet("Calculating hillslope geometries")
-    calculate_geometries(workspace, delineation_name, discretization, parameterization_name, flow_length_method,
-                        save_intermediate_outputs)
-
-    tweet("Calculating stream sequence")
-    calculate_stream_sequence(workspace, delineation_name, discretization, parameterization_name,
-                            save_intermediate_outputs)
-
-    tweet("Calculating contributing areas")
-    calculate_contributing_area_k2(workspace, delineation_name, discretization, parameterization_name,
-                                save_intermediate_outputs)
-
-    tweet("Calculating stream slopes and centroids")
-    calculate_stream_slope(workspace, delineation_name, discretization, parameterization_name, unfilled_dem_raster,
-                        save_intermediate_outputs)
-
-    tweet("Calculating stream geometries")
-    calculate_stream_geometries(workspace, delineation_name, discretization, parameterization_name,
-                                hydraulic_geometry_relationship, agwa_directory, save_intermediate_outputs)
+        if not arcpy.Exists(zone_raster):
+            agwa_raster_io.rasterize_zones(hillslopes_feature_class, "HillslopeID", unfilled_dem_raster, zone_raster)
+        df_stats = zonal_statistics.get("df_stats")
+        max_flow_lengths = None if df_stats is None else df_stats["MeanFlowLength_MAX"]
+        calculate_complex_slope(workspace, delineation_name, discretization, parameterization_name, zone_raster,
+                                slope_raster, max_flow_lengths, save_intermediate_outputs)
+
+    run_step("hillslope_centroids", "Calculating hillslope centroids",
+             calculate_centroids, workspace, delineation_name, discretization, parameterization_name,
+             save_intermediate_outputs,
+             inputs=[hillslopes_fingerprint])
+
+    run_step("stream_lengths", "Calculating stream lengths",
+             calculate_stream_length, workspace, delineation_name, discretization, parameterization_name,
+             save_intermediate_outputs,
+             inputs=[channels_fingerprint])
+
+    run_step("hillslope_geometries", "Calculating hillslope geometries",
+             calculate_geometries, workspace, delineation_name, discretization, parameterization_name,
+             flow_length_method, save_intermediate_outputs,
+             options=[flow_length_method])
+
+    tweet("Reading channel network")
+    channel_network = ChannelNetwork.from_workspace(workspace, delineation_name, discretization)
+
+    run_step("stream_sequence", "Calculating stream sequence",
+             calculate_stream_sequence, workspace, delineation_name, discretization, parameterization_name,
+             save_intermediate_outputs, channel_network,
+             inputs=[channels_fingerprint, network_fingerprint])
+
+    run_step("contributing_areas", "Calculating contributing areas",
+             calculate_contributing_area_k2, workspace, delineation_name, discretization, parameterization_name,
+             save_intermediate_outputs, channel_network,
+             inputs=[channels_fingerprint, network_fingerprint])
+
+    run_step("stream_slopes", "Calculating stream slopes and centroids",
+             calculate_stream_slope, workspace, delineation_name, discretization, parameterization_name,
+             unfilled_dem_raster, save_intermediate_outputs,
+             inputs=[channels_fingerprint, dem_fingerprint])
+
+    run_step("stream_geometries", "Calculating stream geometries",
+             calculate_stream_geometries, workspace, delineation_name, discretization, parameterization_name,
+             hydraulic_geometry_relationship, agwa_directory, save_intermediate_outputs,
+             inputs=[agwa_step_cache.fingerprint(os.path.join(agwa_directory, "lookup_tables.gdb", "HGR"),
+                                                 ["HGRNAME", "wCoef", "wExp", "dCoef", "dExp"],
+                                                 {"HGRNAME": hydraulic_geometry_relationship})],
+             options=[hydraulic_geometry_relationship])
+
+    if not save_intermediate_outputs and arcpy.Exists(zone_raster):
+        arcpy.management.Delete(zone_raster)
 
     return
 
@@ -168,57 +270,36 @@ def parameterize(prjgdb, workspace, delineation_name, discretization, parameteri
 def copy_parameterization(workspace, delineation_name, discretization_name, parameterization_name, previous_parameterization_name):
     """Copy the parameterization from a previous parameterization to a new parameterization. Called from tool_parameterize_elements.
     Note: Element parameterization should always be done before parameterizing the soil and land cover. Therefore, in this function, 
-    we only copy the elemnent parameters."""               
-    
-    tables = ["parameters_hillslopes", "parameters_channels"]
+    we only copy the elemnent parameters.
+    The rows are not duplicated: the new parameterization is recorded as a child of the previous one in the
+    parameterization_lineage table and inherits its element parameters when the tables are read."""
+
     tweet(f"Copying element parameterameters from '{previous_parameterization_name}' to '{parameterization_name}'")
-    hillslope_fields =["DelineationName", "DiscretizationName", "ParameterizationName", "HillslopeID", "Area", 
-                "MeanElevation", "MeanSlope", "MeanAspect", "MeanFlowLength", "CentroidX", "CentroidY", "Width", "Length"]
-    
-    channel_fields = ["DelineationName", "DiscretizationName", "ParameterizationName", "ChannelID", "Sequence",                      
-                "ChannelLength", "LateralArea", "UpstreamArea", "UpstreamElevation", "DownstreamElevation",
-                "MeanSlope", "CentroidX", "CentroidY", "SideSlope1", "SideSlope2", "UpstreamBankfullDepth", "DownstreamBankfullDepth",
-                "UpstreamBankfullWidth", "DownstreamBankfullWidth", "UpstreamBottomWidth", "DownstreamBottomWidth"]   
-
-    for table, fields in zip(tables, [hillslope_fields, channel_fields]):
-        table_path = arcpy.os.path.join(workspace, table)
-        new_rows = []
-        with arcpy.da.SearchCursor(table_path, fields) as cursor:
-            for row in cursor:
-                if ((row[fields.index('ParameterizationName')] == previous_parameterization_name) and 
-                   (row[fields.index('DelineationName')] == delineation_name) and
-                   (row[fields.index('DiscretizationName')] == discretization_name)):
-                    new_row = list(row)
-                    new_row[fields.index('ParameterizationName')] = parameterization_name
-                    new_rows.append(tuple(new_row))
-        with arcpy.da.InsertCursor(table_path, fields) as cursor:
-            for new_row in new_rows:
-                cursor.insertRow(new_row)
+    hillslope_fields = ["Area", "MeanElevation", "MeanSlope", "MeanAspect", "MeanFlowLength", "CentroidX", "CentroidY",
+                        "Width", "Length"]
+
+    channel_fields = ["Sequence", "ChannelLength", "LateralArea", "UpstreamArea", "UpstreamElevation",
+                      "DownstreamElevation", "MeanSlope", "CentroidX", "CentroidY"] + \
+        agwa_element_geometry.CHANNEL_GEOMETRY_FIELDS
+
+    for table, fields in zip(["parameters_hillslopes", "parameters_channels"], [hillslope_fields, channel_fields]):
+        agwa_parameterization_lineage.add_parent(workspace, delineation_name, discretization_name,
+                                                 parameterization_name, previous_parameterization_name, table, fields)
 
 
 def calculate_hillslope_areas(workspace, delineation_name, discretization_name, parameterization_name,
                             save_intermediate_outputs):
     """Calculate the area of each hillslope in the discretization feature class and populate the parameters_hillslopes table."""
 
-    table_name = "parameters_hillslopes"
-    parameters_hillslopes_table = os.path.join(workspace, table_name)
-    discretization_hillslopes = f"{discretization_name}_hillslopes"
-    discretization_feature_class = os.path.join(workspace, discretization_hillslopes)
-
-    table_view = f"{table_name}_tableview"
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = (f"{delineation_name_field} = '{delineation_name}' AND " 
-                 f"{discretization_name_field} = '{discretization_name}' AND " 
-                 f"{parameterization_name_field} = '{parameterization_name}'")
-    arcpy.management.MakeTableView(parameters_hillslopes_table, table_view, expression)
-    arcpy.management.AddJoin(table_view, "HillslopeID", discretization_feature_class, "HillslopeID")
-    area_field = arcpy.AddFieldDelimiters(workspace, f"{table_name}.Area")
-    shape_area_field = arcpy.AddFieldDelimiters(workspace, f"{discretization_hillslopes}.Shape_Area")
-    arcpy.management.CalculateField(table_view, area_field, f"!{shape_area_field}!", "PYTHON3")
-    arcpy.management.RemoveJoin(table_view, discretization_hillslopes)
-    arcpy.management.Delete(table_view)
+    parameters_hillslopes_table = os.path.join(workspace, "parameters_hillslopes")
+    discretization_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
+
+    df_areas = pd.DataFrame(arcpy.da.SearchCursor(discretization_feature_class, ["HillslopeID", "SHAPE@AREA"]),
+                            columns=["HillslopeID", "Area"])
+    expression = agwa_table_io.where_clause(parameters_hillslopes_table, {"DelineationName": delineation_name,
+                                                                          "DiscretizationName": discretization_name,
+                                                                          "ParameterizationName": parameterization_name})
+    agwa_table_io.update_rows(parameters_hillslopes_table, df_areas, "HillslopeID", where=expression)
 
 
 def populate_hillslopeids_in_parameter_tables(workspace, delineation_name, discretization_name, parameterization_name):    
@@ -227,719 +308,263 @@ def populate_hillslopeids_in_parameter_tables(workspace, delineation_name, discr
     parameters_hillslopes_table = os.path.join(workspace, "parameters_hillslopes")
     parameters_channels_table = os.path.join(workspace, "parameters_channels")
 
-    hillslopes_fields = ["HillslopeID"]
     parameters_fields = ["DelineationName", "DiscretizationName", "ParameterizationName", "HillslopeID"]
     discretization_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
-    with arcpy.da.SearchCursor(discretization_feature_class, hillslopes_fields) as hillslopes_cursor:
-        for hillslope_row in hillslopes_cursor:
-            hillslope_id = hillslope_row[0]
-            with arcpy.da.InsertCursor(parameters_hillslopes_table, parameters_fields) as parameters_cursor:
-                parameters_cursor.insertRow(
-                    (delineation_name, discretization_name, parameterization_name, hillslope_id))
-
-    channels_fields = ["ChannelID"]
+    with arcpy.da.SearchCursor(discretization_feature_class, ["HillslopeID"]) as hillslopes_cursor:
+        rows = [(delineation_name, discretization_name, parameterization_name, hillslope_row[0])
+                for hillslope_row in hillslopes_cursor]
+    agwa_table_io.append_rows(parameters_hillslopes_table, rows, parameters_fields)
+
     parameters_fields = ["DelineationName", "DiscretizationName", "ParameterizationName", "ChannelID"]
     channels_feature_class = os.path.join(workspace, f"{discretization_name}_channels")
-    with arcpy.da.SearchCursor(channels_feature_class, channels_fields) as channels_cursor:
-        for stream_row in channels_cursor:
-            channel_id = stream_row[0]
-            with arcpy.da.InsertCursor(parameters_channels_table, parameters_fields) as parameters_cursor:
-                parameters_cursor.insertRow((delineation_name, discretization_name, parameterization_name,
-                                             channel_id))
-
-
-def calculate_mean_elevation(workspace, delineation_name, discretization_name, parameterization_name, dem_raster,
-                            save_intermediate_outputs):
-    
-    """ Calculate the mean elevation of each hillslope in the discretization feature class and
-        populate the parameters_hillslopes table. Called from parameterize()."""
-
-    arcpy.env.workspace = workspace
+    with arcpy.da.SearchCursor(channels_feature_class, ["ChannelID"]) as channels_cursor:
+        rows = [(delineation_name, discretization_name, parameterization_name, stream_row[0])
+                for stream_row in channels_cursor]
+    agwa_table_io.append_rows(parameters_channels_table, rows, parameters_fields)
+
+
+def calculate_zonal_statistics(workspace, delineation_name, discretization_name, parameterization_name,
+                               zone_raster, unfilled_dem_raster, slope_raster, aspect_raster, save_intermediate_outputs):
+    """Calculate the mean elevation, slope, aspect and flow length of each hillslope in one pass over the
+    rasters and populate the parameters_hillslopes table. Aspect is averaged as a circular mean and flat cells
+    (aspect -1) are ignored. When zone_raster is None, the hillslopes are split into groups of sub-basins that
+    are rasterized and summarized in parallel (see agwa_parallel). Called from parameterize()."""
+
+    flow_length_down_raster = os.path.join(workspace, f"{discretization_name}_flow_length_downstream")
+    value_rasters = {"MeanElevation": unfilled_dem_raster,
+                     "MeanSlope": slope_raster,
+                     "MeanAspect": aspect_raster,
+                     "MeanFlowLength": flow_length_down_raster}
+
+    # Resample inputs that are not on the grid of the zone raster, so all rasters can be read with the same blocks.
+    # The zone rasters of sub-basins are snapped to the DEM, so the DEM grid is used for them.
+    grid_raster = zone_raster if zone_raster is not None else unfilled_dem_raster
+    aligned_rasters = {}
+    for field, raster in value_rasters.items():
+        aligned_raster = os.path.join(workspace, f"intermediate_{discretization_name}_{field}_aligned")
+        aligned_rasters[field] = agwa_raster_io.align_raster(raster, grid_raster, aligned_raster)
+
+    if zone_raster is None:
+        df_stats = agwa_parallel.zonal_statistics_by_sub_basin(workspace, delineation_name, discretization_name,
+                                                               unfilled_dem_raster, aligned_rasters,
+                                                               circular=["MeanAspect"])
+    else:
+        discretization_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
+        hillslope_ids = agwa_parallel.read_hillslope_ids(discretization_feature_class)
+        df_stats = agwa_zonal.zonal_statistics(zone_raster, aligned_rasters, hillslope_ids, circular=["MeanAspect"])
 
     parameters_hillslopes_table = os.path.join(workspace, "parameters_hillslopes")
-    discretization_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
-    zone_field = "HillslopeID"
-    value_raster = dem_raster
-    zonal_table = f"intermediate_{discretization_name}_meanElevation"
-    arcpy.sa.ZonalStatisticsAsTable(discretization_feature_class, zone_field, value_raster, zonal_table, 
-                                    "DATA", "MEAN")
-
-    table_view = "parameters_hillslopes"
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = (f"{delineation_name_field} = '{delineation_name}' And "
-                  f"{discretization_name_field} = '{discretization_name}' And "
-                  f"{parameterization_name_field} = '{parameterization_name}'")
-
-    arcpy.management.MakeTableView(parameters_hillslopes_table, table_view, expression)
-    arcpy.management.AddJoin(table_view, "HillslopeID", zonal_table, "HillslopeID")
-    mean_elevation_field = f"{table_view}.MeanElevation"
-    zonal_mean_field = f"!{zonal_table}.MEAN!"
-    arcpy.management.CalculateField(table_view, mean_elevation_field, zonal_mean_field)
-    arcpy.management.RemoveJoin(table_view, zonal_table)
+    expression = agwa_table_io.where_clause(parameters_hillslopes_table, {"DelineationName": delineation_name,
+                                                                          "DiscretizationName": discretization_name,
+                                                                          "ParameterizationName": parameterization_name})
+    df_means = df_stats[[f"{field}_MEAN" for field in value_rasters]]
+    df_means.columns = list(value_rasters)
+    agwa_table_io.update_rows(parameters_hillslopes_table, df_means.rename_axis("HillslopeID").reset_index(),
+                              "HillslopeID", where=expression)
 
     if not save_intermediate_outputs:
-        arcpy.Delete_management(zonal_table)
+        for field, raster in aligned_rasters.items():
+            if raster != value_rasters[field]:
+                arcpy.management.Delete(raster)
+
+    return df_stats
 
 
-def calculate_mean_slope(workspace, delineation_name, discretization_name, parameterization_name, slope_raster,
+def calculate_centroids(workspace, delineation_name, discretization_name, parameterization_name,
                         save_intermediate_outputs):
+    """Calculate the centroid of each hillslope from its geometry and populate the parameters_hillslopes table."""
+
     parameters_hillslopes_table = os.path.join(workspace, "parameters_hillslopes")
-    discretization_feature_class = os.path.join(workspace, "{}_hillslopes".format(discretization_name))
-    zone_field = "HillslopeID"
-    value_raster = slope_raster
-    zonal_table = "intermediate_{}_meanSlope".format(discretization_name)
-    arcpy.sa.ZonalStatisticsAsTable(discretization_feature_class, zone_field, value_raster, zonal_table, "DATA",
-                                    "MEAN")
-
-    table_view = "parameters_hillslopes"
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                                                    discretization_name_field,
-                                                                    discretization_name,
-                                                                    parameterization_name_field,
-                                                                    parameterization_name)
-    arcpy.management.MakeTableView(parameters_hillslopes_table, table_view, expression)
-    arcpy.management.AddJoin(table_view, "HillslopeID", zonal_table, "HillslopeID")
-    mean_slope_field = "{}.MeanSlope".format(table_view)
-    zonal_mean_field = "!{}.MEAN!".format(zonal_table)
-    arcpy.management.CalculateField(table_view, mean_slope_field, zonal_mean_field)
-    arcpy.management.RemoveJoin(table_view, zonal_table)
+    discretization_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
 
-    if not save_intermediate_outputs:
-        arcpy.Delete_management(zonal_table)
+    with arcpy.da.SearchCursor(discretization_feature_class, ["HillslopeID", "SHAPE@TRUECENTROID"]) as cursor:
+        df_centroids = pd.DataFrame([(row[0], row[1][0], row[1][1]) for row in cursor],
+                                    columns=["HillslopeID", "CentroidX", "CentroidY"])
+    expression = agwa_table_io.where_clause(parameters_hillslopes_table, {"DelineationName": delineation_name,
+                                                                          "DiscretizationName": discretization_name,
+                                                                          "ParameterizationName": parameterization_name})
+    agwa_table_io.update_rows(parameters_hillslopes_table, df_centroids, "HillslopeID", where=expression)
 
 
-def calculate_mean_aspect(workspace, delineation_name, discretization_name, parameterization_name, aspect_raster,
+def calculate_geometries(workspace, delineation_name, discretization_name, parameterization_name, flow_length_method,
                         save_intermediate_outputs):
-    parameters_hillslopes_table = os.path.join(workspace, "parameters_hillslopes")
-    discretization_feature_class = os.path.join(workspace, "{}_hillslopes".format(discretization_name))
-    zone_field = "HillslopeID"
-    value_raster = aspect_raster
-    zonal_table = "intermediate_{}_meanAspect".format(discretization_name)
-    arcpy.sa.ZonalStatisticsAsTable(discretization_feature_class, zone_field, value_raster, zonal_table, "DATA",
-                                    "MEAN")
-
-    table_view = "parameters_hillslopes"
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                                                    discretization_name_field,
-                                                                    discretization_name,
-                                                                    parameterization_name_field,
-                                                                    parameterization_name)
-    arcpy.management.MakeTableView(parameters_hillslopes_table, table_view, expression)
-    arcpy.management.AddJoin(table_view, "HillslopeID", zonal_table, "HillslopeID")
-    mean_aspect_field = "{}.MeanAspect".format(table_view)
-    zonal_mean_field = "!{}.MEAN!".format(zonal_table)
-    arcpy.management.CalculateField(table_view, mean_aspect_field, zonal_mean_field)
-    arcpy.management.RemoveJoin(table_view, zonal_table)
-
-    if not save_intermediate_outputs:
-        arcpy.Delete_management(zonal_table)
+    """Calculate the width and length of each hillslope with the selected flow length method and populate the
+    parameters_hillslopes table. Called from parameterize()."""
 
+    parameters_hillslopes_table = os.path.join(workspace, "parameters_hillslopes")
+    parameters_channels_table = os.path.join(workspace, "parameters_channels")
+    filters = {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+               "ParameterizationName": parameterization_name}
 
-def calculate_mean_flow_length(workspace, delineation_name, discretization_name, parameterization_name,
-                            save_intermediate_outputs):
+    df_hillslopes = agwa_table_io.read_table(parameters_hillslopes_table, ["HillslopeID", "Area", "MeanFlowLength"],
+                                             filters, null_value=0)
+    df_channels = agwa_table_io.read_table(parameters_channels_table, ["ChannelID", "ChannelLength"], filters,
+                                           null_value=0)
+    df_geometries = agwa_element_geometry.hillslope_geometries(df_hillslopes.HillslopeID.values,
+                                                               df_hillslopes.Area.values,
+                                                               df_hillslopes.MeanFlowLength.values,
+                                                               df_channels.ChannelID.values,
+                                                               df_channels.ChannelLength.values,
+                                                               flow_length_method)
 
-    parameters_hillslopes_table = os.path.join(workspace, "parameters_hillslopes")
-    discretization_feature_class = os.path.join(workspace, "{}_hillslopes".format(discretization_name))
-    flow_length_down_raster = os.path.join(workspace, "{}_flow_length_downstream".format(discretization_name))
-    zone_field = "HillslopeID"
-    value_raster = flow_length_down_raster
-    zonal_table = "intermediate_{}_mean_flow_length_downstream".format(discretization_name)
-    arcpy.sa.ZonalStatisticsAsTable(discretization_feature_class, zone_field, value_raster, zonal_table, "DATA",
-                                    "MEAN")
-
-    table_view = "parameters_hillslopes"
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                                                    discretization_name_field,
-                                                                    discretization_name,
-                                                                    parameterization_name_field,
-                                                                    parameterization_name)
-    arcpy.management.MakeTableView(parameters_hillslopes_table, table_view, expression)
-    arcpy.management.AddJoin(table_view, "HillslopeID", zonal_table, "HillslopeID")
-    mean_flow_length_field = "{}.MeanFlowLength".format(table_view)
-    zonal_mean_field = "!{}.MEAN!".format(zonal_table)
-    arcpy.management.CalculateField(table_view, mean_flow_length_field, zonal_mean_field)
-    arcpy.management.RemoveJoin(table_view, zonal_table)
+    expression = agwa_table_io.where_clause(parameters_hillslopes_table, filters)
+    agwa_table_io.update_rows(parameters_hillslopes_table, df_geometries, "HillslopeID", where=expression)
 
-    if not save_intermediate_outputs:
-        arcpy.Delete_management(zonal_table)
 
+def calculate_stream_length(workspace, delineation_name, discretization_name, parameterization_name,
+                            save_intermediate_outputs):
+    """Calculate the length of each channel from its geometry and populate the parameters_channels table."""
 
-def calculate_centroids(workspace, delineation_name, discretization_name, parameterization_name,
-                        save_intermediate_outputs):
-    table_name = "parameters_hillslopes"
-    parameters_hillslopes_table = os.path.join(workspace, table_name)
-    discretization_hillslopes = "{}_hillslopes".format(discretization_name)
-    discretization_feature_class = os.path.join(workspace, discretization_hillslopes)
-
-    arcpy.management.AddFields(discretization_feature_class, "CentroidX FLOAT # # # #;CentroidY FLOAT # # # #", None)
-    arcpy.management.CalculateGeometryAttributes(discretization_feature_class,
-                                                "CentroidX CENTROID_X;CentroidY CENTROID_Y", '', '', None,
-                                                "SAME_AS_INPUT")
-
-    table_view = "{}_tableview".format(table_name)
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                                                    discretization_name_field,
-                                                                    discretization_name,
-                                                                    parameterization_name_field,
-                                                                    parameterization_name)
-    arcpy.management.MakeTableView(parameters_hillslopes_table, table_view, expression)
-    arcpy.management.AddJoin(table_view, "HillslopeID", discretization_feature_class, "HillslopeID")
-    centroid_x_field = arcpy.AddFieldDelimiters(workspace, "{}.CentroidX".format(table_name))
-    centroid_y_field = arcpy.AddFieldDelimiters(workspace, "{}.CentroidY".format(table_name))
-    discretization_centroid_x_field = "!{}!"\
-        .format(arcpy.AddFieldDelimiters(workspace, "{}.CentroidX".format(discretization_hillslopes)))
-    discretization_centroid_y_field = "!{}!"\
-        .format(arcpy.AddFieldDelimiters(workspace, "{}.CentroidY".format(discretization_hillslopes)))
-    expression = "{0} {1};{2} {3}".format(centroid_x_field, discretization_centroid_x_field, centroid_y_field,
-                                        discretization_centroid_y_field)
-    arcpy.management.CalculateFields(table_view, "PYTHON3", expression, '', "NO_ENFORCE_DOMAINS")
-    arcpy.management.RemoveJoin(table_view, discretization_hillslopes)
-    arcpy.management.Delete(table_view)
-    arcpy.management.DeleteField(discretization_feature_class, "CentroidX;CentroidY", "DELETE_FIELDS")
+    parameters_channels_table = os.path.join(workspace, "parameters_channels")
+    channels_feature_class = os.path.join(workspace, f"{discretization_name}_channels")
 
+    df_lengths = pd.DataFrame(arcpy.da.SearchCursor(channels_feature_class, ["ChannelID", "SHAPE@LENGTH"]),
+                              columns=["ChannelID", "ChannelLength"])
+    expression = agwa_table_io.where_clause(parameters_channels_table, {"DelineationName": delineation_name,
+                                                                        "DiscretizationName": discretization_name,
+                                                                        "ParameterizationName": parameterization_name})
+    agwa_table_io.update_rows(parameters_channels_table, df_lengths, "ChannelID", where=expression)
 
-def calculate_geometries(workspace, delineation_name, discretization_name, parameterization_name, flow_length_method,
-                        save_intermediate_outputs):
-    hillslopes_table_name = "parameters_hillslopes"
-    channels_table_name = "parameters_channels"
-    parameters_hillslopes_table = os.path.join(workspace, hillslopes_table_name)
-    parameters_hillslopes_table = os.path.join(workspace, channels_table_name)
-
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    channel_id_field = arcpy.AddFieldDelimiters(workspace, "ChannelID")
-    expression = "{0} = '{1}' AND" \
-                " {2} = '{3}' AND" \
-                " {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                    discretization_name_field, discretization_name,
-                                    parameterization_name_field, parameterization_name)
-    if flow_length_method == "Geometric Abstraction":
-        hillslopes_fields = ["HillslopeID", "Area", "Width", "Length"]
-        channels_fields = ["ChannelLength"]
-
-        with arcpy.da.UpdateCursor(parameters_hillslopes_table, hillslopes_fields, expression) as hillslopes_cursor:
-            for hillslope_row in hillslopes_cursor:
-                hillslope_id = hillslope_row[0]
-                area = hillslope_row[1]
-                channel_id = round(hillslope_id / 10) * 10 + 4
-                expression = "{0} = '{1}' AND" \
-                            " {2} = '{3}' AND " \
-                            " {4} = '{5}' AND " \
-                            " {6} = {7}".format(delineation_name_field, delineation_name,
-                                                discretization_name_field, discretization_name,
-                                                parameterization_name_field, parameterization_name,
-                                                channel_id_field, channel_id)
-                with arcpy.da.SearchCursor(parameters_hillslopes_table, channels_fields, expression) as channels_cursor:
-                    for stream_row in channels_cursor:
-                        if hillslope_id % 10 == 2 or hillslope_id % 10 == 3:
-                            width = stream_row[0]
-                            length = area / width
-                            hillslope_row[2] = width
-                            hillslope_row[3] = length
-                            hillslopes_cursor.updateRow(hillslope_row)
-                        else:
-                            # assume shape of headwater hillslope is a triangles
-                            #  and use its centroid
-                            width = stream_row[0]
-                            length = area / width
-    elif flow_length_method == "Plane Average":
-        table_name = "parameters_hillslopes"
-        parameters_hillslopes_table = os.path.join(workspace, table_name)
-
-        table_view = "{}_tableview".format(table_name)
-        delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-        discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-        parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-        expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                                                        discretization_name_field,
-                                                                        discretization_name,
-                                                                        parameterization_name_field,
-                                                                        parameterization_name)
-        arcpy.management.MakeTableView(parameters_hillslopes_table, table_view, expression)
-        area_field = arcpy.AddFieldDelimiters(workspace, "Area")
-        mean_flow_length_field = arcpy.AddFieldDelimiters(workspace, "MeanFlowLength")
-        width_field = arcpy.AddFieldDelimiters(workspace, "Width")
-        length_field = arcpy.AddFieldDelimiters(workspace, "Length")
-        arcpy.management.CalculateField(table_view, width_field, "!{0}! / !{1}!".
-                                        format(area_field, mean_flow_length_field), "PYTHON3")
-        arcpy.management.CalculateField(table_view, length_field, "!{}!".format(mean_flow_length_field), "PYTHON3")
-        arcpy.management.Delete(table_view)
 
+def calculate_stream_sequence(workspace, delineation_name, discretization_name, parameterization_name,
+                            save_intermediate_outputs, channel_network=None):
+    """Calculate the sequence of each channel and populate the Sequence field of the parameters_channels table.
+    The outlet channel has the highest sequence and every channel is sequenced after its contributing channels.
+    The topology is read once into a ChannelNetwork and all sequences are written in one cursor pass."""
 
-def calculate_stream_length(workspace, delineation_name, discretization_name, parameterization_name,
-                            save_intermediate_outputs):
-    table_name = "parameters_channels"
-    parameters_channels_table = os.path.join(workspace, table_name)
-    discretization_channels = "{}_channels".format(discretization_name)
-    channels_feature_class = os.path.join(workspace, discretization_channels)
-
-    table_view = "{}_tableview".format(table_name)
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                                                    discretization_name_field,
-                                                                    discretization_name,
-                                                                    parameterization_name_field,
-                                                                    parameterization_name)
-    arcpy.management.MakeTableView(parameters_channels_table, table_view, expression)
-    arcpy.management.AddJoin(table_view, "ChannelID", channels_feature_class, "ChannelID")
-    stream_length_field = arcpy.AddFieldDelimiters(workspace, "{}.ChannelLength".format(table_name))
-    shape_length_field = arcpy.AddFieldDelimiters(workspace, "{}.Shape_Length".format(discretization_channels))
-    arcpy.management.CalculateField(table_view, stream_length_field, "!{}!".format(shape_length_field), "PYTHON3")
-    arcpy.management.RemoveJoin(table_view, discretization_channels)
-    arcpy.management.Delete(table_view)
+    if channel_network is None:
+        channel_network = ChannelNetwork.from_workspace(workspace, delineation_name, discretization_name)
+    sequence = channel_network.sequence()
 
+    unsequenced_channels = channel_network.unsequenced_channels()
+    if unsequenced_channels:
+        tweet(f"WARNING: Channels {unsequenced_channels} are not connected to the outlet channel "
+              f"{channel_network.outlet_channel_id} and were not sequenced.")
 
-def calculate_stream_sequence(workspace, delineation_name, discretization_name, parameterization_name,
-                            save_intermediate_outputs):    
-    # TODO: Replace function comments with docstring style comments
-    # Outlet stream has highest sequence
-    # Identify outlet using discretization nodes feature class where node_type = 'outlet'
-    # Query for stream outlet and push on to unprocessedStack
-    # While unprocessedStack is not empty
-    #   peek at unprocessedStack to get streamID
-    #   If channelsList has current streamID
-    #       push stream ID on to processedStack
-    #   Add streamID to channelsList
-    #   query for streams contributing to streamID
-    #       If no contributing streams
-    #           push top of unprocessedStack onto processedStack
-    #       while contributing streams
-    #           push contributing stream onto unProcessedStack
-
-    # Identify outlet using node_type = 'outlet'
-    discretization_nodes = f"{discretization_name}_nodes"
-    nodes_feature_class = os.path.join(workspace, discretization_nodes)
-    node_type_field = arcpy.AddFieldDelimiters(workspace, "node_type")
-    expression = f"{node_type_field} = 'outlet'"
-    fields = ["arcid", "grid_code", "from_node", "to_node"]   
-    attdict = {}
-    with arcpy.da.SearchCursor(nodes_feature_class, fields, expression) as nodes_cursor:
-        for nodes_row in nodes_cursor:
-            attdict["outlet"] = dict(zip(nodes_cursor.fields, nodes_row))
-
-    arcid_field = arcpy.AddFieldDelimiters(workspace, "arcid")
-    grid_code_field = arcpy.AddFieldDelimiters(workspace, "grid_code")
-    from_node_field = arcpy.AddFieldDelimiters(workspace, "from_node")
-    to_node_field = arcpy.AddFieldDelimiters(workspace, "to_node")
-
-    expression = (f"{arcid_field} = {attdict['outlet']['arcid']} And "
-            f"{grid_code_field} = {attdict['outlet']['grid_code']} And "
-            f"{from_node_field} = {attdict['outlet']['from_node']} And "
-            f"{to_node_field} = {attdict['outlet']['to_node']}")
-    
-    discretization_channels = f"{discretization_name}_channels"
-    channels_feature_class = os.path.join(workspace, discretization_channels)
-    channel_count = int(arcpy.management.GetCount(channels_feature_class).getOutput(0))
-    fields = ["ChannelID"]
-    channel_id = None
-    with arcpy.da.SearchCursor(channels_feature_class, fields, expression) as channels_cursor:
-        for channels_row in channels_cursor:
-            channel_id = channels_row[0]
-
-    contributing_channels_table_name = "contributing_channels"
-    contributing_channels_table = os.path.join(workspace, contributing_channels_table_name)
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    expression = (f"{delineation_name_field} = '{delineation_name}' And "
-                 f"{discretization_name_field} = '{discretization_name}'")
-    
-    contrib_table_view = f"{contributing_channels_table_name}_tableview"
-    arcpy.management.MakeTableView(contributing_channels_table, contrib_table_view, expression)
-    channel_id_field = arcpy.AddFieldDelimiters(workspace, "ChannelID")
-
-    fields = ["ContributingChannel"]
-    unprocessed_stack = deque()
-    unprocessed_stack.append(channel_id)
-    processed_stack = deque()
-    channels_list = []
-    while unprocessed_stack:
-        channel_id = unprocessed_stack[-1]
-        if channel_id in channels_list:
-            processed_stream = unprocessed_stack.pop()
-            processed_stack.append(processed_stream)
-            continue
-
-        channels_list.append(channel_id)
-
-        expression = f"{channel_id_field} = '{channel_id}'"
-        with arcpy.da.SearchCursor(contrib_table_view, fields, expression) as contrib_cursor:
-            contrib_row = None
-            for contrib_row in contrib_cursor:
-                contributing_channel_id = contrib_row[0]
-                unprocessed_stack.append(contributing_channel_id)
-            if contrib_row is None:
-                # No contributing channels so add to the processed stack
-                processed_stream = unprocessed_stack.pop()
-                processed_stack.append(processed_stream)
-
-    # The processed_stack is now in order with the watershed outlet stream at the top of the stack
-    table_name = "parameters_channels"
-    parameters_channels_table = os.path.join(workspace, table_name)
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    fields = ["Sequence"]
-    for sequence in range(1, channel_count+1):
-        channel_id = processed_stack.popleft()
-        expression = (f"{parameterization_name_field} = '{parameterization_name}' And "
-                      f"{channel_id_field} = {int(channel_id)}")
-        with arcpy.da.UpdateCursor(parameters_channels_table, fields, expression) as cursor:
-            for row in cursor:
-                row[0] = sequence
-                cursor.updateRow(row)
-
-    arcpy.management.Delete(contrib_table_view)
+    parameters_channels_table = os.path.join(workspace, "parameters_channels")
+    expression = agwa_table_io.where_clause(parameters_channels_table, {"DelineationName": delineation_name,
+                                                                        "DiscretizationName": discretization_name,
+                                                                        "ParameterizationName": parameterization_name})
+    df_sequence = pd.DataFrame({"ChannelID": list(sequence), "Sequence": list(sequence.values())})
+    agwa_table_io.update_rows(parameters_channels_table, df_sequence, "ChannelID", where=expression)
 
 
 def calculate_contributing_area_k2(workspace, delineation_name, discretization_name, parameterization_name,
-                                save_intermediate_outputs):
-    # TODO: Replace function comments with docstring style comments
-    # Calculate contributing areas by starting at the top of the watershed
-    # and moving towards the outlet
-    # Iterate through parameters_channels by sequence number
-    # This results in the headwater areas being calculated first
-    # so moving towards the outlet the upstream contributing areas
-    # can be added
-    
-    parameters_channels_table_name = "parameters_channels"
-    parameters_channels_table = os.path.join(workspace, parameters_channels_table_name)
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'". \
-        format(delineation_name_field, delineation_name,
-            discretization_name_field, discretization_name,
-            parameterization_name_field, parameterization_name)
-    parameters_channels_table_view = "{}_tableview".format(parameters_channels_table)
-    arcpy.management.MakeTableView(parameters_channels_table, parameters_channels_table_view, expression)
-    channel_count = int(arcpy.management.GetCount(parameters_channels_table_view).getOutput(0))
+                                save_intermediate_outputs, channel_network=None, quantities=None):
+    """Calculate the lateral and upstream contributing areas of each channel and populate the parameters_channels
+    table. The hillslope areas and the channel topology are read once and accumulated from the headwaters
+    towards the outlet in NumPy. Returns the accumulated DataFrame, which also holds the area-weighted
+    Upstream<q> means of the parameters_hillslopes columns listed in quantities."""
+
+    if channel_network is None:
+        channel_network = ChannelNetwork.from_workspace(workspace, delineation_name, discretization_name)
+
+    filters = {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+               "ParameterizationName": parameterization_name}
+    quantities = list(quantities or [])
+    parameters_hillslopes_table = os.path.join(workspace, "parameters_hillslopes")
+    df_hillslopes = agwa_table_io.read_table(parameters_hillslopes_table, ["HillslopeID", "Area"] + quantities,
+                                             filters, null_value=0)
+    df_areas = channel_network.accumulate_hillslopes(df_hillslopes, quantities)
 
-    parameters_hillslopes_table_name = "parameters_hillslopes"
-    parameters_hillslopes_table = os.path.join(workspace, parameters_hillslopes_table_name)
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'". \
-        format(delineation_name_field, delineation_name,
-            discretization_name_field, discretization_name,
-            parameterization_name_field, parameterization_name)
-    parameters_hillslopes_table_view = "{}_tableview".format(parameters_hillslopes_table)
-    arcpy.management.MakeTableView(parameters_hillslopes_table, parameters_hillslopes_table_view, expression)
-
-    contributing_channels_table_name = "contributing_channels"
-    contributing_channels_table = os.path.join(workspace, contributing_channels_table_name)
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    expression = "{0} = '{1}' And {2} = '{3}'".format(delineation_name_field, delineation_name,
-                                                    discretization_name_field, discretization_name)
-    contrib_table_view = "{}_tableview".format(contributing_channels_table_name)
-    arcpy.management.MakeTableView(contributing_channels_table, contrib_table_view, expression)
-
-    channel_id_field = arcpy.AddFieldDelimiters(workspace, "ChannelID")
-    sequence_field = arcpy.AddFieldDelimiters(workspace, "Sequence")
-    hillslope_id_field = arcpy.AddFieldDelimiters(workspace, "HillslopeID")
-    fields_cursor1 = ["ChannelID", "LateralArea", "UpstreamArea"]
-    fields_cursor2 = ["Area"]
-    fields_cursor3 = ["ContributingChannel"]
-    fields_cursor4 = ["LateralArea", "UpstreamArea"]
-    for sequence in range(1, channel_count + 1):
-        expression = "{0} = {1}".format(sequence_field, sequence)
-        with arcpy.da.UpdateCursor(parameters_channels_table_view, fields_cursor1, expression) as cursor:
-            for row in cursor:
-                channel_id = row[0]
-                left_lateral_id = channel_id - 1
-                right_lateral_id = channel_id - 2
-                headwater_id = channel_id - 3
-
-                lateral_area = 0
-                headwater_area = None
-                upstream_area = None
-
-                # Determine lateral_area
-                expression = "{0} = '{1}' And " \
-                            "{2} = '{3}' And " \
-                            "{4} = '{5}' And " \
-                            "{6} = {7} Or " \
-                            "{8} = {9}".format(delineation_name_field, delineation_name,
-                                                discretization_name_field, discretization_name,
-                                                parameterization_name_field, parameterization_name,
-                                                hillslope_id_field, left_lateral_id,
-                                                hillslope_id_field, right_lateral_id)
-
-                with arcpy.da.SearchCursor(parameters_hillslopes_table_view, fields_cursor2,
-                                        expression) as hillslopes_cursor:
-                    for hillslope_row in hillslopes_cursor:
-                        # print("lateral area: ", str(hillslope_row[0]))
-                        lateral_area += hillslope_row[0]
-                # Determine headwater_area
-                expression = "{0} = '{1}' And " \
-                            "{2} = '{3}' And " \
-                            "{4} = '{5}' And " \
-                            "{6} = {7}".format(delineation_name_field, delineation_name,
-                                                discretization_name_field, discretization_name,
-                                                parameterization_name_field, parameterization_name,
-                                                hillslope_id_field, headwater_id)
-                with arcpy.da.SearchCursor(parameters_hillslopes_table_view, fields_cursor2,
-                                        expression) as hillslopes_cursor:
-                    for hillslope_row in hillslopes_cursor:
-                        # print("headwater area: ", str(hillslope_row[0]))
-                        headwater_area = hillslope_row[0]
-
-                # Determine upstream_area
-                if headwater_area is None:
-                    expression = "{0} = '{1}'".format(channel_id_field, channel_id)
-                    expression2 = ""
-                    with arcpy.da.SearchCursor(contrib_table_view, fields_cursor3, expression) as contrib_cursor:
-                        for contrib_row in contrib_cursor:
-                            expression2 += "{0} = {1} Or ".format(channel_id_field, contrib_row[0])
-
-                    expression2 = expression2[:-4]
-                    upstream_area = 0
-                    with arcpy.da.SearchCursor(parameters_channels_table_view, fields_cursor4, expression2) as \
-                            contrib_cursor:
-                        for contrib_row in contrib_cursor:
-                            upstream_area += contrib_row[0] + contrib_row[1]
-
-                row[1] = lateral_area
-                if headwater_area:
-                    row[2] = headwater_area
-                elif upstream_area:
-                    row[2] = upstream_area
-
-                cursor.updateRow(row)
-
-    arcpy.management.Delete(contrib_table_view)
-    arcpy.management.Delete(parameters_channels_table_view)
-    arcpy.management.Delete(parameters_hillslopes_table_view)
+    parameters_channels_table = os.path.join(workspace, "parameters_channels")
+    expression = agwa_table_io.where_clause(parameters_channels_table, filters)
+    agwa_table_io.update_rows(parameters_channels_table, df_areas, "ChannelID", ["LateralArea", "UpstreamArea"],
+                              where=expression)
+
+    return df_areas
 
 
 def calculate_stream_slope(workspace, delineation_name, discretization_name, parameterization_name, dem_raster,
                         save_intermediate_outputs):
-    parameters_channels_table_name = "parameters_channels"
-    parameters_channels_table = os.path.join(workspace, parameters_channels_table_name)
-    discretization_channels = "{}_channels".format(discretization_name)
-    channels_feature_class = os.path.join(workspace, discretization_channels)
-
-    # channels table view of input delineation, discretization, and parameterization
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                                                    discretization_name_field,
-                                                                    discretization_name,
-                                                                    parameterization_name_field,
-                                                                    parameterization_name)
-    parameters_channels_table_view = "{}_tableview".format(parameters_channels_table_name)
-    arcpy.management.MakeTableView(parameters_channels_table, parameters_channels_table_view, expression)
-
-    arcpy.management.AddFields(channels_feature_class, "UpstreamX FLOAT # # # #;UpstreamY FLOAT # # # #;"
-                                                    "DownstreamX FLOAT # # # #;DownstreamY FLOAT # # # #"
-                                                    "CentroidX FLOAT # # # #;CentroidY FLOAT # # # #;", None)
-
-    arcpy.management.CalculateGeometryAttributes(channels_feature_class,
-                                                "UpstreamX LINE_START_X;""UpstreamY LINE_START_Y;"
-                                                "DownstreamX LINE_END_X;""DownstreamY LINE_END_Y;"
-                                                "CentroidX CENTROID_X;""CentroidY CENTROID_Y",
-                                                '', '', None, "SAME_AS_INPUT")
-
-    # Join
-    arcpy.management.AddJoin(parameters_channels_table_view, "ChannelID", channels_feature_class, "ChannelID")
-
-    # Calculate centroid
-    centroid_x_field = "{0}.{1}".format(parameters_channels_table_name, "CentroidX")
-    centroid_y_field = "{0}.{1}".format(parameters_channels_table_name, "CentroidY")
-    channels_centroid_x_field = "{0}.{1}".format(discretization_channels, "CentroidX")
-    channels_centroid_y_field = "{0}.{1}".format(discretization_channels, "CentroidY")
-    calculate_expression = "{0} !{1}!;{2} !{3}!".format(centroid_x_field, channels_centroid_x_field,
-                                                        centroid_y_field, channels_centroid_y_field)
-    arcpy.management.CalculateFields(parameters_channels_table_view, "PYTHON3",
-                                    calculate_expression, '', "NO_ENFORCE_DOMAINS")
-
-    # Remove join
-    arcpy.management.RemoveJoin(parameters_channels_table_view, discretization_channels)
-
-    # XY Table To Point
-    channels_spatial_ref = arcpy.Describe(channels_feature_class).spatialReference
-    upstream_points_name = "{}_XY_upstream".format(discretization_name)
-    upstream_points_feature_class = os.path.join(workspace, upstream_points_name)
-    arcpy.management.XYTableToPoint(channels_feature_class,
-                                    upstream_points_feature_class,
-                                    "UpstreamX", "UpstreamY", None, channels_spatial_ref)
-
-    # Sample
-    sample_upstream_name = "{}_sample_upstream".format(discretization_name)
-    sample_upstream_table = os.path.join(workspace, sample_upstream_name)
-    arcpy.sa.Sample(dem_raster, upstream_points_feature_class,
-                    sample_upstream_table, "NEAREST", "ChannelID",
-                    "CURRENT_SLICE", None, '', None, None, "ROW_WISE", "TABLE")
-
-    # XY Table To Point
-    downstream_points_name = "{}_XY_downstream".format(discretization_name)
-    downstream_points_feature_class = os.path.join(workspace, downstream_points_name)
-    arcpy.management.XYTableToPoint(channels_feature_class,
-                                    downstream_points_feature_class,
-                                    "DownstreamX", "DownstreamY", None, channels_spatial_ref)
-
-    # Sample
-    sample_downstream_name = "{}_sample_downstream".format(discretization_name)
-    sample_downstream_table = os.path.join(workspace, sample_downstream_name)
-    arcpy.sa.Sample(dem_raster, downstream_points_feature_class,
-                    sample_downstream_table, "NEAREST", "ChannelID",
-                    "CURRENT_SLICE", None, '', None, None, "ROW_WISE", "TABLE")
-
-    # Add Join
-    join_field = "ChannelID"
-    arcpy.management.AddJoin(parameters_channels_table_view, join_field, sample_upstream_name,
-                            upstream_points_name, "KEEP_ALL", "NO_INDEX_JOIN_FIELDS")
-
-    # Add Join
-    join_field = "{0}.{1}".format(parameters_channels_table_name, "ChannelID")
-    arcpy.management.AddJoin(parameters_channels_table_view, join_field, sample_downstream_name,
-                            downstream_points_name, "KEEP_ALL", "NO_INDEX_JOIN_FIELDS")
-
-    # Calculate Fields    
-    dem_path, dem_name = os.path.split(dem_raster)
-    upstream_field = "{0}.{1}".format(parameters_channels_table_name, "UpstreamElevation")
-    downstream_field = "{0}.{1}".format(parameters_channels_table_name, "DownstreamElevation")
-    sample_upstream_field = get_table_field_name(sample_upstream_table, dem_name)
-    sample_downstream_field = get_table_field_name(sample_downstream_table, dem_name)
-    calculate_expression = "{0} !{1}!;{2} !{3}!".format(upstream_field, sample_upstream_field,
-                                                        downstream_field, sample_downstream_field)
-    arcpy.management.CalculateFields(parameters_channels_table_view, "PYTHON3",
-                                    calculate_expression,
-                                    '', "NO_ENFORCE_DOMAINS")
-    # Remove Join in reverse order
-    arcpy.management.RemoveJoin(parameters_channels_table_view, sample_downstream_name)
-    arcpy.management.RemoveJoin(parameters_channels_table_view, sample_upstream_name)
-
-    # Calculate Field
-    arcpy.management.CalculateField(parameters_channels_table_view, "MeanSlope",
-                                    "(!UpstreamElevation!-!DownstreamElevation!) / !ChannelLength!", "PYTHON3", '',
-                                    "TEXT", "NO_ENFORCE_DOMAINS")
-
-    arcpy.management.Delete(parameters_channels_table_view)
-    arcpy.management.DeleteField(channels_feature_class,
-                                "UpstreamX;UpstreamY;DownstreamX;DownstreamY;CentroidX;CentroidY",
-                                "DELETE_FIELDS")
-    if not save_intermediate_outputs:
-        arcpy.management.Delete(upstream_points_feature_class)
-        arcpy.management.Delete(downstream_points_feature_class)
-        arcpy.management.Delete(sample_upstream_table)
-        arcpy.management.Delete(sample_downstream_table)
-
+    """Calculate the upstream and downstream elevations, mean slope and centroid of each channel and populate the
+    parameters_channels table. The channel endpoints are read from the geometries in one cursor pass and the DEM
+    is sampled at the cells containing them, so no fields are added to the channels feature class and no
+    intermediate datasets are created. Called from parameterize()."""
 
-def get_table_field_name(table, dem_name):
-    # depends on whether the raster is a multiband or single band raster, 
-    # sample_upstream_field and sample_downstream_field will be created with a different field name
+    parameters_channels_table = os.path.join(workspace, "parameters_channels")
+    channels_feature_class = os.path.join(workspace, f"{discretization_name}_channels")
 
-    # First, in case if dem rasster is an .img file, remove the file extension
-    field_names = [f.name for f in arcpy.ListFields(table)]
-    tale_name = os.path.basename(table)
+    fields = ["ChannelID", "SHAPE@"]
+    channels = []
+    with arcpy.da.SearchCursor(channels_feature_class, fields) as cursor:
+        for channel_id, shape in cursor:
+            first_point, last_point, centroid = shape.firstPoint, shape.lastPoint, shape.trueCentroid
+            channels.append((channel_id, first_point.X, first_point.Y, last_point.X, last_point.Y,
+                             centroid.X, centroid.Y, shape.length))
+    df_channels = pd.DataFrame(channels, columns=["ChannelID", "UpstreamX", "UpstreamY", "DownstreamX",
+                                                  "DownstreamY", "CentroidX", "CentroidY", "ChannelLength"])
+
+    df_channels["UpstreamElevation"] = agwa_raster_io.sample_points(dem_raster, df_channels.UpstreamX,
+                                                                    df_channels.UpstreamY)
+    df_channels["DownstreamElevation"] = agwa_raster_io.sample_points(dem_raster, df_channels.DownstreamX,
+                                                                      df_channels.DownstreamY)
+    df_channels["MeanSlope"] = ((df_channels.UpstreamElevation - df_channels.DownstreamElevation) /
+                                df_channels.ChannelLength)
+
+    expression = agwa_table_io.where_clause(parameters_channels_table, {"DelineationName": delineation_name,
+                                                                        "DiscretizationName": discretization_name,
+                                                                        "ParameterizationName": parameterization_name})
+    fields = ["CentroidX", "CentroidY", "UpstreamElevation", "DownstreamElevation", "MeanSlope"]
+    agwa_table_io.update_rows(parameters_channels_table, df_channels, "ChannelID", fields, where=expression)
 
-    possible_names = [dem_name, f"{dem_name}_Band_1", f"{dem_name}_Layer_1"]
-    for name in possible_names:
-        if name in field_names:
-            return f"{tale_name}.{name}"
-    raise ValueError(f"None of {possible_names} found in {table}")
-    
 
 def calculate_stream_geometries(workspace, delineation_name, discretization_name, parameterization_name,
                                 hydraulic_geometry_relationship, agwa_directory, save_intermediate_outputs):
-    parameters_channels_table_name = "parameters_channels"
-    parameters_channels_table = os.path.join(workspace, parameters_channels_table_name)
-
-    # channels table view of input delineation, discretization, and parameterization
-    delineation_name_field = arcpy.AddFieldDelimiters(workspace, "DelineationName")
-    discretization_name_field = arcpy.AddFieldDelimiters(workspace, "DiscretizationName")
-    parameterization_name_field = arcpy.AddFieldDelimiters(workspace, "ParameterizationName")
-    expression = "{0} = '{1}' And {2} = '{3}' And {4} = '{5}'".format(delineation_name_field, delineation_name,
-                                                                    discretization_name_field,
-                                                                    discretization_name,
-                                                                    parameterization_name_field,
-                                                                    parameterization_name)
-    parameters_channels_table_view = "{}_tableview".format(parameters_channels_table_name)
-    arcpy.management.MakeTableView(parameters_channels_table, parameters_channels_table_view, expression)
-
-    # Acquire channel width and depth coefficients and exponents from the hydraulic geometry relationship table
-    datafiles_directory = os.path.join(agwa_directory, "lookup_tables.gdb")
-    hgr_table = os.path.join(datafiles_directory, "HGR")
-
-    width_coefficient = None
-    width_exponent = None
-    depth_coefficient = None
-    depth_exponent = None
-    fields = ["wCoef", "wExp", "dCoef", "dExp"]
-    name_field = arcpy.AddFieldDelimiters(workspace, "HGRNAME")
-    expression = "{0} = '{1}'".format(name_field, hydraulic_geometry_relationship)
-    with arcpy.da.SearchCursor(hgr_table, fields, expression) as cursor:
-        for row in cursor:
-            width_coefficient = row[0]
-            width_exponent = row[1]
-            depth_coefficient = row[2]
-            depth_exponent = row[3]
-
-    # Calculate side slopes first so they can be used to calculate bottom width of channel from bank full depth
-    side_slope1 = 1
-    side_slope2 = 1
-    side_slope1_field = arcpy.AddFieldDelimiters(workspace, "SideSlope1")
-    side_slope2_field = arcpy.AddFieldDelimiters(workspace, "SideSlope2")
-    expression = "{0} {1};{2} {3}".format(side_slope1_field, side_slope1, side_slope2_field, side_slope2)
-    arcpy.management.CalculateFields(parameters_channels_table_view, "PYTHON3",
-                                    expression, '', "NO_ENFORCE_DOMAINS")
-
-    upstream_bankfull_depth_field = arcpy.AddFieldDelimiters(workspace, "UpstreamBankfullDepth")
-    downstream_bankfull_depth_field = arcpy.AddFieldDelimiters(workspace, "DownstreamBankfullDepth")
-    upstream_bankfull_width_field = arcpy.AddFieldDelimiters(workspace, "UpstreamBankfullWidth")
-    downstream_bankfull_width_field = arcpy.AddFieldDelimiters(workspace, "DownstreamBankfullWidth")
-    upstream_bottom_width_field = arcpy.AddFieldDelimiters(workspace, "UpstreamBottomWidth")
-    downstream_bottom_width_field = arcpy.AddFieldDelimiters(workspace, "DownstreamBottomWidth")
-    # upstream bankfull depth calculation
-    # expression = "{0} * math.pow(!UpstreamArea!, {1})".format(depth_coefficient, depth_exponent)
-    expression = "{0} * !UpstreamArea! ** {1}".format(depth_coefficient, depth_exponent)
-    arcpy.management.CalculateField(parameters_channels_table_view, upstream_bankfull_depth_field,
-                                    expression, "PYTHON3", '', "TEXT",
-                                    "NO_ENFORCE_DOMAINS")
-    # downstream bankfull depth calculation
-    # expression = "{0} * math.pow(!UpstreamArea! + !LateralArea!, {1})".format(depth_coefficient, depth_exponent)
-    expression = "{0} * (!UpstreamArea! + !LateralArea!) * {1}".format(depth_coefficient, depth_exponent)
-    arcpy.management.CalculateField(parameters_channels_table_view, downstream_bankfull_depth_field,
-                                    expression, "PYTHON3", '', "TEXT",
-                                    "NO_ENFORCE_DOMAINS")
-    # upstream bankfull width calculation
-    # expression = "{0} * math.pow(!UpstreamArea!, {1})".format(width_coefficient, width_exponent)
-    expression = "{0} * !UpstreamArea! ** {1}".format(width_coefficient, width_exponent)
-    arcpy.management.CalculateField(parameters_channels_table_view, upstream_bankfull_width_field,
-                                    expression, "PYTHON3", '', "TEXT",
-                                    "NO_ENFORCE_DOMAINS")
-    # downstream bankfull width calculation
-    # expression = "{0} * math.pow(!UpstreamArea! + !LateralArea!, {1})".format(width_coefficient, width_exponent)
-    expression = "{0} * (!UpstreamArea! + !LateralArea!) ** {1}".format(width_coefficient, width_exponent)
-    arcpy.management.CalculateField(parameters_channels_table_view, downstream_bankfull_width_field,
-                                    expression, "PYTHON3", '', "TEXT",
-                                    "NO_ENFORCE_DOMAINS")
-
-    # upstream bottom width calculation
-    expression = "!UpstreamBankfullWidth! - !UpstreamBankfullDepth! * (1/!SideSlope1! + 1/!SideSlope2!)"
-    arcpy.management.CalculateField(parameters_channels_table_view, upstream_bottom_width_field,
-                                    expression, "PYTHON3", '', "TEXT",
-                                    "NO_ENFORCE_DOMAINS")
-    # downstream bottom width calculation
-    expression = "!DownstreamBankfullWidth! - !UpstreamBankfullDepth! * (1/!SideSlope1! + 1/!SideSlope2!)"
-    arcpy.management.CalculateField(parameters_channels_table_view, downstream_bottom_width_field,
-                                    expression, "PYTHON3", '', "TEXT",
-                                    "NO_ENFORCE_DOMAINS")
+    """Calculate the side slopes, bankfull depths and widths and bottom widths of each channel with the selected
+    hydraulic geometry relationship and populate the parameters_channels table. Called from parameterize()."""
+
+    parameters_channels_table = os.path.join(workspace, "parameters_channels")
+    hgr_table = os.path.join(agwa_directory, "lookup_tables.gdb", "HGR")
+    df_hgr = agwa_element_geometry.read_hydraulic_geometry_relationships(hgr_table, hydraulic_geometry_relationship)
+
+    filters = {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+               "ParameterizationName": parameterization_name}
+    df_channels = agwa_table_io.read_table(parameters_channels_table, ["ChannelID", "UpstreamArea", "LateralArea"],
+                                           filters, null_value=0)
+
+    # Side slopes are 1 so bottom widths are the bankfull widths minus twice the bankfull depths
+    df_geometries = agwa_element_geometry.channel_geometries(df_channels, df_hgr, side_slope1=1, side_slope2=1)
+    expression = agwa_table_io.where_clause(parameters_channels_table, filters)
+    agwa_table_io.update_rows(parameters_channels_table, df_geometries, "ChannelID",
+                              agwa_element_geometry.CHANNEL_GEOMETRY_FIELDS, where=expression)
+
+
+def calculate_alternative_stream_geometries(workspace, delineation_name, discretization_name, parameterization_name,
+                                            agwa_directory, hydraulic_geometry_relationships=None):
+    """Evaluate several hydraulic geometry relationships (all relationships in lookup_tables.gdb/HGR by default)
+    for the channels of an existing parameterization and save them to the parameters_channel_geometries table,
+    one row per channel and relationship. The contributing areas are read from parameters_channels, so
+    alternative channel geometries for sensitivity runs do not require re-running the parameterization.
+    Called from the Calculate Alternative Channel Geometries tool."""
+
+    hgr_table = os.path.join(agwa_directory, "lookup_tables.gdb", "HGR")
+    df_hgr = agwa_element_geometry.read_hydraulic_geometry_relationships(hgr_table, hydraulic_geometry_relationships)
+
+    filters = {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+               "ParameterizationName": parameterization_name}
+    df_channels = agwa_parameterization_lineage.read_parameters(workspace, "parameters_channels",
+                                                                ["ChannelID", "UpstreamArea", "LateralArea"],
+                                                                delineation_name, discretization_name,
+                                                                parameterization_name, null_value=0)
+    if df_channels.empty:
+        raise Exception(f"Parameterization '{parameterization_name}' has no channel parameters. "
+                        "Run Step 4 - Parameterize Elements first.")
+    tweet(f"Evaluating {len(df_hgr)} hydraulic geometry relationships for {len(df_channels)} channels.")
+    df_geometries = agwa_element_geometry.channel_geometries(df_channels, df_hgr)
+
+    channel_geometries_table = os.path.join(workspace, CHANNEL_GEOMETRIES_TABLE)
+    if not arcpy.Exists(channel_geometries_table):
+        arcpy.CreateTable_management(workspace, CHANNEL_GEOMETRIES_TABLE)
+        for field, field_type in CHANNEL_GEOMETRIES_FIELDS:
+            arcpy.AddField_management(channel_geometries_table, field, field_type)
+
+    agwa_table_io.delete_rows(channel_geometries_table, dict(filters, HydraulicGeometryRelationship=list(df_hgr.index)))
+    df_geometries = df_geometries.assign(**filters)
+    agwa_table_io.append_rows(channel_geometries_table, df_geometries,
+                              [field for field, _ in CHANNEL_GEOMETRIES_FIELDS])
+
+    return df_geometries
 
 
 def create_parameter_tables(workspace):
@@ -995,13 +620,63 @@ def create_parameter_tables(workspace):
         arcpy.management.AddFields(stream_table_name, fields)
 
 
-def calculate_complex_slope(workspace, agwa_directory, delineation_name, discretization, parameterization_name, slope_raster,
-                                fa_raster, flow_length_raster, save_intermediate_outputs):
-    # collect inputs to flan.exe: area, flowdown, flow length, slope, stream link
+def calculate_complex_slope(workspace, delineation_name, discretization, parameterization_name, zone_raster,
+                            slope_raster, max_flow_lengths, save_intermediate_outputs):
+    """Calculate the slope profile of each hillslope and populate the parameters_hillslope_profiles table.
+    Each hillslope is divided into config.COMPLEX_SLOPE_SEGMENTS equal-length segments by flow length downstream,
+    from the divide to the channel, and the slope of a segment is the mean slope of its cells. Segments without
+    cells get the mean slope of the hillslope. All hillslopes are binned in one block-wise pass over the rasters.
+    max_flow_lengths: longest flow length of each hillslope from the zonal statistics, or None to calculate it.
+    Called from parameterize()."""
+
+    flow_length_down_raster = os.path.join(workspace, f"{discretization}_flow_length_downstream")
+    aligned_slope_raster = agwa_raster_io.align_raster(
+        slope_raster, zone_raster, os.path.join(workspace, f"intermediate_{discretization}_MeanSlope_aligned"))
+    aligned_flow_length_raster = agwa_raster_io.align_raster(
+        flow_length_down_raster, zone_raster,
+        os.path.join(workspace, f"intermediate_{discretization}_MeanFlowLength_aligned"))
+
+    filters = {"DelineationName": delineation_name, "DiscretizationName": discretization,
+               "ParameterizationName": parameterization_name}
+    df_hillslopes = agwa_table_io.read_table(os.path.join(workspace, "parameters_hillslopes"),
+                                             ["HillslopeID", "MeanSlope"], filters, null_value=0)
+    df_profiles = agwa_zonal.zonal_profiles(zone_raster, aligned_flow_length_raster, aligned_slope_raster,
+                                            df_hillslopes.HillslopeID.values, config.COMPLEX_SLOPE_SEGMENTS,
+                                            max_flow_lengths)
+    mean_slopes = df_hillslopes.set_index("HillslopeID").MeanSlope
+    df_profiles["MEAN"] = df_profiles.MEAN.fillna(df_profiles.ZoneID.map(mean_slopes))
+    df_profiles = df_profiles.rename(columns={"ZoneID": "HillslopeID", "COUNT": "CellCount", "MEAN": "MeanSlope"})
+    df_profiles["SegmentLength"] = df_profiles.UpstreamDistance - df_profiles.DownstreamDistance
+
+    profiles_table = os.path.join(workspace, "parameters_hillslope_profiles")
+    if not arcpy.Exists(profiles_table):
+        arcpy.CreateTable_management(workspace, "parameters_hillslope_profiles")
+        fields = [("DelineationName", "TEXT"),
+                  ("DiscretizationName", "TEXT"),
+                  ("ParameterizationName", "TEXT"),
+                  ("HillslopeID", "LONG"),
+                  ("Segment", "LONG"),
+                  ("UpstreamDistance", "DOUBLE"),
+                  ("DownstreamDistance", "DOUBLE"),
+                  ("SegmentLength", "DOUBLE"),
+                  ("MeanSlope", "DOUBLE"),
+                  ("CellCount", "LONG")]
+        arcpy.management.AddFields(profiles_table, fields)
+
+    agwa_table_io.delete_rows(profiles_table, filters)
+    for field, value in filters.items():
+        df_profiles[field] = value
+    agwa_table_io.append_rows(profiles_table, df_profiles,
+                              list(filters) + ["HillslopeID", "Segment", "UpstreamDistance", "DownstreamDistance",
+                                               "SegmentLength", "MeanSlope", "CellCount"])
 
-    flow_down = os.path.join(workspace, f"{discretization}_flow_length_downstream")
+    if not save_intermediate_outputs:
+        for raster, aligned_raster in [(slope_raster, aligned_slope_raster),
+                                       (flow_length_down_raster, aligned_flow_length_raster)]:
+            if aligned_raster != raster:
+                arcpy.management.Delete(aligned_raster)
 
-    return
+    return df_profiles
 
 
 def read_extract_parameters(prjgdb, delineation_name, discretization_name, parameterization_name):  
@@ -1010,18 +685,21 @@ def read_extract_parameters(prjgdb, delineation_name, discretization_name, param
    
     # Extract variables from parameterization table
     meta_parameterization_table = os.path.join(prjgdb, "metaParameterization")
-    df_meta_parameterization = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_parameterization_table, "*"))
-    df_parameterization = df_meta_parameterization[(df_meta_parameterization.DelineationName == delineation_name) &
-        (df_meta_parameterization.DiscretizationName == discretization_name) &
-        (df_meta_parameterization.ParameterizationName == parameterization_name)].to_dict("records")[0]
+    df_parameterization = agwa_table_io.read_table(
+        meta_parameterization_table, ["FlowLengthMethod", "HydraulicGeometryRelationship", "SlopeType"],
+        {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+         "ParameterizationName": parameterization_name}).to_dict("records")[0]
     flow_length_method = df_parameterization["FlowLengthMethod"]
     hgr_method = df_parameterization["HydraulicGeometryRelationship"]
     slope_method = df_parameterization["SlopeType"]
     
     # Extract variables from workspace table
     meta_workspace_table = os.path.join(prjgdb, "metaWorkspace")
-    df_meta_workspace = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_workspace_table, '*'))
-    df_workspace = df_meta_workspace[df_meta_workspace['ProjectGeoDataBase']==prjgdb].to_dict("records")[0]
+    workspace_fields = ["UnfilledDEMPath", "AGWADirectory", "SlopePath", "AspectPath"]
+    if slope_method == "Complex":
+        workspace_fields += ["FlowAccumulationPath", "FlowLengthPath"]
+    df_workspace = agwa_table_io.read_table(meta_workspace_table, workspace_fields,
+                                            {"ProjectGeoDataBase": prjgdb}).to_dict("records")[0]
     unfilled_dem_raster = df_workspace['UnfilledDEMPath']
     agwa_directory = df_workspace['AGWADirectory']
     slope_raster = df_workspace['SlopePath']
@@ -2,14 +2,49 @@ import os
 import sys
 import math
 import arcpy
+import hashlib
+import importlib
 import numpy as np
 import pandas as pd
 import arcpy.analysis
 from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 import config
+import agwa_table_io
+importlib.reload(agwa_table_io)
+import agwa_parameterization_lineage
+importlib.reload(agwa_parameterization_lineage)
+import agwa_parallel
+importlib.reload(agwa_parallel)
+import agwa_weighting
+importlib.reload(agwa_weighting)
+import agwa_raster_io
+importlib.reload(agwa_raster_io)
+import agwa_zonal
+importlib.reload(agwa_zonal)
+import agwa_step_cache
+importlib.reload(agwa_step_cache)
+import agwa_gssurgo_cache
+importlib.reload(agwa_gssurgo_cache)
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
 arcpy.env.parallelProcessingFactor = config.PARALLEL_PROCESSING_FACTOR
 
+# Area of each soil map unit in each hillslope, kept per discretization so that parameterizations with other
+# soil options (max horizons, max thickness) skip the overlay of the soil raster and the hillslopes
+SOIL_MAP_UNIT_AREAS_TABLE = "soil_map_unit_areas"
+SOIL_MAP_UNIT_AREAS_FIELDS = [("DelineationName", "TEXT"), ("DiscretizationName", "TEXT"), ("InputsHash", "TEXT"),
+                              ("HillslopeID", "LONG"), ("MUKEY", "TEXT"), ("Shape_Area", "DOUBLE")]
+
+
+# Land cover and soil parameters written by this step, which copy_parameterization lets a parameterization inherit
+LAND_COVER_AND_SOIL_FIELDS = {
+    "parameters_hillslopes": ["Ksat", "G", "Porosity", "Rock", "Sand", "Silt", "Clay", "Splash", "Cohesion", "Pave",
+                              "SMax", "CV", "Distribution", "BPressure", "Canopy", "Interception", "Manning",
+                              "Imperviousness"],
+    "parameters_channels": ["Ksat", "Manning", "Pave", "Imperviousness", "SMax", "CV", "G", "Porosity", "Rock", "Sand",
+                            "Silt", "Clay", "Splash", "Cohesion", "Distribution", "BPressure", "Woolhiser"]}
+
 
 def tweet(msg):
     """Produce a message for both arcpy and python"""
@@ -58,6 +93,8 @@ def parameterize(prjgdb, workspace, delineation_name, discretization_name, param
     functions called: extract_parameters, intersect_soils, weight_hillsope_parameters_by_area_fractions, 
     intersect_weight_land_cover_by_area, parameterize_channels"""
 
+    detach_children(workspace, delineation_name, discretization_name, parameterization_name)
+
     # Step 1. Extract parameters from the metadata tables 
     (max_thickness, max_horizons, land_cover, land_cover_lut, soil_layer_path, soils_database_path, 
      AGWA_directory, channel_type) = extract_parameters(prjgdb, delineation_name, discretization_name, 
@@ -74,18 +111,97 @@ def parameterize(prjgdb, workspace, delineation_name, discretization_name, param
                                                   channel_type, AGWA_directory)
 
 
+def parameterize_scenarios(prjgdb, workspace, delineation_name, discretization_name, parameterization_names,
+                           land_covers, land_cover_lut, soil_layer_path, soils_database_path, max_horizons,
+                           max_thickness, channel_type, save_intermediate_outputs):
+
+    """Parameterize land cover and soils for several land cover scenarios of a discretization at once: one
+    parameterization (created by Step 4 Parameterize Elements) per land cover raster of land_covers. The soils are
+    overlaid and parameterized once, the hillslopes are rasterized once for all land covers (Crosstab overlay
+    method), the land covers are counted in parallel when config.PARALLEL_PROCESSING_FACTOR allows it, and the
+    hillslope and channel parameters of all the scenarios are written with one bulk write per table."""
+
+    if len(parameterization_names) != len(land_covers):
+        raise Exception("One land cover is needed for each parameterization name.")
+    if len(set(parameterization_names)) != len(parameterization_names):
+        raise Exception("The parameterization names must be unique.")
+
+    # Step 1. Document the inputs of each scenario and get the AGWA directory
+    for parameterization_name, land_cover in zip(parameterization_names, land_covers):
+        initialize_workspace(delineation_name, discretization_name, parameterization_name, prjgdb, land_cover,
+                             land_cover_lut, soil_layer_path, soils_database_path, max_horizons, max_thickness,
+                             channel_type)
+        detach_children(workspace, delineation_name, discretization_name, parameterization_name)
+    agwa_directory = extract_parameters(prjgdb, delineation_name, discretization_name,
+                                        parameterization_names[0])[6]
+
+    # Step 2. Soils are the same for all the scenarios: overlay and weight them once
+    df_soil_areas = soil_map_unit_areas(workspace, delineation_name, discretization_name, soil_layer_path)
+    mukeys = pd.unique(df_soil_areas.MUKEY.astype(str))
+    soil_tables = soil_parameters(soils_database_path, agwa_directory, mukeys, max_thickness, max_horizons,
+                                  save_intermediate_outputs)
+    for parameterization_name in parameterization_names:
+        save_results(workspace, delineation_name, discretization_name, parameterization_name,
+                     save_intermediate_outputs, *[df.copy() if df is not None else None for df in soil_tables])
+    df_soil = weight_soil_parameters_by_area(df_soil_areas, soil_tables[3])
+
+    # Step 3. Area of each land cover class in each hillslope, for each scenario
+    if config.LAND_COVER_OVERLAY_METHOD == "Crosstab":
+        hillslope_covers = crosstab_land_covers(workspace, discretization_name, land_covers)
+    elif config.LAND_COVER_OVERLAY_METHOD == "Intersect":
+        hillslope_covers = [intersect_land_cover_polygons(workspace, delineation_name, discretization_name,
+                                                          land_cover) for land_cover in land_covers]
+    else:
+        raise Exception(f"Unknown land cover overlay method '{config.LAND_COVER_OVERLAY_METHOD}'. "
+                        "Set config.LAND_COVER_OVERLAY_METHOD to 'Crosstab' or 'Intersect'.")
+
+    # Step 4. Save the hillslope parameters of all the scenarios
+    scenarios = []
+    for parameterization_name, df_hillslope_cover in zip(parameterization_names, hillslope_covers):
+        df_cover = weight_land_cover_parameters(df_hillslope_cover, land_cover_lut, agwa_directory)
+        df_soil_cover = pd.merge(df_soil, df_cover, left_on="HillslopeID", right_on="HillslopeID", how="left")
+        scenarios.append(df_soil_cover.assign(ParameterizationName=parameterization_name))
+    tweet(f"Saving the hillslope parameters of {len(scenarios)} parameterizations to the workspace geodatabase.")
+    filters = {"DelineationName": delineation_name, "DiscretizationName": discretization_name}
+    save_parameters(workspace, "parameters_hillslopes", pd.concat(scenarios, ignore_index=True),
+                    ["ParameterizationName", "HillslopeID"], filters)
+
+    # Step 5. Channel parameters depend on the hillslope parameters saved in Step 4
+    scenarios = [calculate_channel_parameters(workspace, delineation_name, discretization_name,
+                                              parameterization_name, channel_type, agwa_directory)
+                 .assign(ParameterizationName=parameterization_name)
+                 for parameterization_name in parameterization_names]
+    tweet(f"Saving the channel parameters of {len(scenarios)} parameterizations to the workspace geodatabase.")
+    save_parameters(workspace, "parameters_channels", pd.concat(scenarios, ignore_index=True),
+                    ["ParameterizationName", "ChannelID"], filters, text_fields=["Woolhiser"])
+
+
+def detach_children(workspace, delineation_name, discretization_name, parameterization_name):
+    """Before a parameterization is parameterized again, copy the land cover and soil parameters that other
+    parameterizations inherit from it (see copy_parameterization) into them, so that their parameters do not change
+    with it. Called in parameterize and parameterize_scenarios functions."""
+
+    for table_name, fields in LAND_COVER_AND_SOIL_FIELDS.items():
+        children = agwa_parameterization_lineage.detach_children(workspace, delineation_name, discretization_name,
+                                                                 parameterization_name, table_name, fields)
+        if children:
+            tweet(f"Parameterization '{parameterization_name}' is parameterized again. The {table_name} values that "
+                  f"{', '.join(children)} inherited from it were copied into them, so they keep their values.")
+
+
 def parameterize_hillslopes(workspace, delineation_name, discretization_name, parameterization_name, 
                             soil_layer_path, soils_database_path, agwa_directory, max_thickness,
                             max_horizons, land_cover, land_cover_lut, save_intermediate_outputs):
     
     """Parameterize hillslopes. Results: 33 parameters. Called in parameterize function."""
 
-    # Step 1. intersect soils and land cover with hillslopes
-    intersect_soils(workspace, delineation_name, discretization_name, parameterization_name, soil_layer_path,
+    # Step 1. overlay soils with hillslopes, then calculate and weight the soil parameters of the map units
+    df_soil_areas = soil_map_unit_areas(workspace, delineation_name, discretization_name, soil_layer_path)
+    intersect_soils(workspace, delineation_name, discretization_name, parameterization_name, df_soil_areas,
                     soils_database_path, agwa_directory, max_thickness, max_horizons, save_intermediate_outputs)
     
     df_soil = weight_hillsope_parameters_by_area_fractions(workspace, delineation_name, discretization_name, 
-                parameterization_name,soil_layer_path, save_intermediate_outputs)
+                parameterization_name, df_soil_areas, save_intermediate_outputs)
     
     # Step 2. intersect land cover with hillslopes
     df_cover = intersect_weight_land_cover_by_area(workspace, delineation_name, discretization_name, land_cover, 
@@ -94,32 +210,9 @@ def parameterize_hillslopes(workspace, delineation_name, discretization_name, pa
     
     # Step 3. save the results to the workspace geodatabase
     tweet("Saving the results to the workspace geodatabase.")
-    arcgis_table = os.path.join(workspace, "parameters_hillslopes")
-    if not arcpy.Exists(arcgis_table):
-        raise Exception(f"The table 'parameters_hillslopes' does not exist in the workspace {workspace}.")
-    else:        
-        for column in df_soil_cover.columns:
-            if column not in [f.name for f in arcpy.ListFields(arcgis_table)]:
-                arcpy.AddField_management(arcgis_table, column, "DOUBLE")
-
-    fields = [field.name for field in arcpy.ListFields(arcgis_table)]
-    with arcpy.da.UpdateCursor(arcgis_table, fields) as cursor:
-        for row in cursor:
-            # Check conditions
-            if (row[cursor.fields.index("DelineationName")] == delineation_name and 
-                row[cursor.fields.index("DiscretizationName")] == discretization_name and 
-                row[cursor.fields.index("ParameterizationName")] == parameterization_name):
-
-                hillslope_id = row[cursor.fields.index("HillslopeID")]
-
-                # Iterate through DataFrame columns to update corresponding fields in the row
-                for column in df_soil_cover.columns:
-                    if column not in ["HillslopeID"]:  # Assuming you don't want to update HillslopeID
-                        df_value = df_soil_cover.loc[df_soil_cover["HillslopeID"] == hillslope_id, column].values
-                        if df_value.size > 0:
-                            # Update the row's field directly by name
-                            row[cursor.fields.index(column)] = df_value[0]
-            cursor.updateRow(row)
+    save_parameters(workspace, "parameters_hillslopes", df_soil_cover, "HillslopeID",
+                    {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+                     "ParameterizationName": parameterization_name})
 
 
 def parameterize_channels(workspace, delineation_name, discretization_name, parameterization_name, 
@@ -127,24 +220,36 @@ def parameterize_channels(workspace, delineation_name, discretization_name, para
     """Parameterize channel elements. Note: it is important to make sure parameters match in this function.
     Called in parameterize function."""    
 
+    df_channel_parameters = calculate_channel_parameters(workspace, delineation_name, discretization_name,
+                                                         parameterization_name, channel_type, agwa_directory)
+    # Save the results to the workspace geodatabase
+    save_parameters(workspace, "parameters_channels", df_channel_parameters, "ChannelID",
+                    {"DelineationName": delineation_name, "DiscretizationName": discretization_name,
+                     "ParameterizationName": parameterization_name}, text_fields=["Woolhiser"])
+
+
+def calculate_channel_parameters(workspace, delineation_name, discretization_name, parameterization_name,
+                                 channel_type, agwa_directory):
+    """Calculate the parameters of the channels from the parameters of their adjacent hillslopes and the channel
+    type. Returns a DataFrame with ChannelID and 18 parameters. Called in parameterize_channels and
+    parameterize_scenarios functions."""
+
+    parameters = ["Ksat", "Manning", "Pave", "Imperviousness", "SMax", "CV", "G", "Porosity", "Rock",
+                  "Sand", "Silt", "Clay", "Splash", "Cohesion", "Distribution", "BPressure"]
+
     def get_channel_parameters_based_on_adj_hillslopes(workspace, discretization_name, df_hillslope_parameters):
-        """Get channel parameters based on adjacent hillslopes. Called in parameterize_channels function.
+        """Get channel parameters based on adjacent hillslopes. Called in calculate_channel_parameters function.
         returned 17 parameters"""
 
-        parameters = ["Ksat", "Manning", "Pave", "Imperviousness", "SMax", "CV", "G", "Porosity", "Rock",
-                    "Sand", "Silt", "Clay", "Splash", "Cohesion", "Distribution", "BPressure"]                                          
+        df_channels = agwa_table_io.read_table(os.path.join(workspace, f"{discretization_name}_channels"),
+                                               ["ChannelID"])
 
-        df_channels = pd.DataFrame(arcpy.da.TableToNumPyArray(
-            os.path.join(workspace, f"{discretization_name}_channels"), ["ChannelID"]))
-
-        for channel_id in df_channels.ChannelID:
-            hillslope_ids = [channel_id-1, channel_id-2, channel_id-3]
-            hillslope_ids = [hid for hid in hillslope_ids if hid in df_hillslope_parameters.HillslopeID.values]
-            df_hillslopes_filtered = df_hillslope_parameters[df_hillslope_parameters.HillslopeID.isin(hillslope_ids)]
-            total_area = df_hillslopes_filtered.Area.sum()
-            for parameter in parameters:
-                weighted_value = (df_hillslopes_filtered[parameter] * df_hillslopes_filtered.Area).sum() / total_area
-                df_channels.loc[df_channels.ChannelID == channel_id, parameter] = weighted_value
+        # Headwater, right and left hillslopes (IDs ending in 1, 2 and 3) of a channel have ID ChannelID - 3,
+        # ChannelID - 2 and ChannelID - 1
+        df_adjacent = df_hillslope_parameters[(df_hillslope_parameters.HillslopeID % 10).isin([1, 2, 3])]
+        df_adjacent = df_adjacent.assign(ChannelID=df_adjacent.HillslopeID // 10 * 10 + 4)
+        df_weighted = agwa_weighting.weighted_mean(df_adjacent, "ChannelID", parameters, "Area")
+        df_channels = df_channels.merge(df_weighted, on="ChannelID", how="left")
 
         # Weight the texture factions, so that they sum to 1. When the sum of Sand, Silt, and Clay is 0, set them to 0.
         df_channels[["Sand", "Clay", "Silt"]] = df_channels[["Sand", "Clay", "Silt"]].div(
@@ -154,12 +259,9 @@ def parameterize_channels(workspace, delineation_name, discretization_name, para
 
     tweet("Calculating channel parameters.")
     # Get channel parameters based on weighted parameters from adjacent hillslopes (17 parameters in total)
-    df_hillslope_parameters = pd.DataFrame(arcpy.da.TableToNumPyArray(
-                                            os.path.join(workspace, "parameters_hillslopes"), "*"))
-    df_hillslope_parameters = df_hillslope_parameters[
-                                    (df_hillslope_parameters['DelineationName'] == delineation_name) & 
-                                    (df_hillslope_parameters['DiscretizationName'] == discretization_name) & 
-                                    (df_hillslope_parameters['ParameterizationName'] == parameterization_name)]
+    df_hillslope_parameters = agwa_parameterization_lineage.read_parameters(
+        workspace, "parameters_hillslopes", ["HillslopeID", "Area"] + parameters, delineation_name,
+        discretization_name, parameterization_name)
                                                 
     df_channel_parameters = get_channel_parameters_based_on_adj_hillslopes(workspace, discretization_name, 
                                                                            df_hillslope_parameters)
@@ -168,8 +270,7 @@ def parameterize_channels(workspace, delineation_name, discretization_name, para
     df_channel_parameters = df_channel_parameters.assign(Woolhiser="Yes")
 
     # Modify 3 parameters (ksat, manning, and pave) based on the user selected input channel type. 
-    df_channel_type = pd.DataFrame(arcpy.da.TableToNumPyArray(
-        os.path.join(agwa_directory, "lookup_tables.gdb", "channel_types"), "*", null_value=-9999))
+    df_channel_type = agwa_lookup_tables.channel_types(agwa_directory).fillna(-9999)
     channel_type_row = df_channel_type[df_channel_type.Channel_Type == channel_type][["Ksat", "Manning", "Pave"]]
     if not channel_type_row.empty:
         ksat, manning, pave = channel_type_row.values[0]
@@ -177,40 +278,144 @@ def parameterize_channels(workspace, delineation_name, discretization_name, para
             df_channel_parameters = df_channel_parameters.assign(Ksat=ksat, Manning=manning, Pave=pave)
     else:
         tweet(f"Channel type {channel_type} not found in the Lookup table.")
-    # Save the results to the workspace geodatabase
-    arcgis_table = os.path.join(workspace, "parameters_channels")
+
+    return df_channel_parameters
+
+
+def save_parameters(workspace, table_name, df, key_fields, filters, text_fields=()):
+    """Add the columns of df missing from the parameter table table_name (DOUBLE, or TEXT for text_fields) and
+    upsert the rows of df matched on key_fields among the rows selected by filters, see agwa_table_io.upsert_rows.
+    Rows are inserted for elements whose element parameters are inherited from a parent parameterization.
+    Called in parameterize_hillslopes, parameterize_channels and parameterize_scenarios functions."""
+
+    arcgis_table = os.path.join(workspace, table_name)
     if not arcpy.Exists(arcgis_table):
-        raise Exception(f"The table 'parameters_channels' does not exist in the workspace {workspace}.")
-    else:
-        for column in df_channel_parameters.columns:
-            if column not in [f.name for f in arcpy.ListFields(arcgis_table)]:
-                if column in ["Woolhiser"]:
-                    arcpy.AddField_management(arcgis_table, column, "TEXT")
-                else:   
-                    arcpy.AddField_management(arcgis_table, column, "DOUBLE")
-    
-    fields = [field.name for field in arcpy.ListFields(arcgis_table)]
-    with arcpy.da.UpdateCursor(arcgis_table, fields) as cursor:
-        for row in cursor:
-            if (row[cursor.fields.index("DelineationName")] == delineation_name and 
-                row[cursor.fields.index("DiscretizationName")] == discretization_name and 
-                row[cursor.fields.index("ParameterizationName")] == parameterization_name):
-
-                channel_id = row[cursor.fields.index("ChannelID")]
-                for column in df_channel_parameters.columns:
-                    if column not in ["ChannelID"]:
-                        df_value = df_channel_parameters.loc[
-                            df_channel_parameters["ChannelID"] == channel_id, column].values
-                        if df_value.size > 0:
-                            row[cursor.fields.index(column)] = df_value[0]
-                cursor.updateRow(row)
+        raise Exception(f"The table '{table_name}' does not exist in the workspace {workspace}.")
+    existing_fields = [f.name for f in arcpy.ListFields(arcgis_table)]
+    for column in df.columns:
+        if column not in existing_fields:
+            arcpy.AddField_management(arcgis_table, column, "TEXT" if column in text_fields else "DOUBLE")
+
+    agwa_table_io.upsert_rows(arcgis_table, df, key_fields, filters=filters)
 
 
 def intersect_weight_land_cover_by_area(workspace, delineation_name, discretization_name, land_cover, land_cover_lut, 
                                         agwa_directory):
 
     """Intersect land cover with hillslopes and calculate weighted parameters for each hillslope.
-    called in parameterize function."""
+    The area of each land cover class in each hillslope is calculated with the method set by
+    config.LAND_COVER_OVERLAY_METHOD. called in parameterize function."""
+
+    if config.LAND_COVER_OVERLAY_METHOD == "Crosstab":
+        df_hillslope_cover = crosstab_land_cover(workspace, discretization_name, land_cover)
+    elif config.LAND_COVER_OVERLAY_METHOD == "Intersect":
+        df_hillslope_cover = intersect_land_cover_polygons(workspace, delineation_name, discretization_name,
+                                                           land_cover)
+    else:
+        raise Exception(f"Unknown land cover overlay method '{config.LAND_COVER_OVERLAY_METHOD}'. "
+                        "Set config.LAND_COVER_OVERLAY_METHOD to 'Crosstab' or 'Intersect'.")
+
+    return weight_land_cover_parameters(df_hillslope_cover, land_cover_lut, agwa_directory)
+
+
+def weight_land_cover_parameters(df_hillslope_cover, land_cover_lut, agwa_directory):
+    """Weight the parameters of the land cover lookup table by the area of each land cover class (gridcode) in
+    each hillslope (df_hillslope_cover, with HillslopeID, gridcode and Shape_Area).
+    Called in intersect_weight_land_cover_by_area and parameterize_scenarios functions."""
+    
+    df_cover_lut = agwa_lookup_tables.land_cover_lut(agwa_lookup_tables.lookup_table_path(agwa_directory,
+                                                                                         land_cover_lut))
+    df_cover_lut = df_cover_lut.rename(columns={"NAME": "LandCoverClass", "COVER": "Canopy",
+                                                "INT": "Interception", "N": "Manning", "IMPERV": "Imperviousness"}) 
+    df_merge = pd.merge(df_hillslope_cover, df_cover_lut, left_on="gridcode", right_on="CLASS", how="left")  
+
+    tweet("Calculating weighted land cover parameters for each hillslope.")
+    parameters = ["Canopy", "Interception", "Manning", "Imperviousness"]
+    df_weighted = agwa_weighting.weighted_mean(df_merge, "HillslopeID", parameters, "Shape_Area")
+
+    return df_weighted
+
+
+def crosstab_land_cover(workspace, discretization_name, land_cover):
+    """Calculate the area of each land cover class in each hillslope by rasterizing the hillslopes onto the land
+    cover grid and counting the cells of each class, block by block. No land cover polygons are created.
+    Returns a DataFrame with HillslopeID, gridcode and Shape_Area, like the intersection feature class.
+    Called in intersect_weight_land_cover_by_area function."""
+
+    return crosstab_land_covers(workspace, discretization_name, [land_cover])[0]
+
+
+def crosstab_land_covers(workspace, discretization_name, land_covers):
+    """Cross-tabulate several land cover rasters with the hillslopes, see crosstab_land_cover. The hillslopes are
+    rasterized once onto the grid of the first land cover and the other land covers are resampled to that grid.
+    With more than one worker (see agwa_parallel.worker_count), the land covers are counted in parallel.
+    Hillslopes without a cell take the land cover class at their label point (see add_hillslopes_without_cells).
+    Returns a list of DataFrames with HillslopeID, gridcode and Shape_Area, in the order of land_covers.
+    Called in crosstab_land_cover and parameterize_scenarios functions."""
+
+    tweet("Cross-tabulating land cover classes and hillslopes.")
+    hillslope_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
+    zone_raster = os.path.join(workspace, f"intermediate_{discretization_name}_land_cover_zones")
+    agwa_raster_io.rasterize_zones(hillslope_feature_class, "HillslopeID", land_covers[0], zone_raster)
+    hillslope_ids = agwa_parallel.read_hillslope_ids(hillslope_feature_class)
+
+    if len(land_covers) > 1 and agwa_parallel.worker_count() > 1:
+        crosstabs = agwa_parallel.crosstab_rasters(zone_raster, land_covers, hillslope_ids)
+    else:
+        crosstabs = []
+        aligned_land_cover = os.path.join(workspace, f"intermediate_{discretization_name}_land_cover_aligned")
+        for land_cover in land_covers:
+            class_raster = agwa_raster_io.align_raster(land_cover, zone_raster, aligned_land_cover, "NEAREST")
+            crosstabs.append(agwa_zonal.zonal_crosstab(zone_raster, class_raster, hillslope_ids))
+            if arcpy.Exists(aligned_land_cover):
+                arcpy.Delete_management(aligned_land_cover)
+
+    if arcpy.Exists(zone_raster):
+        arcpy.Delete_management(zone_raster)
+
+    crosstabs = [add_hillslopes_without_cells(df_crosstab, hillslope_feature_class, hillslope_ids, land_cover)
+                 for df_crosstab, land_cover in zip(crosstabs, land_covers)]
+    return [pd.DataFrame({"HillslopeID": df_crosstab.ZoneID.values, "gridcode": df_crosstab.Class.values,
+                          "Shape_Area": df_crosstab.AREA.values}) for df_crosstab in crosstabs]
+
+
+def add_hillslopes_without_cells(df_crosstab, hillslope_feature_class, hillslope_ids, class_raster):
+    """Hillslopes that contain no cell center of the grid they are rasterized on (narrower or smaller than a cell)
+    have no row in df_crosstab (see agwa_zonal.zonal_crosstab). Each of them is given the class of the cell of
+    class_raster at its label point over its whole area, like a cell that is not split by the Intersect method.
+    Hillslopes whose label point is on NoData or outside class_raster are left without a class, with a warning.
+    Returns df_crosstab with a row (ZoneID, Class, COUNT of 0, AREA) for each of these hillslopes.
+    Called in crosstab_land_covers and crosstab_soil_map_units functions."""
+
+    missing_ids = sorted(set(hillslope_ids) - set(df_crosstab.ZoneID.astype(np.int64)))
+    if not missing_ids:
+        return df_crosstab
+
+    where = agwa_table_io.where_clause(hillslope_feature_class, {"HillslopeID": missing_ids})
+    with arcpy.da.SearchCursor(hillslope_feature_class, ["HillslopeID", "SHAPE@", "SHAPE@AREA"], where) as cursor:
+        df_missing = pd.DataFrame([(hillslope_id, shape.labelPoint.X, shape.labelPoint.Y, area)
+                                   for hillslope_id, shape, area in cursor], columns=["ZoneID", "X", "Y", "AREA"])
+    classes = agwa_raster_io.sample_points(class_raster, df_missing.X.values, df_missing.Y.values)
+    has_class = ~np.isnan(classes) & (classes >= 0)
+
+    tweet(f"{len(df_missing)} hillslopes contain no cell center of {class_raster}. They take the class of the cell "
+          f"at their label point.")
+    if not has_class.all():
+        arcpy.AddWarning(f"The label point of the hillslopes {df_missing.ZoneID[~has_class].tolist()} is on "
+                         f"NoData or outside {class_raster}. They have no class and no parameters from it.")
+
+    df_added = pd.DataFrame({"ZoneID": df_missing.ZoneID.values[has_class],
+                             "Class": classes[has_class].astype(np.int64), "COUNT": 0.,
+                             "AREA": df_missing.AREA.values[has_class]})
+    return pd.concat([df_crosstab, df_added], ignore_index=True).sort_values(
+        ["ZoneID", "Class"], ignore_index=True)
+
+
+def intersect_land_cover_polygons(workspace, delineation_name, discretization_name, land_cover):
+    """Calculate the area of each land cover class in each hillslope by converting the land cover raster to
+    polygons and intersecting them with the hillslopes.
+    Returns a DataFrame with HillslopeID, gridcode and Shape_Area.
+    Called in intersect_weight_land_cover_by_area function."""
 
     # test if land cover needs a buffer
     watershed_feature_class = os.path.join(workspace, f"{delineation_name}")
@@ -231,82 +436,184 @@ def intersect_weight_land_cover_by_area(workspace, delineation_name, discretizat
         clipped_lc_raster = land_cover
 
     # convert land cover raster to polygon, then intersect with hillslopes
-    hillslope_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
     land_cover_feature_class = os.path.join(workspace, f"{discretization_name}_land_cover")
     intersect_feature_class = os.path.join(workspace, f"{discretization_name}_land_cover_PairwiseIntersect")
 
     if arcpy.Exists(land_cover_feature_class):
         arcpy.Delete_management(land_cover_feature_class) ## delete this when testing is done
-    if arcpy.Exists(intersect_feature_class):
-        arcpy.Delete_management(intersect_feature_class) ## delete this when testing is done
 
     clipped_lc_raster = arcpy.sa.Int(clipped_lc_raster)
     arcpy.RasterToPolygon_conversion(clipped_lc_raster, land_cover_feature_class, "NO_SIMPLIFY", "VALUE")
-    arcpy.analysis.PairwiseIntersect(f"'{land_cover_feature_class}'; '{hillslope_feature_class}'", 
-                                     intersect_feature_class, "ALL", None, "INPUT")
-    
-    df_cover_lut = pd.DataFrame(arcpy.da.TableToNumPyArray(
-        os.path.join(agwa_directory, "lookup_tables.gdb", land_cover_lut), "*"))
+    agwa_parallel.intersect_hillslopes(workspace, delineation_name, discretization_name, land_cover_feature_class,
+                                       intersect_feature_class)
 
-    cover_lut_fields = ["CLASS", "NAME", "COVER", "INT", "N", "IMPERV"]
-    df_cover_lut = df_cover_lut[cover_lut_fields]
-    df_cover_lut = df_cover_lut.rename(columns={"NAME": "LandCoverClass", "COVER": "Canopy",
-                                                "INT": "Interception", "N": "Manning", "IMPERV": "Imperviousness"}) 
-    df_hillslope_cover = pd.DataFrame(arcpy.da.TableToNumPyArray(
+    return pd.DataFrame(arcpy.da.TableToNumPyArray(
             intersect_feature_class, ["HillslopeID", "gridcode", "Shape_Area"]))
-    df_merge = pd.merge(df_hillslope_cover, df_cover_lut, left_on="gridcode", right_on="CLASS", how="left")  
 
-    tweet("Calculating weighted land cover parameters for each hillslope.")
-    parameters = ["Canopy", "Interception", "Manning", "Imperviousness"]
-    def weight_parameters(group, weight_column):
-        weighted_par = pd.Series()
-        for param in parameters:
-            weighted_par[param] =  (group[param] * group[weight_column]).sum() / group[weight_column].sum()
-        return pd.DataFrame([weighted_par])
-        
-    df_weighted = pd.DataFrame()
-    for hillslope_id in df_merge.HillslopeID.unique():
-        df_hillslope = df_merge[df_merge.HillslopeID == hillslope_id]
-        df_weighted_values = weight_parameters(df_hillslope, "Shape_Area")
-        df_weighted_values.insert(0, "HillslopeID", hillslope_id)
-        df_weighted = pd.concat([df_weighted, df_weighted_values], axis=0, ignore_index=True)
 
-    return df_weighted
+def soil_map_unit_areas(workspace, delineation_name, discretization_name, soil_layer_path):
+    """Calculate the area of each soil map unit in each hillslope. Soil rasters are cross-tabulated with the
+    hillslopes on the soil grid when config.SOIL_OVERLAY_METHOD is "Crosstab"; soil feature classes (and soil
+    rasters with the "Intersect" method) are intersected with the hillslopes.
+    Returns a DataFrame with HillslopeID, MUKEY (as text) and Shape_Area.
+    Called in parameterize_hillslopes function."""
 
+    if config.SOIL_OVERLAY_METHOD not in ("Crosstab", "Intersect"):
+        raise Exception(f"Unknown soil overlay method '{config.SOIL_OVERLAY_METHOD}'. "
+                        "Set config.SOIL_OVERLAY_METHOD to 'Crosstab' or 'Intersect'.")
 
-def intersect_soils(workspace, delineation_name, discretization_name, parameterization_name, soil_layer_path, 
-                    soil_gdb, agwa_directory, max_thickness, max_horizons, save_intermediate_outputs):
+    desc = arcpy.Describe(soil_layer_path)
+    if desc.dataType == "RasterDataset" and config.SOIL_OVERLAY_METHOD == "Crosstab":
+        return crosstab_soil_map_units(workspace, delineation_name, discretization_name, soil_layer_path)
 
-    """Intersect soils with gSSURGO tables and calculate parameters 
-        for each soil component, horizon, and texture.
-       Outputs include tables that are saved to the workspace geodatabase.
-       called in parameterize function."""
-            
     # convert soil raster to polygon
     watershed_feature_class = os.path.join(workspace, f"{delineation_name}")
-    desc = arcpy.Describe(soil_layer_path)
     if desc.dataType == "RasterDataset":
         soil_feature_class = convert_soil_raster_to_polygon(soil_layer_path, watershed_feature_class, 
                                                             delineation_name, workspace)
     elif desc.dataType == "FeatureClass":
         soil_feature_class = soil_layer_path
+    else:
+        raise Exception(f"The soil layer {soil_layer_path} must be a raster dataset or a feature class.")
 
-    # intersect soil
-    hillslope_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
+    # intersect soil, in parallel over groups of sub-basins when config.PARALLEL_PROCESSING_FACTOR allows it
     soil_feature_class_name = os.path.basename(soil_feature_class)
     intersect_feature_class = os.path.join(workspace, 
                                 f"{discretization_name}_{soil_feature_class_name}_intersection")
-    if arcpy.Exists(intersect_feature_class):
-        arcpy.Delete_management(intersect_feature_class)  
-    arcpy.analysis.PairwiseIntersect(f"'{soil_feature_class}'; '{hillslope_feature_class}'", 
-                                     intersect_feature_class, "ALL", None, "INPUT")
-        
+    agwa_parallel.intersect_hillslopes(workspace, delineation_name, discretization_name, soil_feature_class,
+                                       intersect_feature_class)
+
+    df_soil_areas = pd.DataFrame(arcpy.da.TableToNumPyArray(intersect_feature_class,
+                                                            ["HillslopeID", "MUKEY", "Shape_Area"]))
+    df_soil_areas["MUKEY"] = df_soil_areas.MUKEY.astype(str)
+    return df_soil_areas
+
+
+def crosstab_soil_map_units(workspace, delineation_name, discretization_name, soil_raster):
+    """Calculate the area of each soil map unit in each hillslope by rasterizing the hillslopes onto the soil
+    grid and counting the cells of each map unit, block by block. No soil polygons are created. Hillslopes
+    without a cell take the map unit at their label point (see add_hillslopes_without_cells). Raster values are
+    translated to map unit keys with the MUKEY field of the raster attribute table, if any.
+
+    The result is stored in the soil_map_unit_areas table for the discretization, with a hash of the soil raster
+    (its grid, spatial reference and the modification time of its files, see agwa_step_cache.fingerprint) and of
+    the hillslopes (their IDs and geometry). With config.USE_PARAMETERIZATION_CACHE, it is read from that table
+    when the hash matches instead of being recalculated, without reading the cells of a statewide soil raster.
+    Returns a DataFrame with HillslopeID, MUKEY and Shape_Area. Called in soil_map_unit_areas function."""
+
+    hillslope_feature_class = os.path.join(workspace, f"{discretization_name}_hillslopes")
+    areas_table = os.path.join(workspace, SOIL_MAP_UNIT_AREAS_TABLE)
+    filters = {"DelineationName": delineation_name, "DiscretizationName": discretization_name}
+    inputs_hash = hashlib.sha1("".join([
+        agwa_step_cache.fingerprint(soil_raster),
+        agwa_step_cache.fingerprint(hillslope_feature_class, ["HillslopeID", "SHAPE@WKB"])]).encode()).hexdigest()
+
+    if config.USE_PARAMETERIZATION_CACHE and arcpy.Exists(areas_table):
+        df_soil_areas = agwa_table_io.read_table(areas_table, ["HillslopeID", "MUKEY", "Shape_Area"],
+                                                 {**filters, "InputsHash": inputs_hash})
+        if len(df_soil_areas):
+            tweet("Using the soil map unit areas of a previous parameterization of this discretization.")
+            df_soil_areas["MUKEY"] = df_soil_areas.MUKEY.astype(str)
+            return df_soil_areas
+
+    tweet("Cross-tabulating soil map units and hillslopes.")
+    zone_raster = os.path.join(workspace, f"intermediate_{discretization_name}_soil_zones")
+    aligned_soil = os.path.join(workspace, f"intermediate_{discretization_name}_soil_aligned")
+    agwa_raster_io.rasterize_zones(hillslope_feature_class, "HillslopeID", soil_raster, zone_raster)
+    class_raster = agwa_raster_io.align_raster(soil_raster, zone_raster, aligned_soil, "NEAREST")
+
+    hillslope_ids = agwa_parallel.read_hillslope_ids(hillslope_feature_class)
+    df_crosstab = agwa_zonal.zonal_crosstab(zone_raster, class_raster, hillslope_ids)
+    df_crosstab = add_hillslopes_without_cells(df_crosstab, hillslope_feature_class, hillslope_ids, soil_raster)
+
+    for raster in [zone_raster, aligned_soil]:
+        if arcpy.Exists(raster):
+            arcpy.Delete_management(raster)
+
+    raster_fields = {field.name.upper(): field.name for field in arcpy.ListFields(soil_raster)}
+    if "MUKEY" in raster_fields:
+        df_attributes = agwa_table_io.read_table(soil_raster, [raster_fields["VALUE"], raster_fields["MUKEY"]])
+        mukeys = dict(zip(df_attributes.iloc[:, 0].astype(np.int64), df_attributes.iloc[:, 1].astype(str)))
+        map_unit_keys = df_crosstab.Class.map(mukeys)
+        if map_unit_keys.isna().any():
+            raise Exception(f"Some values of the soil raster {soil_raster} have no MUKEY in its attribute table.")
+    else:
+        map_unit_keys = df_crosstab.Class.astype(str)
+
+    df_soil_areas = pd.DataFrame({"HillslopeID": df_crosstab.ZoneID.values, "MUKEY": map_unit_keys.values,
+                                  "Shape_Area": df_crosstab.AREA.values})
+
+    if not arcpy.Exists(areas_table):
+        arcpy.CreateTable_management(workspace, SOIL_MAP_UNIT_AREAS_TABLE)
+        for field, field_type in SOIL_MAP_UNIT_AREAS_FIELDS:
+            arcpy.AddField_management(areas_table, field, field_type)
+    agwa_table_io.delete_rows(areas_table, filters)
+    agwa_table_io.append_rows(areas_table, df_soil_areas.assign(**filters, InputsHash=inputs_hash),
+                              [field for field, _ in SOIL_MAP_UNIT_AREAS_FIELDS])
+
+    return df_soil_areas
+
+
+def intersect_soils(workspace, delineation_name, discretization_name, parameterization_name, df_soil_areas, 
+                    soil_gdb, agwa_directory, max_thickness, max_horizons, save_intermediate_outputs):
+
+    """Join the soil map units of the hillslopes (df_soil_areas, see soil_map_unit_areas) with gSSURGO tables
+        and calculate parameters for each soil component, horizon, and texture (see soil_parameters).
+       Outputs include tables that are saved to the workspace geodatabase.
+       called in parameterize function."""
+
+    mukeys = pd.unique(df_soil_areas.MUKEY.astype(str))
+    soil_tables = soil_parameters(soil_gdb, agwa_directory, mukeys, max_thickness, max_horizons,
+                                  save_intermediate_outputs)
+    save_results(workspace, delineation_name, discretization_name, parameterization_name, save_intermediate_outputs,
+                 *soil_tables)
+
+
+def soil_parameters(soil_gdb, agwa_directory, mukeys, max_thickness, max_horizons, save_intermediate_outputs):
+    """Soil parameters of the map units mukeys. When a soil parameter index was built for the database and options
+    (see code_build_soil_parameter_index) and intermediate outputs are not saved, the weighted parameters are
+    read from the index, otherwise they are calculated (see calculate_soil_parameters).
+    Returns the horizons with their textures and the horizon parameters (None when read from the index), and
+    the parameters weighted by horizon and by component. Called in intersect_soils and parameterize_scenarios
+    functions."""
+
+    kin_lut_table = agwa_lookup_tables.lookup_table_path(agwa_directory, "kin_lut")
+    if config.USE_SOIL_PARAMETER_INDEX and not save_intermediate_outputs:
+        index_tables = agwa_gssurgo_cache.read_soil_index(soil_gdb, kin_lut_table, max_horizons, max_thickness,
+                                                          mukeys)
+        if index_tables is not None:
+            tweet("Reading the weighted soil parameters of the map units from the soil parameter index.")
+            # rows in the order of the map units of the hillslopes, as if they had been calculated here
+            map_unit_order = {mukey: order for order, mukey in enumerate(mukeys)}
+            df_weighted_by_horizon, df_weighted_by_component = (
+                df.iloc[np.argsort(df.MapUnitKey.map(map_unit_order).values, kind="stable")].reset_index(drop=True)
+                for df in index_tables)
+            return None, None, df_weighted_by_horizon, df_weighted_by_component
+
+    (df_horizon_parameters_with_textures, df_horizon_parameters, df_weighted_by_horizon, df_weighted_by_component,
+     textures_not_usda_type) = calculate_soil_parameters(soil_gdb, kin_lut_table, mukeys, max_thickness,
+                                                         max_horizons)
+
+    textures_not_usda_type_set = set(textures_not_usda_type)
+    textures_not_usda_string = ", ".join(textures_not_usda_type_set)
+    tweet(f"Textures not matching the 12 standard USDA types: {textures_not_usda_string}. \n"
+           "    Soil parameters for these textures were estimated by AGWA.")
+    return (df_horizon_parameters_with_textures, df_horizon_parameters, df_weighted_by_horizon,
+            df_weighted_by_component)
+
+
+def calculate_soil_parameters(soil_gdb, kin_lut_table, mukeys, max_thickness, max_horizons):
+    """Read the gSSURGO tables of the map units mukeys and the kin_lut table, and calculate the parameters of each
+    horizon and the parameters weighted by horizon and by component.
+    Returns the horizons with their textures, the horizon parameters, the parameters weighted by horizon and by
+    component, and the list of textures that are not standard USDA textures.
+    Called in intersect_soils function and when building the soil parameter index."""
+
     # reading tables from AGWA directory and gSSURGO database
     component_table = os.path.join(soil_gdb, "component")
     horizon_table = os.path.join(soil_gdb, "chorizon")
     texture_table = os.path.join(soil_gdb, "chtexture")
     texture_group_table = os.path.join(soil_gdb, "chtexturegrp")
-    kin_lut_table = os.path.join(agwa_directory, "lookup_tables.gdb", "kin_lut")
     
     # define fields needed and read tables into dataframes
     component_fields = ["cokey", "comppct_r", "mukey"]
@@ -314,110 +621,29 @@ def intersect_soils(workspace, delineation_name, discretization_name, parameteri
                       "dbthirdbar_r", "partdensity", "sieveno10_r", "kwfact"]
     texture_group_fields = ["chkey", "chtgkey", "texture"]
     texture_fields = ["chtgkey", "texcl", "lieutex"]
-    kin_lut_fields = ["TextureName", "KS", "G", "POR", "SMAX", "CV", "SAND", "SILT", "CLAY", "DIST", "KFF", "BPressure"]
-    df_mapunit = pd.DataFrame(arcpy.da.TableToNumPyArray(intersect_feature_class, ["mukey"]))
-    df_component = pd.DataFrame(arcpy.da.TableToNumPyArray(component_table, component_fields, skip_nulls=False))
-    df_horizon = pd.DataFrame(arcpy.da.TableToNumPyArray(horizon_table, horizon_fields))
-    df_texture_group = pd.DataFrame(arcpy.da.TableToNumPyArray(texture_group_table, texture_group_fields))
-    df_texture = pd.DataFrame(arcpy.da.TableToNumPyArray(texture_table, texture_fields))
-    df_kin_lut = pd.DataFrame(arcpy.da.TableToNumPyArray(kin_lut_table, kin_lut_fields))
-
-    # start processing each mukey found in the intersection feature class
-    df_horizon_parameters_with_textures = pd.DataFrame()
-    df_horizon_parameters = pd.DataFrame()
-    
-    # Loop 1: process each mukey
-    df_component.mukey = df_component.mukey.astype(str)
-    df_mapunit.mukey = df_mapunit.mukey.astype(str)
-    unique_mukeys = df_mapunit["mukey"].unique()
-    textures_not_usda_type = []
-
-    for mukey in unique_mukeys:
-        
-        df_component_filtered = df_component[df_component["mukey"] == mukey]
-        
-        # Loop 2: process each component
-        for _, row in df_component_filtered.iterrows():
-            component_id = row.cokey
-            ComponentPercentage = row.comppct_r           
-
-            # Loop 3: process each horizon
-            df_horizon_filtered = df_horizon[(df_horizon["cokey"] == component_id) & 
-                                             (df_horizon["hzdept_r"] < max_thickness)].reset_index(drop=True)
-            if df_horizon_filtered.empty:
-                continue
-            horizon_count = 0            
-            for _, row in df_horizon_filtered.iterrows():    
-                horizon_count += 1
-                if not (max_horizons == 0 or horizon_count <= max_horizons):
-                    break
-                horizon_id = row.chkey
-                horizon_parameters = query_soil_horizon_parameters(row, horizon_count, max_horizons)
-                horizon_parameters["MapUnitKey"] = mukey
-                horizon_parameters["ComponentId"] = component_id
-                horizon_parameters["ComponentPercentage"] = ComponentPercentage
-
-                # Loop 4: process texture group  
-                # there is a potential issue here: from the gSSURGO tables, 1 horizon can have multiple texture groups
-                df_texture_group_filtered = df_texture_group[df_texture_group["chkey"] == horizon_id]
-                for _, row in df_texture_group_filtered.iterrows():
-                    texture_group_id, texture_in_group_table = row.chtgkey, row.texture
-
-                    # Loop 5: process texture (Loop 5 is not used in VB file?)
-                    for _, row in df_texture[df_texture["chtgkey"] == texture_group_id].iterrows():
-                        texture = row.texcl if row.texcl != "None" else row.lieutex
-                        # print(mukey, component_id, horizon_id, texture_group_id,texture_in_group_table, texture)             
-                        new_row = {"MapUnitKey": mukey, "ComponentId": component_id, "HorizonId": horizon_id,
-                                   "TextureGroupId": texture_group_id, "Texture": texture} 
-                        df_horizon_parameters_with_textures = pd.concat(
-                            [df_horizon_parameters_with_textures, pd.DataFrame([new_row])], axis=0, ignore_index=True)
-                
-                # Query the kin_lut table based on soil texture with the last "texture".
-                texture_is_usda_type, texture_in_kinlut, horizon_parameters = (
-                    query_kin_lut_update_horizon_parameters(df_kin_lut, texture, horizon_parameters))
-                
-                if not texture_is_usda_type:
-                    textures_not_usda_type.append(texture)  
-
-                if texture_in_kinlut:                     
-                    horizon_parameters["TextureGroupId"] = texture_group_id
-                    horizon_parameters["Texture"] = texture_in_group_table
-                    horizon_parameters["Texture_texcl"] = texture
-                    # The following code is from the original VB code, which assigns 
-                    # Pave = 1 when the texture is one of ["WB", "UWB", "ICE", "CEM", "IND", "GYP"].
-                    # "BR" and "CEM_BR", both of which represent bedrock in the gSSURGO_CA database, are added to the list.
-                    # "VAR", which means "variable" in the gSSURGO_CA database, is also added,
-                    # but it needs to be confirmed if Pave=1 is correct for this type.
-                    # The list could potentially be updated and expanded with applying gSSURGO database in other States.
-                    if texture_in_group_table in ["WB", "UWB", "ICE", "CEM", "IND", "GYP", "BR", "CEM_BR", "VAR"]:
-                        horizon_parameters["Pave"] = 1
-                        # When Pave=1, Sand, Clay and Silt are set to 0.33, 0.33, and 0.34, respectively. 
-                        # The values do not matter, but they need to sum to 1, so K2 can be executed.
-                        # Also, they will be excluded from the calculation of the weighted parameters.
-                        horizon_parameters["Sand"] = 0.33
-                        horizon_parameters["Clay"] = 0.33
-                        horizon_parameters["Silt"] = 0.34
-                    else:
-                        horizon_parameters["Pave"] = 0
-
-                    # Update horizon_parameters with the texture group and texture
-                    df_horizon_parameters = pd.concat([df_horizon_parameters, 
-                                                       pd.DataFrame([horizon_parameters])], axis=0, ignore_index=True)
-                else:
-                    # Note: If the 'texture_in_kinlut_flag' is False, 
-                    # the variables SMax, CV, Distribution, and BPressure will not hold any values.
-                    # As a result, the execution of K2 will not be possible under this condition.
-                    raise Exception(f"Texture {texture} is not found in the AGWA lookup table. "
-                                    "Please add the texture to the lookup table.")
-
-    textures_not_usda_type_set = set(textures_not_usda_type)
-    textures_not_usda_string = ", ".join(textures_not_usda_type_set)
-    tweet(f"Textures not matching the 12 standard USDA types: {textures_not_usda_string}. \n"
-           "    Soil parameters for these textures were estimated by AGWA.")
+    df_mapunit = pd.DataFrame({"mukey": mukeys})
+    if config.USE_GSSURGO_CACHE:
+        # only the rows of the map units of the watershed are read from the cached gSSURGO tables
+        soil_tables = agwa_gssurgo_cache.read_soil_tables(soil_gdb, pd.unique(df_mapunit.mukey))
+        df_component = soil_tables["component"][component_fields]
+        df_horizon = soil_tables["chorizon"][horizon_fields]
+        df_texture_group = soil_tables["chtexturegrp"][texture_group_fields]
+        df_texture = soil_tables["chtexture"][texture_fields]
+    else:
+        df_component = pd.DataFrame(arcpy.da.TableToNumPyArray(component_table, component_fields, 
+                                                               skip_nulls=False))
+        df_horizon = pd.DataFrame(arcpy.da.TableToNumPyArray(horizon_table, horizon_fields))
+        df_texture_group = pd.DataFrame(arcpy.da.TableToNumPyArray(texture_group_table, texture_group_fields))
+        df_texture = pd.DataFrame(arcpy.da.TableToNumPyArray(texture_table, texture_fields))
+    df_kin_lut = agwa_lookup_tables.read_lookup_table(kin_lut_table, agwa_lookup_tables.KIN_LUT_FIELDS)
+
+    df_horizon_parameters_with_textures, df_horizon_parameters, textures_not_usda_type = (
+        calculate_horizon_parameters(df_mapunit, df_component, df_horizon, df_texture_group, df_texture, df_kin_lut,
+                                     max_thickness, max_horizons))
     df_weighted_by_horizon, df_weighted_by_component = calculate_weighted_hillslope_soil_parameters(df_horizon_parameters)
-    save_results(workspace, delineation_name, discretization_name, parameterization_name, save_intermediate_outputs,
-                 df_horizon_parameters_with_textures, df_horizon_parameters, df_weighted_by_horizon, 
-                 df_weighted_by_component)
+
+    return (df_horizon_parameters_with_textures, df_horizon_parameters, df_weighted_by_horizon,
+            df_weighted_by_component, textures_not_usda_type)
     
 
 def save_results(workspace, delineation_name, discretization_name, parameterization_name, save_intermediate_outputs,
@@ -459,88 +685,169 @@ def save_results(workspace, delineation_name, discretization_name, parameterizat
                 else:
                     arcpy.AddField_management(arcgis_table, column, "DOUBLE")
         # instert rows from df
-        with arcpy.da.InsertCursor(arcgis_table, df.columns.tolist()) as cursor:
-            for row in df.itertuples(index=False):
-                cursor.insertRow(row)
-
-
-def query_soil_horizon_parameters(row, horizon_count, max_horizons):
-    """Query soil horizon parameters. Called in intersect_soils function."""
-    
-    if not (max_horizons == 0 or horizon_count <= max_horizons):
-        return pd.Series()
-
-    try: 
-        # calculate horizon thickness and total thickness
-        horizon_id = row.chkey
-        # Horizon thickness=Bottom depth-Top depth 
-        # (from gSSURGO chorizon table, bottom depth is always greater than top depth)
-        horizon_thickness = row.hzdepb_r - row.hzdept_r 
-        # SSURGO table has ksat in micrometers per second, which needs to be converted to mm/hr
-        # 1 mm / 1000 mm * 3600 seconds / 1 hour
-        horizon_ksat = row.ksat_r * 1 / 1000 * 3600 / 1
-        # Calculate G based on ksat using relationship derived by Goodrich, 1990 dissertation
-        # G = 4.83 * (1 / ksat) * 0.326
-        # Note his calculation are in English units, so conversions from Ks in mm/hr to in/hr
-        # is used in the equation to derive G in inches, which is then converted back to
-        # Alternate calculate derived by Haiyan Wei 2016 is G = 362.41 * KS ^ -0.378
-        # Haiyan in July 2024: the equation may be updated in the future
+        agwa_table_io.append_rows(arcgis_table, df)
+
+
+def calculate_horizon_parameters(df_mapunit, df_component, df_horizon, df_texture_group, df_texture, df_kin_lut,
+                                 max_thickness, max_horizons):
+    """Join the map units found in the intersection with the gSSURGO component, chorizon, chtexturegrp and
+    chtexture tables and the kin_lut table, and calculate the parameters of each horizon.
+    Rows are in the order the tables were previously walked (map unit, component, horizon, texture group,
+    texture), so the parameters_soil_* tables are unchanged. Called in intersect_soils function.
+    Returns the horizons with their textures, the horizon parameters and the list of textures that are not
+    standard USDA textures."""
+
+    # Map units in order of appearance, their components and the horizons of each component above max_thickness
+    df_mapunits = pd.DataFrame({"mukey": pd.unique(df_mapunit.mukey.astype(str))})
+    df_mapunits["MapUnitOrder"] = np.arange(len(df_mapunits))
+    df_components = df_component.assign(mukey=df_component.mukey.astype(str),
+                                        ComponentOrder=np.arange(len(df_component)))
+    df_horizons = df_horizon[df_horizon["hzdept_r"] < max_thickness]
+    df_horizons = df_horizons.assign(HorizonOrder=np.arange(len(df_horizons)))
+    df = (df_mapunits.merge(df_components, on="mukey")
+          .merge(df_horizons, on="cokey")
+          .sort_values(["MapUnitOrder", "ComponentOrder", "HorizonOrder"], kind="stable")
+          .reset_index(drop=True))
+
+    # Rank the horizons of each component and keep the first max_horizons (all of them when max_horizons is 0)
+    df["HorizonNumber"] = df.groupby(["MapUnitOrder", "ComponentOrder"]).cumcount() + 1
+    if max_horizons != 0:
+        df = df[df.HorizonNumber <= max_horizons].reset_index(drop=True)
+    df["HorizonSequence"] = np.arange(len(df))
+
+    df_parameters = calculate_ssurgo_horizon_parameters(df)
+
+    # Textures of each horizon. The texture is texcl, or lieutex when texcl is empty.
+    df_groups = df_texture_group.assign(GroupOrder=np.arange(len(df_texture_group)))
+    df_textures = df_texture.assign(TextureOrder=np.arange(len(df_texture)))
+    df_textures["TextureName"] = np.where(df_textures.texcl != "None", df_textures.texcl, df_textures.lieutex)
+    df_horizon_textures = (df[["HorizonSequence", "mukey", "cokey", "chkey"]]
+                           .merge(df_groups, on="chkey")
+                           .merge(df_textures, on="chtgkey", how="left")
+                           .sort_values(["HorizonSequence", "GroupOrder", "TextureOrder"], kind="stable"))
+    df_with_textures = df_horizon_textures[df_horizon_textures.TextureOrder.notna()]
+    df_horizon_parameters_with_textures = pd.DataFrame({"MapUnitKey": df_with_textures.mukey.values,
+                                                        "ComponentId": df_with_textures.cokey.values,
+                                                        "HorizonId": df_with_textures.chkey.values,
+                                                        "TextureGroupId": df_with_textures.chtgkey.values,
+                                                        "Texture": df_with_textures.TextureName.values})
+
+    # Each horizon uses its last texture group and the last texture found in its groups. A horizon without
+    # texture groups or textures keeps the ones of the previous horizon of its component, as the original nested
+    # loops did. The texture is never taken from another component, so the parameters of a map unit do not depend
+    # on the map units calculated with it (the soil parameter index holds every map unit of the database).
+    # Fallback: horizons above the first textured horizon of a component take the texture below them, and
+    # components without any texture are left out, like components without horizons above max_thickness.
+    df_last_group = df_horizon_textures.groupby("HorizonSequence")[["chtgkey", "texture"]].last()
+    df_last_texture = df_with_textures.groupby("HorizonSequence")["TextureName"].last()
+    df_horizon_texture = df_last_group.reindex(df.HorizonSequence.values)
+    df_horizon_texture["TextureName"] = df_last_texture.reindex(df.HorizonSequence.values).values
+    components = [df.MapUnitOrder.values, df.ComponentOrder.values]
+    df_horizon_texture = df_horizon_texture.groupby(components).ffill()
+    df_horizon_texture = df_horizon_texture.groupby(components).bfill()
+
+    has_texture = df_horizon_texture.TextureName.notna().values
+    if not has_texture.all():
+        untextured = df[~has_texture].drop_duplicates(["MapUnitOrder", "ComponentOrder"])
+        tweet(f"Warning: {len(untextured)} soil components have no texture in the gSSURGO database "
+              f"(components {', '.join(untextured.cokey.astype(str).values[:10])}). These components will be ignored "
+              "in the calculation of weighted parameters.")
+        df = df[has_texture].reset_index(drop=True)
+        df_parameters = df_parameters[has_texture].reset_index(drop=True)
+        df_horizon_texture = df_horizon_texture[has_texture]
+
+    df_parameters["MapUnitKey"] = df.mukey.values
+    df_parameters["ComponentId"] = df.cokey.values
+    df_parameters["ComponentPercentage"] = df.comppct_r.values
+    texture_group_ids = df_horizon_texture.chtgkey.values
+    textures_in_group_table = df_horizon_texture.texture.values
+    textures = df_horizon_texture.TextureName.values
+
+    usda_standard_texture = ["Clay", "Clay loam", "Loam", "Loamy sand", "Sand", "Sandy clay",
+                "Sandy clay loam", "Sandy loam", "Silt", "Silt loam", "Silty clay", "Silty clay loam"]
+    textures_not_usda_type = [texture for texture in textures if texture not in usda_standard_texture]
+
+    df_parameters = update_horizon_parameters_from_kin_lut(df_parameters, df_kin_lut, textures)
+
+    df_parameters["TextureGroupId"] = texture_group_ids
+    df_parameters["Texture"] = textures_in_group_table
+    df_parameters["Texture_texcl"] = textures
+    # The following code is from the original VB code, which assigns 
+    # Pave = 1 when the texture is one of ["WB", "UWB", "ICE", "CEM", "IND", "GYP"].
+    # "BR" and "CEM_BR", both of which represent bedrock in the gSSURGO_CA database, are added to the list.
+    # "VAR", which means "variable" in the gSSURGO_CA database, is also added,
+    # but it needs to be confirmed if Pave=1 is correct for this type.
+    # The list could potentially be updated and expanded with applying gSSURGO database in other States.
+    paved = np.isin(textures_in_group_table, ["WB", "UWB", "ICE", "CEM", "IND", "GYP", "BR", "CEM_BR", "VAR"])
+    df_parameters["Pave"] = paved.astype(int)
+    # When Pave=1, Sand, Clay and Silt are set to 0.33, 0.33, and 0.34, respectively. 
+    # The values do not matter, but they need to sum to 1, so K2 can be executed.
+    # Also, they will be excluded from the calculation of the weighted parameters.
+    df_parameters.loc[paved, "Sand"] = 0.33
+    df_parameters.loc[paved, "Clay"] = 0.33
+    df_parameters.loc[paved, "Silt"] = 0.34
+
+    return df_horizon_parameters_with_textures, df_parameters, textures_not_usda_type
+
+
+def calculate_ssurgo_horizon_parameters(df):
+    """Calculate the parameters of each horizon from the gSSURGO chorizon fields of df.
+    Returns a DataFrame with 15 parameters. Called in calculate_horizon_parameters function."""
+
+    # Horizon thickness=Bottom depth-Top depth 
+    # (from gSSURGO chorizon table, bottom depth is always greater than top depth)
+    horizon_thickness = df.hzdepb_r - df.hzdept_r
+    # SSURGO table has ksat in micrometers per second, which needs to be converted to mm/hr
+    # 1 mm / 1000 mm * 3600 seconds / 1 hour
+    horizon_ksat = df.ksat_r * 1 / 1000 * 3600 / 1
+    # Calculate G based on ksat using relationship derived by Goodrich, 1990 dissertation
+    # G = 4.83 * (1 / ksat) * 0.326
+    # Note his calculation are in English units, so conversions from Ks in mm/hr to in/hr
+    # is used in the equation to derive G in inches, which is then converted back to
+    # Alternate calculate derived by Haiyan Wei 2016 is G = 362.41 * KS ^ -0.378
+    # Haiyan in July 2024: the equation may be updated in the future
+    with np.errstate(divide="ignore"):
         horizon_g = 25.4 * (4.83 * (1 / (horizon_ksat / 25.4)) ** 0.326)
 
-        horizon_sand = row.sandtotal_r / 100
-        horizon_silt = row.silttotal_r / 100
-        horizon_clay = row.claytotal_r / 100
-        kwfact = row.kwfact
-        if kwfact == 'None':
-            kwfact = 0.2 # from VB code
-        #TODO from Shea: update the reference for the following equations
-        horizon_splash = 422 * float(kwfact) * 0.8
-        if horizon_clay <= 0.22:
-            horizon_cohesion = 5.6 * float(kwfact) / (188 - (468 * horizon_clay)
-                                        + (907 * (horizon_clay ** 2))) * 0.5
-        else:
-            horizon_cohesion = 5.6 * float(kwfact) / 130 * 0.5
-        bulk_density = row.dbthirdbar_r # dbthirdbar_r is moist bulk density
-        specific_gravity = row.partdensity
-        # sieve_no_10 is soil fraction passing a number 10 sieve (2.00mm square opening) as a weight
-        # percentage of the less than 3 inch (76.4mm) fraction.
-        # effectively percent soil
-        sieve_no_10 = row.sieveno10_r
-        horizon_rock = 1 - (sieve_no_10 / 100)
-        # reference: https://water.usgs.gov/GIS/metadata/usgswrd/XML/ds866_ssurgo_variables.xml
-        # porosity = 1 - ((bulk density) / (particle density))
-        # bulk density = dbthirdbar_r from SSURGO chorizon table
-        # particle density = partdensity from SSURGO chorizon table
-        if not(math.isnan(bulk_density) or math.isnan(specific_gravity)):
-            horizon_porosity = 1 - (bulk_density / specific_gravity)
-        else:
-            horizon_porosity = np.nan            
-        # rock_by_weight = ((1 - horizon_porosity) * (1 - horizon_rock)) /
-        # (1 - (horizon_porosity * (1 - horizon_rock)))
-
-        new_row = {
-            "HorizonId": horizon_id,
-            "HorizonNumber": horizon_count,
-            "HorizonTopDepth": row.hzdept_r,
-            "HorizonBottomDepth": row.hzdepb_r,
-            "HorizonThickness": horizon_thickness,
-            "Ksat": horizon_ksat,
-            "G": horizon_g,
-            "Porosity": horizon_porosity,
-            "Rock": horizon_rock,
-            "Sand": horizon_sand,
-            "Silt": horizon_silt,
-            "Clay": horizon_clay,
-            "kwfact": kwfact,
-            "Splash": horizon_splash,
-            "Cohesion": horizon_cohesion} # 15 parameters in total
-        
-        horizon_parameters = pd.DataFrame([new_row]).squeeze()
-    
-    except Exception as e:
-        horizon_parameters = pd.Series()
-
-    return horizon_parameters
+    horizon_sand = df.sandtotal_r / 100
+    horizon_silt = df.silttotal_r / 100
+    horizon_clay = df.claytotal_r / 100
+    kwfact = df.kwfact.where(df.kwfact != "None", 0.2)  # from VB code
+    kf = pd.to_numeric(kwfact).astype(float)
+    #TODO from Shea: update the reference for the following equations
+    horizon_splash = 422 * kf * 0.8
+    horizon_cohesion = np.where(horizon_clay <= 0.22,
+                                5.6 * kf / (188 - (468 * horizon_clay) + (907 * (horizon_clay ** 2))) * 0.5,
+                                5.6 * kf / 130 * 0.5)
+    # sieve_no_10 is soil fraction passing a number 10 sieve (2.00mm square opening) as a weight
+    # percentage of the less than 3 inch (76.4mm) fraction.
+    # effectively percent soil
+    horizon_rock = 1 - (df.sieveno10_r / 100)
+    # reference: https://water.usgs.gov/GIS/metadata/usgswrd/XML/ds866_ssurgo_variables.xml
+    # porosity = 1 - ((bulk density) / (particle density))
+    # bulk density = dbthirdbar_r (moist bulk density) from SSURGO chorizon table
+    # particle density = partdensity from SSURGO chorizon table
+    with np.errstate(divide="ignore", invalid="ignore"):
+        horizon_porosity = 1 - (df.dbthirdbar_r / df.partdensity)
+    # rock_by_weight = ((1 - horizon_porosity) * (1 - horizon_rock)) /
+    # (1 - (horizon_porosity * (1 - horizon_rock)))
+
+    return pd.DataFrame({
+        "HorizonId": df.chkey.values,
+        "HorizonNumber": df.HorizonNumber.values,
+        "HorizonTopDepth": df.hzdept_r.values,
+        "HorizonBottomDepth": df.hzdepb_r.values,
+        "HorizonThickness": horizon_thickness.values,
+        "Ksat": horizon_ksat.values,
+        "G": np.asarray(horizon_g),
+        "Porosity": horizon_porosity.values,
+        "Rock": horizon_rock.values,
+        "Sand": horizon_sand.values,
+        "Silt": horizon_silt.values,
+        "Clay": horizon_clay.values,
+        "kwfact": kwfact.values,
+        "Splash": horizon_splash.values,
+        "Cohesion": horizon_cohesion})  # 15 parameters in total
 
 
 def calculate_weighted_hillslope_soil_parameters(df):
@@ -574,141 +881,102 @@ def calculate_weighted_hillslope_soil_parameters(df):
     parameters = ["Ksat", "G", "Porosity", "Rock", "Sand", "Silt", "Clay", "Splash", "Cohesion", "Pave", 
                   "SMax", "CV", "Distribution", "BPressure"]
 
-    df_weighted_horizon = pd.DataFrame()
-    df_weighted_component = pd.DataFrame()
-
-    def weight_parameters(group, weight_column):
-        weighted_par = pd.Series()
-        for param in parameters:
-            weighted_par[param] = (group[param] * group[weight_column]).sum() / group[weight_column].sum()
-        # weight the texture factions, so that they sum to 1
-        total_particle = weighted_par['Sand'] + weighted_par['Silt'] + weighted_par['Clay']
-        if total_particle != 0:
-            weighted_par['Sand'] /= total_particle
-            weighted_par['Silt'] /= total_particle
-            weighted_par['Clay'] /= total_particle            
-        return pd.DataFrame([weighted_par])
-        
-    for mukey in df.MapUnitKey.unique():
-        df_soil = df[df.MapUnitKey == mukey]
-        for component_id in df.ComponentId.unique():
-            df_component = df_soil[df_soil.ComponentId == component_id]
-            for horizon_id in df_component.HorizonId.unique():
-                df_horizon = df_component[df_component.HorizonId == horizon_id]
-                df_weighted_values = weight_parameters(df_horizon, "HorizonThickness")
-                df_weighted_values.insert(0, "MapUnitKey", mukey)
-                df_weighted_values.insert(1, "ComponentId", component_id)
-                df_weighted_values.insert(2, "HorizonId", horizon_id)
-                df_weighted_values.insert(3, "TotalHorizonThickness", df_horizon["HorizonThickness"].sum())                
-                df_weighted_values.insert(4, "ComponentPercentage", df_horizon["ComponentPercentage"].values[0])
-                df_weighted_horizon = pd.concat([df_weighted_horizon, df_weighted_values], axis=0, ignore_index=True)
-    
-    for mukey in df_weighted_horizon.MapUnitKey.unique():
-        df_component = df_weighted_horizon[df_weighted_horizon.MapUnitKey == mukey]
-        df_weighted_values = weight_parameters(df_component, "ComponentPercentage")
-        df_weighted_values.insert(0, "MapUnitKey", mukey)
-        df_weighted_values.insert(1, "TotalComponentPercentage", df_component["ComponentPercentage"].sum())   
-        df_weighted_component = pd.concat([df_weighted_component, df_weighted_values], axis=0, ignore_index=True)
+    # weight by horizon thickness within each horizon, then by component percentage within each map unit,
+    # and weight the texture factions, so that they sum to 1
+    horizon_fields = ["MapUnitKey", "ComponentId", "HorizonId"]
+    df_weighted_horizon = agwa_weighting.weighted_mean(df, horizon_fields, parameters, "HorizonThickness",
+                                                       renormalize=agwa_weighting.TEXTURE_FIELDS)
+    df_horizon_totals = df.groupby(horizon_fields, sort=False).agg(
+        TotalHorizonThickness=("HorizonThickness", "sum"), ComponentPercentage=("ComponentPercentage", "first"))
+    df_weighted_horizon.insert(3, "TotalHorizonThickness", df_horizon_totals.TotalHorizonThickness.values)
+    df_weighted_horizon.insert(4, "ComponentPercentage", df_horizon_totals.ComponentPercentage.values)
+
+    df_weighted_component = agwa_weighting.weighted_mean(df_weighted_horizon, "MapUnitKey", parameters,
+                                                         "ComponentPercentage",
+                                                         renormalize=agwa_weighting.TEXTURE_FIELDS)
+    df_weighted_component.insert(1, "TotalComponentPercentage", df_weighted_horizon.groupby(
+        "MapUnitKey", sort=False).ComponentPercentage.sum().values)
     
     return df_weighted_horizon, df_weighted_component
 
 
-def query_kin_lut_update_horizon_parameters(df_kin_lut, texture, horizon_parameters):  
-    """This function queries 'kin' parameters and updates 'horizon' values. 
-        It is called within the 'intersect_soils' function.
+def update_horizon_parameters_from_kin_lut(df_parameters, df_kin_lut, textures):
+    """Update the horizon parameters with the 'kin' parameters of the texture of each horizon.
+        It is called within the 'calculate_horizon_parameters' function.
         Additionally, it computes 'cohesion' based on the 'clay' values from the 'kin_lut' table.
-        Note: the 'kin_lut' table is prioritized over the SSURGO 'chorizon' table."""
-
-    texture_is_usda_standard = True
-    texture_is_in_kin_lut = True
-
-    kin_par = df_kin_lut[df_kin_lut.TextureName == texture].squeeze()
-    usda_standard_texture = ["Clay", "Clay loam", "Loam", "Loamy sand", "Sand", "Sandy clay", 
-                "Sandy clay loam", "Sandy loam", "Silt", "Silt loam", "Silty clay", "Silty clay loam"]
-    if texture not in usda_standard_texture:
-        texture_is_usda_standard = False
-
-    if kin_par.empty: 
-        texture_is_in_kin_lut = False
-        # this means the texture type from SSURGO is not found in the kin_lut table
-        # in this case, there won't be values for SMax, CV, Distribution, and BPressure
-        return texture_is_usda_standard, texture_is_in_kin_lut, horizon_parameters
-
-
-    # 13 parameters from kin_lut table
-    kin_ksat = kin_par.KS
-    kin_g = kin_par.G
-    kin_porosity = kin_par.POR
-    kin_smax = kin_par.SMAX
-    kin_cv = kin_par.CV 
-    kin_sand = kin_par.SAND/100
-    kin_silt = kin_par.SILT/100
-    kin_clay = kin_par.CLAY/100
-    kin_distribution = kin_par.DIST
-    kin_kff = kin_par.KFF  # used to calculate cohesion
-    kin_bpressure = kin_par.BPressure  # need to confirm with Shea, the purpose of this parameter
+        Note: the 'kin_lut' table is prioritized over the SSURGO 'chorizon' table.
+        Raises an exception for the first texture that is not found in the 'kin_lut' table."""
+
+    df_kin = (pd.DataFrame({"TextureName": textures})
+              .merge(df_kin_lut.drop_duplicates("TextureName"), on="TextureName", how="left"))
+    missing = ~df_kin.TextureName.isin(df_kin_lut.TextureName)
+    if missing.any():
+        # Note: If the texture is not found in kin_lut, 
+        # the variables SMax, CV, Distribution, and BPressure will not hold any values.
+        # As a result, the execution of K2 will not be possible under this condition.
+        raise Exception(f"Texture {df_kin.TextureName[missing].iloc[0]} is not found in the AGWA lookup table. "
+                        "Please add the texture to the lookup table.")
 
     # TODO from Shea: document the splash and cohesion equations by adding references    
     # calculate cohesion based on kff (kwfact). modify if kf is 0 or kin_kff is negative
-    kf = float(horizon_parameters["kwfact"])
-    if kf == 0:
-        if kin_kff <= 0:
-            kf = 0.2
-        else:
-            kf = kin_kff
-    splash = 422 * float(kf) * 0.8
-
-    # calculate cohension
-    # option 1: calculate cohesion based on clay content from SSURGO chorizon table
-    if False: # use option 2
-        if math.isnan(horizon_parameters["Clay"]):
-            clay = kin_clay
-        else:
-            clay = horizon_parameters["Clay"]
-    # option 2: calculate cohesion based on clay content from kin_lut
-    clay = kin_clay
-
-    if clay <= 0.22:
-        cohesion = 5.6 * kf / (188 - (468 * clay) + (907 * (clay ** 2))) * 0.5
-    else:
-        cohesion = 5.6 * kf / 130 * 0.5
+    kin_kff = df_kin.KFF.values.astype(float)
+    kf = pd.to_numeric(df_parameters.kwfact).values.astype(float)
+    kf = np.where(kf == 0, np.where(kin_kff <= 0, 0.2, kin_kff), kf)
+    splash = 422 * kf * 0.8
+
+    # calculate cohesion based on clay content from kin_lut
+    clay = df_kin.CLAY.values / 100
+    cohesion = np.where(clay <= 0.22, 5.6 * kf / (188 - (468 * clay) + (907 * (clay ** 2))) * 0.5,
+                        5.6 * kf / 130 * 0.5)
 
     # The following 8 parameters are computable from SSURGO
     # Use values from kin_lut unless parameter from kin_lut is null
-    kin_values_to_use = {"Ksat": kin_ksat, "G": kin_g, "Sand": kin_sand,
-                         "Silt": kin_silt, "Clay": kin_clay, "Splash": splash,
-                         "Cohesion": cohesion, "Porosity": kin_porosity}
-    for key, value in kin_values_to_use.items():
-        if value is not None and not math.isnan(value):
-            horizon_parameters[key] = value
+    kin_values_to_use = {"Ksat": df_kin.KS.values, "G": df_kin.G.values, "Sand": df_kin.SAND.values / 100,
+                         "Silt": df_kin.SILT.values / 100, "Clay": clay, "Splash": splash,
+                         "Cohesion": cohesion, "Porosity": df_kin.POR.values}
+    df_parameters = df_parameters.copy()
+    for key, values in kin_values_to_use.items():
+        values = np.asarray(values, dtype=float)
+        df_parameters[key] = np.where(np.isnan(values), df_parameters[key].values.astype(float), values)
 
     # the following 4 parameters are not computable from SSURGO, so they must come from kin_lut
     # these are required parameters for KINEROS2
-    kin_values_to_add ={"SMax": kin_smax, "CV": kin_cv, 
-                        "Distribution": kin_distribution, "BPressure": kin_bpressure}        
-    for key, value in kin_values_to_add.items():
-        horizon_parameters[key] = value
-    
-    return texture_is_usda_standard, texture_is_in_kin_lut, horizon_parameters
+    kin_values_to_add = {"SMax": df_kin.SMAX.values, "CV": df_kin.CV.values,
+                         "Distribution": df_kin.DIST.values, "BPressure": df_kin.BPressure.values}
+    for key, values in kin_values_to_add.items():
+        df_parameters[key] = values
+
+    return df_parameters
 
 
 def weight_hillsope_parameters_by_area_fractions(workspace, delineation_name, discretization_name,
-                                                 parameterization_name, soil_layer, save_intermediate_outputs):
-    """Weight soil parameters for each hillslope based on the intersection of hillslopes and soils. 
+                                                 parameterization_name, df_soil_areas, save_intermediate_outputs):
+    """Weight soil parameters for each hillslope based on the area of each soil map unit in the hillslope
+        (df_soil_areas, see soil_map_unit_areas). 
         14 parameters are weighted.
         called in parameterize function."""
     
     # Step 1: read 2 tables    
     soils_table = os.path.join(workspace, "parameters_soil_weighted_by_component")
-    df_soils = pd.DataFrame(arcpy.da.TableToNumPyArray(soils_table, "*"))
-    df_soils = df_soils[(df_soils["DelineationName"] == delineation_name) &  
-                        (df_soils["DiscretizationName"] == discretization_name) &
-                        (df_soils["ParameterizationName"] == parameterization_name)]
+    parameters = ["Ksat", "G", "Porosity", "Rock", "Sand", "Silt", "Clay", "Splash", "Cohesion", "Pave",
+                   "SMax", "CV", "Distribution", "BPressure"]
+    df_soils = agwa_table_io.read_table(soils_table, ["MapUnitKey"] + parameters,
+                                        {"DelineationName": delineation_name,
+                                         "DiscretizationName": discretization_name,
+                                         "ParameterizationName": parameterization_name})
     
-    soil_feature_class_name = os.path.basename(soil_layer)
-    intersection_table = os.path.join(workspace, f"{discretization_name}_{soil_feature_class_name}_intersection")
-    df_intersections = pd.DataFrame(arcpy.da.TableToNumPyArray(intersection_table, 
-                                                               ["HillslopeID", "MUKEY", "Shape_Area"])) 
+    return weight_soil_parameters_by_area(df_soil_areas, df_soils)
+
+
+def weight_soil_parameters_by_area(df_soil_areas, df_soils):
+    """Weight the soil parameters of the map units (df_soils, with MapUnitKey and the 14 parameters) by the area
+    of each map unit in each hillslope (df_soil_areas). Called in weight_hillsope_parameters_by_area_fractions and
+    parameterize_scenarios functions."""
+
+    parameters = ["Ksat", "G", "Porosity", "Rock", "Sand", "Silt", "Clay", "Splash", "Cohesion", "Pave",
+                   "SMax", "CV", "Distribution", "BPressure"]
+    df_intersections = df_soil_areas.copy()
+    df_soils = df_soils[["MapUnitKey"] + parameters].copy()
 
     # Step 2: Merge intersection polygons with soils
     df_soils.MapUnitKey = df_soils.MapUnitKey.astype(str)
@@ -719,24 +987,10 @@ def weight_hillsope_parameters_by_area_fractions(workspace, delineation_name, di
     df_intersections_soils = pd.merge(df_intersections, df_soils, left_on="MUKEY", right_on="MapUnitKey", how="left")
     
     # Step 3: Weight soil parameters by area fractions
-    parameters = ["Ksat", "G", "Porosity", "Rock", "Sand", "Silt", "Clay", "Splash", "Cohesion", "Pave",
-                   "SMax", "CV", "Distribution", "BPressure"]
-    df_weighted_by_area = pd.DataFrame().assign(HillslopeID=df_intersections_soils.HillslopeID.unique())
-    for hillsope_id in df_intersections_soils.HillslopeID.unique():
-        # print(hillsope_id) ### remove this when testing is done
-        df_hillslope = df_intersections_soils[df_intersections_soils.HillslopeID == hillsope_id]
-        
-        # For now: area with Pave = 1 will be excluded from the calculation
-        pave_unique = df_hillslope.Pave.unique()
-        if len(pave_unique) >= 2:
-            df_hillslope = df_hillslope[df_hillslope.Pave != 1]
-        
-        #TODO: will there be a case where Pave=0 but Sand, Clay and Silt are all 0?
-
-        total_area = df_hillslope.Shape_Area.sum()
-        for param in parameters:
-            weighted_value = (df_hillslope[param] * df_hillslope.Shape_Area).sum() / total_area
-            df_weighted_by_area.loc[df_weighted_by_area.HillslopeID == hillsope_id, param] = weighted_value
+    # For now: area with Pave = 1 will be excluded from the calculation, unless the whole hillslope has Pave = 1
+    #TODO: will there be a case where Pave=0 but Sand, Clay and Silt are all 0?
+    df_weighted_by_area = agwa_weighting.weighted_mean(df_intersections_soils, "HillslopeID", parameters,
+                                                       "Shape_Area", exclude=df_intersections_soils.Pave == 1)
 
     return df_weighted_by_area
 
@@ -747,10 +1001,12 @@ def extract_parameters(prjgdb, delineation_name, discretization_name, parameteri
         called in parameterize function."""
     
     meta_parameterization_table = os.path.join(prjgdb, "metaParameterization")
-    df_parameterization = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_parameterization_table,"*"))
-    df_parameterization = df_parameterization[(df_parameterization["DelineationName"] == delineation_name) &
-                                        (df_parameterization["DiscretizationName"] == discretization_name) &
-                                        (df_parameterization["ParameterizationName"] == parameterization_name)].squeeze()
+    parameterization_fields = ["MaxThickness", "MaxHorizons", "LandCoverPath", "LandCoverLookUpTablePath",
+                               "SoilsPath", "ChannelType", "SoilsDatabasePath"]
+    df_parameterization = agwa_table_io.read_table(meta_parameterization_table, parameterization_fields,
+                                                   {"DelineationName": delineation_name,
+                                                    "DiscretizationName": discretization_name,
+                                                    "ParameterizationName": parameterization_name}).squeeze(axis=0)
     if df_parameterization.empty:
         raise Exception(f"No parameterization found for the given delineation, discretization, and parameterization names.")
     
@@ -765,7 +1021,7 @@ def extract_parameters(prjgdb, delineation_name, discretization_name, parameteri
 
     meta_workspace_table = os.path.join(prjgdb, "metaWorkspace")
     if arcpy.Exists(meta_workspace_table):
-        df_workspace = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_workspace_table, "*"))
+        df_workspace = agwa_table_io.read_table(meta_workspace_table, ["AGWADirectory"])
         AGWA_directory = df_workspace["AGWADirectory"].values[0]
     else:
         raise Exception(f"The table 'metaWorkspace' does not exist in the workspace {prjgdb}.")
@@ -783,45 +1039,13 @@ def copy_parameterization(workspace, delineation_name, discretization_name, prev
     the targe parameterization, and do not copy them from the previous parameterization.
     """
     tweet(f"Copying parameterization from '{previous_parameterization_name}' to '{parameterization_name}'.")
-    tables = ["parameters_hillslopes", "parameters_channels"]
-    index_fields = ["HillslopeID", "ChannelID"]
-    hillslope_fields_copy = ["Ksat", "G", "Porosity", "Rock", "Sand", "Silt", "Clay", "Splash", "Cohesion", 
-                             "Pave", "SMax", "CV", "Distribution", "BPressure", "Canopy", "Interception", 
-                             "Manning", "Imperviousness"]
-    channel_feilds_copy = ["Ksat", "Manning", "Pave", "Imperviousness", "SMax", "CV", "G", "Porosity", 
-                           "Rock", "Sand", "Silt", "Clay", "Splash", "Cohesion", "Distribution", 
-                           "BPressure", "Woolhiser"]
-
-    
-    for table, fields_to_copy, index_field in zip(tables, [hillslope_fields_copy, channel_feilds_copy], 
-                                                  index_fields):
+    for table, fields_to_copy in LAND_COVER_AND_SOIL_FIELDS.items():
 
         try:
-            table_path = arcpy.os.path.join(workspace, table)
-            field_objects = arcpy.ListFields(table_path)
-            all_fields = [field.name for field in field_objects if field.type != 'OID']
-            cols_to_load = [index_field] + fields_to_copy + ["DelineationName", "DiscretizationName", 
-                                                             "ParameterizationName"]
-            df = pd.DataFrame(arcpy.da.TableToNumPyArray(table_path, cols_to_load))
-            
-            previous_data_set = df[(df["DelineationName"] == delineation_name) & 
-                                   (df["DiscretizationName"] == discretization_name) &
-                                   (df["ParameterizationName"] == previous_parameterization_name)]
-            previous_data_set = previous_data_set.set_index(index_field)[fields_to_copy].to_dict(orient='index')
-
-            field_indices = {field: all_fields.index(field) for field in fields_to_copy}
-
-            where_clause = (f"DelineationName = '{delineation_name}' AND "
-                            f"DiscretizationName = '{discretization_name}' AND "
-                            f"ParameterizationName = '{parameterization_name}'")
-
-            with arcpy.da.UpdateCursor(table_path, all_fields, where_clause) as cursor:
-                for row in cursor:
-                    element_id = row[3]
-                    if element_id in previous_data_set:
-                        for field in fields_to_copy:
-                            row[field_indices[field]] = previous_data_set[element_id][field]
-                        cursor.updateRow(row)
+            # The values are not copied: they are inherited from the previous parameterization when read
+            agwa_parameterization_lineage.add_parent(workspace, delineation_name, discretization_name,
+                                                     parameterization_name, previous_parameterization_name, table,
+                                                     fields_to_copy)
             tweet(f"Update complete for table {table}.")
         except Exception as e:
             tweet(f"Failed to update table {table} due to error: {e}")
@@ -872,7 +1096,7 @@ def is_raster_larger_and_buffer(raster, watershed_feature_class):
 
 def convert_soil_raster_to_polygon(raster, watershed_feature_class, delineation, workspace):
     """Convert soil raster to polygon and clip to the watershed extent.
-        Called in intersect_soils function."""
+        Called in soil_map_unit_areas function."""
 
     # Check if raster is substantially larger than the watershed
     apply_buffer_flag, buffer_size = is_raster_larger_and_buffer(raster, watershed_feature_class)                                        
@@ -1,8 +1,22 @@
 import os
 import arcpy
+import importlib
 import pandas as pd
 from arcpy._mp import Table
 from datetime import datetime
+import agwa_table_io
+importlib.reload(agwa_table_io)
+import agwa_parameterization_lineage
+importlib.reload(agwa_parameterization_lineage)
+
+
+HILLSLOPE_FIELDS = ["ParameterizationName", "HillslopeID", "Area", "Width", "Length", "MeanSlope", "Manning",
+                    "CentroidX", "CentroidY", "CV", "Ksat", "G", "Distribution", "Porosity", "Rock", "Sand", "Silt",
+                    "Clay", "Splash", "Cohesion", "SMax", "Interception", "Canopy", "Pave"]
+CHANNEL_FIELDS = ["ParameterizationName", "ChannelID", "Sequence", "ChannelLength", "MeanSlope", "Manning",
+                  "CentroidX", "CentroidY", "SideSlope1", "SideSlope2", "CV", "Ksat", "G", "Distribution",
+                  "Porosity", "Rock", "Sand", "Silt", "Clay", "Cohesion", "Splash", "Pave", "Woolhiser",
+                  "DownstreamBottomWidth", "UpstreamBottomWidth", "DownstreamBankfullDepth", "UpstreamBankfullDepth"]
 
 
 def tweet(msg):
@@ -22,10 +36,11 @@ def initialize_workspace(prjgdb, delineation, discretization, parameterization,
         raise Exception("Cannot proceed. \nThe table meta_parameterization_table does not exist. "
                         "Please perform Step 4 and Step 5 before proceeding.")                             
     else:
-        df_parameterization = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_parameterization_table, "*"))
-        if df_parameterization[(df_parameterization.DelineationName == delineation) &
-                              (df_parameterization.DiscretizationName == discretization) &
-                              (df_parameterization.ParameterizationName == parameterization)].empty:
+        df_parameterization = agwa_table_io.read_table(meta_parameterization_table, ["ParameterizationName"],
+                                                       {"DelineationName": delineation,
+                                                        "DiscretizationName": discretization,
+                                                        "ParameterizationName": parameterization})
+        if df_parameterization.empty:
             msg = (f"Cannot proceed. Parameterization '{parameterization}' does not exists with the selected delineation and discretization. "
                    "Please perform Step 4 and Step 5 before proceeding.")
             raise Exception(msg)
@@ -151,21 +166,17 @@ def write_file(output_file, agwa_version_at_creation, agwa_gbd_version_at_creati
 
 
 def read_parameter_tables(workspace, delineation, discretization, parameterization):    
-    df_hilllslopes = pd.DataFrame(arcpy.da.TableToNumPyArray(
-        os.path.join(workspace, "parameters_hillslopes"), "*", null_value=-9999))
-    df_channels = pd.DataFrame(arcpy.da.TableToNumPyArray(
-        os.path.join(workspace, "parameters_channels"), "*", null_value=-9999))        
-    df_contributing_channels = pd.DataFrame(arcpy.da.TableToNumPyArray(
-        os.path.join(workspace, "contributing_channels"), "*", null_value=-9999))
-    
-    df_hillslopes_filtered = df_hilllslopes[(df_hilllslopes.DelineationName == delineation) &
-                                            (df_hilllslopes.DiscretizationName == discretization) &
-                                            (df_hilllslopes.ParameterizationName == parameterization)]                                            
-    df_channels_filtered = df_channels[(df_channels.DelineationName == delineation) &
-                                        (df_channels.DiscretizationName == discretization) &
-                                        (df_channels.ParameterizationName == parameterization)]
-    df_contributing_channels = df_contributing_channels[(df_contributing_channels.DelineationName == delineation) &
-                                                        (df_contributing_channels.DiscretizationName == discretization)]
+    # Parameters inherited from parent parameterizations are merged in memory
+    filters = {"DelineationName": delineation, "DiscretizationName": discretization}
+    df_hillslopes_filtered = agwa_parameterization_lineage.read_parameters(
+        workspace, "parameters_hillslopes", HILLSLOPE_FIELDS, delineation, discretization, parameterization,
+        null_value=-9999)
+    df_channels_filtered = agwa_parameterization_lineage.read_parameters(
+        workspace, "parameters_channels", CHANNEL_FIELDS, delineation, discretization, parameterization,
+        null_value=-9999)
+    df_contributing_channels = agwa_table_io.read_table(os.path.join(workspace, "contributing_channels"),
+                                                        ["ChannelID", "ContributingChannel"], filters,
+                                                        null_value=-9999)
     
     return df_hillslopes_filtered, df_channels_filtered, df_contributing_channels
 
@@ -253,11 +264,11 @@ def extract_parameters(prjgdb, delineation, discretization, parameterization):
     if not arcpy.Exists(meta_parameterization_table):
         raise Exception("Cannot proceed. \nThe table '{}' does not exist.".format(meta_parameterization_table))
 
-    fields = ["DelineationName", "DiscretizationName", "ParameterizationName", "AGWAVersionAtCreation", "AGWAGDBVersionAtCreation"]
-    df_parameterization = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_parameterization_table, fields))
-    df_parameterization_filtered = df_parameterization[(df_parameterization.DelineationName == delineation) &
-                                 (df_parameterization.DiscretizationName == discretization) &
-                                 (df_parameterization.ParameterizationName == parameterization)].squeeze()
+    fields = ["AGWAVersionAtCreation", "AGWAGDBVersionAtCreation"]
+    df_parameterization_filtered = agwa_table_io.read_table(meta_parameterization_table, fields,
+                                                            {"DelineationName": delineation,
+                                                             "DiscretizationName": discretization,
+                                                             "ParameterizationName": parameterization}).squeeze(axis=0)
     agwa_version_at_creation = df_parameterization_filtered.AGWAGDBVersionAtCreation
     agwa_gbd_version_at_creation = df_parameterization_filtered.AGWAGDBVersionAtCreation
     
@@ -11,6 +11,11 @@ from pathlib import Path
 from arcpy._mp import Table
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 from config import AGWA_VERSION, AGWAGDB_VERSION
+import importlib
+import agwa_table_io
+importlib.reload(agwa_table_io)
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
 
 Prop_xcoord = "xcoord"
 Prop_ycoord = "ycoord"
@@ -129,7 +134,8 @@ def write_file_with_depth_duration(agwa_directory, discretization, depth, durati
                                    soil_moisture, output_filename, storm_source):
     """Write the precipitation file using the specified depth and duration. Called by process()."""
     
-    precip_distribution_file = os.path.join(agwa_directory, "lookup_tables.gdb", "nrcs_precipitation_distributions_LUT")
+    precip_distribution_file = agwa_lookup_tables.lookup_table_path(agwa_directory,
+                                                                    "nrcs_precipitation_distributions_LUT")
 
     header = write_header(discretization, depth, duration, hyetograph_shape, storm_source)
     body = write_from_distributions_lut(depth, duration, time_step, hyetograph_shape, soil_moisture,
@@ -278,7 +284,10 @@ def write_from_distributions_lut(depth, duration, time_step_duration, hyetograph
                       "! (min)        (mm)\n"
         design_storm = rg_line + coordinate_line + soil_moisture_line + time_steps_line + header_line
 
-        fields = ["Time", hyetograph_shape]
+        # cumulative fraction of the depth at each time of the distribution, read once instead of per time step
+        distribution = agwa_lookup_tables.precipitation_distribution(precip_distribution_file, hyetograph_shape)
+        # like a query on Time, the first row of a time is used
+        fractions = distribution[~distribution.index.duplicated(keep="first")].to_dict()
 
         time = 0.0
         value = 0.0
@@ -288,19 +297,11 @@ def write_from_distributions_lut(depth, duration, time_step_duration, hyetograph
         p_start = 0.0
         p_end = 0.0
 
-        dist_curs = arcpy.da.SearchCursor(precip_distribution_file, fields)
-        for dist_row in dist_curs:
-            time = dist_row[0]
-            value = dist_row[1]
+        for time, value in distribution.items():
             new_time = time + duration
             if new_time <= 24:
-                where_clause = "Time = " + str(new_time)
-
-                upper_bound_curs = arcpy.da.SearchCursor(
-                    precip_distribution_file, fields, where_clause)
-                upper_bound_row = next(upper_bound_curs)
-                upper_time = upper_bound_row[0]
-                upper_value = upper_bound_row[1]
+                upper_time = new_time
+                upper_value = fractions[new_time]
                 difference = upper_value - value
 
                 if difference > max_dif:
@@ -319,11 +320,7 @@ def write_from_distributions_lut(depth, duration, time_step_duration, hyetograph
         for i in range(time_steps):
             the_time = t_start + i * time_step_duration / 60
             the_kin_time = i * time_step_duration
-            p_ratio_query = "Time = " + str(round(the_time, 1))
-            p_ratio_cursor = arcpy.da.SearchCursor(
-                precip_distribution_file, fields, p_ratio_query)
-            p_ratio_row = next(p_ratio_cursor)
-            p_ratio = p_ratio_row[1]
+            p_ratio = fractions[round(the_time, 1)]
 
             cum_depth = depth * (p_ratio - p_start) / (p_end - p_start)
 
@@ -372,7 +369,7 @@ def extract_parameters(prjgdb, delineation, discretization, precipitation_file):
     
     # Read the AGWA directory from the metaWorkspace table
     meta_workspace_table = os.path.join(prjgdb, "metaWorkspace")
-    df_meta_workspace = pd.DataFrame(arcpy.da.TableToNumPyArray(meta_workspace_table, '*'))
+    df_meta_workspace = agwa_table_io.read_table(meta_workspace_table, ["AGWADirectory"])
     agwa_directory = df_meta_workspace['AGWADirectory'].values[0]
 
     # Read the precipitation parameters from the metaK2PrecipitationFile table
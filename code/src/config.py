@@ -11,3 +11,53 @@ AGWA_BUILD = "2024-07-20"
 # Users can set this to any desired percentage or fixed number of cores
 PARALLEL_PROCESSING_FACTOR = 0
 
+
+# Parameterization Cache Setting
+# When True, steps of Parameterize Elements whose inputs and options are unchanged since another parameterization
+# of the same discretization are copied from that parameterization instead of being recalculated
+USE_PARAMETERIZATION_CACHE = True
+
+
+# Complex Slope Setting
+# Number of equal-length segments of the slope profile of each hillslope when the slope type is Complex
+COMPLEX_SLOPE_SEGMENTS = 5
+
+
+# Land Cover Overlay Setting
+# "Crosstab" counts the land cover cells of each hillslope on the land cover grid (fast, no intermediate polygons).
+# Hillslopes that contain no cell center of the grid take the land cover class at their label point.
+# "Intersect" converts the land cover raster to polygons and intersects them with the hillslopes (previous method).
+LAND_COVER_OVERLAY_METHOD = "Crosstab"
+
+
+# Soil Overlay Setting
+# "Crosstab" counts the map unit cells of each hillslope on the grid of a gSSURGO soil raster (fast, no intermediate
+# polygons). "Intersect" converts the soil raster to polygons and intersects them with the hillslopes (previous
+# method). Hillslopes that contain no cell center of the grid take the map unit at their label point. Soil feature
+# classes are always intersected.
+SOIL_OVERLAY_METHOD = "Crosstab"
+
+
+# gSSURGO Cache Settings
+# When True, the gSSURGO tables used for the soil parameters are extracted once per database into a local cache
+# of NumPy files sorted by map unit, and only the rows of the map units of the watershed are read from it.
+# The cache is rebuilt when the database is modified. An empty folder uses %LOCALAPPDATA%\AGWA\gssurgo_cache.
+USE_GSSURGO_CACHE = True
+GSSURGO_CACHE_DIRECTORY = ""
+
+
+# Soil Parameter Index Setting
+# When True, Step 5 reads the weighted soil parameters of the map units from the index built by the Build Soil
+# Parameter Index tool for the soil database, kin_lut table, maximum horizons and maximum depth, if there is one
+USE_SOIL_PARAMETER_INDEX = True
+
+
+# Discretization Backend Setting
+# "ArcGIS" creates the stream links, stream order, pour points and hillslopes of Step 3 with Spatial Analyst tools.
+# "NumPy" computes them from the D8 flow direction array in a few passes (agwa_d8), with memory-mapped arrays in a
+# temporary folder for grids that do not fit in memory. NumPy follows the definitions of the tools (tested against a
+# cell by cell reference, not against ArcGIS), but not their numbering: it numbers the links in the row-major order of
+# their first cell, and the numbering of StreamLink is not documented and has not been reproduced. Element IDs
+# (ChannelID, HillslopeID) are built from the link numbers, so keep "ArcGIS" wherever IDs must match
+# discretizations, parameterizations or results created with ArcGIS.
+DISCRETIZATION_BACKEND = "ArcGIS"
@@ -0,0 +1,99 @@
+import os
+import sys
+import arcpy
+import importlib
+sys.path.append(os.path.dirname(__file__))
+import code_build_soil_parameter_index as agwa
+importlib.reload(agwa)
+
+
+class BuildSoilParameterIndex(object):
+    def __init__(self):
+        """Define the tool (tool name is the name of the class)."""
+        self.label = "Build Soil Parameter Index"
+        self.description = ("Precompute the weighted soil parameters of every map unit of a gSSURGO database, so "
+                            "that soil parameterizations with the same options only join the map units of the "
+                            "watershed with the index.")
+        self.category = "Soil Tools"
+        self.canRunInBackground = False
+
+    def getParameterInfo(self):
+        """Define parameter definitions"""
+
+        param0 = arcpy.Parameter(displayName="AGWA Directory",
+                                 name="AGWA_Directory",
+                                 datatype="DEWorkspace",
+                                 parameterType="Required",
+                                 direction="Input")
+        param0.filter.list = ['File System']
+
+        param1 = arcpy.Parameter(displayName="Soil Database",
+                                 name="Soil_Database",
+                                 datatype="DEWorkspace",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param2 = arcpy.Parameter(displayName="Maximum Number of Soil Horizons",
+                                 name="Max_horizons",
+                                 datatype="GPLong",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param3 = arcpy.Parameter(displayName="Maximum Soil Depth (cm)",
+                                 name="Max_thickness",
+                                 datatype="GPDouble",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        params = [param0, param1, param2, param3]
+
+        return params
+
+    def isLicensed(self):
+        """Set whether tool is licensed to execute."""
+        return True
+
+    def updateParameters(self, parameters):
+        """Modify the values and properties of parameters before internal
+        validation is performed.  This method is called whenever a parameter
+        has been changed."""
+
+        # Use the AGWA directory of the metaWorkspace table of the current project by default
+        if not parameters[0].altered:
+            project = arcpy.mp.ArcGISProject("CURRENT")
+            for table in project.activeMap.listTables():
+                if table.name == "metaWorkspace":
+                    with arcpy.da.SearchCursor(table, ["AGWADirectory"]) as cursor:
+                        for row in cursor:
+                            parameters[0].value = row[0]
+                    break
+        return
+
+    def updateMessages(self, parameters):
+        """Modify the messages created by internal validation for each tool
+        parameter.  This method is called after internal validation."""
+
+        if parameters[1].value:
+            soils_database = parameters[1].valueAsText
+            for table in ["component", "chorizon", "chtexturegrp", "chtexture"]:
+                if not arcpy.Exists(os.path.join(soils_database, table)):
+                    parameters[1].setErrorMessage(f"The table '{table}' does not exist in the soil database.")
+                    break
+        return
+
+    def execute(self, parameters, messages):
+        """The source code of the tool."""
+        arcpy.AddMessage("Script source: " + __file__)
+        agwa_directory = parameters[0].valueAsText
+        soils_database = parameters[1].valueAsText
+        max_horizons = int(parameters[2].valueAsText)
+        max_thickness = float(parameters[3].valueAsText)
+
+        agwa.execute(agwa_directory, soils_database, max_horizons, max_thickness)
+
+        return
+
+    def postExecute(self, parameters):
+        """This method takes place after outputs are processed and
+        added to the display."""
+        return
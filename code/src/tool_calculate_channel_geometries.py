@@ -0,0 +1,174 @@
+import os
+import sys
+import arcpy
+import importlib
+sys.path.append(os.path.dirname(__file__))
+import code_parameterize_elements as agwa
+importlib.reload(agwa)
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
+
+
+class CalculateChannelGeometries(object):
+    def __init__(self):
+        """Define the tool (tool name is the name of the class)."""
+        self.label = "Calculate Alternative Channel Geometries"
+        self.description = ("Evaluate several hydraulic geometry relationships for the channels of an element "
+                            "parameterization and save the channel geometries of each relationship to the "
+                            "parameters_channel_geometries table, for sensitivity runs.")
+        self.category = "Parameterization Tools"
+        self.canRunInBackground = False
+
+    def getParameterInfo(self):
+        """Define parameter definitions"""
+
+        param0 = arcpy.Parameter(displayName="AGWA Delineation",
+                                 name="AGWA_Delineation",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+        delineation_list = []
+        project = arcpy.mp.ArcGISProject("CURRENT")
+        m = project.activeMap
+        for table in m.listTables():
+            if table.name == "metaDelineation":
+                with arcpy.da.SearchCursor(table, "DelineationName") as cursor:
+                    for row in cursor:
+                        delineation_list.append(row[0])
+                break
+        param0.filter.list = delineation_list
+
+        param1 = arcpy.Parameter(displayName="AGWA Discretization",
+                                 name="AGWA_Discretization",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param2 = arcpy.Parameter(displayName="Element Parameterization",
+                                 name="Element_Parameterization",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param3 = arcpy.Parameter(displayName="Hydraulic Geometry Relationships (all by default)",
+                                 name="Hydraulic_Geometry_Relationships",
+                                 datatype="GPString",
+                                 parameterType="Optional",
+                                 direction="Input",
+                                 multiValue=True)
+
+        param4 = arcpy.Parameter(displayName="Workspace",
+                                 name="Workspace",
+                                 datatype="GPString",
+                                 parameterType="Derived",
+                                 direction="Output")
+
+        param5 = arcpy.Parameter(displayName="AGWA Directory",
+                                 name="AGWA_Directory",
+                                 datatype="GPString",
+                                 parameterType="Derived",
+                                 direction="Output")
+
+        params = [param0, param1, param2, param3, param4, param5]
+
+        return params
+
+    def isLicensed(self):
+        """Set whether tool is licensed to execute."""
+        return True
+
+    def updateParameters(self, parameters):
+        """Modify the values and properties of parameters before internal
+        validation is performed.  This method is called whenever a parameter
+        has been changed."""
+
+        # get the discretization list, workspace and AGWA directory from meta tables
+        delineation_name = parameters[0].valueAsText
+        discretization_list = []
+        agwa_directory, workspace, prjgdb = "", "", ""
+        if parameters[0].altered:
+            project = arcpy.mp.ArcGISProject("CURRENT")
+            m = project.activeMap
+            for table in m.listTables():
+                if table.name == "metaDelineation":
+                    with arcpy.da.SearchCursor(table, ["DelineationName", "ProjectGeoDataBase",
+                                                       "DelineationWorkspace"]) as cursor:
+                        for row in cursor:
+                            if row[0] == delineation_name:
+                                prjgdb = row[1]
+                                workspace = row[2]
+                    break
+
+            for table in m.listTables():
+                if table.name == "metaWorkspace":
+                    with arcpy.da.SearchCursor(table, ["AGWADirectory", "ProjectGeoDataBase"]) as cursor:
+                        for row in cursor:
+                            if row[1] == prjgdb:
+                                agwa_directory = row[0]
+
+                if table.name == "metaDiscretization":
+                    with arcpy.da.SearchCursor(table, ["DelineationName", "DiscretizationName"]) as cursor:
+                        for row in cursor:
+                            if row[0] == delineation_name:
+                                discretization_list.append(row[1])
+
+        parameters[1].filter.list = discretization_list
+        parameters[4].value = workspace
+        parameters[5].value = agwa_directory
+
+        # Parameterizations with channel parameters for the selected discretization
+        discretization_name = parameters[1].valueAsText
+        parameterization_list = []
+        parameters_channels_table = os.path.join(workspace, "parameters_channels")
+        if discretization_name and arcpy.Exists(parameters_channels_table):
+            with arcpy.da.SearchCursor(parameters_channels_table,
+                                       ["DelineationName", "DiscretizationName", "ParameterizationName"]) as cursor:
+                for row in cursor:
+                    if row[0] == delineation_name and row[1] == discretization_name and \
+                            row[2] not in parameterization_list:
+                        parameterization_list.append(row[2])
+        parameters[2].filter.list = parameterization_list
+
+        # Get the hydraulic geometry list from AGWA lookup table
+        hgr_list = []
+        hgr_table = os.path.join(agwa_directory, "lookup_tables.gdb", "HGR")
+        if agwa_directory and arcpy.Exists(hgr_table):
+            hgr_list = agwa_lookup_tables.hydraulic_geometry_relationships(hgr_table).HGRNAME.tolist()
+        parameters[3].filter.list = hgr_list
+
+        return
+
+    def updateMessages(self, parameters):
+        """Modify the messages created by internal validation for each tool
+        parameter.  This method is called after internal validation."""
+
+        if parameters[0].value and len(parameters[1].filter.list) == 0:
+            parameters[0].setErrorMessage("No discretizations found for this delineation. "
+                "If you believe discretization has been completed, please check whether the metaDiscretization "
+                "table has been added to the Contents.")
+
+        if parameters[1].value and len(parameters[2].filter.list) == 0:
+            parameters[2].setErrorMessage("No element parameterizations found for the selected delineation and "
+                                          "discretization. Please run Step 4 first.")
+        return
+
+    def execute(self, parameters, messages):
+        """The source code of the tool."""
+        arcpy.AddMessage("Script source: " + __file__)
+        delineation_name = parameters[0].valueAsText
+        discretization_name = parameters[1].valueAsText
+        parameterization_name = parameters[2].valueAsText
+        hydraulic_geometry_relationships = list(parameters[3].values) if parameters[3].values else None
+        workspace = parameters[4].valueAsText
+        agwa_directory = parameters[5].valueAsText
+
+        agwa.calculate_alternative_stream_geometries(workspace, delineation_name, discretization_name,
+                                                     parameterization_name, agwa_directory,
+                                                     hydraulic_geometry_relationships)
+
+        return
+
+    def postExecute(self, parameters):
+        """This method takes place after outputs are processed and
+        added to the display."""
+        return
@@ -5,6 +5,8 @@ sys.path.append(os.path.dirname(__file__))
 import code_modify_land_cover as agwa
 import importlib
 importlib.reload(agwa)
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
 
 
 class ModifyLandCover(object):
@@ -172,14 +174,9 @@ class ModifyLandCover(object):
         class_names = []
         if parameters[1].value:
             lookup_table = parameters[1].valueAsText
-            fields = ["CLASS", "NAME"]
-            row = None
-            with arcpy.da.SearchCursor(lookup_table, fields) as cursor:
-                for row in cursor:
-                    class_value = row[0]
-                    class_name = row[1]
-                    class_names.append(class_name)
-                    class_dictionary[class_value] = class_name
+            df_lut = agwa_lookup_tables.read_lookup_table(lookup_table, ["CLASS", "NAME"])
+            class_names = df_lut.NAME.tolist()
+            class_dictionary = dict(zip(df_lut.CLASS, df_lut.NAME))
 
         parameters[6].filter.list = class_names
         parameters[7].filter.list = class_names
@@ -6,6 +6,8 @@ import importlib
 sys.path.append(os.path.dirname(__file__))
 import code_parameterize_elements as agwa
 importlib.reload(agwa)
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
 
 
 class ParameterizeElements(object):
@@ -66,10 +68,8 @@ class ParameterizeElements(object):
                                  datatype="GPString",
                                  parameterType="Optional",
                                  direction="Input")
-        param5.filter.list = ["Plane Average"]
-        # TODO: Add Geometric Abstraction method back once calculation of headwater flow length is finalized
-        # param2.filter.list = ["Geometric Abstraction", "Plane Average"]
-        param5.value = param5.filter.list[0]
+        param5.filter.list = ["Geometric Abstraction", "Plane Average"]
+        param5.value = "Plane Average"
 
         param6 = arcpy.Parameter(displayName="View Map of Hydraulic Geometry Types",
                                     name="View_Hydraulic_Geometry_Type_Map",
@@ -215,11 +215,7 @@ class ParameterizeElements(object):
         if lookup_table_directory:
             hgr_table = os.path.join(lookup_table_directory, "HGR")
             if arcpy.Exists(hgr_table):
-                fields = ["HGRNAME"]
-                row = None
-                with arcpy.da.SearchCursor(hgr_table, fields) as cursor:
-                    for row in cursor:
-                        hgr_list.append(row[0])
+                hgr_list = agwa_lookup_tables.hydraulic_geometry_relationships(hgr_table).HGRNAME.tolist()
         parameters[7].filter.list = hgr_list
 
         return
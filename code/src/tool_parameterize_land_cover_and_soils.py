@@ -5,6 +5,8 @@ import importlib
 sys.path.append(os.path.dirname(__file__))
 import code_parameterize_land_cover_and_soils as agwa
 importlib.reload(agwa)
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
 
 
 class ParameterizeLandCoverAndSoils(object):
@@ -238,10 +240,7 @@ class ParameterizeLandCoverAndSoils(object):
         channel_type_list = []
         lookup_table = os.path.join(agwa_directory, "lookup_tables.gdb")
         if arcpy.Exists(lookup_table):
-            channel_type_table = os.path.join(lookup_table, "channel_types")
-            with arcpy.da.SearchCursor(channel_type_table, "Channel_Type") as cursor:
-                for row in cursor:
-                    channel_type_list.append(row[0])
+            channel_type_list = agwa_lookup_tables.channel_types(agwa_directory).Channel_Type.tolist()
             parameters[11].filter.list = channel_type_list
         else:
             arcpy.AddMessage(f"Channel type table not found at {lookup_table}.")
@@ -0,0 +1,240 @@
+import os
+import sys
+import arcpy
+import importlib
+sys.path.append(os.path.dirname(__file__))
+import code_parameterize_land_cover_and_soils as agwa
+importlib.reload(agwa)
+# agwa_lookup_tables is not reloaded: it keeps the lookup tables read in this session
+import agwa_lookup_tables
+
+
+class ParameterizeLandCoverScenarios(object):
+    def __init__(self):
+        """Define the tool (tool name is the name of the class)."""
+        self.label = "Parameterize Land Cover Scenarios"
+        self.description = ("Run Step 5 for several land cover scenarios of a discretization at once: one element "
+                            "parameterization (Step 4) per land cover raster. The soils are overlaid and "
+                            "parameterized once and the parameters of all the scenarios are written together.")
+        self.category = "Land Cover Tools"
+        self.canRunInBackground = False
+
+    def getParameterInfo(self):
+        """Define parameter definitions"""
+
+        param0 = arcpy.Parameter(displayName="AGWA Delineation",
+                                 name="AGWA_Delineation",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+        delineation_list = []
+        project = arcpy.mp.ArcGISProject("CURRENT")
+        m = project.activeMap
+        for table in m.listTables():
+            if table.name == "metaDelineation":
+                with arcpy.da.SearchCursor(table, "DelineationName") as cursor:
+                    for row in cursor:
+                        delineation_list.append(row[0])
+                break
+        param0.filter.list = delineation_list
+
+        param1 = arcpy.Parameter(displayName="AGWA Discretization",
+                                 name="AGWA_Discretization",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param2 = arcpy.Parameter(displayName="Land Cover Scenarios",
+                                 name="Land_Cover_Scenarios",
+                                 datatype="GPValueTable",
+                                 parameterType="Required",
+                                 direction="Input")
+        param2.columns = [["GPString", "Parameterization Name"], ["GPRasterLayer", "Land Cover Raster"]]
+        param2.filters[0].type = "ValueList"
+
+        param3 = arcpy.Parameter(displayName="Land Cover Lookup Table",
+                                 name="Land_Cover_Lookup_Table",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+        param3.filter.list = ["mrlc1992_lut", "mrlc1992_lut_fire", "mrlc2001_lut",
+                              "mrlc2001_lut_fire", "nalc_lut"]
+
+        param4 = arcpy.Parameter(displayName="Soils Layer",
+                                 name="Soils_Layer",
+                                 datatype=["GPFeatureLayer", "GPRasterLayer"],
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param5 = arcpy.Parameter(displayName="Default Soils Database",
+                                 name="Use Soils Database",
+                                 datatype="GPBoolean",
+                                 parameterType="Optional",
+                                 direction="Input")
+        param5.value = True
+
+        param6 = arcpy.Parameter(displayName="Soil Database",
+                                 name="Soil_Database",
+                                 datatype="DEWorkspace",
+                                 parameterType="Optional",
+                                 direction="Input")
+
+        param7 = arcpy.Parameter(displayName="Maximum Number of Soil Horizons",
+                                 name="Max_horizons",
+                                 datatype="GPLong",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param8 = arcpy.Parameter(displayName="Maximum Soil Depth (cm)",
+                                 name="Max_thickness",
+                                 datatype="GPDouble",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param9 = arcpy.Parameter(displayName="Channel Type",
+                                 name="Channel_Type",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+
+        param10 = arcpy.Parameter(displayName="Workspace",
+                                  name="Workspace",
+                                  datatype="GPString",
+                                  parameterType="Derived",
+                                  direction="Output")
+
+        param11 = arcpy.Parameter(displayName="Project Geodatabase",
+                                  name="Project_Geodatabase",
+                                  datatype="DEWorkspace",
+                                  parameterType="Derived",
+                                  direction="Input")
+
+        param12 = arcpy.Parameter(displayName="Save Intermediate Outputs",
+                                  name="Save_Intermediate_Outputs",
+                                  datatype="GPBoolean",
+                                  parameterType="Optional",
+                                  direction="Input")
+        param12.value = False
+
+        params = [param0, param1, param2, param3, param4, param5, param6, param7, param8, param9, param10,
+                  param11, param12]
+
+        return params
+
+    def isLicensed(self):
+        """Set whether tool is licensed to execute."""
+        return True
+
+    def get_element_parameterizations(self, prjgdb, delineation_name, discretization_name):
+        """Get the element parameterizations (Step 4) of the selected delineation and discretization."""
+
+        meta_parameterization_table = os.path.join(prjgdb, "metaParameterization")
+        element_parameterization_list = []
+        if arcpy.Exists(meta_parameterization_table):
+            with arcpy.da.SearchCursor(meta_parameterization_table,
+                                       ["DelineationName", "DiscretizationName", "ParameterizationName",
+                                        "SlopeType"]) as cursor:
+                for row in cursor:
+                    if row[0] == delineation_name and row[1] == discretization_name and row[3] != "":
+                        element_parameterization_list.append(row[2])
+        return element_parameterization_list
+
+    def updateParameters(self, parameters):
+        """Modify the values and properties of parameters before internal
+        validation is performed.  This method is called whenever a parameter
+        has been changed."""
+
+        # Get workspace, project geodatabase, AGWA directory and discretization list
+        discretization_list = []
+        delineation_name, agwa_directory, workspace, prjgdb = "", "", "", ""
+        if parameters[0].value:
+            delineation_name = parameters[0].valueAsText
+            project = arcpy.mp.ArcGISProject("CURRENT")
+            m = project.activeMap
+            for table in m.listTables():
+                if table.name == "metaDelineation":
+                    with arcpy.da.SearchCursor(table, ["DelineationName", "ProjectGeoDataBase",
+                                                       "DelineationWorkspace"]) as cursor:
+                        for row in cursor:
+                            if row[0] == delineation_name:
+                                prjgdb = row[1]
+                                workspace = row[2]
+
+            for table in m.listTables():
+                if table.name == "metaDiscretization":
+                    with arcpy.da.SearchCursor(table, ["DelineationName", "DiscretizationName"]) as cursor:
+                        for row in cursor:
+                            if row[0] == delineation_name:
+                                discretization_list.append(row[1])
+
+                if table.name == "metaWorkspace":
+                    with arcpy.da.SearchCursor(table, ["AGWADirectory", "ProjectGeoDataBase"]) as cursor:
+                        for row in cursor:
+                            if row[1] == prjgdb:
+                                agwa_directory = row[0]
+
+        parameters[1].filter.list = discretization_list
+        parameters[10].value = workspace
+        parameters[11].value = prjgdb
+
+        # Each scenario is an element parameterization of the discretization
+        discretization_name = parameters[1].valueAsText
+        parameters[2].filters[0].list = self.get_element_parameterizations(prjgdb, delineation_name,
+                                                                           discretization_name)
+
+        # Get Channel Types
+        lookup_table = os.path.join(agwa_directory, "lookup_tables.gdb")
+        if agwa_directory and arcpy.Exists(lookup_table):
+            parameters[9].filter.list = agwa_lookup_tables.channel_types(agwa_directory).Channel_Type.tolist()
+
+        # Use default soil database
+        use_default_soil_database = parameters[5].value
+        parameters[6].enabled = not use_default_soil_database
+        if parameters[4].value and use_default_soil_database:
+            soil_layer = arcpy.Describe(parameters[4].value).catalogPath
+            parameters[6].value = os.path.split(soil_layer)[0]
+
+        return
+
+    def updateMessages(self, parameters):
+        """Modify the messages created by internal validation for each tool
+        parameter.  This method is called after internal validation."""
+
+        if parameters[0].value and parameters[1].value and len(parameters[2].filters[0].list) == 0:
+            parameters[1].setErrorMessage("Element parameterization must be performed prior to land cover and "
+                                          "soils parameterization for selected delineation and discretization.")
+
+        if parameters[2].values:
+            parameterization_names = [row[0] for row in parameters[2].values]
+            if len(set(parameterization_names)) != len(parameterization_names):
+                parameters[2].setErrorMessage("Each parameterization name can only be used by one scenario.")
+
+        return
+
+    def execute(self, parameters, messages):
+        """The source code of the tool."""
+        arcpy.AddMessage("Script source: " + __file__)
+        delineation = parameters[0].valueAsText
+        discretization = parameters[1].valueAsText
+        parameterization_names = [str(row[0]) for row in parameters[2].values]
+        land_covers = [arcpy.Describe(row[1]).catalogPath for row in parameters[2].values]
+        lookup_table = parameters[3].valueAsText
+        soils = arcpy.Describe(parameters[4].valueAsText).catalogPath
+        soils_database = parameters[6].valueAsText
+        max_horizons = int(parameters[7].valueAsText)
+        max_thickness = float(parameters[8].valueAsText)
+        channel_type = parameters[9].valueAsText
+        workspace = parameters[10].valueAsText
+        prjgdb = parameters[11].valueAsText
+        save_intermediate_outputs = (parameters[12].valueAsText or '').lower() == 'true'
+
+        agwa.parameterize_scenarios(prjgdb, workspace, delineation, discretization, parameterization_names,
+                                    land_covers, lookup_table, soils, soils_database, max_horizons, max_thickness,
+                                    channel_type, save_intermediate_outputs)
+
+        return
+
+    def postExecute(self, parameters):
+        """This method takes place after outputs are processed and
+        added to the display."""
+        return
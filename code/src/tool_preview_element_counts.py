@@ -0,0 +1,138 @@
+import os
+import sys
+import arcpy
+import importlib
+sys.path.append(os.path.dirname(__file__))
+import code_discretize_watershed as agwa
+importlib.reload(agwa)
+
+
+class PreviewElementCounts(object):
+    def __init__(self):
+        """Define the tool (tool name is the name of the class)."""
+        self.label = "Preview Element Counts"
+        self.description = ("Estimate the number of channels, hillslopes and K2 elements (NELE) that threshold-based "
+                            "discretizations (Step 3) of the watershed would have for several thresholds, without "
+                            "discretizing it.")
+        self.category = "Discretization Tools"
+        self.canRunInBackground = False
+
+    def getParameterInfo(self):
+        """Define parameter definitions"""
+
+        param0 = arcpy.Parameter(displayName="AGWA Delineation",
+                                 name="AGWA_Delineation",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+        delineation_list = []
+        project = arcpy.mp.ArcGISProject("CURRENT")
+        m = project.activeMap
+        for table in m.listTables():
+            if table.name == "metaDelineation":
+                with arcpy.da.SearchCursor(table, "DelineationName") as cursor:
+                    for row in cursor:
+                        delineation_list.append(row[0])
+                break
+        param0.filter.list = delineation_list
+
+        param1 = arcpy.Parameter(displayName="Threshold-based Method",
+                                 name="Threshold_method",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+        param1.filter.list = ["Flow length (unit: m)", "Flow accumulation (unit: %)"]
+
+        param2 = arcpy.Parameter(displayName="Threshold Values",
+                                 name="Threshold_values",
+                                 datatype="GPDouble",
+                                 parameterType="Required",
+                                 direction="Input",
+                                 multiValue=True)
+
+        param3 = arcpy.Parameter(displayName="Workspace",
+                                 name="Workspace",
+                                 datatype="DEWorkspace",
+                                 parameterType="Derived",
+                                 direction="Input")
+
+        param4 = arcpy.Parameter(displayName="Project Geodatabase",
+                                 name="Project_Geodatabase",
+                                 datatype="DEWorkspace",
+                                 parameterType="Derived",
+                                 direction="Input")
+
+        params = [param0, param1, param2, param3, param4]
+
+        return params
+
+    def isLicensed(self):
+        """Set whether tool is licensed to execute."""
+        return True
+
+    def updateParameters(self, parameters):
+        """Modify the values and properties of parameters before internal
+        validation is performed.  This method is called whenever a parameter
+        has been changed."""
+
+        if parameters[0].altered:
+            workspace, project_geodatabase = None, None
+            delineation_name = parameters[0].valueAsText
+            aprx = arcpy.mp.ArcGISProject("CURRENT")
+            map = aprx.activeMap
+            for t in map.listTables():
+                if t.name == "metaDelineation":
+                    with arcpy.da.SearchCursor(t, ["DelineationName", "ProjectGeoDataBase",
+                                                   "DelineationWorkspace"]) as cursor:
+                        for row in cursor:
+                            if row[0] == delineation_name:
+                                project_geodatabase = row[1]
+                                workspace = row[2]
+                parameters[3].value = workspace
+                parameters[4].value = project_geodatabase
+
+        else:
+            parameters[3].value = "Waiting for AGWA Delineation selection."
+
+        return
+
+    def updateMessages(self, parameters):
+        """Modify the messages created by internal validation for each tool
+        parameter.  This method is called after internal validation."""
+
+        # check if metaDelineation table is available
+        if parameters[0].altered:
+            aprx = arcpy.mp.ArcGISProject("CURRENT")
+            map = aprx.activeMap
+            delineation_table = None
+            for t in map.listTables():
+                if t.name == "metaDelineation":
+                    delineation_table = t
+                    break
+            if delineation_table is None:
+                parameters[0].setErrorMessage("The table 'metaDelineation' does not exist in the current map. "
+                                              "Please add the table to the map and try again.")
+
+        if parameters[2].values and any(value <= 0 for value in parameters[2].values):
+            parameters[2].setErrorMessage("The threshold values must be greater than 0.")
+
+        return
+
+    def execute(self, parameters, messages):
+        """The source code of the tool."""
+        arcpy.AddMessage("Script source: " + __file__)
+
+        delineation = parameters[0].valueAsText
+        threshold_method = parameters[1].valueAsText
+        threshold_values = [float(value) for value in parameters[2].values]
+        workspace = parameters[3].valueAsText
+        prjgdb = parameters[4].valueAsText
+
+        agwa.preview_element_counts(prjgdb, workspace, delineation, threshold_method, threshold_values)
+
+        return
+
+    def postExecute(self, parameters):
+        """This method takes place after outputs are processed and
+        added to the display."""
+        return
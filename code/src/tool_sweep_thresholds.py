@@ -0,0 +1,191 @@
+import os
+import re
+import sys
+import arcpy
+import importlib
+import pandas as pd
+sys.path.append(os.path.dirname(__file__))
+import code_discretize_watershed as agwa
+importlib.reload(agwa)
+
+
+class SweepThresholds(object):
+    def __init__(self):
+        """Define the tool (tool name is the name of the class)."""
+        self.label = "Sweep Discretization Thresholds"
+        self.description = ("Run Step 3 with the threshold-based methodology for several thresholds at once. The "
+                            "flow graph is built once and the element counts and timing of every threshold are "
+                            "reported. A discretization is created for each threshold given a name.")
+        self.category = "Discretization Tools"
+        self.canRunInBackground = False
+
+    def getParameterInfo(self):
+        """Define parameter definitions"""
+
+        param0 = arcpy.Parameter(displayName="AGWA Delineation",
+                                 name="AGWA_Delineation",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+        delineation_list = []
+        project = arcpy.mp.ArcGISProject("CURRENT")
+        m = project.activeMap
+        for table in m.listTables():
+            if table.name == "metaDelineation":
+                with arcpy.da.SearchCursor(table, "DelineationName") as cursor:
+                    for row in cursor:
+                        delineation_list.append(row[0])
+                break
+        param0.filter.list = delineation_list
+
+        param1 = arcpy.Parameter(displayName="Model",
+                                 name="Model",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+        param1.filter.list = ["KINEROS2"]
+
+        param2 = arcpy.Parameter(displayName="Threshold-based Method",
+                                 name="Threshold_method",
+                                 datatype="GPString",
+                                 parameterType="Required",
+                                 direction="Input")
+        param2.filter.list = ["Flow length (unit: m)", "Flow accumulation (unit: %)"]
+
+        param3 = arcpy.Parameter(displayName="Thresholds",
+                                 name="Thresholds",
+                                 datatype="GPValueTable",
+                                 parameterType="Required",
+                                 direction="Input")
+        param3.columns = [["GPDouble", "Threshold Value"], ["GPString", "Discretization Name (optional)"]]
+
+        param4 = arcpy.Parameter(displayName="Environment",
+                                 name="Environment",
+                                 datatype="GpString",
+                                 parameterType="Required",
+                                 direction="Input")
+        param4.filter.list = ["ArcGIS Pro", "ArcMap", "Geoprocessing Service"]
+        param4.value = param4.filter.list[0]
+
+        param5 = arcpy.Parameter(displayName="Workspace",
+                                 name="Workspace",
+                                 datatype="DEWorkspace",
+                                 parameterType="Derived",
+                                 direction="Input")
+
+        param6 = arcpy.Parameter(displayName="Project Geodatabase",
+                                 name="Project_Geodatabase",
+                                 datatype="DEWorkspace",
+                                 parameterType="Derived",
+                                 direction="Input")
+
+        param7 = arcpy.Parameter(displayName="Save Intermediate Outputs",
+                                 name="Save_Intermediate_Outputs",
+                                 datatype="GPBoolean",
+                                 parameterType="Optional",
+                                 direction="Input")
+        param7.value = False
+
+        params = [param0, param1, param2, param3, param4, param5, param6, param7]
+
+        return params
+
+    def isLicensed(self):
+        """Set whether tool is licensed to execute."""
+        return True
+
+    def updateParameters(self, parameters):
+        """Modify the values and properties of parameters before internal
+        validation is performed.  This method is called whenever a parameter
+        has been changed."""
+
+        if parameters[0].altered:
+            workspace, project_geodatabase = None, None
+            delineation_name = parameters[0].valueAsText
+            aprx = arcpy.mp.ArcGISProject("CURRENT")
+            map = aprx.activeMap
+            for t in map.listTables():
+                if t.name == "metaDelineation":
+                    with arcpy.da.SearchCursor(t, ["DelineationName", "ProjectGeoDataBase",
+                                                   "DelineationWorkspace"]) as cursor:
+                        for row in cursor:
+                            if row[0] == delineation_name:
+                                project_geodatabase = row[1]
+                                workspace = row[2]
+                parameters[5].value = workspace
+                parameters[6].value = project_geodatabase
+
+        else:
+            parameters[5].value = "Waiting for AGWA Delineation selection."
+
+        return
+
+    def updateMessages(self, parameters):
+        """Modify the messages created by internal validation for each tool
+        parameter.  This method is called after internal validation."""
+
+        # check if metaDelineation table is available
+        if parameters[0].altered:
+            aprx = arcpy.mp.ArcGISProject("CURRENT")
+            map = aprx.activeMap
+            delineation_table = None
+            for t in map.listTables():
+                if t.name == "metaDelineation":
+                    delineation_table = t
+                    break
+            if delineation_table is None:
+                parameters[0].setErrorMessage("The table 'metaDelineation' does not exist in the current map. "
+                                              "Please add the table to the map and try again.")
+
+        # check if the discretization names are valid and unique
+        if parameters[3].values:
+            discretization_names = [str(row[1] or "").strip() for row in parameters[3].values]
+            discretization_names = [name for name in discretization_names if name]
+            for discretization_name in discretization_names:
+                if re.match("^[A-Za-z][A-Za-z0-9_]*$", discretization_name) is None:
+                    parameters[3].setErrorMessage(f"The discretization name, '{discretization_name}', must start "
+                                                  f"with a letter and contain only letters, numbers, and "
+                                                  f"underscores.")
+            if len(set(discretization_names)) != len(discretization_names):
+                parameters[3].setErrorMessage("Each discretization name can only be used by one threshold.")
+
+            if parameters[0].value and parameters[6].value:
+                delineation_name = parameters[0].valueAsText
+                meta_discretization_table = os.path.join(parameters[6].valueAsText, "metaDiscretization")
+                if arcpy.Exists(meta_discretization_table):
+                    df_discretization = pd.DataFrame(arcpy.da.TableToNumPyArray(
+                        meta_discretization_table, ["DelineationName", "DiscretizationName"]))
+                    existing_names = df_discretization[df_discretization.DelineationName == delineation_name]
+                    existing_names = set(existing_names.DiscretizationName).intersection(discretization_names)
+                    if existing_names:
+                        msg = (f"The selected geodatabase already has AGWA discretizations named "
+                               f"{', '.join(sorted(existing_names))}.\n")
+                        msg += f"Please enter unique names for the discretizations to be created."
+                        parameters[3].setErrorMessage(msg)
+
+        return
+
+    def execute(self, parameters, messages):
+        """The source code of the tool."""
+        arcpy.AddMessage("Script source: " + __file__)
+
+        delineation = parameters[0].valueAsText
+        model = parameters[1].valueAsText
+        threshold_method = parameters[2].valueAsText
+        threshold_values = [float(row[0]) for row in parameters[3].values]
+        discretization_names = [str(row[1] or "").strip() or None for row in parameters[3].values]
+        environment = parameters[4].valueAsText
+        workspace = parameters[5].valueAsText
+        prjgdb = parameters[6].valueAsText
+        save_intermediate_outputs = (parameters[7].valueAsText or '').lower() == 'true'
+
+        df_report = agwa.sweep_thresholds(prjgdb, workspace, delineation, model, threshold_method, threshold_values,
+                                          discretization_names, environment, save_intermediate_outputs)
+        arcpy.AddMessage(df_report.to_string(index=False))
+
+        return
+
+    def postExecute(self, parameters):
+        """This method takes place after outputs are processed and
+        added to the display."""
+        return
@@ -0,0 +1,212 @@
+"""The nested loops that calculated the soil horizon parameters in intersect_soils before they were vectorized by
+calculate_horizon_parameters, kept as the reference of the regression tests, and small gSSURGO and kin_lut tables."""
+import math
+import numpy as np
+import pandas as pd
+
+
+def baseline_horizon_parameters(df_mapunit, df_component, df_horizon, df_texture_group, df_texture, df_kin_lut,
+                                max_thickness, max_horizons):
+    """Loops 1 to 5 of the original intersect_soils. Returns the horizons with their textures, the horizon
+    parameters and the textures that are not standard USDA textures."""
+
+    df_horizon_parameters_with_textures = pd.DataFrame()
+    df_horizon_parameters = pd.DataFrame()
+
+    df_component = df_component.copy()
+    df_mapunit = df_mapunit.copy()
+    df_component.mukey = df_component.mukey.astype(str)
+    df_mapunit.mukey = df_mapunit.mukey.astype(str)
+    unique_mukeys = df_mapunit["mukey"].unique()
+    textures_not_usda_type = []
+
+    for mukey in unique_mukeys:
+        df_component_filtered = df_component[df_component["mukey"] == mukey]
+        for _, row in df_component_filtered.iterrows():
+            component_id = row.cokey
+            ComponentPercentage = row.comppct_r
+            df_horizon_filtered = df_horizon[(df_horizon["cokey"] == component_id) &
+                                             (df_horizon["hzdept_r"] < max_thickness)].reset_index(drop=True)
+            if df_horizon_filtered.empty:
+                continue
+            horizon_count = 0
+            for _, row in df_horizon_filtered.iterrows():
+                horizon_count += 1
+                if not (max_horizons == 0 or horizon_count <= max_horizons):
+                    break
+                horizon_id = row.chkey
+                horizon_parameters = query_soil_horizon_parameters(row, horizon_count, max_horizons)
+                horizon_parameters["MapUnitKey"] = mukey
+                horizon_parameters["ComponentId"] = component_id
+                horizon_parameters["ComponentPercentage"] = ComponentPercentage
+
+                df_texture_group_filtered = df_texture_group[df_texture_group["chkey"] == horizon_id]
+                for _, row in df_texture_group_filtered.iterrows():
+                    texture_group_id, texture_in_group_table = row.chtgkey, row.texture
+                    for _, row in df_texture[df_texture["chtgkey"] == texture_group_id].iterrows():
+                        texture = row.texcl if row.texcl != "None" else row.lieutex
+                        new_row = {"MapUnitKey": mukey, "ComponentId": component_id, "HorizonId": horizon_id,
+                                   "TextureGroupId": texture_group_id, "Texture": texture}
+                        df_horizon_parameters_with_textures = pd.concat(
+                            [df_horizon_parameters_with_textures, pd.DataFrame([new_row])], axis=0, ignore_index=True)
+
+                texture_is_usda_type, texture_in_kinlut, horizon_parameters = (
+                    query_kin_lut_update_horizon_parameters(df_kin_lut, texture, horizon_parameters))
+                if not texture_is_usda_type:
+                    textures_not_usda_type.append(texture)
+
+                if texture_in_kinlut:
+                    horizon_parameters["TextureGroupId"] = texture_group_id
+                    horizon_parameters["Texture"] = texture_in_group_table
+                    horizon_parameters["Texture_texcl"] = texture
+                    if texture_in_group_table in ["WB", "UWB", "ICE", "CEM", "IND", "GYP", "BR", "CEM_BR", "VAR"]:
+                        horizon_parameters["Pave"] = 1
+                        horizon_parameters["Sand"] = 0.33
+                        horizon_parameters["Clay"] = 0.33
+                        horizon_parameters["Silt"] = 0.34
+                    else:
+                        horizon_parameters["Pave"] = 0
+                    df_horizon_parameters = pd.concat([df_horizon_parameters,
+                                                       pd.DataFrame([horizon_parameters])], axis=0, ignore_index=True)
+                else:
+                    raise Exception(f"Texture {texture} is not found in the AGWA lookup table. "
+                                    "Please add the texture to the lookup table.")
+
+    return df_horizon_parameters_with_textures, df_horizon_parameters, textures_not_usda_type
+
+
+def query_soil_horizon_parameters(row, horizon_count, max_horizons):
+    if not (max_horizons == 0 or horizon_count <= max_horizons):
+        return pd.Series()
+
+    horizon_thickness = row.hzdepb_r - row.hzdept_r
+    horizon_ksat = row.ksat_r * 1 / 1000 * 3600 / 1
+    horizon_g = 25.4 * (4.83 * (1 / (horizon_ksat / 25.4)) ** 0.326)
+    horizon_sand = row.sandtotal_r / 100
+    horizon_silt = row.silttotal_r / 100
+    horizon_clay = row.claytotal_r / 100
+    kwfact = row.kwfact
+    if kwfact == 'None':
+        kwfact = 0.2
+    horizon_splash = 422 * float(kwfact) * 0.8
+    if horizon_clay <= 0.22:
+        horizon_cohesion = 5.6 * float(kwfact) / (188 - (468 * horizon_clay) + (907 * (horizon_clay ** 2))) * 0.5
+    else:
+        horizon_cohesion = 5.6 * float(kwfact) / 130 * 0.5
+    bulk_density = row.dbthirdbar_r
+    specific_gravity = row.partdensity
+    horizon_rock = 1 - (row.sieveno10_r / 100)
+    if not (math.isnan(bulk_density) or math.isnan(specific_gravity)):
+        horizon_porosity = 1 - (bulk_density / specific_gravity)
+    else:
+        horizon_porosity = np.nan
+
+    new_row = {
+        "HorizonId": row.chkey,
+        "HorizonNumber": horizon_count,
+        "HorizonTopDepth": row.hzdept_r,
+        "HorizonBottomDepth": row.hzdepb_r,
+        "HorizonThickness": horizon_thickness,
+        "Ksat": horizon_ksat,
+        "G": horizon_g,
+        "Porosity": horizon_porosity,
+        "Rock": horizon_rock,
+        "Sand": horizon_sand,
+        "Silt": horizon_silt,
+        "Clay": horizon_clay,
+        "kwfact": kwfact,
+        "Splash": horizon_splash,
+        "Cohesion": horizon_cohesion}
+    return pd.DataFrame([new_row]).squeeze()
+
+
+def query_kin_lut_update_horizon_parameters(df_kin_lut, texture, horizon_parameters):
+    texture_is_usda_standard = True
+    texture_is_in_kin_lut = True
+
+    kin_par = df_kin_lut[df_kin_lut.TextureName == texture].squeeze()
+    usda_standard_texture = ["Clay", "Clay loam", "Loam", "Loamy sand", "Sand", "Sandy clay",
+                             "Sandy clay loam", "Sandy loam", "Silt", "Silt loam", "Silty clay", "Silty clay loam"]
+    if texture not in usda_standard_texture:
+        texture_is_usda_standard = False
+    if kin_par.empty:
+        texture_is_in_kin_lut = False
+        return texture_is_usda_standard, texture_is_in_kin_lut, horizon_parameters
+
+    kin_clay = kin_par.CLAY / 100
+    kf = float(horizon_parameters["kwfact"])
+    if kf == 0:
+        if kin_par.KFF <= 0:
+            kf = 0.2
+        else:
+            kf = kin_par.KFF
+    splash = 422 * float(kf) * 0.8
+    clay = kin_clay
+    if clay <= 0.22:
+        cohesion = 5.6 * kf / (188 - (468 * clay) + (907 * (clay ** 2))) * 0.5
+    else:
+        cohesion = 5.6 * kf / 130 * 0.5
+
+    kin_values_to_use = {"Ksat": kin_par.KS, "G": kin_par.G, "Sand": kin_par.SAND / 100,
+                         "Silt": kin_par.SILT / 100, "Clay": kin_clay, "Splash": splash,
+                         "Cohesion": cohesion, "Porosity": kin_par.POR}
+    for key, value in kin_values_to_use.items():
+        if value is not None and not math.isnan(value):
+            horizon_parameters[key] = value
+    kin_values_to_add = {"SMax": kin_par.SMAX, "CV": kin_par.CV,
+                         "Distribution": kin_par.DIST, "BPressure": kin_par.BPressure}
+    for key, value in kin_values_to_add.items():
+        horizon_parameters[key] = value
+    return texture_is_usda_standard, texture_is_in_kin_lut, horizon_parameters
+
+
+def soil_tables():
+    """Small component, chorizon, chtexturegrp, chtexture and kin_lut tables.
+
+    - Map unit 100 has two components. c1 has four horizons, listed out of depth order and interleaved with the
+      horizons of c2, and c2 has a horizon below 80 cm.
+    - h2 has two texture groups and g3 two textures. h3 has no texcl, only a lieutex.
+    - h6 has a second texture group without textures.
+    - Map unit 200 is bedrock (paved) over a horizon without texture groups, which keeps the bedrock texture.
+    - Map unit 300 only has a horizon below 80 cm, and map unit 999 is not in the watershed.
+    Returns the map units of the watershed and a dict of table name -> DataFrame."""
+
+    df_mapunit = pd.DataFrame({"mukey": [200, 100, 300, 100, 200]})
+    df_component = pd.DataFrame({"cokey": ["c1", "c2", "c3", "c4", "c5"],
+                                 "comppct_r": [60, 40, 100, 100, 100],
+                                 "mukey": ["100", "100", "200", "300", "999"]})
+    horizons = [
+        # cokey, chkey, top, bottom, ksat, sand, silt, clay, bulk density, particle density, sieve no 10, kwfact
+        ("c1", "h1", 0, 10, 9.0, 40., 40., 20., 1.4, 2.65, 90., ".28"),
+        ("c2", "h5", 0, 20, 23.0, 65., 20., 15., 1.5, 2.65, 85., ".24"),
+        ("c1", "h2", 10, 30, 4.0, 60., 25., 15., 1.5, 2.65, 80., "None"),
+        ("c1", "h3", 30, 60, 2.0, 45., 35., 20., 1.5, 2.65, 60., ".17"),
+        ("c2", "h6", 20, 90, 10.0, 55., 30., 15., 1.6, 2.65, 75., "0"),
+        ("c1", "h4", 60, 100, 0.5, 20., 30., 50., 1.3, 2.65, 95., ".32"),
+        ("c2", "h7", 100, 150, 1.0, 30., 30., 40., 1.4, 2.65, 70., ".20"),
+        ("c3", "h8", 0, 25, 1.0, 0., 0., 0., np.nan, np.nan, 0., "None"),
+        ("c3", "h9", 25, 50, 3.0, 50., 30., 20., 1.5, 2.65, 80., ".24"),
+        ("c4", "h10", 90, 120, 5.0, 50., 30., 20., 1.5, 2.65, 80., ".24"),
+        ("c5", "h11", 0, 30, 5.0, 50., 30., 20., 1.5, 2.65, 80., ".24")]
+    df_horizon = pd.DataFrame(horizons, columns=["cokey", "chkey", "hzdept_r", "hzdepb_r", "ksat_r", "sandtotal_r",
+                                                 "silttotal_r", "claytotal_r", "dbthirdbar_r", "partdensity",
+                                                 "sieveno10_r", "kwfact"])
+    df_texture_group = pd.DataFrame([("h1", "g1", "L"), ("h2", "g2", "SL"), ("h2", "g3", "L"), ("h3", "g4", "GR-L"),
+                                     ("h4", "g5", "C"), ("h5", "g6", "L"), ("h6", "g7", "SL"), ("h6", "g12", "SPM"),
+                                     ("h7", "g8", "L"), ("h8", "g9", "BR"), ("h10", "g10", "L"), ("h11", "g11", "L")],
+                                    columns=["chkey", "chtgkey", "texture"])
+    df_texture = pd.DataFrame([("g1", "Loam", "None"), ("g2", "Sandy loam", "None"), ("g3", "Loam", "None"),
+                               ("g3", "Clay", "None"), ("g4", "None", "Gravelly loam"), ("g5", "Clay", "None"),
+                               ("g6", "Loam", "None"), ("g7", "Sandy loam", "None"), ("g8", "Loam", "None"),
+                               ("g9", "None", "Bedrock"), ("g10", "Loam", "None"), ("g11", "Loam", "None")],
+                              columns=["chtgkey", "texcl", "lieutex"])
+    df_kin_lut = pd.DataFrame(
+        [("Sand", 210.0, 46.0, 0.437, 0.95, 0.8, 92., 5., 3., 0.69, 0.05, 7.26),
+         ("Sandy loam", 26.0, 110.0, 0.453, 0.88, 0.9, 65., 25., 10., 0.38, 0.24, 14.66),
+         ("Loam", 13.0, 89.0, 0.463, 0.87, 0.9, 42., 40., 18., 0.25, 0.32, 11.15),
+         ("Clay", 0.6, 320.0, 0.475, 0.8, 0.5, 20., 20., 60., 0.17, 0.28, 37.3),
+         ("Gravelly loam", 13.0, 89.0, np.nan, 0.87, 0.9, 42., 40., 18., 0.25, 0.32, 11.15),
+         ("Bedrock", 0.0, np.nan, 0.01, 0.01, 0.1, 0., 0., 0., 0.2, -1., 0.)],
+        columns=["TextureName", "KS", "G", "POR", "SMAX", "CV", "SAND", "SILT", "CLAY", "DIST", "KFF", "BPressure"])
+    return df_mapunit, {"component": df_component, "chorizon": df_horizon, "chtexturegrp": df_texture_group,
+                        "chtexture": df_texture, "kin_lut": df_kin_lut}
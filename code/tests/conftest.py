@@ -0,0 +1,13 @@
+"""Test configuration: the modules of code/src are imported by name, as the toolbox does, and arcpy is replaced by
+a stub so that the functions that only work on arrays and DataFrames can be tested without ArcGIS Pro."""
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+if "arcpy" not in sys.modules:
+    arcpy = mock.MagicMock(name="arcpy")
+    sys.modules["arcpy"] = arcpy
+    for submodule in ["_mp", "analysis", "da", "management", "sa"]:
+        sys.modules[f"arcpy.{submodule}"] = getattr(arcpy, submodule)
@@ -0,0 +1,105 @@
+"""Cell by cell reference of the StreamLink, StreamOrder (SHREVE), pour point and Watershed steps of Discretize
+Watershed, for testing agwa_d8. Written for clarity, not speed: it follows each flow path one cell at a time."""
+import numpy as np
+from agwa_d8 import D8_OFFSETS
+
+
+def flow_direction_from_dem(dem):
+    """D8 flow direction of each cell towards its steepest downhill neighbor. Cells without one flow out of the
+    grid on the edges and have no flow direction (0) inside it."""
+
+    n_rows, n_cols = dem.shape
+    flow_direction = np.zeros(dem.shape, np.uint8)
+    for row in range(n_rows):
+        for col in range(n_cols):
+            steepest, code = 0, 0
+            for offset_code, (d_row, d_col) in D8_OFFSETS.items():
+                to_row, to_col = row + d_row, col + d_col
+                if 0 <= to_row < n_rows and 0 <= to_col < n_cols:
+                    drop = (dem[row, col] - dem[to_row, to_col]) / (np.sqrt(2) if d_row and d_col else 1)
+                    if drop > steepest:
+                        steepest, code = drop, offset_code
+            if code == 0 and row in (0, n_rows - 1):
+                code = 64 if row == 0 else 4
+            elif code == 0 and col in (0, n_cols - 1):
+                code = 16 if col == 0 else 1
+            flow_direction[row, col] = code
+    return flow_direction
+
+
+def downstream_cell(flow_direction, cell):
+    n_rows, n_cols = flow_direction.shape
+    row, col = divmod(cell, n_cols)
+    code = flow_direction[row, col]
+    if code == 0:
+        return -1
+    d_row, d_col = D8_OFFSETS[int(code)]
+    to_row, to_col = row + d_row, col + d_col
+    if 0 <= to_row < n_rows and 0 <= to_col < n_cols and flow_direction[to_row, to_col] != 0:
+        return to_row * n_cols + to_col
+    return -1
+
+
+def flow_accumulation(flow_direction):
+    """Number of cells upstream of each cell."""
+
+    downstream = [downstream_cell(flow_direction, cell) for cell in range(flow_direction.size)]
+    accumulation = np.zeros(flow_direction.size, np.int64)
+    for cell in range(flow_direction.size):
+        target = downstream[cell]
+        while target >= 0:
+            accumulation[target] += 1
+            target = downstream[target]
+    return accumulation.reshape(flow_direction.shape)
+
+
+def discretize(flow_direction, stream):
+    """Stream links (numbered in the row-major order of their first cell), Shreve order, pour points and labels,
+    as flat arrays."""
+
+    n_cells = flow_direction.size
+    stream = stream.reshape(-1)
+    downstream = [downstream_cell(flow_direction, cell) for cell in range(n_cells)]
+    upstream = [[] for _ in range(n_cells)]
+    for cell in range(n_cells):
+        if stream[cell] and downstream[cell] >= 0 and stream[downstream[cell]]:
+            upstream[downstream[cell]].append(cell)
+
+    # A link runs from a cell without exactly one upstream stream cell down to the next such cell
+    links = np.zeros(n_cells, np.int64)
+    first_cells = {}
+    for cell in range(n_cells):
+        if stream[cell] and len(upstream[cell]) != 1:
+            link = len(first_cells) + 1
+            first_cells[link] = cell
+            link_cell = cell
+            while True:
+                links[link_cell] = link
+                target = downstream[link_cell]
+                if target < 0 or not stream[target] or len(upstream[target]) != 1:
+                    break
+                link_cell = target
+
+    # The first cells of the links flowing into a link have a smaller flow accumulation than its first cell
+    accumulation = flow_accumulation(flow_direction).reshape(-1)
+    link_order = {}
+    for link in sorted(first_cells, key=lambda link: accumulation[first_cells[link]]):
+        link_order[link] = sum(link_order[links[cell]] for cell in upstream[first_cells[link]]) or 1
+    order = np.array([link_order[link] if link else 0 for link in links], np.int64)
+
+    smallest = {}
+    for cell in np.flatnonzero(stream):
+        smallest[links[cell]] = min(smallest.get(links[cell], np.inf), accumulation[cell])
+    pour_points = np.zeros(n_cells, np.int64)
+    for cell in np.flatnonzero(stream):
+        head = order[cell] == 1 and accumulation[cell] == smallest[links[cell]]
+        pour_points[cell] = links[cell] * 10 + head
+
+    labels = np.zeros(n_cells, np.int64)
+    for cell in range(n_cells):
+        target = cell
+        while target >= 0 and pour_points[target] == 0:
+            target = downstream[target]
+        labels[cell] = pour_points[target] if target >= 0 else 0
+    return links, order, pour_points, labels
+
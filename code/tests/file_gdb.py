@@ -0,0 +1,52 @@
+"""A file geodatabase folder with a system catalog and empty table files, for testing the modules that key caches
+on the files of a few tables (see agwa_file_gdb)."""
+import os
+import struct
+
+
+SYSTEM_TABLES = ["GDB_SystemCatalog", "GDB_DBTune", "GDB_SpatialRefs", "GDB_Items", "GDB_ItemTypes"]
+
+
+def create_file_gdb(gdb, table_names, deleted=("GDB_DBTune",)):
+    """Create the folder gdb with the system catalog of the system tables and table_names, numbered in this order
+    from 1, where the rows of deleted were deleted, and the .gdbtable and .gdbtablx files of each table.
+    Returns the number of each table by name."""
+
+    os.makedirs(gdb, exist_ok=True)
+    names = SYSTEM_TABLES + list(table_names)
+    fields = (_field("ID", bytes([6, 4, 2])) + _field("Name", bytes([4]) + struct.pack("<I", 160) + bytes([0])) +
+              _field("FileFormat", bytes([1, 4, 1, 0])))
+    field_section = struct.pack("<IIIH", 10 + len(fields), 4, 0, 3) + fields
+
+    rows, offsets = b"", []
+    for name in names:
+        encoded = name.encode("utf-8")
+        # One nullable field (FileFormat) that is not null, the name and the file format
+        blob = bytes([0, len(encoded)]) + encoded + struct.pack("<i", 0)
+        offsets.append(0 if name in deleted else 40 + len(field_section) + len(rows))
+        rows += struct.pack("<I", len(blob)) + blob
+    data = rows
+    header = struct.pack("<iIIIIIQQ", 3, len(names) - len(deleted), 0, 5, 0, 0,
+                         40 + len(field_section) + len(data), 40)
+    with open(os.path.join(gdb, "a00000001.gdbtable"), "wb") as f:
+        f.write(header + field_section + data)
+    with open(os.path.join(gdb, "a00000001.gdbtablx"), "wb") as f:
+        f.write(struct.pack("<4I", 3, 1, len(names), 5) +
+                b"".join(offset.to_bytes(5, "little") for offset in offsets + [0] * (1024 - len(offsets))))
+
+    numbers = {name: number for number, name in enumerate(names, 1) if name not in deleted}
+    for name, number in numbers.items():
+        for extension in [".gdbtable", ".gdbtablx"]:
+            path = os.path.join(gdb, f"a{number:08x}{extension}")
+            if not os.path.exists(path):
+                open(path, "wb").close()
+    return numbers
+
+
+def table_file(gdb, number, extension=".gdbtable"):
+    return os.path.join(gdb, f"a{number:08x}{extension}")
+
+
+def _field(name, definition):
+    # Name and empty alias in UTF-16, then the type and its definition
+    return bytes([len(name)]) + name.encode("utf-16-le") + bytes([0]) + definition
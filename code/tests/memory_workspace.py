@@ -0,0 +1,105 @@
+"""A workspace geodatabase held in DataFrames, for testing the modules that read and write tables through
+agwa_table_io and arcpy cursors without ArcGIS Pro."""
+import os
+import numpy as np
+import pandas as pd
+
+
+class MemoryWorkspace(object):
+    """Tables of a workspace as DataFrames, with the agwa_table_io functions and the arcpy functions that read and
+    write them. Where clauses are kept as the dict of field -> value they are built from."""
+
+    def __init__(self, workspace="workspace.gdb"):
+        self.workspace = workspace
+        self.tables = {}
+
+    def path(self, table_name):
+        return os.path.join(self.workspace, table_name)
+
+    def create_table(self, table_name, df):
+        self.tables[self.path(table_name)] = df.reset_index(drop=True)
+
+    def patch(self, monkeypatch, arcpy, agwa_table_io):
+        monkeypatch.setattr(arcpy, "Exists", lambda table: table in self.tables)
+        monkeypatch.setattr(arcpy, "CreateTable_management",
+                            lambda workspace, name: self.tables.__setitem__(os.path.join(workspace, name),
+                                                                            pd.DataFrame()))
+        monkeypatch.setattr(arcpy, "AddField_management", self.add_field)
+        monkeypatch.setattr(arcpy.da, "SearchCursor", self.search_cursor)
+        monkeypatch.setattr(agwa_table_io, "where_clause", lambda table, filters: dict(filters or {}))
+        monkeypatch.setattr(agwa_table_io, "read_table", self.read_table)
+        monkeypatch.setattr(agwa_table_io, "append_rows", self.append_rows)
+        monkeypatch.setattr(agwa_table_io, "delete_rows", self.delete_rows)
+        monkeypatch.setattr(agwa_table_io, "update_rows", self.update_rows)
+        monkeypatch.setattr(agwa_table_io, "upsert_rows", self.upsert_rows)
+
+    def add_field(self, table, field, field_type, *args, **kwargs):
+        if field not in self.tables[table].columns:
+            self.tables[table][field] = pd.Series(dtype=object if field_type == "TEXT" else float)
+
+    def _selected(self, table, filters):
+        df = self.tables[table]
+        selected = np.ones(len(df), dtype=bool)
+        for field, value in (filters or {}).items():
+            selected &= df[field].isin(list(value) if isinstance(value, (list, tuple, set)) else [value]).values
+        return selected
+
+    def search_cursor(self, table, fields, where=None):
+        df = self.tables[table][self._selected(table, where)][list(fields)].astype(object)
+        return Cursor(tuple(row) for row in df.where(df.notna(), None).values)
+
+    def read_table(self, table, fields, filters=None, where=None, null_value=None, skip_nulls=False, **kwargs):
+        df = self.tables[table][self._selected(table, filters)][list(fields)]
+        df = (df.dropna() if skip_nulls else df).reset_index(drop=True)
+        return df if null_value is None else df.fillna(null_value)
+
+    def append_rows(self, table, rows, fields=None):
+        if isinstance(rows, pd.DataFrame):
+            df_rows = rows[list(fields)] if fields is not None else rows
+        else:
+            df_rows = pd.DataFrame(list(rows), columns=list(fields))
+        self.tables[table] = pd.concat([self.tables[table], df_rows], ignore_index=True)
+        return len(df_rows)
+
+    def delete_rows(self, table, filters=None, where=None, key_fields=None, keys=None):
+        selected = self._selected(table, filters)
+        self.tables[table] = self.tables[table][~selected].reset_index(drop=True)
+        return int(selected.sum())
+
+    def update_rows(self, table, df, key_fields, fields=None, where=None):
+        n_updated, _ = self._update_matching_rows(table, df, key_fields, fields, where)
+        return n_updated
+
+    def upsert_rows(self, table, df, key_fields, fields=None, filters=None):
+        _, new_rows = self._update_matching_rows(table, df, key_fields, fields, filters)
+        if new_rows:
+            self.tables[table] = pd.concat([self.tables[table], pd.DataFrame(new_rows)], ignore_index=True)
+        return len(new_rows)
+
+    def _update_matching_rows(self, table, df, key_fields, fields, filters):
+        # Returns the number of rows updated and the rows of df not found, with the filters values
+        key_fields = [key_fields] if isinstance(key_fields, str) else list(key_fields)
+        fields = list(fields) if fields is not None else [field for field in df.columns if field not in key_fields]
+        df_table = self.tables[table]
+        selected = np.flatnonzero(self._selected(table, filters))
+        rows = {tuple(key): index for key, index in zip(df_table.iloc[selected][key_fields].values, selected)}
+        n_updated, new_rows = 0, []
+        for record in df[key_fields + fields].itertuples(index=False):
+            index = rows.get(tuple(record[:len(key_fields)]))
+            if index is None:
+                new_rows.append(dict(filters or {}, **dict(zip(key_fields + fields, record))))
+            else:
+                for field, value in zip(fields, record[len(key_fields):]):
+                    df_table.at[index, field] = value
+                n_updated += 1
+        return n_updated, new_rows
+
+
+class Cursor(list):
+    """Rows of a search cursor, which can be iterated in a with statement or directly, like arcpy cursors."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
@@ -0,0 +1,90 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+import agwa_table_io
+import code_parameterize_elements
+from agwa_channel_network import ChannelNetwork
+from memory_workspace import MemoryWorkspace
+
+
+# 44 and 54 flow into 24, and 14 and 24 into the outlet channel 34. Hillslopes ChannelID - 1 and ChannelID - 2 are
+# the laterals of a channel and ChannelID - 3 the headwater hillslope of the channels without contributing
+# channels (14, 44 and 54).
+CONTRIBUTING = {34: [14, 24], 24: [44, 54]}
+HILLSLOPES = pd.DataFrame({
+    "HillslopeID": [11, 12, 13, 22, 23, 32, 33, 41, 42, 43, 51, 52, 53],
+    "Area": [100., 10., 20., 30., 40., 50., 60., 200., 1., 2., 300., 3., 4.],
+    "MeanSlope": [0.10, 0.20, 0.30, 0.05, 0.15, 0.25, 0.35, 0.40, 0.50, 0.60, 0.02, 0.04, 0.06]})
+# Hillslopes draining to the outlet of each channel, by hand
+DRAINING = {14: [11, 12, 13], 44: [41, 42, 43], 54: [51, 52, 53], 24: [22, 23, 41, 42, 43, 51, 52, 53],
+            34: HILLSLOPES.HillslopeID.tolist()}
+
+
+@pytest.fixture
+def network():
+    return ChannelNetwork([14, 24, 34, 44, 54], CONTRIBUTING, 34)
+
+
+def test_sequence_follows_the_contributing_channels(network):
+    sequence = network.sequence()
+
+    assert sequence == {54: 1, 44: 2, 24: 3, 14: 4, 34: 5}
+    for channel_id, contributing_ids in CONTRIBUTING.items():
+        assert all(sequence[c] < sequence[channel_id] for c in contributing_ids)
+    assert network.levels() == {14: 1, 24: 1, 34: 0, 44: 2, 54: 2}
+    assert network.headwater_channels() == [14, 44, 54]
+    assert ChannelNetwork([14, 24, 34, 64], {34: [14, 24]}, 34).unsequenced_channels() == [64]
+
+
+def test_headwater_and_lateral_areas_are_accumulated_downstream(network):
+    df_areas = network.accumulate_hillslopes(HILLSLOPES, ["MeanSlope"]).set_index("ChannelID")
+
+    assert df_areas.LateralArea.to_dict() == {14: 30., 24: 70., 34: 110., 44: 3., 54: 7.}
+    # Channels with a headwater hillslope drain its area, the others the areas draining to their contributing
+    # channels: 24 gets 44 (3 + 200) and 54 (7 + 300), 34 gets 14 (30 + 100) and 24 (70 + 510)
+    assert df_areas.UpstreamArea.to_dict() == {14: 100., 24: 510., 34: 710., 44: 200., 54: 300.}
+    assert df_areas.LateralArea[34] + df_areas.UpstreamArea[34] == HILLSLOPES.Area.sum()
+
+    df_hillslopes = HILLSLOPES.set_index("HillslopeID")
+    for channel_id, hillslope_ids in DRAINING.items():
+        areas, slopes = df_hillslopes.Area[hillslope_ids], df_hillslopes.MeanSlope[hillslope_ids]
+        assert df_areas.UpstreamMeanSlope[channel_id] == pytest.approx((areas * slopes).sum() / areas.sum())
+
+
+def test_contributing_areas_of_a_parameterization_are_saved(network, monkeypatch):
+    workspace = MemoryWorkspace()
+    names = {"DelineationName": "d1", "DiscretizationName": "d1_1000"}
+    workspace.create_table("parameters_hillslopes", pd.concat([
+        HILLSLOPES.assign(**names, ParameterizationName="p1"),
+        HILLSLOPES.assign(**names, ParameterizationName="p2", Area=HILLSLOPES.Area * 2)], ignore_index=True))
+    workspace.create_table("parameters_channels", pd.DataFrame(
+        [("d1", "d1_1000", name, channel_id, np.nan, np.nan) for name in ["p1", "p2"]
+         for channel_id in network.channel_ids],
+        columns=list(names) + ["ParameterizationName", "ChannelID", "LateralArea", "UpstreamArea"]))
+    workspace.patch(monkeypatch, sys.modules["arcpy"], agwa_table_io)
+
+    code_parameterize_elements.calculate_contributing_area_k2(workspace.workspace, "d1", "d1_1000", "p2", False,
+                                                              network)
+    df_channels = workspace.tables[workspace.path("parameters_channels")].set_index(
+        ["ParameterizationName", "ChannelID"])
+    assert df_channels.loc["p2"].UpstreamArea.to_dict() == {14: 200., 24: 1020., 34: 1420., 44: 400., 54: 600.}
+    assert df_channels.loc["p1"].UpstreamArea.isna().all()
+
+
+def test_network_is_read_from_the_contributing_channels_of_its_discretization(network, monkeypatch):
+    workspace = MemoryWorkspace()
+    workspace.create_table("d1_1000_channels", pd.DataFrame({
+        "ChannelID": network.channel_ids, "arcid": range(5), "grid_code": range(5), "from_node": range(5),
+        "to_node": range(5)}))
+    # ChannelID and ContributingChannel are stored as text, and the rows of d1_500 must not be read
+    rows = [("d1", "d1_1000", str(channel_id), str(contributing_id))
+            for channel_id, contributing_ids in CONTRIBUTING.items() for contributing_id in contributing_ids]
+    workspace.create_table("contributing_channels", pd.DataFrame(
+        rows + [("d1", "d1_500", "34", "54"), ("d1", "d1_1000", "44", None)],
+        columns=["DelineationName", "DiscretizationName", "ChannelID", "ContributingChannel"]))
+    workspace.patch(monkeypatch, sys.modules["arcpy"], agwa_table_io)
+
+    network_read = ChannelNetwork.from_workspace(workspace.workspace, "d1", "d1_1000")
+    assert network_read.outlet_channel_id == 34
+    assert network_read.sequence() == network.sequence()
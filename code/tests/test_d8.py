@@ -0,0 +1,111 @@
+import os
+import numpy as np
+import pytest
+import agwa_d8
+import d8_reference
+
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "d8")
+OUTPUTS = ["stream_links", "shreve_order", "pour_points", "labels"]
+
+
+@pytest.fixture(params=["in memory", "memory-mapped"])
+def directory(request, monkeypatch, tmp_path):
+    """Work folder of agwa_d8. Memory-mapped arrays are forced by an IN_MEMORY_CELLS of 0, and the row blocks and
+    chunks are made smaller than the grids so that the passes cross their boundaries."""
+
+    monkeypatch.setattr(agwa_d8, "ROW_BLOCK_SIZE", 2)
+    monkeypatch.setattr(agwa_d8, "CHUNK_SIZE", 7)
+    if request.param == "memory-mapped":
+        monkeypatch.setattr(agwa_d8, "IN_MEMORY_CELLS", 0)
+    return tmp_path
+
+
+def random_grid(rng):
+    """Flow direction of a random tilted DEM with a few cells masked out, and its cells with a flow accumulation of
+    at least a random threshold."""
+
+    n_rows, n_cols = rng.integers(5, 30, 2)
+    rows, cols = np.mgrid[0:n_rows, 0:n_cols]
+    flow_direction = d8_reference.flow_direction_from_dem(cols * 0.3 + rows * 0.5 + rng.random((n_rows, n_cols)) * 3)
+    flow_direction[rng.random(flow_direction.shape) < 0.03] = 0
+    stream = (d8_reference.flow_accumulation(flow_direction) >= rng.integers(3, 10)) & (flow_direction != 0)
+    return flow_direction, stream
+
+
+def assert_matches(results, expected):
+    for name, values in zip(OUTPUTS, expected):
+        np.testing.assert_array_equal(np.asarray(results[name]).reshape(-1), np.asarray(values).reshape(-1), name)
+
+
+def test_golden_dem(directory):
+    dem = np.loadtxt(os.path.join(DATA, "dem.txt"))
+    flow_direction = d8_reference.flow_direction_from_dem(dem)
+    np.testing.assert_array_equal(flow_direction, np.loadtxt(os.path.join(DATA, "flow_direction.txt")))
+    stream = (d8_reference.flow_accumulation(flow_direction) >= 3) & (flow_direction != 0)
+    expected = [np.loadtxt(os.path.join(DATA, f"{name}.txt"), dtype=np.int64) for name in OUTPUTS]
+
+    assert_matches(agwa_d8.discretize(flow_direction, stream, str(directory)), expected)
+    assert_matches(agwa_d8.FlowGraph(flow_direction, str(directory)).discretize(stream), expected)
+    assert bool(os.listdir(directory)) == (agwa_d8.IN_MEMORY_CELLS == 0)
+
+
+def test_grid_array_copies_the_cells_chunk_by_chunk(directory):
+    flow_direction, stream = random_grid(np.random.default_rng(0))
+    links = agwa_d8.stream_links(flow_direction, stream, str(directory))
+
+    grid = agwa_d8.grid_array(links, flow_direction.shape, np.int32, str(directory), "stream_link_raster")
+    assert grid.dtype == np.int32
+    np.testing.assert_array_equal(grid, np.asarray(links).reshape(flow_direction.shape))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_grids_match_the_reference(directory, seed):
+    flow_direction, stream = random_grid(np.random.default_rng(seed))
+    expected = d8_reference.discretize(flow_direction, stream)
+
+    assert_matches(agwa_d8.discretize(flow_direction, stream, str(directory)), expected)
+    assert_matches(agwa_d8.FlowGraph(flow_direction, str(directory)).discretize(stream), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_link_count_curve_matches_the_discretizations(directory, seed):
+    flow_direction, _ = random_grid(np.random.default_rng(seed))
+    accumulation = np.where(flow_direction != 0, d8_reference.flow_accumulation(flow_direction), -1).astype(float)
+    thresholds = [7., 0., 2.5, 12., 3., 30.]
+
+    heads, confluences = agwa_d8.link_count_curve(flow_direction, accumulation, thresholds)
+    flow_graph = agwa_d8.FlowGraph(flow_direction, str(directory))
+    for threshold, n_heads, n_confluences in zip(thresholds, heads, confluences):
+        results = flow_graph.discretize((accumulation > threshold) & (flow_direction != 0))
+        assert results["stream_links"].max(initial=0) == n_heads + n_confluences
+        assert np.count_nonzero(results["pour_points"] % 10 == 1) == n_heads
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("increases_downstream", [True, False])
+def test_threshold_sweep_matches_the_discretizations(directory, seed, increases_downstream):
+    rng = np.random.default_rng(seed)
+    flow_direction, _ = random_grid(rng)
+    metric = d8_reference.flow_accumulation(flow_direction).astype(float)
+    if not increases_downstream:
+        # stream cells can then leave the network above cells that remain in it
+        metric = rng.random(flow_direction.shape) * 20
+    metric[flow_direction == 0] = -1
+    flow_graph = agwa_d8.FlowGraph(flow_direction, str(directory))
+    sweep = agwa_d8.ThresholdSweep(flow_graph, metric)
+
+    for threshold in [0., 2.5, 3., 3., 7., 12., 30., 1e9]:
+        sweep.advance(threshold)
+        stream = (metric > threshold) & (flow_direction != 0)
+        expected = flow_graph.discretize(stream)
+        channels = sweep.channel_grid(np.empty(flow_direction.shape, np.uint8))
+        np.testing.assert_array_equal(channels, np.where(flow_direction != 0, stream, 255))
+        np.testing.assert_array_equal(sweep.links_grid(np.empty(flow_direction.shape, np.int32)),
+                                      expected["stream_links"])
+        np.testing.assert_array_equal(sweep.labels_grid(np.empty(flow_direction.shape, np.int64)), expected["labels"])
+        np.testing.assert_array_equal(sweep.order, expected["shreve_order"].reshape(-1)[sweep.cells])
+        np.testing.assert_array_equal(sweep.pour_points, expected["pour_points"].reshape(-1)[sweep.cells])
+
+    with pytest.raises(Exception, match="increasing order"):
+        sweep.advance(0.)
@@ -0,0 +1,44 @@
+import numpy as np
+import code_discretize_watershed
+
+
+def polyline(*vertices):
+    vertices = np.array(vertices, dtype=float)
+    return vertices[:-1], vertices[1:]
+
+
+def test_points_on_the_left_of_a_straight_channel():
+    starts, ends = polyline((0, 0), (10, 0))
+    points = np.array([(5, 1), (5, -1), (-3, 2), (14, -2), (5, 0)], dtype=float)
+
+    # the channel flows east: north is on the left, and points on the line are on the right
+    assert code_discretize_watershed.points_on_left(points, starts, ends).tolist() == [True, False, True, False,
+                                                                                       False]
+    assert code_discretize_watershed.points_on_left(points, ends, starts).tolist() == [False, True, False, True,
+                                                                                       False]
+
+
+def test_points_on_the_left_of_a_bent_channel():
+    starts, ends = polyline((0, 0), (10, 0), (10, 10))
+    points = np.array([(5, 5), (9, 1), (15, -5), (11, 1), (5, -1), (9, 12)], dtype=float)
+
+    assert code_discretize_watershed.points_on_left(points, starts, ends).tolist() == [True, True, False, False,
+                                                                                       False, True]
+
+
+def test_nearest_vertex_of_a_hairpin():
+    # (11, 0.5) is nearest to the vertex (10, 0) of both segments. It is on the left of the first segment but
+    # outside the hairpin, which the second segment, whose line is farther from the point, decides.
+    starts, ends = polyline((0, 0), (10, 0), (0, 1))
+    points = np.array([(11, 0.5), (5, 0.2)], dtype=float)
+
+    assert code_discretize_watershed.points_on_left(points, starts, ends).tolist() == [False, True]
+
+
+def test_zero_length_segments():
+    starts, ends = polyline((0, 0), (0, 0), (0, 10), (0, 10))
+    points = np.array([(-1, 5), (1, 5), (-1, -1)], dtype=float)
+
+    with np.errstate(all="raise"):
+        on_left = code_discretize_watershed.points_on_left(points, starts, ends)
+    assert on_left.tolist() == [True, False, True]
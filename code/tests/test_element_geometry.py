@@ -0,0 +1,70 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+import agwa_table_io
+import agwa_lookup_tables
+import agwa_element_geometry
+import code_parameterize_elements
+from memory_workspace import MemoryWorkspace
+
+
+HGR = pd.DataFrame({"HGRNAME": ["Southwest", "Basin and Range", "Colorado Plateau"],
+                    "wCoef": [2.8, 1.9, 3.4], "wExp": [0.39, 0.46, 0.35],
+                    "dCoef": [0.09, 0.12, 0.07], "dExp": [0.32, 0.28, 0.36]})
+CHANNELS = pd.DataFrame({"ChannelID": [14, 24, 34, 44], "UpstreamArea": [0., 2.5e5, 1.2e6, 8.4e6],
+                         "LateralArea": [3.e5, 1.1e5, 4.e5, 2.2e5]})
+
+
+@pytest.fixture
+def df_hgr(monkeypatch):
+    monkeypatch.setattr(agwa_lookup_tables, "hydraulic_geometry_relationships", lambda hgr_table: HGR)
+    return agwa_element_geometry.read_hydraulic_geometry_relationships("lookup_tables.gdb/HGR")
+
+
+def test_relationships_broadcast_like_one_relationship_at_a_time(df_hgr):
+    df_geometries = agwa_element_geometry.channel_geometries(CHANNELS, df_hgr, side_slope1=2., side_slope2=3.)
+
+    assert len(df_geometries) == len(HGR) * len(CHANNELS)
+    for name, row in df_hgr.iterrows():
+        df_single = agwa_element_geometry.channel_geometries(CHANNELS, df_hgr.loc[[name]], 2., 3.)
+        pd.testing.assert_frame_equal(
+            df_geometries[df_geometries.HydraulicGeometryRelationship == name].reset_index(drop=True), df_single)
+
+        # scalar coefficients and exponents, as in a single-relationship parameterization
+        geometry = agwa_element_geometry.hydraulic_geometry(CHANNELS.UpstreamArea, CHANNELS.LateralArea, row.wCoef,
+                                                            row.wExp, row.dCoef, row.dExp, 2., 3.)
+        for field in agwa_element_geometry.CHANNEL_GEOMETRY_FIELDS:
+            np.testing.assert_allclose(df_single[field], geometry[field], err_msg=f"{name} {field}")
+
+    downstream_area = CHANNELS.UpstreamArea + CHANNELS.LateralArea
+    southwest = df_geometries[df_geometries.HydraulicGeometryRelationship == "Southwest"]
+    np.testing.assert_allclose(southwest.DownstreamBankfullWidth, 2.8 * downstream_area ** 0.39)
+    np.testing.assert_allclose(southwest.DownstreamBottomWidth,
+                               2.8 * downstream_area ** 0.39 - 0.09 * downstream_area ** 0.32 * (1 / 2. + 1 / 3.))
+
+
+def test_alternative_geometries_are_saved_for_each_relationship(df_hgr, monkeypatch):
+    workspace = MemoryWorkspace()
+    workspace.create_table("parameters_channels", CHANNELS.assign(DelineationName="d1", DiscretizationName="d1_1000",
+                                                                  ParameterizationName="p1"))
+    workspace.patch(monkeypatch, sys.modules["arcpy"], agwa_table_io)
+
+    def calculate(relationships):
+        return code_parameterize_elements.calculate_alternative_stream_geometries(
+            workspace.workspace, "d1", "d1_1000", "p1", "agwa", relationships)
+
+    calculate(None)
+    calculate(["Southwest"])
+    df_saved = workspace.tables[workspace.path("parameters_channel_geometries")]
+    assert len(df_saved) == len(HGR) * len(CHANNELS)
+    assert sorted(df_saved.HydraulicGeometryRelationship.unique()) == sorted(HGR.HGRNAME)
+    assert (df_saved.ParameterizationName == "p1").all()
+    pd.testing.assert_frame_equal(
+        df_saved.drop(columns=["DelineationName", "DiscretizationName", "ParameterizationName"])
+        .sort_values(["HydraulicGeometryRelationship", "ChannelID"], ignore_index=True),
+        agwa_element_geometry.channel_geometries(CHANNELS, df_hgr)
+        .sort_values(["HydraulicGeometryRelationship", "ChannelID"], ignore_index=True), check_dtype=False)
+
+    with pytest.raises(Exception, match="not found"):
+        calculate(["Great Plains"])
@@ -0,0 +1,73 @@
+import os
+import pytest
+import config
+import agwa_file_gdb
+import agwa_gssurgo_cache
+from file_gdb import create_file_gdb, table_file
+
+
+TABLES = ["component", "chorizon", "chtexturegrp", "chtexture", "mapunit", "fras_blk_MapunitRaster_10m"]
+
+
+def set_time(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+@pytest.fixture
+def soil_gdb(tmp_path, monkeypatch):
+    """A gSSURGO file geodatabase whose files were all last modified at time 1000."""
+
+    monkeypatch.setattr(config, "GSSURGO_CACHE_DIRECTORY", str(tmp_path / "cache"))
+    gdb = str(tmp_path / "gSSURGO_AZ.gdb")
+    numbers = create_file_gdb(gdb, TABLES)
+    for entry in os.scandir(gdb):
+        set_time(entry.path, 1000)
+    set_time(gdb, 1000)
+    return gdb, numbers
+
+
+def test_tables_are_found_in_the_system_catalog(soil_gdb):
+    gdb, numbers = soil_gdb
+
+    assert agwa_file_gdb.table_numbers(gdb) == {name.lower(): number for name, number in numbers.items()}
+    assert agwa_file_gdb.table_files(gdb, ["Chorizon"]) == [table_file(gdb, numbers["chorizon"]),
+                                                            table_file(gdb, numbers["chorizon"], ".gdbtablx")]
+    with pytest.raises(Exception, match="does not exist"):
+        agwa_file_gdb.table_files(gdb, ["GDB_DBTune"])
+
+
+def test_opening_the_database_does_not_change_the_cache(soil_gdb):
+    gdb, numbers = soil_gdb
+    directory = agwa_gssurgo_cache.cache_directory(gdb)
+
+    # ArcGIS opens the tables and builds the statistics of the raster stored with them
+    lock_file = os.path.join(gdb, f"a{numbers['chorizon']:08x}.MACHINE.1234.5678.sr.lock")
+    open(lock_file, "w").close()
+    set_time(lock_file, 2000)
+    set_time(table_file(gdb, numbers["fras_blk_MapunitRaster_10m"]), 2000)
+    set_time(table_file(gdb, numbers["mapunit"]), 2000)
+    set_time(gdb, 2000)
+    assert agwa_gssurgo_cache.cache_directory(gdb) == directory
+    os.remove(lock_file)
+    set_time(gdb, 3000)
+    assert agwa_gssurgo_cache.cache_directory(gdb) == directory
+
+    # editing a table read creates a new cache
+    set_time(table_file(gdb, numbers["chtexture"], ".gdbtablx"), 4000)
+    assert agwa_gssurgo_cache.cache_directory(gdb) != directory
+
+
+def test_table_files_are_used_when_the_catalog_cannot_be_read(soil_gdb):
+    gdb, numbers = soil_gdb
+    with open(table_file(gdb, 1), "wb") as f:
+        f.write(b"\0" * 8)
+    set_time(table_file(gdb, 1), 1000)
+    directory = agwa_gssurgo_cache.cache_directory(gdb)
+
+    lock_file = os.path.join(gdb, "_gdb.MACHINE.1234.5678.sr.lock")
+    open(lock_file, "w").close()
+    set_time(lock_file, 2000)
+    set_time(gdb, 2000)
+    assert agwa_gssurgo_cache.cache_directory(gdb) == directory
+    set_time(table_file(gdb, numbers["mapunit"]), 3000)
+    assert agwa_gssurgo_cache.cache_directory(gdb) != directory
@@ -0,0 +1,100 @@
+import sys
+import types
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import agwa_table_io
+import agwa_lookup_tables
+import code_parameterize_land_cover_and_soils as soils
+from memory_workspace import MemoryWorkspace
+
+
+NAMES = {"DelineationName": "d1", "DiscretizationName": "d1_1000"}
+SOIL_PARAMETERS = ["Ksat", "G", "Porosity", "Rock", "Sand", "Silt", "Clay", "Splash", "Cohesion", "Pave", "SMax",
+                   "CV", "Distribution", "BPressure"]
+# Land cover classes 11 (water) and 42 (evergreen forest)
+LAND_COVER_LUT = pd.DataFrame({"CLASS": [11, 42], "NAME": ["Water", "Forest"], "COVER": [0., 0.5],
+                               "INT": [0., 2.], "N": [0.01, 0.1], "IMPERV": [1., 0.]})
+
+
+@pytest.fixture
+def workspace(monkeypatch):
+    """A workspace with the element parameters (Step 4) of the parameterizations p1 and p2 for the hillslopes 11,
+    12 and 13 of the channel 14. Every hillslope has the soil of map unit 100, where p1 is covered by forest and
+    p2 by water on hillslope 13."""
+
+    memory_workspace = MemoryWorkspace()
+    memory_workspace.create_table("parameters_hillslopes", pd.DataFrame(
+        [(name, hillslope_id, area) for name in ["p1", "p2"]
+         for hillslope_id, area in [(11, 100.), (12, 200.), (13, 300.)]],
+        columns=["ParameterizationName", "HillslopeID", "Area"]).assign(**NAMES))
+    memory_workspace.create_table("parameters_channels", pd.DataFrame(
+        {"ParameterizationName": ["p1", "p2"], "ChannelID": [14, 14]}).assign(**NAMES))
+    memory_workspace.create_table("d1_1000_channels", pd.DataFrame({"ChannelID": [14]}))
+    memory_workspace.patch(monkeypatch, sys.modules["arcpy"], agwa_table_io)
+    memory_workspace.upserts = []
+    upsert_rows = memory_workspace.upsert_rows
+
+    def record_upsert(table, df, key_fields, fields=None, filters=None):
+        memory_workspace.upserts.append(table)
+        return upsert_rows(table, df, key_fields, fields, filters)
+
+    arcpy = sys.modules["arcpy"]
+    monkeypatch.setattr(agwa_table_io, "upsert_rows", record_upsert)
+    monkeypatch.setattr(arcpy, "ListFields", lambda table: [
+        types.SimpleNamespace(name=name) for name in memory_workspace.tables[table].columns])
+    monkeypatch.setattr(config, "LAND_COVER_OVERLAY_METHOD", "Crosstab")
+
+    df_soils = pd.DataFrame({"MapUnitKey": ["100"], **{parameter: [0.5] for parameter in SOIL_PARAMETERS}})
+    df_soils["Pave"] = 0.
+    monkeypatch.setattr(soils, "initialize_workspace", lambda *args: None)
+    monkeypatch.setattr(soils, "detach_children", lambda *args: None)
+    monkeypatch.setattr(soils, "extract_parameters", lambda *args: (None,) * 6 + ("agwa",) + (None,))
+    monkeypatch.setattr(soils, "soil_map_unit_areas", lambda *args: pd.DataFrame(
+        {"HillslopeID": [11, 12, 13], "MUKEY": "100", "Shape_Area": [100., 200., 300.]}))
+    monkeypatch.setattr(soils, "soil_parameters", lambda *args: (None, None, None, df_soils))
+    monkeypatch.setattr(soils, "save_results", lambda *args: None)
+    monkeypatch.setattr(soils, "crosstab_land_covers", lambda workspace, discretization_name, land_covers: [
+        pd.DataFrame({"HillslopeID": [11, 12, 13], "gridcode": [42, 42, 42 if land_cover == "forest.tif" else 11],
+                      "Shape_Area": [100., 200., 300.]}) for land_cover in land_covers])
+    monkeypatch.setattr(agwa_lookup_tables, "lookup_table_path", lambda agwa_directory, table: table)
+    monkeypatch.setattr(agwa_lookup_tables, "land_cover_lut", lambda table: LAND_COVER_LUT)
+    monkeypatch.setattr(agwa_lookup_tables, "channel_types", lambda agwa_directory: pd.DataFrame(
+        {"Channel_Type": ["Default", "Sandy"], "Ksat": [np.nan, 210.], "Manning": [np.nan, 0.035],
+         "Pave": [np.nan, 0.]}))
+    return memory_workspace
+
+
+def test_scenarios_are_saved_with_one_write_per_table(workspace):
+    soils.parameterize_scenarios("project.gdb", workspace.workspace, "d1", "d1_1000", ["p1", "p2"],
+                                 ["forest.tif", "water.tif"], "mrlc2001_lut", "soils.tif", "gSSURGO.gdb", 3, 80.,
+                                 "Sandy", False)
+
+    assert workspace.upserts == [workspace.path("parameters_hillslopes"), workspace.path("parameters_channels")]
+    df_hillslopes = workspace.tables[workspace.path("parameters_hillslopes")].set_index(
+        ["ParameterizationName", "HillslopeID"])
+    assert len(df_hillslopes) == 6
+    assert df_hillslopes.Canopy.to_dict() == {("p1", 11): 0.5, ("p1", 12): 0.5, ("p1", 13): 0.5,
+                                              ("p2", 11): 0.5, ("p2", 12): 0.5, ("p2", 13): 0.}
+    assert (df_hillslopes.Ksat == 0.5).all()
+    assert df_hillslopes.Area.tolist() == [100., 200., 300.] * 2
+
+    df_channels = workspace.tables[workspace.path("parameters_channels")].set_index("ParameterizationName")
+    assert len(df_channels) == 2
+    # Channel 14 takes the area-weighted means of its hillslopes and the Ksat and Manning of its channel type
+    assert df_channels.Imperviousness.to_dict() == {"p1": 0., "p2": 0.5}
+    assert df_channels.Ksat.tolist() == [210., 210.]
+    assert df_channels.Woolhiser.tolist() == ["Yes", "Yes"]
+
+
+def test_scenarios_need_one_land_cover_and_a_unique_name_each(workspace):
+    with pytest.raises(Exception, match="One land cover"):
+        soils.parameterize_scenarios("project.gdb", workspace.workspace, "d1", "d1_1000", ["p1", "p2"],
+                                     ["forest.tif"], "mrlc2001_lut", "soils.tif", "gSSURGO.gdb", 3, 80., "Sandy",
+                                     False)
+    with pytest.raises(Exception, match="unique"):
+        soils.parameterize_scenarios("project.gdb", workspace.workspace, "d1", "d1_1000", ["p1", "p1"],
+                                     ["forest.tif", "water.tif"], "mrlc2001_lut", "soils.tif", "gSSURGO.gdb", 3,
+                                     80., "Sandy", False)
+    assert workspace.upserts == []
@@ -0,0 +1,112 @@
+import os
+import sys
+import types
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import agwa_table_io
+import agwa_raster_io
+import agwa_zonal
+import code_parameterize_land_cover_and_soils as soils
+from memory_workspace import MemoryWorkspace
+
+
+def polygon(x, y):
+    return types.SimpleNamespace(labelPoint=types.SimpleNamespace(X=x, Y=y))
+
+
+# Hillslopes on a 10 x 10 grid of 10 m cells from (0, 0) to (100, 100). 31 and 41 are too small to contain a cell
+# center, and the label point of 41 is outside the grid.
+HILLSLOPES = pd.DataFrame({"HillslopeID": [11, 21, 31, 41], "SHAPE@WKB": [b"11", b"21", b"31", b"41"],
+                           "SHAPE@": [polygon(25., 75.), polygon(75., 25.), polygon(52., 48.), polygon(102., 50.)],
+                           "SHAPE@AREA": [1200., 800., 30., 20.]})
+WITHOUT_CELLS = [31, 41]
+
+
+@pytest.fixture
+def overlay(monkeypatch, tmp_path):
+    """A workspace with the hillslopes of the discretization d1_1000 and a soil raster file, soil.tif. The
+    hillslopes are cross-tabulated with the rasters by zonal_crosstab, which counts 4 cells of class 7 in each
+    hillslope with cells, the cells of each raster read by RasterToNumPyArray have the value of cell_values (7 by
+    default), the blocks read are recorded in blocks_read and the warnings in warnings."""
+
+    arcpy = sys.modules["arcpy"]
+    workspace = MemoryWorkspace()
+    workspace.create_table("d1_1000_hillslopes", HILLSLOPES)
+    workspace.patch(monkeypatch, arcpy, agwa_table_io)
+    soil_raster = str(tmp_path / "soil.tif")
+    open(soil_raster, "wb").close()
+    os.utime(soil_raster, (1000, 1000))
+    workspace.blocks_read, workspace.crosstabs, workspace.warnings, workspace.cell_values = [], [], [], {}
+
+    class Raster(object):
+        def __init__(self, path):
+            self.catalogPath = path
+            self.extent = types.SimpleNamespace(XMin=0., YMax=100.)
+            self.meanCellWidth, self.meanCellHeight, self.width, self.height = 10., 10., 10, 10
+            self.noDataValue, self.pixelType = -1, "U32"
+            self.spatialReference = types.SimpleNamespace(exportToString=lambda: "NAD83 UTM 12N")
+
+    def raster_to_numpy_array(raster, lower_left, n_cols, n_rows, *args, **kwargs):
+        workspace.blocks_read.append(raster.catalogPath)
+        return np.full((n_rows, n_cols), workspace.cell_values.get(raster.catalogPath, 7))
+
+    def zonal_crosstab(zone_raster, class_raster, zone_ids, *args):
+        workspace.crosstabs.append(class_raster)
+        zone_ids = [zone_id for zone_id in zone_ids if zone_id not in WITHOUT_CELLS]
+        return pd.DataFrame({"ZoneID": zone_ids, "Class": 7, "COUNT": 4., "AREA": 400.})
+
+    monkeypatch.setattr(config, "USE_PARAMETERIZATION_CACHE", True)
+    monkeypatch.setattr(arcpy, "Exists", lambda dataset: dataset in workspace.tables or os.path.exists(dataset))
+    monkeypatch.setattr(arcpy, "Describe", lambda dataset: types.SimpleNamespace(
+        dataType="RasterDataset" if dataset.endswith(".tif") else "FeatureClass"))
+    monkeypatch.setattr(arcpy, "Raster", Raster)
+    monkeypatch.setattr(arcpy, "RasterToNumPyArray", raster_to_numpy_array)
+    monkeypatch.setattr(arcpy, "ListFields", lambda dataset: [])
+    monkeypatch.setattr(arcpy, "AddWarning", workspace.warnings.append)
+    monkeypatch.setattr(agwa_raster_io, "rasterize_zones", lambda *args: args[-1])
+    monkeypatch.setattr(agwa_raster_io, "align_raster", lambda raster, *args: raster)
+    monkeypatch.setattr(agwa_zonal, "zonal_crosstab", zonal_crosstab)
+    workspace.soil_raster = soil_raster
+    return workspace
+
+
+def soil_map_unit_areas(overlay):
+    return soils.crosstab_soil_map_units(overlay.workspace, "d1", "d1_1000", overlay.soil_raster)
+
+
+def test_soil_map_unit_areas_are_read_back_without_reading_the_soil_raster(overlay):
+    df_soil_areas = soil_map_unit_areas(overlay)
+    assert df_soil_areas.HillslopeID.tolist() == [11, 21, 31]
+    assert overlay.crosstabs == [overlay.soil_raster]
+
+    overlay.blocks_read.clear()
+    pd.testing.assert_frame_equal(soil_map_unit_areas(overlay), df_soil_areas, check_dtype=False)
+    assert overlay.crosstabs == [overlay.soil_raster]
+    assert overlay.blocks_read == []
+
+    # a soil raster overwritten in place is cross-tabulated again
+    os.utime(overlay.soil_raster, (2000, 2000))
+    soil_map_unit_areas(overlay)
+    assert overlay.crosstabs == [overlay.soil_raster] * 2
+
+
+def test_land_cover_of_hillslopes_without_cells_is_taken_at_their_label_point(overlay):
+    overlay.cell_values["land_cover.tif"] = 42
+    df_hillslope_cover = soils.crosstab_land_cover(overlay.workspace, "d1_1000", "land_cover.tif")
+
+    assert df_hillslope_cover.values.tolist() == [[11, 7, 400.], [21, 7, 400.], [31, 42, 30.]]
+    assert len(overlay.warnings) == 1 and "[41]" in overlay.warnings[0]
+
+
+def test_map_unit_of_hillslopes_without_cells_is_taken_at_their_label_point(overlay, monkeypatch):
+    overlay.cell_values[overlay.soil_raster] = 3
+    # raster attribute table
+    overlay.tables[overlay.soil_raster] = pd.DataFrame({"Value": [3, 7], "MUKEY": ["100", "200"]})
+    monkeypatch.setattr(sys.modules["arcpy"], "ListFields", lambda dataset: [
+        types.SimpleNamespace(name=name) for name in ["Value", "MUKEY"]])
+
+    df_soil_areas = soil_map_unit_areas(overlay)
+    assert df_soil_areas.values.tolist() == [[11, "200", 400.], [21, "200", 400.], [31, "100", 30.]]
+    assert len(overlay.warnings) == 1 and "[41]" in overlay.warnings[0]
@@ -0,0 +1,73 @@
+import os
+import sys
+import multiprocessing
+import multiprocessing.spawn
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import agwa_table_io
+import agwa_parallel
+from agwa_channel_network import ChannelNetwork
+from memory_workspace import MemoryWorkspace
+
+
+# 44 and 54 flow into 24, and 14 and 24 into the outlet channel 34. 64 is not connected to the outlet.
+NETWORK = ChannelNetwork([14, 24, 34, 44, 54, 64], {34: [14, 24], 24: [44, 54]}, 34)
+HILLSLOPE_IDS = [11, 12, 13, 22, 23, 32, 33, 41, 42, 43, 51, 52, 53, 62, 63]
+
+
+@pytest.mark.parametrize("factor, n_workers", [(0, 1), ("0", 1), (3, 3), ("3", 3), (" 2.0 ", 2), ("50%", 4),
+                                               ("100%", 8), ("10%", 1), (64, 8), (None, 2)])
+def test_worker_count_follows_the_parallel_processing_factor(monkeypatch, factor, n_workers):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(config, "PARALLEL_PROCESSING_FACTOR", "25%")
+
+    assert agwa_parallel.worker_count(factor) == n_workers
+
+
+def test_hillslopes_are_partitioned_into_whole_sub_basins():
+    groups = agwa_parallel.partition_hillslopes(NETWORK, HILLSLOPE_IDS, 2)
+
+    # 24 collects the 8 hillslopes of its sub-basin, more than 15 / 2, and the rest, with 64, form the last group
+    assert [group.tolist() for group in groups] == [[22, 23, 41, 42, 43, 51, 52, 53], [11, 12, 13, 32, 33, 62, 63]]
+    assert [group.tolist() for group in agwa_parallel.partition_hillslopes(NETWORK, HILLSLOPE_IDS, 1)] == \
+        [HILLSLOPE_IDS]
+
+
+@pytest.mark.parametrize("n_groups", [2, 3, 5, 15, 30])
+def test_every_hillslope_is_in_one_group(n_groups):
+    groups = agwa_parallel.partition_hillslopes(NETWORK, HILLSLOPE_IDS, n_groups)
+
+    assert sorted(np.concatenate(groups).tolist()) == HILLSLOPE_IDS
+    # the hillslopes of a channel are never split
+    channels = [set(np.asarray(group) // 10) for group in groups]
+    assert sum(len(group_channels) for group_channels in channels) == len(set.union(*channels))
+
+
+def test_hillslopes_without_an_id_are_skipped(monkeypatch):
+    workspace = MemoryWorkspace()
+    workspace.create_table("d1_1000_hillslopes", pd.DataFrame({"HillslopeID": [11, None, 12]}))
+    workspace.patch(monkeypatch, sys.modules["arcpy"], agwa_table_io)
+
+    assert agwa_parallel.read_hillslope_ids(workspace.path("d1_1000_hillslopes")) == [11, 12]
+
+
+def test_worker_environment_is_restored(monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", "other_folder")
+    monkeypatch.setattr(sys, "executable", os.path.join("ArcGIS", "Pro", "bin", "ArcGISPro.exe"))
+    monkeypatch.setattr(sys, "exec_prefix", os.path.join("ArcGIS", "Pro", "bin", "Python", "envs", "arcgispro-py3"))
+    executable = multiprocessing.spawn.get_executable()
+
+    with agwa_parallel._worker_environment():
+        assert os.environ["PYTHONPATH"].split(os.pathsep) == [
+            os.path.dirname(os.path.abspath(agwa_parallel.__file__)), "other_folder"]
+        assert os.fsdecode(multiprocessing.spawn.get_executable()).startswith(sys.exec_prefix)
+    assert os.environ["PYTHONPATH"] == "other_folder"
+    assert multiprocessing.spawn.get_executable() == executable
+
+    monkeypatch.delenv("PYTHONPATH")
+    with pytest.raises(ValueError):
+        with agwa_parallel._worker_environment():
+            raise ValueError()
+    assert "PYTHONPATH" not in os.environ
@@ -0,0 +1,122 @@
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+import agwa_table_io
+import agwa_parameterization_lineage as lineage
+from memory_workspace import MemoryWorkspace
+
+
+NAMES = ("d1", "d1_1000")
+
+
+@pytest.fixture
+def workspace(monkeypatch):
+    """A workspace whose parameters_hillslopes table has the rows of the parameterization p1 and a row of c1 that
+    overrides the MeanSlope of hillslope 21."""
+
+    memory_workspace = MemoryWorkspace()
+    rows = [("p1", 11, 100., 0.1), ("p1", 21, 200., 0.2), ("p1", 31, 300., 0.3), ("c1", 21, np.nan, 0.5)]
+    memory_workspace.create_table("parameters_hillslopes", pd.DataFrame(
+        [NAMES + row for row in rows],
+        columns=lineage.NAME_FIELDS + ["HillslopeID", "Area", "MeanSlope"]))
+    memory_workspace.patch(monkeypatch, sys.modules["arcpy"], agwa_table_io)
+    return memory_workspace
+
+
+def add_parent(workspace, child, parent, fields=("Area", "MeanSlope")):
+    lineage.add_parent(workspace.workspace, *NAMES, child, parent, "parameters_hillslopes", list(fields))
+
+
+def read(workspace, parameterization_name, fields=("Area", "MeanSlope")):
+    return lineage.read_parameters(workspace.workspace, "parameters_hillslopes", ["HillslopeID"] + list(fields),
+                                   *NAMES, parameterization_name).set_index("HillslopeID")
+
+
+def test_child_inherits_the_rows_of_its_parent(workspace):
+    add_parent(workspace, "c2", "p1")
+    df = read(workspace, "c2", lineage.NAME_FIELDS + ["Area", "MeanSlope"])
+
+    assert df.Area.tolist() == [100., 200., 300.]
+    assert df.MeanSlope.tolist() == [0.1, 0.2, 0.3]
+    assert set(df.ParameterizationName) == {"c2"}
+
+
+def test_values_stored_by_the_child_win(workspace):
+    add_parent(workspace, "c1", "p1")
+    df = read(workspace, "c1")
+
+    assert df.MeanSlope.tolist() == [0.1, 0.5, 0.3]
+    # Area is null in the row of c1, so it is inherited
+    assert df.Area.tolist() == [100., 200., 300.]
+
+
+def test_only_inherited_fields_are_resolved(workspace):
+    add_parent(workspace, "c1", "p1", ["MeanSlope"])
+    df = read(workspace, "c1")
+
+    assert df.MeanSlope.tolist() == [0.1, 0.5, 0.3]
+    assert df.Area.isna().all()
+
+
+def test_lineage_of_more_than_two_levels(workspace):
+    add_parent(workspace, "c1", "p1")
+    add_parent(workspace, "g1", "c1")
+    add_parent(workspace, "gg1", "g1", ["MeanSlope"])
+    workspace.append_rows(workspace.path("parameters_hillslopes"),
+                          [NAMES + ("g1", 31, np.nan, 0.9)], lineage.NAME_FIELDS + ["HillslopeID", "Area", "MeanSlope"])
+
+    assert read(workspace, "g1").MeanSlope.tolist() == [0.1, 0.5, 0.9]
+    assert read(workspace, "g1").Area.tolist() == [100., 200., 300.]
+    assert read(workspace, "gg1").MeanSlope.tolist() == [0.1, 0.5, 0.9]
+    assert read(workspace, "gg1").Area.isna().all()
+
+
+def test_circular_lineage_raises(workspace):
+    add_parent(workspace, "c1", "p1")
+    add_parent(workspace, "p1", "c1")
+    with pytest.raises(Exception, match="circular"):
+        read(workspace, "c1")
+    with pytest.raises(Exception, match="inherit from itself"):
+        add_parent(workspace, "p1", "p1")
+
+
+def test_detached_children_keep_their_values_when_the_parent_changes(workspace):
+    add_parent(workspace, "c1", "p1")
+    add_parent(workspace, "g1", "c1")
+    add_parent(workspace, "c2", "p1", ["MeanSlope"])
+    before = {name: read(workspace, name) for name in ["c1", "g1", "c2"]}
+
+    detached = lineage.detach_children(workspace.workspace, *NAMES, "p1", "parameters_hillslopes", ["Area"])
+    # re-parameterizing p1 changes its rows
+    table = workspace.tables[workspace.path("parameters_hillslopes")]
+    table.loc[table.ParameterizationName == "p1", ["Area", "MeanSlope"]] = [[1., 1.], [2., 2.], [3., 3.]]
+
+    assert detached == ["c1"]
+    # c1 stored the Area it inherited and still inherits MeanSlope, like c2 which inherits no Area
+    assert lineage.get_parents(workspace.workspace, *NAMES, "c1", "parameters_hillslopes") == [("p1", ["MeanSlope"])]
+    pd.testing.assert_series_equal(read(workspace, "c1").Area, before["c1"].Area, check_dtype=False)
+    pd.testing.assert_series_equal(read(workspace, "g1").Area, before["g1"].Area, check_dtype=False)
+    assert read(workspace, "c1").MeanSlope.tolist() == [1., 0.5, 3.]
+    assert read(workspace, "c2").MeanSlope.tolist() == [1., 2., 3.]
+
+
+def test_parent_with_children_is_not_deleted(workspace):
+    add_parent(workspace, "c1", "p1")
+    with pytest.raises(Exception, match="cannot be deleted"):
+        lineage.delete_parameterization(workspace.workspace, *NAMES, "p1")
+    assert (workspace.tables[workspace.path("parameters_hillslopes")].ParameterizationName == "p1").sum() == 3
+
+    before = read(workspace, "c1")
+    lineage.delete_parameterization(workspace.workspace, *NAMES, "p1", detach=True)
+
+    assert "p1" not in workspace.tables[workspace.path("parameters_hillslopes")].ParameterizationName.values
+    assert lineage.get_parents(workspace.workspace, *NAMES, "c1", "parameters_hillslopes") == []
+    pd.testing.assert_frame_equal(read(workspace, "c1"), before, check_dtype=False)
+
+
+def test_child_of_a_parent_without_rows_raises(workspace):
+    add_parent(workspace, "c1", "p1")
+    workspace.delete_rows(workspace.path("parameters_hillslopes"), {"ParameterizationName": "p1"})
+    with pytest.raises(Exception, match="has no rows"):
+        read(workspace, "c1")
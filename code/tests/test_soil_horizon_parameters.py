@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+import code_parameterize_land_cover_and_soils as soils
+from baseline_soils import baseline_horizon_parameters, soil_tables
+
+
+def horizon_parameters(function, max_thickness, max_horizons):
+    df_mapunit, tables = soil_tables()
+    return function(df_mapunit, tables["component"], tables["chorizon"], tables["chtexturegrp"],
+                    tables["chtexture"], tables["kin_lut"], max_thickness, max_horizons)
+
+
+@pytest.mark.parametrize("max_thickness, max_horizons", [(80, 0), (80, 3), (80, 1), (1000, 0), (15, 2)])
+def test_horizon_parameters_match_the_nested_loops(max_thickness, max_horizons):
+    expected_textures, expected_parameters, expected_not_usda = horizon_parameters(
+        baseline_horizon_parameters, max_thickness, max_horizons)
+    with_textures, parameters, not_usda = horizon_parameters(
+        soils.calculate_horizon_parameters, max_thickness, max_horizons)
+
+    pd.testing.assert_frame_equal(with_textures.reset_index(drop=True), expected_textures, check_dtype=False)
+    pd.testing.assert_frame_equal(parameters, expected_parameters.infer_objects(), check_dtype=False)
+    assert not_usda == expected_not_usda
+
+
+def test_horizon_parameters_cut_offs_and_textures():
+    _, parameters, not_usda = horizon_parameters(soils.calculate_horizon_parameters, 80, 3)
+    by_horizon = parameters.set_index("HorizonId")
+
+    # Map units are in the order they are found in the watershed. h4 is the fourth horizon of c1, h7 starts below
+    # 80 cm and c4 of map unit 300 has no horizon above 80 cm.
+    assert list(parameters.HorizonId) == ["h8", "h9", "h1", "h2", "h3", "h5", "h6"]
+    assert list(parameters.HorizonNumber) == [1, 2, 1, 2, 3, 1, 2]
+    # last texture of the last texture group, lieutex when texcl is empty
+    assert by_horizon.loc["h2", "Texture_texcl"] == "Clay"
+    assert by_horizon.loc["h3", "Texture_texcl"] == "Gravelly loam"
+    assert by_horizon.loc[["h6"], ["TextureGroupId", "Texture", "Texture_texcl"]].values.tolist() == [
+        ["g12", "SPM", "Sandy loam"]]
+    assert not_usda == ["Bedrock", "Bedrock", "Gravelly loam"]
+    # bedrock is paved, with the texture fractions set so that they sum to 1
+    assert by_horizon.loc["h8", ["Pave", "Sand", "Silt", "Clay"]].tolist() == [1, 0.33, 0.34, 0.33]
+    assert by_horizon.loc["h1", "Pave"] == 0
+    # kin_lut values replace the gSSURGO values unless they are missing
+    assert by_horizon.loc["h1", "Ksat"] == 13.0
+    assert by_horizon.loc["h1", "Porosity"] == 0.463
+    assert by_horizon.loc["h3", "Porosity"] == pytest.approx(1 - 1.5 / 2.65)
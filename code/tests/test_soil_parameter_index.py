@@ -0,0 +1,115 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+import config
+import agwa_gssurgo_cache
+import agwa_lookup_tables
+import code_build_soil_parameter_index
+import code_parameterize_land_cover_and_soils as soils
+from baseline_soils import soil_tables
+from file_gdb import create_file_gdb
+
+
+def database_tables():
+    """The tables of baseline_soils with two more map units: 400, first in the database, whose first horizon has
+    no texture group, and 500, whose only texture group has no textures."""
+
+    df_mapunit, tables = soil_tables()
+    tables["component"] = pd.concat([pd.DataFrame({"cokey": ["c6"], "comppct_r": [100], "mukey": ["400"]}),
+                                     tables["component"],
+                                     pd.DataFrame({"cokey": ["c7"], "comppct_r": [100], "mukey": ["500"]})],
+                                    ignore_index=True)
+    horizons = pd.DataFrame([("c6", "h12", 0, 10), ("c6", "h13", 10, 40), ("c7", "h14", 0, 30)],
+                            columns=["cokey", "chkey", "hzdept_r", "hzdepb_r"])
+    tables["chorizon"] = pd.concat([tables["chorizon"], horizons.assign(
+        ksat_r=5.0, sandtotal_r=50., silttotal_r=30., claytotal_r=20., dbthirdbar_r=1.5, partdensity=2.65,
+        sieveno10_r=80., kwfact=".24")], ignore_index=True)
+    tables["chtexturegrp"] = pd.concat([tables["chtexturegrp"], pd.DataFrame(
+        {"chkey": ["h13", "h14"], "chtgkey": ["g13", "g14"], "texture": ["S", "SPM"]})], ignore_index=True)
+    tables["chtexture"] = pd.concat([tables["chtexture"], pd.DataFrame(
+        {"chtgkey": ["g13"], "texcl": ["Sand"], "lieutex": ["None"]})], ignore_index=True)
+    return df_mapunit, tables
+
+
+@pytest.fixture
+def gssurgo(monkeypatch, tmp_path):
+    """A gSSURGO file geodatabase folder whose tables, read through arcpy, are those of database_tables, with the
+    gSSURGO caches and soil parameter indexes in tmp_path. Returns the tables, the path of the geodatabase and the
+    number of each table in it."""
+
+    _, tables = database_tables()
+    soil_gdb = str(tmp_path / "soils.gdb")
+    numbers = create_file_gdb(soil_gdb, ["component", "chorizon", "chtexturegrp", "chtexture", "mapunit"])
+
+    def table_to_numpy_array(table, fields, *args, **kwargs):
+        return tables[os.path.basename(table)][list(fields)].to_records(index=False)
+
+    monkeypatch.setattr(config, "USE_GSSURGO_CACHE", True)
+    monkeypatch.setattr(config, "GSSURGO_CACHE_DIRECTORY", str(tmp_path / "cache"))
+    monkeypatch.setattr(agwa_gssurgo_cache.agwa_step_cache, "fingerprint", lambda *args, **kwargs: "kin_lut")
+    monkeypatch.setattr(agwa_lookup_tables, "read_lookup_table", lambda table, fields=None: tables["kin_lut"].copy())
+    monkeypatch.setattr(sys.modules["arcpy"].da, "TableToNumPyArray", table_to_numpy_array)
+    return tables, soil_gdb, numbers
+
+
+def set_time(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+@pytest.mark.parametrize("max_thickness, max_horizons", [(80, 0), (80, 2)])
+def test_index_and_direct_calculation_give_identical_rows(gssurgo, monkeypatch, max_thickness, max_horizons):
+    _, soil_gdb, _ = gssurgo
+    code_build_soil_parameter_index.execute("agwa", soil_gdb, max_horizons, max_thickness)
+    mukeys = pd.unique(np.array(["200", "100", "400", "500", "200"]))
+
+    monkeypatch.setattr(config, "USE_SOIL_PARAMETER_INDEX", True)
+    from_index = soils.soil_parameters(soil_gdb, "agwa", mukeys, max_thickness, max_horizons, False)
+    monkeypatch.setattr(config, "USE_SOIL_PARAMETER_INDEX", False)
+    calculated = soils.soil_parameters(soil_gdb, "agwa", mukeys, max_thickness, max_horizons, False)
+
+    assert from_index[0] is None and calculated[0] is not None
+    for df_index, df_calculated in zip(from_index[2:], calculated[2:]):
+        assert len(df_calculated)
+        pd.testing.assert_frame_equal(df_index, df_calculated, check_dtype=False)
+
+
+def test_index_is_read_until_the_tables_are_edited(gssurgo):
+    _, soil_gdb, numbers = gssurgo
+    for entry in os.scandir(soil_gdb):
+        set_time(entry.path, 1000)
+    code_build_soil_parameter_index.execute("agwa", soil_gdb, 0, 80)
+    kin_lut_table = agwa_lookup_tables.lookup_table_path("agwa", "kin_lut")
+    cache = agwa_gssurgo_cache.cache_directory(soil_gdb)
+
+    # opening the database does not change the key of the index
+    set_time(soil_gdb, 2000)
+    open(os.path.join(soil_gdb, "_gdb.MACHINE.1234.5678.sr.lock"), "w").close()
+    df_weighted_by_horizon, df_weighted_by_component = agwa_gssurgo_cache.read_soil_index(
+        soil_gdb, kin_lut_table, 0, 80, ["100", "200"])
+    assert sorted(df_weighted_by_component.MapUnitKey) == ["100", "200"]
+    assert len(df_weighted_by_horizon)
+
+    # the index of the edited tables is not found, and a new build deletes it
+    old_index = agwa_gssurgo_cache.soil_index_directory(soil_gdb, kin_lut_table, 0, 80)
+    set_time(os.path.join(soil_gdb, f"a{numbers['chorizon']:08x}.gdbtable"), 3000)
+    assert agwa_gssurgo_cache.read_soil_index(soil_gdb, kin_lut_table, 0, 80, ["100"]) is None
+    code_build_soil_parameter_index.execute("agwa", soil_gdb, 0, 80)
+    assert agwa_gssurgo_cache.read_soil_index(soil_gdb, kin_lut_table, 0, 80, ["100"]) is not None
+    assert not os.path.exists(old_index) and not os.path.exists(cache)
+
+
+def test_horizons_without_texture_stay_within_their_component(gssurgo):
+    gssurgo, _, _ = gssurgo
+    mukeys = pd.DataFrame({"mukey": ["999", "400", "500", "200"]})
+    _, parameters, _ = soils.calculate_horizon_parameters(
+        mukeys, gssurgo["component"], gssurgo["chorizon"], gssurgo["chtexturegrp"], gssurgo["chtexture"],
+        gssurgo["kin_lut"], 80, 0)
+    textures = parameters.set_index("HorizonId").Texture_texcl
+
+    # h12 takes the texture below it in c6 instead of the texture of map unit 999 calculated before it, c7 has no
+    # texture and is left out, and h9 keeps the bedrock of h8 above it
+    assert list(parameters.HorizonId) == ["h11", "h12", "h13", "h8", "h9"]
+    assert textures.to_dict() == {"h11": "Loam", "h12": "Sand", "h13": "Sand", "h8": "Bedrock", "h9": "Bedrock"}
+    assert parameters.set_index("HorizonId").loc["h12", "TextureGroupId"] == "g13"
@@ -0,0 +1,124 @@
+import os
+import sys
+import types
+import numpy as np
+import pandas as pd
+import pytest
+import agwa_table_io
+import agwa_step_cache
+from memory_workspace import MemoryWorkspace
+from file_gdb import create_file_gdb, table_file
+
+
+NAMES = ["DelineationName", "DiscretizationName", "ParameterizationName"]
+OUTPUTS = {"parameters_hillslopes": ["Area"], "parameters_channels": ["LateralArea"]}
+
+
+@pytest.fixture
+def workspace(monkeypatch):
+    """A workspace with the hillslope and channel rows of the parameterizations p1 and p2, where p1 calculated the
+    Area of its hillslopes and the LateralArea of its channels."""
+
+    memory_workspace = MemoryWorkspace()
+    memory_workspace.create_table("parameters_hillslopes", pd.DataFrame(
+        [("d1", "d1_1000", name, hillslope_id, area) for name, area in [("p1", 10.), ("p2", np.nan)]
+         for hillslope_id in [11, 21]], columns=NAMES + ["HillslopeID", "Area"]))
+    memory_workspace.create_table("parameters_channels", pd.DataFrame(
+        [("d1", "d1_1000", name, 14, lateral_area) for name, lateral_area in [("p1", 20.), ("p2", np.nan)]],
+        columns=NAMES + ["ChannelID", "LateralArea"]))
+    memory_workspace.patch(monkeypatch, sys.modules["arcpy"], agwa_table_io)
+    return memory_workspace
+
+
+def values(workspace, table_name, field, parameterization_name):
+    df = workspace.tables[workspace.path(table_name)]
+    return df[df.ParameterizationName == parameterization_name][field].tolist()
+
+
+def test_step_is_restored_from_a_parameterization_with_the_same_hash(workspace):
+    agwa_step_cache.StepCache(workspace.workspace, "d1", "d1_1000", "p1").record("areas", "hash")
+    cache = agwa_step_cache.StepCache(workspace.workspace, "d1", "d1_1000", "p2")
+
+    assert cache.restore("areas", "other hash", OUTPUTS) is None
+    assert cache.restore("areas", "hash", OUTPUTS) == "p1"
+    assert values(workspace, "parameters_hillslopes", "Area", "p2") == [10., 10.]
+    assert values(workspace, "parameters_channels", "LateralArea", "p2") == [20.]
+
+
+def test_no_table_is_restored_when_a_donor_table_has_no_rows(workspace):
+    donor_cache = agwa_step_cache.StepCache(workspace.workspace, "d1", "d1_1000", "p1")
+    donor_cache.record("areas", donor_cache.step_hash("areas", inputs=["dem"]))
+    workspace.delete_rows(workspace.path("parameters_channels"), {"ParameterizationName": "p1"})
+    cache = agwa_step_cache.StepCache(workspace.workspace, "d1", "d1_1000", "p2")
+
+    calculated = []
+    assert cache.run("areas", OUTPUTS, lambda: calculated.append(True), inputs=["dem"]) is None
+    assert calculated == [True]
+    # the hillslope areas of p1 were not copied before the missing channel rows were found
+    assert np.isnan(values(workspace, "parameters_hillslopes", "Area", "p2")).all()
+
+
+@pytest.fixture
+def rasters(monkeypatch):
+    """Serve 100 x 100 rasters through arcpy.Raster at any path, and record the blocks read from them."""
+
+    arcpy = sys.modules["arcpy"]
+    blocks_read = []
+
+    def raster(path):
+        return types.SimpleNamespace(
+            catalogPath=path, extent=types.SimpleNamespace(XMin=0., YMax=100.), meanCellWidth=1.,
+            meanCellHeight=1., width=100, height=100, noDataValue=-9999, pixelType="F32",
+            spatialReference=types.SimpleNamespace(exportToString=lambda: "NAD83 UTM 12N"))
+
+    def raster_to_numpy_array(raster, lower_left, n_cols, n_rows, *args, **kwargs):
+        blocks_read.append(raster.catalogPath)
+        return np.zeros((n_rows, n_cols), np.float32)
+
+    monkeypatch.setattr(arcpy, "Exists", lambda dataset: True)
+    monkeypatch.setattr(arcpy, "Describe", lambda dataset: types.SimpleNamespace(dataType="RasterDataset"))
+    monkeypatch.setattr(arcpy, "Raster", raster)
+    monkeypatch.setattr(arcpy, "RasterToNumPyArray", raster_to_numpy_array)
+    return blocks_read
+
+
+def set_time(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+def test_rasters_of_a_file_geodatabase_are_fingerprinted_without_reading_them(rasters, tmp_path):
+    gdb = str(tmp_path / "workspace.gdb")
+    numbers = create_file_gdb(gdb, ["fras_ras_dem", "fras_bnd_dem", "fras_blk_dem", "fras_aux_dem", "fras_blk_slope"])
+    for entry in os.scandir(gdb):
+        set_time(entry.path, 1000)
+    dem = os.path.join(gdb, "dem")
+    fingerprint = agwa_step_cache.fingerprint(dem)
+
+    lock_file = os.path.join(gdb, f"a{numbers['fras_blk_dem']:08x}.MACHINE.1234.5678.sr.lock")
+    open(lock_file, "w").close()
+    set_time(table_file(gdb, numbers["fras_blk_slope"]), 2000)
+    set_time(gdb, 2000)
+    assert agwa_step_cache.fingerprint(dem) == fingerprint
+    # overwriting the raster in place rewrites its blocks
+    set_time(table_file(gdb, numbers["fras_blk_dem"]), 3000)
+    assert agwa_step_cache.fingerprint(dem) != fingerprint
+    assert agwa_step_cache.fingerprint(os.path.join(gdb, "slope")) != agwa_step_cache.fingerprint(dem)
+    assert rasters == []
+
+
+def test_raster_files_are_fingerprinted_from_their_modification_time(rasters, tmp_path):
+    tif = str(tmp_path / "dem.tif")
+    open(tif, "wb").close()
+    set_time(tif, 1000)
+    fingerprint = agwa_step_cache.fingerprint(tif)
+
+    assert agwa_step_cache.fingerprint(tif) == fingerprint
+    set_time(tif, 2000)
+    assert agwa_step_cache.fingerprint(tif) != fingerprint
+    assert rasters == []
+
+
+def test_rasters_without_files_are_fingerprinted_from_their_cells(rasters):
+    agwa_step_cache.fingerprint("sde_connection.sde/dem")
+
+    assert rasters == ["sde_connection.sde/dem"]
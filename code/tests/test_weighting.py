@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+import agwa_weighting
+
+
+def loop_weighted_mean(df, group_field, value_fields, weight_field):
+    """The loop over the groups that weighted_mean replaces."""
+
+    rows = []
+    for group in pd.unique(df[group_field]):
+        df_group = df[df[group_field] == group]
+        weights = df_group[weight_field].astype(float)
+        rows.append([group] + [np.nansum(df_group[field] * weights) / weights.sum() for field in value_fields])
+    return pd.DataFrame(rows, columns=[group_field] + list(value_fields))
+
+
+@pytest.fixture
+def df():
+    """Horizons of three map units, in the order they are found in the watershed: 30 has a paved horizon, 10
+    only paved horizons and a missing Ksat, and 20 a single horizon."""
+
+    return pd.DataFrame({
+        "MapUnitKey": [30, 10, 30, 20, 10, 30],
+        "Ksat": [1., 4., 3., 5., np.nan, 0.],
+        "Sand": [0.2, 0.33, 0.4, 0.5, 0.33, 0.6],
+        "Silt": [0.4, 0.34, 0.3, 0.25, 0.34, 0.2],
+        "Clay": [0.4, 0.33, 0.3, 0.25, 0.33, 0.2],
+        "Pave": [0, 1, 0, 0, 1, 1],
+        "Thickness": [10., 20., 30., 40., 60., 50.]})
+
+
+def test_means_match_the_loop_over_the_groups(df):
+    fields = ["Ksat", "Sand", "Silt", "Clay", "Pave"]
+    df_means = agwa_weighting.weighted_mean(df, "MapUnitKey", fields, "Thickness")
+
+    pd.testing.assert_frame_equal(df_means, loop_weighted_mean(df, "MapUnitKey", fields, "Thickness"))
+
+
+def test_groups_are_in_order_of_first_appearance(df):
+    df_means = agwa_weighting.weighted_mean(df, "MapUnitKey", ["Ksat"], "Thickness")
+
+    assert df_means.MapUnitKey.tolist() == [30, 10, 20]
+    df_means = agwa_weighting.weighted_mean(df, ["Pave", "MapUnitKey"], ["Ksat"], "Thickness")
+    assert df_means[["Pave", "MapUnitKey"]].values.tolist() == [[0, 30], [1, 10], [0, 20], [1, 30]]
+
+
+def test_missing_values_count_in_the_weights(df):
+    df_means = agwa_weighting.weighted_mean(df, "MapUnitKey", ["Ksat"], "Thickness").set_index("MapUnitKey")
+
+    # the missing Ksat of map unit 10 adds nothing to the weighted sum but its thickness counts
+    assert df_means.loc[10, "Ksat"] == pytest.approx(4. * 20. / 80.)
+    df.loc[df.MapUnitKey == 10, "Ksat"] = np.nan
+    df_means = agwa_weighting.weighted_mean(df, "MapUnitKey", ["Ksat"], "Thickness").set_index("MapUnitKey")
+    assert df_means.loc[10, "Ksat"] == 0.
+
+
+def test_excluded_rows_are_left_out_unless_the_whole_group_is_excluded(df):
+    df_means = agwa_weighting.weighted_mean(df, "MapUnitKey", ["Ksat", "Pave"], "Thickness",
+                                            exclude=df.Pave == 1).set_index("MapUnitKey")
+
+    # the paved horizon of map unit 30 is left out, map unit 10 keeps its paved horizons
+    assert df_means.loc[30, "Ksat"] == pytest.approx((1. * 10. + 3. * 30.) / 40.)
+    assert df_means.loc[30, "Pave"] == 0.
+    assert df_means.loc[10, "Ksat"] == pytest.approx(4. * 20. / 80.)
+    assert df_means.loc[10, "Pave"] == 1.
+    assert df_means.index.tolist() == [30, 10, 20]
+
+
+def test_all_rows_excluded(df):
+    df_means = agwa_weighting.weighted_mean(df, "MapUnitKey", ["Ksat"], "Thickness", exclude=np.ones(len(df)))
+
+    pd.testing.assert_frame_equal(df_means, agwa_weighting.weighted_mean(df, "MapUnitKey", ["Ksat"], "Thickness"))
+
+
+def test_texture_fractions_are_renormalized(df):
+    df.loc[df.MapUnitKey == 30, "Sand"] = [0.4, 0.8, 1.2]
+    df_means = agwa_weighting.weighted_mean(df, "MapUnitKey", agwa_weighting.TEXTURE_FIELDS, "Thickness",
+                                            renormalize=agwa_weighting.TEXTURE_FIELDS).set_index("MapUnitKey")
+
+    np.testing.assert_allclose(df_means[agwa_weighting.TEXTURE_FIELDS].sum(axis=1), 1.)
+    sand, silt = (np.average(df[df.MapUnitKey == 30][field], weights=[10., 30., 50.]) for field in ["Sand", "Silt"])
+    assert df_means.loc[30, "Sand"] / df_means.loc[30, "Silt"] == pytest.approx(sand / silt)
+
+
+def test_renormalization_of_a_zero_or_missing_total(df):
+    df.loc[df.MapUnitKey == 20, agwa_weighting.TEXTURE_FIELDS] = 0.
+    df.loc[df.MapUnitKey == 10, "Thickness"] = 0.
+    df_means = agwa_weighting.weighted_mean(df, "MapUnitKey", agwa_weighting.TEXTURE_FIELDS, "Thickness",
+                                            renormalize=agwa_weighting.TEXTURE_FIELDS).set_index("MapUnitKey")
+
+    # a total of 0 is left as it is instead of dividing by 0, and a group without weight stays missing
+    assert df_means.loc[20].tolist() == [0., 0., 0.]
+    assert df_means.loc[10].isna().all()
+    assert df_means.loc[30].sum() == pytest.approx(1.)